@@ -0,0 +1,245 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Collects result files and logs from Linux VMs.
+
+Instead of pulling every file with its own uncompressed copy, the selected
+files are packed into a single gzipped tar archive on the VM, the archive is
+pulled and then unpacked into a local directory next to a JSON manifest that
+describes what was collected.
+
+Pulls from many VMs can run concurrently. They share a process-wide budget:
+at most --artifact_collection_max_concurrency archives are transferred at once
+and, if --artifact_collection_bandwidth_mbps is set, transfers are paced so
+that the average rate stays within that many megabits per second.
+
+StreamArtifacts offers the same selection without writing anything under the
+run's temp directory: the archive is read from the output of the remote
+command as it is produced and the files are handed to the caller as file
+objects.
+"""
+
+import json
+import logging
+import os
+import posixpath
+import tarfile
+import threading
+import time
+import uuid
+
+from perfkitbenchmarker import errors
+from perfkitbenchmarker import flags
+from perfkitbenchmarker import vm_util
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_integer('artifact_collection_max_concurrency', 8,
+                     'The maximum number of artifact archives pulled from VMs '
+                     'at the same time.', lower_bound=1)
+flags.DEFINE_float('artifact_collection_bandwidth_mbps', None,
+                   'If set, the average rate at which artifact archives are '
+                   'pulled from all VMs combined is kept below this many '
+                   'megabits per second.', lower_bound=0)
+
+MANIFEST_SUFFIX = '-manifest.json'
+
+
+class _BandwidthBudget(object):
+  """Paces transfers so their combined average rate stays within a budget.
+
+  This is a token bucket that refills at the budgeted rate. A transfer of N
+  bytes waits until the bucket is no longer in debt, then takes N bytes from
+  it, so bursts are allowed but the long-run rate is bounded.
+  """
+
+  def __init__(self, bytes_per_second, clock=time.time, sleep=time.sleep):
+    self.bytes_per_second = bytes_per_second
+    self._clock = clock
+    self._sleep = sleep
+    self._lock = threading.Lock()
+    self._available = 0.0
+    self._last_refill = clock()
+
+  def Acquire(self, num_bytes):
+    """Blocks until num_bytes may be transferred.
+
+    Returns:
+      The number of seconds spent waiting.
+    """
+    if not self.bytes_per_second:
+      return 0
+    with self._lock:
+      now = self._clock()
+      self._available = min(
+          self._available + (now - self._last_refill) * self.bytes_per_second,
+          self.bytes_per_second)
+      self._last_refill = now
+      wait = max(0.0, -self._available / self.bytes_per_second)
+      self._available -= num_bytes
+    if wait:
+      self._sleep(wait)
+    return wait
+
+
+_budget_lock = threading.Lock()
+_transfer_semaphore = None
+_bandwidth_budget = None
+
+
+def _GetBudget():
+  """Returns the process-wide (semaphore, _BandwidthBudget) pair."""
+  global _transfer_semaphore, _bandwidth_budget
+  with _budget_lock:
+    if _transfer_semaphore is None:
+      _transfer_semaphore = threading.BoundedSemaphore(
+          FLAGS.artifact_collection_max_concurrency)
+      mbps = FLAGS.artifact_collection_bandwidth_mbps
+      _bandwidth_budget = _BandwidthBudget(
+          mbps * 1000 * 1000 / 8 if mbps else None)
+    return _transfer_semaphore, _bandwidth_budget
+
+
+def _TarCommand(remote_dir, patterns, output):
+  """Returns a command that archives the files matching 'patterns'.
+
+  Patterns are shell globs evaluated relative to 'remote_dir' on the VM.
+  """
+  return 'cd %s && tar -czf %s %s' % (remote_dir, output, ' '.join(patterns))
+
+
+def _MembersOf(tar):
+  """Returns a list of (name, size) pairs for the regular files in 'tar'."""
+  return [(member.name, member.size) for member in tar.getmembers()
+          if member.isfile()]
+
+
+def _StripComponents(tar, count):
+  """Removes 'count' leading directories from the names of tar's members.
+
+  Like tar's --strip-components, members with no name left are dropped.
+  """
+  members = []
+  for member in tar.getmembers():
+    components = posixpath.normpath(member.name).split('/')
+    if len(components) > count:
+      member.name = '/'.join(components[count:])
+      members.append(member)
+  tar.members = members
+
+
+def CollectArtifacts(vm, remote_dir, patterns, local_dir, label='artifacts',
+                     strip_components=0, manifest_dir=None):
+  """Pulls files from a VM as one compressed archive and unpacks them.
+
+  Args:
+    vm: BaseVirtualMachine. The (Linux) VM to collect files from.
+    remote_dir: string. Directory on the VM that 'patterns' are relative to.
+        The directory structure below it is preserved in 'local_dir'.
+    patterns: list of strings. Shell globs selecting files or directories.
+    local_dir: string. Local directory to unpack into. Created if missing.
+    label: string. Names the manifest.
+    strip_components: int. The number of leading directories, relative to
+        'remote_dir', removed from the paths of the files in 'local_dir'.
+    manifest_dir: string. Local directory the manifest is written to.
+        Defaults to 'local_dir'.
+
+  Returns:
+    list of strings. Local paths of the collected files.
+
+  Raises:
+    RemoteCommandError: If the files could not be archived or pulled.
+  """
+  archive_name = 'pkb-%s-%s.tar.gz' % (label, uuid.uuid4().hex[:8])
+  remote_archive = posixpath.join(vm_util.VM_TMP_DIR, archive_name)
+  vm.RemoteCommand('mkdir -p %s' % vm_util.VM_TMP_DIR)
+  stat_output, _ = vm.RemoteCommand('%s && stat -c %%s %s' % (
+      _TarCommand(remote_dir, patterns, remote_archive), remote_archive))
+  compressed_bytes = int(stat_output.split()[-1])
+
+  if not os.path.isdir(local_dir):
+    os.makedirs(local_dir)
+  local_archive = os.path.join(vm_util.GetTempDir(), archive_name)
+  semaphore, budget = _GetBudget()
+  with semaphore:
+    wait_seconds = budget.Acquire(compressed_bytes)
+    start_time = time.time()
+    vm.PullFile(local_archive, remote_archive)
+    transfer_seconds = time.time() - start_time
+  vm.RemoteCommand('rm -f %s' % remote_archive, ignore_failure=True)
+
+  try:
+    with tarfile.open(local_archive, 'r:gz') as tar:
+      if strip_components:
+        _StripComponents(tar, strip_components)
+      members = _MembersOf(tar)
+      tar.extractall(local_dir)
+  finally:
+    os.remove(local_archive)
+
+  manifest = {
+      'vm': vm.name,
+      'remote_dir': remote_dir,
+      'patterns': patterns,
+      'compressed_bytes': compressed_bytes,
+      'uncompressed_bytes': sum(size for unused_name, size in members),
+      'transfer_seconds': transfer_seconds,
+      'budget_wait_seconds': wait_seconds,
+      'files': [{'path': name, 'bytes': size} for name, size in members],
+  }
+  manifest_path = os.path.join(manifest_dir or local_dir,
+                               '%s-%s%s' % (vm.name, label, MANIFEST_SUFFIX))
+  with open(manifest_path, 'w') as fp:
+    json.dump(manifest, fp, indent=2, sort_keys=True)
+  logging.info('Collected %d file(s) (%d bytes compressed) from %s in %.1fs.',
+               len(members), compressed_bytes, vm, transfer_seconds)
+  return [os.path.normpath(os.path.join(local_dir, name))
+          for name, unused_size in members]
+
+
+def StreamArtifacts(vm, remote_dir, patterns):
+  """Yields files from a VM without writing them to the local disk.
+
+  The archive is written to the output of a remote command and unpacked as it
+  arrives, so neither the archive nor the files are held in memory or on disk
+  as a whole.
+
+  Args:
+    vm: BaseLinuxMixin. The VM to read files from.
+    remote_dir: string. See CollectArtifacts.
+    patterns: list of strings. See CollectArtifacts.
+
+  Yields:
+    (name, file object) pairs, where name is relative to 'remote_dir'. Each
+    file object is only valid until the next pair is requested.
+
+  Raises:
+    RemoteCommandError: If the files could not be archived or read.
+  """
+  process = vm.OpenRemoteCommand(_TarCommand(remote_dir, patterns, '-'))
+  read_error = None
+  try:
+    with tarfile.open(fileobj=process.stdout, mode='r|gz') as tar:
+      for member in tar:
+        if member.isfile():
+          yield member.name, tar.extractfile(member)
+  except tarfile.TarError as e:
+    read_error = e
+  finally:
+    # Drains what the caller did not read, then waits for the command.
+    _, stderr = process.communicate()
+  if process.returncode or read_error:
+    raise errors.VirtualMachine.RemoteCommandError(
+        'Could not stream artifacts from %s (exit status %s): %s %s' %
+        (vm, process.returncode, read_error or '', stderr))
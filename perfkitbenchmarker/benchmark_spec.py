@@ -22,6 +22,7 @@ import os
 import pickle
 import thread
 import threading
+import time
 import uuid
 
 from perfkitbenchmarker import benchmark_status
@@ -34,6 +35,7 @@ from perfkitbenchmarker import os_types
 from perfkitbenchmarker import provider_info
 from perfkitbenchmarker import providers
 from perfkitbenchmarker import spark_service
+from perfkitbenchmarker import spec_journal
 from perfkitbenchmarker import stages
 from perfkitbenchmarker import static_virtual_machine as static_vm
 from perfkitbenchmarker import virtual_machine
@@ -311,6 +313,7 @@ class BenchmarkSpec(object):
     vm_util.RunThreaded(lambda net: net.Create(), networks)
 
     if self.vms:
+      virtual_machine.BulkCreateVms(self.vms)
       vm_util.RunThreaded(self.PrepareVm, self.vms)
       sshable_vms = [vm for vm in self.vms if vm.OS_TYPE != os_types.WINDOWS]
       sshable_vm_groups = {}
@@ -410,14 +413,17 @@ class BenchmarkSpec(object):
     vm.WaitForBootCompletion()
     vm.AddMetadata(**vm_metadata)
     vm.OnStartup()
+    vm.startup_complete_time = time.time()
     if any((spec.disk_type == disk.LOCAL for spec in vm.disk_specs)):
       vm.SetupLocalDisks()
     for disk_spec in vm.disk_specs:
       vm.CreateScratchDisk(disk_spec)
+    vm.scratch_disks_ready_time = time.time()
 
     # This must come after Scratch Disk creation to support the
     # Containerized VM case
     vm.PrepareVMEnvironment()
+    vm.prepare_complete_time = time.time()
 
   def DeleteVm(self, vm):
     """Deletes a single vm and scratch disk if required.
@@ -436,9 +442,17 @@ class BenchmarkSpec(object):
     return os.path.join(vm_util.GetTempDir(), uid)
 
   def Pickle(self):
-    """Pickles the spec so that it can be unpickled on a subsequent run."""
-    with open(self._GetPickleFilename(self.uid), 'wb') as pickle_file:
-      pickle.dump(self, pickle_file, 2)
+    """Pickles the spec so that it can be unpickled on a subsequent run.
+
+    This writes a full snapshot of the spec. Until the next call, resource
+    lifecycle changes are appended to a journal next to the snapshot instead
+    of re-pickling the whole spec (see spec_journal).
+    """
+    journal = spec_journal.GetJournal(self)
+    if journal is None:
+      journal = spec_journal.SpecJournal(self._GetPickleFilename(self.uid))
+      spec_journal.AttachJournal(self, journal)
+    journal.Checkpoint(self)
 
   @classmethod
   def GetBenchmarkSpec(cls, benchmark_module, config, uid):
@@ -456,13 +470,14 @@ class BenchmarkSpec(object):
     if stages.PROVISION in FLAGS.run_stage:
       return cls(benchmark_module, config, uid)
 
+    journal = spec_journal.SpecJournal(cls._GetPickleFilename(uid))
     try:
-      with open(cls._GetPickleFilename(uid), 'rb') as pickle_file:
-        spec = pickle.load(pickle_file)
+      spec = journal.Load()
     except Exception as e:  # pylint: disable=broad-except
       logging.error('Unable to unpickle spec file for benchmark %s.',
                     benchmark_module.BENCHMARK_NAME)
       raise e
+    spec_journal.AttachJournal(spec, journal)
     # Always let the spec be deleted after being unpickled so that
     # it's possible to run cleanup even if cleanup has already run.
     spec.deleted = False
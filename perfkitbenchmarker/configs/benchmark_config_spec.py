@@ -26,6 +26,7 @@ from perfkitbenchmarker import dpb_service
 from perfkitbenchmarker import errors
 from perfkitbenchmarker import flag_util
 from perfkitbenchmarker import flags
+from perfkitbenchmarker import module_manifest
 from perfkitbenchmarker import os_types
 from perfkitbenchmarker import providers
 from perfkitbenchmarker import static_virtual_machine
@@ -61,6 +62,9 @@ class FlagsDecoder(option_decoders.TypeVerifier):
     """
     config_flags = super(FlagsDecoder, self).Decode(value, component_full_name,
                                                     flag_values)
+    if config_flags:
+      # Flags of modules that have not been imported yet are not defined.
+      module_manifest.ImportModulesForFlags(config_flags)
     merged_flag_values = copy.deepcopy(flag_values)
     if config_flags:
       for key, value in config_flags.iteritems():
@@ -0,0 +1,142 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cache of decoded benchmark config specs.
+
+Decoding a benchmark config means parsing and merging its YAML, applying flag
+overrides and running every option decoder of its BenchmarkConfigSpec. The
+result only depends on the benchmark module, the user config for the run and
+the flag values, so large benchmark sets and config sweeps that repeat the
+same entry only need to decode it once.
+
+Entries are content addressed: the key is a digest of the PKB version, the
+benchmark module's source, the user config dict and every flag that was set
+on the command line or differs from its default. Specs are stored pickled, so
+every lookup returns a fresh copy that can be modified freely.
+
+Entries are kept in memory for the current process. If --config_cache_dir is
+set, they are also persisted there and reused by later runs.
+"""
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pickle
+import threading
+
+from perfkitbenchmarker import flags
+from perfkitbenchmarker import version
+
+flags.DEFINE_string('config_cache_dir', None,
+                    'If set, decoded benchmark configs are cached in this '
+                    'directory and reused by later runs with the same '
+                    'benchmark, user config and flag values.')
+
+FLAGS = flags.FLAGS
+
+# Flags that select or label runs, but do not affect how a config is decoded.
+_IGNORED_FLAGS = frozenset(['benchmarks', 'config_cache_dir', 'run_uri'])
+_SUFFIX = '.pickle'
+
+_lock = threading.Lock()
+_cache = {}
+
+
+def _FlagDict(flag_values):
+  if hasattr(flag_values, '_flags'):
+    return flag_values._flags()  # pylint: disable=protected-access
+  return flag_values.FlagDict()
+
+
+def GetKey(benchmark_module, user_config, flag_values):
+  """Returns the cache key of a benchmark config.
+
+  Args:
+    benchmark_module: The benchmark module.
+    user_config: dict. The user config for this run of the benchmark.
+    flag_values: flags.FlagValues. The command-line flags.
+
+  Returns:
+    string, or None if the config cannot be cached.
+  """
+  try:
+    source = inspect.getsource(benchmark_module)
+  except (IOError, TypeError):
+    return None
+  md5 = hashlib.md5()
+  md5.update('%s\0%s\0%s\0' % (version.VERSION, benchmark_module.__name__,
+                               source))
+  md5.update(json.dumps(user_config, sort_keys=True, default=repr))
+  for name, flag in sorted(_FlagDict(flag_values).iteritems()):
+    # Each flag is listed under its short name as well.
+    if name != flag.name or name in _IGNORED_FLAGS:
+      continue
+    if flag.present or flag.value != flag.default:
+      md5.update('\0%s\0%s\0%r' % (name, flag.present, flag.value))
+  return md5.hexdigest()
+
+
+def _CachePath(key):
+  return os.path.join(FLAGS.config_cache_dir, key + _SUFFIX)
+
+
+def Get(key):
+  """Returns a copy of the config spec cached under 'key', or None."""
+  if key is None:
+    return None
+  with _lock:
+    data = _cache.get(key)
+  if data is None and FLAGS.config_cache_dir:
+    try:
+      with open(_CachePath(key), 'rb') as cache_file:
+        data = cache_file.read()
+    except IOError:
+      return None
+  if data is None:
+    return None
+  try:
+    config_spec = pickle.loads(data)
+  except Exception as e:  # pylint: disable=broad-except
+    logging.warning('Ignoring unreadable cached config %s: %s', key, e)
+    return None
+  with _lock:
+    _cache[key] = data
+  return config_spec
+
+
+def Put(key, config_spec):
+  """Caches a copy of 'config_spec' under 'key'."""
+  if key is None:
+    return
+  data = pickle.dumps(config_spec, 2)
+  with _lock:
+    _cache[key] = data
+  if FLAGS.config_cache_dir:
+    tmp_path = '%s.%d' % (_CachePath(key), os.getpid())
+    try:
+      if not os.path.isdir(FLAGS.config_cache_dir):
+        os.makedirs(FLAGS.config_cache_dir)
+      with open(tmp_path, 'wb') as cache_file:
+        cache_file.write(data)
+      os.rename(tmp_path, _CachePath(key))
+    except (IOError, OSError) as e:
+      logging.warning('Could not persist cached config %s: %s', key, e)
+
+
+def Clear():
+  """Removes all in-memory entries."""
+  with _lock:
+    _cache.clear()
@@ -18,13 +18,26 @@ Disks can be created, deleted, attached to VMs, and detached from VMs.
 """
 
 import abc
+import contextlib
 import logging
+import time
 
 from perfkitbenchmarker import flags
 from perfkitbenchmarker import resource
+from perfkitbenchmarker import vm_util
 from perfkitbenchmarker.configs import option_decoders
 from perfkitbenchmarker.configs import spec
 
+flags.DEFINE_integer('scratch_disk_parallelism', 8,
+                     'The maximum number of the disks of a striped scratch '
+                     'disk that are created, attached, detached or deleted '
+                     'concurrently.', lower_bound=1)
+flags.DEFINE_boolean('scratch_disk_lazy_init', True,
+                     'If true, remote scratch disks created by PKB are '
+                     'formatted without zeroing their inode tables, and the '
+                     'kernel is told not to zero them in the background. '
+                     'This relies on new cloud volumes reading as zeros.')
+
 FLAGS = flags.FLAGS
 
 
@@ -257,6 +270,12 @@ class BaseDisk(resource.BaseResource):
     # that we want to operate on.
     self.disk_number = disk_spec.disk_number
 
+    # When attaching the disk started and finished (see TimedAttach), and
+    # how long each step of setting it up in the guest took in seconds.
+    self.attach_start_time = None
+    self.attach_end_time = None
+    self.setup_seconds = {}
+
   @abc.abstractmethod
   def Attach(self, vm):
     """Attaches the disk to a VM.
@@ -266,6 +285,27 @@ class BaseDisk(resource.BaseResource):
     """
     pass
 
+  def TimedAttach(self, vm):
+    """Attaches the disk to a VM and records when that started and finished.
+
+    Args:
+      vm: The BaseVirtualMachine instance to which the disk will be attached.
+    """
+    self.attach_start_time = time.time()
+    self.Attach(vm)
+    self.attach_end_time = time.time()
+
+  @contextlib.contextmanager
+  def MeasureSetupStep(self, step):
+    """Records how long the enclosed setup step takes in setup_seconds.
+
+    Args:
+      step: string. The name of the step, e.g. 'format'.
+    """
+    start_time = time.time()
+    yield
+    self.setup_seconds[step] = time.time() - start_time
+
   @abc.abstractmethod
   def Detach(self):
     """Detaches the disk from a VM."""
@@ -300,18 +340,19 @@ class StripedDisk(BaseDisk):
     super(StripedDisk, self).__init__(disk_spec)
     self.disks = disks
 
+  def _ForEachDisk(self, func):
+    """Calls 'func' on each disk, up to --scratch_disk_parallelism at once."""
+    vm_util.RunThreaded(func, self.disks,
+                        max_concurrent_threads=FLAGS.scratch_disk_parallelism)
+
   def _Create(self):
-    for disk in self.disks:
-      disk.Create()
+    self._ForEachDisk(lambda disk: disk.Create())
 
   def _Delete(self):
-    for disk in self.disks:
-      disk.Delete()
+    self._ForEachDisk(lambda disk: disk.Delete())
 
   def Attach(self, vm):
-    for disk in self.disks:
-      disk.Attach(vm)
+    self._ForEachDisk(lambda disk: disk.TimedAttach(vm))
 
   def Detach(self):
-    for disk in self.disks:
-      disk.Detach()
+    self._ForEachDisk(lambda disk: disk.Detach())
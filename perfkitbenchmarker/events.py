@@ -52,6 +52,16 @@ torn down (if run_stage includes teardown).
 Sender: None
 Payload: benchmark_spec.""")
 
+resource_state_changed = _events.signal('resource-state-changed', doc="""
+Signal sent when a resource's lifecycle state changes: after its creation
+has been requested (before it is known to exist), after it has been created,
+after it is ready (once _PostCreate has run, so provider-assigned ids are set)
+and after it has been deleted.
+
+Sender: the resource.BaseResource.
+Payload: state (string), one of 'requested', 'created', 'ready' or
+    'deleted'.""")
+
 RUN_PHASE = 'run'
 
 before_phase = _events.signal('before-phase', doc="""
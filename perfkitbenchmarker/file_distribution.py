@@ -0,0 +1,236 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Distributes the same file to many VMs.
+
+Pushing a file to every VM with PushFile sends one copy per VM over the PKB
+host's uplink. The functions in this module instead place the file on a single
+seed VM and then fan it out VM-to-VM in rounds: every VM that already holds a
+verified copy sends it to VMs that do not, so the number of holders grows
+geometrically and the PKB host's uplink is used only once.
+
+Copies are written to a temporary path, checked against the source's MD5
+checksum and then renamed into place. A VM that already holds a matching copy
+is skipped, so an interrupted distribution can simply be re-run.
+"""
+
+import hashlib
+import logging
+import posixpath
+
+from perfkitbenchmarker import errors
+from perfkitbenchmarker import flags
+from perfkitbenchmarker import linux_virtual_machine
+from perfkitbenchmarker import vm_util
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_integer('file_distribution_fanout', 1,
+                     'The number of VMs that each VM holding a distributed '
+                     'file copies it to concurrently in each round.',
+                     lower_bound=1)
+flags.DEFINE_integer('file_distribution_min_vms', 4,
+                     'Files pushed to fewer than this many VMs are copied '
+                     'directly from the PKB host instead of VM-to-VM.',
+                     lower_bound=1)
+
+_PARTIAL_SUFFIX = '.pkb_partial'
+_COPY_RETRIES = 3
+
+
+def _LocalMd5(local_path):
+  """Returns the hex MD5 digest of a local file."""
+  md5 = hashlib.md5()
+  with open(local_path, 'rb') as fp:
+    for chunk in iter(lambda: fp.read(1024 * 1024), b''):
+      md5.update(chunk)
+  return md5.hexdigest()
+
+
+def _RemoteMd5(vm, remote_path):
+  """Returns the hex MD5 digest of a file on a VM, or None if it is missing."""
+  stdout, _ = vm.RemoteCommand(
+      'md5sum %s 2>/dev/null' % remote_path, ignore_failure=True,
+      suppress_warning=True)
+  fields = stdout.split()
+  return fields[0] if fields else None
+
+
+def _IsContainerized(vms):
+  """Returns whether any of 'vms' runs remote commands in a container.
+
+  The VM-to-VM copy runs scp on the hosts but checks and renames the copies
+  with RemoteCommand, so it only works where both run in the same place.
+  """
+  return any(isinstance(vm, linux_virtual_machine.ContainerizedDebianMixin)
+             for vm in vms)
+
+
+def _PeerAddress(source_vm, target_vm):
+  """Returns the address source_vm should use to reach target_vm."""
+  if (target_vm.internal_ip and
+      vm_util.ShouldRunOnInternalIpAddress(source_vm, target_vm)):
+    return target_vm.internal_ip
+  return target_vm.ip_address
+
+
+def _VerifyAndCommit(vm, partial_path, remote_path, checksum):
+  """Moves a verified partial copy into place.
+
+  Raises:
+    RemoteCommandError: If the partial copy does not match the checksum.
+  """
+  actual = _RemoteMd5(vm, partial_path)
+  if actual != checksum:
+    vm.RemoteCommand('rm -f %s' % partial_path, ignore_failure=True)
+    raise errors.VirtualMachine.RemoteCommandError(
+        'Checksum mismatch copying %s to %s: expected %s, got %s.' %
+        (remote_path, vm, checksum, actual))
+  vm.RemoteCommand('mv -f %s %s' % (partial_path, remote_path))
+
+
+@vm_util.Retry(max_retries=_COPY_RETRIES,
+               retryable_exceptions=(errors.VirtualMachine.RemoteCommandError,))
+def _PushToVm(vm, local_path, remote_path, checksum):
+  """Copies a local file to a VM unless it already holds a matching copy."""
+  if _RemoteMd5(vm, remote_path) == checksum:
+    logging.info('%s already holds %s; skipping copy.', vm, remote_path)
+    return
+  partial_path = remote_path + _PARTIAL_SUFFIX
+  vm.PushFile(local_path, partial_path)
+  _VerifyAndCommit(vm, partial_path, remote_path, checksum)
+
+
+@vm_util.Retry(max_retries=_COPY_RETRIES,
+               retryable_exceptions=(errors.VirtualMachine.RemoteCommandError,))
+def _CopyBetweenVms(source_vm, source_path, target_vm, target_path, checksum):
+  """Copies a file from one VM to another over the VMs' own network."""
+  if _RemoteMd5(target_vm, target_path) == checksum:
+    logging.info('%s already holds %s; skipping copy.', target_vm, target_path)
+    return
+  source_vm.AuthenticateVm()
+  partial_path = target_path + _PARTIAL_SUFFIX
+  remote_location = '%s@%s:%s' % (target_vm.user_name,
+                                  _PeerAddress(source_vm, target_vm),
+                                  partial_path)
+  source_vm.RemoteHostCommand(
+      'scp -P %s -o StrictHostKeyChecking=no -i %s %s %s' %
+      (target_vm.ssh_port, linux_virtual_machine.REMOTE_KEY_PATH,
+       source_path, remote_location))
+  _VerifyAndCommit(target_vm, partial_path, target_path, checksum)
+
+
+def _FanOut(source_vm, source_path, target_vms, target_path, checksum,
+            fanout):
+  """Copies a file from source_vm to all target_vms in rounds.
+
+  In each round, every VM holding a verified copy sends it to up to 'fanout'
+  VMs that do not hold one yet. Those VMs become senders in the next round.
+
+  Returns:
+    The number of rounds used.
+  """
+  holders = [(source_vm, source_path)]
+  pending = list(target_vms)
+  rounds = 0
+  while pending:
+    transfers = []
+    for holder, holder_path in holders:
+      for _ in xrange(fanout):
+        if not pending:
+          break
+        transfers.append(((holder, holder_path, pending.pop(0), target_path,
+                           checksum), {}))
+    rounds += 1
+    logging.info('File distribution round %d: copying %s to %d VM(s).',
+                 rounds, target_path, len(transfers))
+    vm_util.RunThreaded(_CopyBetweenVms, transfers)
+    holders.extend((args[2], target_path) for args, _ in transfers)
+  return rounds
+
+
+def DistributeRemoteFile(source_vm, target_vms, source_path, target_path=None,
+                         fanout=None):
+  """Copies a file that already exists on one VM to a set of other VMs.
+
+  Containerized VMs get their copies from source_vm with MoveFile, without
+  the fan-out.
+
+  Args:
+    source_vm: BaseVirtualMachine. The VM holding the file.
+    target_vms: list of BaseVirtualMachines. The VMs to copy the file to.
+    source_path: string. Path of the file on source_vm.
+    target_path: string. Path the file should be copied to on each of the
+        target_vms. Defaults to source_path.
+    fanout: int. The number of concurrent copies sent by each VM holding the
+        file per round. Defaults to --file_distribution_fanout.
+
+  Raises:
+    RemoteCommandError: If the file could not be copied to a VM.
+  """
+  target_path = target_path or source_path
+  fanout = fanout or FLAGS.file_distribution_fanout
+  target_vms = [vm for vm in target_vms if vm is not source_vm]
+  if not target_vms:
+    return
+  if _IsContainerized([source_vm] + target_vms):
+    args = [((target_vm, source_path, target_path), {})
+            for target_vm in target_vms]
+    vm_util.RunThreaded(source_vm.MoveFile, args)
+    return
+  checksum = _RemoteMd5(source_vm, source_path)
+  if checksum is None:
+    raise errors.VirtualMachine.RemoteCommandError(
+        'Cannot distribute %s: file not found on %s.' %
+        (source_path, source_vm))
+  rounds = _FanOut(source_vm, source_path, target_vms, target_path, checksum,
+                   fanout)
+  logging.info('Distributed %s to %d VM(s) in %d round(s).',
+               target_path, len(target_vms), rounds)
+
+
+def DistributeFile(vms, local_path, remote_path, fanout=None):
+  """Copies a local file to the same path on each of a set of VMs.
+
+  The file is pushed from the PKB host to the first VM only and then copied
+  VM-to-VM. For fewer than --file_distribution_min_vms VMs, or containerized
+  VMs, the file is pushed to each VM directly.
+
+  Args:
+    vms: list of BaseVirtualMachines. The VMs to copy the file to.
+    local_path: string. Path of a regular file on the PKB host.
+    remote_path: string. Destination file path on each VM. Relative paths are
+        relative to the login user's home directory.
+    fanout: int. The number of concurrent copies sent by each VM holding the
+        file per round. Defaults to --file_distribution_fanout.
+
+  Raises:
+    RemoteCommandError: If the file could not be copied to a VM.
+  """
+  if not vms:
+    return
+  if _IsContainerized(vms):
+    vm_util.RunThreaded(lambda vm: vm.PushFile(local_path, remote_path), vms)
+    return
+  checksum = _LocalMd5(local_path)
+  if len(vms) < FLAGS.file_distribution_min_vms:
+    args = [((vm, local_path, remote_path, checksum), {}) for vm in vms]
+    vm_util.RunThreaded(_PushToVm, args)
+    return
+  seed_vm = vms[0]
+  _PushToVm(seed_vm, local_path, remote_path, checksum)
+  rounds = _FanOut(seed_vm, remote_path, vms[1:], remote_path, checksum,
+                   fanout or FLAGS.file_distribution_fanout)
+  logging.info('Distributed %s (%s) to %d VM(s) in %d round(s).',
+               posixpath.basename(remote_path), checksum, len(vms), rounds)
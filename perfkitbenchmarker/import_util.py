@@ -11,25 +11,52 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-
 """Utilities for dynamically importing python files."""
 
+import collections
 import importlib
 import pkgutil
+import threading
+import time
 
+# Time spent importing modules through this module, see GetImportSeconds.
+_import_stats = {'seconds': 0.0, 'modules': 0, 'depth': 0}
+_import_stats_lock = threading.RLock()
 
-def LoadModulesForPath(path, package_prefix=None):
-  """Load all modules on 'path', with prefix 'package_prefix'.
 
-  Example usage:
-    LoadModulesForPath(__path__, __name__)
+def ImportModule(name):
+  """Imports a module by its full name, accounting for the time spent.
+
+  Only the outermost import is timed so that modules imported while importing
+  another module are not counted twice.
+  """
+  with _import_stats_lock:
+    _import_stats['depth'] += 1
+    start_time = time.time()
+    try:
+      return importlib.import_module(name)
+    finally:
+      _import_stats['depth'] -= 1
+      if not _import_stats['depth']:
+        _import_stats['seconds'] += time.time() - start_time
+      _import_stats['modules'] += 1
+
+
+def GetImportSeconds():
+  """Returns (seconds, number of modules) spent on dynamic imports so far."""
+  with _import_stats_lock:
+    return _import_stats['seconds'], _import_stats['modules']
+
+
+def ListModuleNames(path, package_prefix=None):
+  """Lists the names of all modules on 'path' without importing them.
 
   Args:
     path: Path containing python modules.
     package_prefix: prefix (e.g., package name) to prefix all modules.
       'path' and 'package_prefix' will be joined with a '.'.
-  Yields:
-    Imported modules.
+  Returns:
+    list of full module name strings, sorted.
   """
   prefix = package_prefix + '.' if package_prefix else ''
   # If iter_modules is invoked within a zip file, the zipimporter adds the
@@ -37,7 +64,106 @@ def LoadModulesForPath(path, package_prefix=None):
   # the prefix is necessary to correctly import a package, this behavior is
   # undesirable, so do not pass the prefix to iter_modules. Instead, apply it
   # explicitly afterward.
-  for _, modname, _ in pkgutil.iter_modules(path):
-    # Skip recursively listed modules (e.g. 'subpackage.module').
-    if '.' not in modname:
-      yield importlib.import_module(prefix + modname)
+  # Skip recursively listed modules (e.g. 'subpackage.module').
+  return sorted(prefix + modname
+                for _, modname, _ in pkgutil.iter_modules(path)
+                if '.' not in modname)
+
+
+def LoadModulesForPath(path, package_prefix=None):
+  """Load all modules on 'path', with prefix 'package_prefix'.
+
+  Example usage:
+    LoadModulesForPath(__path__, __name__)
+
+  Args:
+    path: Path containing python modules.
+    package_prefix: prefix (e.g., package name) to prefix all modules.
+      'path' and 'package_prefix' will be joined with a '.'.
+  Yields:
+    Imported modules.
+  """
+  for name in ListModuleNames(path, package_prefix):
+    yield ImportModule(name)
+
+
+class LazyModuleDict(collections.MutableMapping):
+  """A dict of modules that are imported the first time they are looked up.
+
+  Keys are known up front, so membership tests and iteration over keys never
+  import anything. Values assigned directly (e.g. objects that merely act like
+  a module) are stored as is.
+  """
+
+  def __init__(self, module_names=None, modules=None):
+    """Initializes the dict.
+
+    Args:
+      module_names: dict mapping keys to full module names.
+      modules: dict mapping keys to already imported modules.
+    """
+    self._module_names = dict(module_names or {})
+    self._modules = dict(modules or {})
+    self._lock = threading.Lock()
+
+  def __getitem__(self, key):
+    with self._lock:
+      if key not in self._modules:
+        self._modules[key] = ImportModule(self._module_names[key])
+      return self._modules[key]
+
+  def __setitem__(self, key, value):
+    with self._lock:
+      self._module_names.pop(key, None)
+      self._modules[key] = value
+
+  def __delitem__(self, key):
+    with self._lock:
+      if key not in self._modules and key not in self._module_names:
+        raise KeyError(key)
+      self._modules.pop(key, None)
+      self._module_names.pop(key, None)
+
+  def __contains__(self, key):
+    return key in self._modules or key in self._module_names
+
+  def __iter__(self):
+    return iter(sorted(set(self._modules) | set(self._module_names)))
+
+  def __len__(self):
+    return len(set(self._modules) | set(self._module_names))
+
+  def GetModuleName(self, key):
+    """Returns the full module name for 'key' without importing it."""
+    if key in self._module_names:
+      return self._module_names[key]
+    return getattr(self[key], '__name__', key)
+
+  def IsLoaded(self, key):
+    """Returns whether the value for 'key' has already been imported."""
+    return key in self._modules
+
+
+class LazyModuleList(collections.Sequence):
+  """The modules of a LazyModuleDict, ordered by module name.
+
+  Modules are imported as they are indexed or iterated over.
+  """
+
+  def __init__(self, module_dict):
+    self._module_dict = module_dict
+    self._keys = sorted(module_dict, key=module_dict.GetModuleName)
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      return [self._module_dict[key] for key in self._keys[index]]
+    return self._module_dict[self._keys[index]]
+
+  def __len__(self):
+    return len(self._keys)
+
+  def __add__(self, other):
+    return list(self) + list(other)
+
+  def __radd__(self, other):
+    return list(other) + list(self)
@@ -14,16 +14,14 @@
 """Contains benchmark imports and a list of benchmarks.
 
 All modules within this package are considered benchmarks, and are loaded
-dynamically. Add non-benchmark code to other packages.
+dynamically, on first use (see module_manifest). Add non-benchmark code to
+other packages.
 """
 
 from perfkitbenchmarker import import_util
+from perfkitbenchmarker import module_manifest
 
+# Benchmark modules are imported the first time they are looked up.
+VALID_BENCHMARKS = module_manifest.LoadBenchmarkModules(__name__, __path__)
 
-def _LoadBenchmarks():
-  return list(import_util.LoadModulesForPath(__path__, __name__))
-
-BENCHMARKS = _LoadBenchmarks()
-
-VALID_BENCHMARKS = {module.BENCHMARK_NAME: module
-                    for module in BENCHMARKS}
+BENCHMARKS = import_util.LazyModuleList(VALID_BENCHMARKS)
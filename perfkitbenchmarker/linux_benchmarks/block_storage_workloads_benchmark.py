@@ -96,8 +96,9 @@ def GetConfig(user_config):
 def Prepare(benchmark_spec):
   """Prepare the virtual machine to run FIO.
 
-     This includes installing fio, bc. and libaio1 and insuring that the
-     attached disk is large enough to support the fio benchmark.
+     This includes installing fio, bc. and libaio1, insuring that the
+     attached disk is large enough to support the fio benchmark and
+     optionally pre-warming it (see --fio_prewarm).
 
   Args:
     benchmark_spec: The benchmark specification. Contains all data that is
@@ -107,6 +108,9 @@ def Prepare(benchmark_spec):
   vm = vms[0]
   logging.info('FIO prepare on %s', vm)
   vm.Install('fio')
+  # The pre-warm samples are reported by Run.
+  benchmark_spec.prewarm_samples = fio.PrewarmScratchDisk(
+      vm, vm.scratch_disks[0], FLAGS.fio_prewarm)
 
 
 def UpdateWorkloadMetadata(results):
@@ -275,7 +279,11 @@ def Run(benchmark_spec):
   logging.info('Simulating %s scenario.', FLAGS.workload_mode)
   vms = benchmark_spec.vms
   vm = vms[0]
-  return RUN_SCENARIO_FUNCTION_DICT[FLAGS.workload_mode][METHOD](vm)
+  results = RUN_SCENARIO_FUNCTION_DICT[FLAGS.workload_mode][METHOD](vm)
+  # Only the first run reports the pre-warm samples.
+  results.extend(benchmark_spec.prewarm_samples)
+  benchmark_spec.prewarm_samples = []
+  return results
 
 
 def Cleanup(benchmark_spec):
@@ -27,6 +27,7 @@ import posixpath
 import time
 
 
+from perfkitbenchmarker import artifact_collection
 from perfkitbenchmarker import configs
 from perfkitbenchmarker import data
 from perfkitbenchmarker import errors
@@ -167,6 +168,12 @@ CLIENT_GROUP = 'client'
 SLEEP_BETWEEN_CHECK_IN_SECONDS = 5
 TEMP_PROFILE_PATH = posixpath.join(vm_util.VM_TMP_DIR, 'profile.yaml')
 
+# Seconds between scheduling the loaders and their common start time. This
+# leaves time to launch cassandra-stress on every loader before it is reached.
+LOADER_START_DELAY = 15
+# Width, in seconds, of the wall-clock intervals of the merged loader series.
+MERGED_INTERVAL_SECONDS = 1
+
 # Results documentation:
 # http://docs.datastax.com/en/cassandra/2.1/cassandra/tools/toolsCStressOutput_c.html
 RESULTS_METRICS = (
@@ -195,6 +202,15 @@ AGGREGATED_METRICS = {'op rate', 'partition rate', 'row rate',
 # Maximum value will be choisen between client vms.
 MAXIMUM_METRICS = {'latency max'}
 
+# The intervals of a loader's run, placed on its clock by AlignIntervals, and
+# the times at which it launched and completed cassandra-stress.
+LoaderIntervals = collections.namedtuple(
+    'LoaderIntervals', ['launch_time', 'end_time', 'intervals'])
+
+# An interval of the merged series of all loaders. See MergeIntervals.
+MergedInterval = collections.namedtuple(
+    'MergedInterval', ['start', 'op_rate', 'latency_mean', 'latency_max'])
+
 
 def GetConfig(user_config):
   return configs.LoadConfig(BENCHMARK_CONFIG, user_config, BENCHMARK_NAME)
@@ -341,9 +357,14 @@ def _ResultFilePath(vm):
                         vm.hostname + '.stress_results.txt')
 
 
+def _TimingFilePath(vm):
+  return posixpath.join(vm_util.VM_TMP_DIR,
+                        vm.hostname + '.stress_timing.txt')
+
+
 def RunTestOnLoader(vm, loader_index, operations_per_vm, data_node_ips,
                     command, user_operations, population_per_vm,
-                    population_dist, population_params):
+                    population_dist, population_params, start_time=None):
   """Run Cassandra-stress test on loader node.
 
   Args:
@@ -357,6 +378,10 @@ def RunTestOnLoader(vm, loader_index, operations_per_vm, data_node_ips,
     population_per_vm: integer. Population per loader vm.
     population_dist: string. The population distribution.
     population_params: string. Representing additional population parameters.
+    start_time: int. If set, the time at which cassandra-stress starts, in
+        seconds since the epoch on the loader's clock. The loader records the
+        times at which cassandra-stress started and completed in its timing
+        file.
   """
   if command == USER_COMMAND:
     command += ' profile={profile} ops\({ops}\)'.format(
@@ -382,11 +407,21 @@ def RunTestOnLoader(vm, loader_index, operations_per_vm, data_node_ips,
                                               population_params)
   else:
     population_dist = '-pop seq=%s' % population_params
+  timing_file = _TimingFilePath(vm)
+  if start_time:
+    wait = ('now=$(date +%s); if [ {0} -gt $now ]; then '
+            'sleep $(({0} - now)); fi; '.format(start_time))
+  else:
+    wait = ''
   vm.RobustRemoteCommand(
+      '{wait}date +%s.%N > {timing_file}; '
       '{cassandra} {command} cl={consistency_level} n={num_keys} '
       '-node {nodes} {schema} {population_dist} '
       '-log file={result_file} -rate threads={threads} '
-      '-errors retries={retries}'.format(
+      '-errors retries={retries} && '
+      'date +%s.%N >> {timing_file}'.format(
+          wait=wait,
+          timing_file=timing_file,
           cassandra=cassandra.GetCassandraStressPath(vm),
           command=command,
           consistency_level=FLAGS.cassandra_stress_consistency_level,
@@ -426,14 +461,101 @@ def RunCassandraStressTest(cassandra_vms, loader_vms, num_operations,
         'Total number of operations rounded to %s '
         '(%s operations per loader vm).',
         operations_per_vm * num_loaders, operations_per_vm)
-  logging.info('Executing the benchmark.')
+  # Start all loaders at the same time on their clocks, so that their
+  # intervals overlap as much as possible. See MergeIntervals.
+  stdout, _ = loader_vms[0].RemoteCommand('date +%s')
+  start_time = int(stdout) + LOADER_START_DELAY
+  logging.info('Executing the benchmark. Loaders start at %s.', start_time)
   args = [((loader_vms[i], i, operations_per_vm, data_node_ips,
             command, profile_operations, population_per_vm,
-            population_dist, population_params), {})
+            population_dist, population_params, start_time), {})
           for i in xrange(0, num_loaders)]
   vm_util.RunThreaded(RunTestOnLoader, args)
 
 
+def ParseIntervals(lines):
+  """Parses the per-interval stats of a cassandra-stress log.
+
+  Args:
+    lines: list of strings. The lines of the log.
+
+  Returns:
+    A list with a dict per interval, mapping the columns of the log's header,
+    e.g. 'op/s', 'mean' or 'time', to their values.
+  """
+  header = None
+  intervals = []
+  for line in lines:
+    fields = [field.strip() for field in line.split(',')]
+    if fields[0] == 'type':
+      header = fields
+    elif fields[0] == 'total' and header and len(fields) == len(header):
+      interval = {}
+      for name, value in zip(header[1:], fields[1:]):
+        try:
+          interval[name] = float(value)
+        except ValueError:
+          pass
+      intervals.append(interval)
+  return intervals
+
+
+def AlignIntervals(intervals, end_time):
+  """Places the intervals of a loader on its clock.
+
+  cassandra-stress reports the end of each interval in seconds since its
+  measurement started, which is after JVM startup and connecting to the
+  cluster. The intervals are anchored at the time the loader completed
+  instead, which closely follows the last interval.
+
+  Args:
+    intervals: list of dicts. The intervals returned by ParseIntervals.
+    end_time: float. The time at which cassandra-stress completed.
+
+  Returns:
+    A list of (start, end, interval) tuples, with start and end in seconds
+    since the epoch.
+  """
+  if not intervals:
+    return []
+  measurement_start = end_time - intervals[-1]['time']
+  aligned = []
+  start = measurement_start
+  for interval in intervals:
+    end = measurement_start + interval['time']
+    aligned.append((start, end, interval))
+    start = end
+  return aligned
+
+
+def MergeIntervals(loader_intervals, width=MERGED_INTERVAL_SECONDS):
+  """Merges the aligned intervals of all loaders into one series.
+
+  The series only covers the window in which all loaders were active. See
+  sample.GridIntervals.
+
+  Args:
+    loader_intervals: list. The aligned intervals of each loader, as returned
+        by AlignIntervals.
+    width: int. The width of the merged intervals in seconds.
+
+  Returns:
+    A list of MergedInterval. The op rate is the sum of the loaders' rates,
+    the mean latency their mean weighted by op rate and the max latency their
+    maximum. Empty if the loaders were never all active at once.
+  """
+  merged = []
+  for start, aligned in sample.GridIntervals(loader_intervals, width):
+    intervals = [interval for _, _, interval in aligned]
+    op_rates = [interval['op/s'] for interval in intervals]
+    merged.append(MergedInterval(
+        start, math.fsum(op_rates),
+        sample.WeightedMean([interval['mean'] for interval in intervals],
+                            op_rates),
+        max(interval['max'] for interval in intervals)))
+  return merged
+
+
 def CollectResultFile(vm, results):
   """Collect result file on vm.
 
@@ -441,10 +563,17 @@ def CollectResultFile(vm, results):
     vm: The target vm.
     results: A dictionary of lists. Each list contains results of a field
        defined in RESULTS_METRICS collected from each loader machines.
+
+  Returns:
+    A LoaderIntervals with the intervals of the vm's run.
   """
   result_path = _ResultFilePath(vm)
-  vm.PullFile(vm_util.GetTempDir(), result_path)
-  resp, _ = vm.RemoteCommand('tail -n 20 ' + result_path)
+  local_path, = artifact_collection.CollectArtifacts(
+      vm, posixpath.dirname(result_path), [posixpath.basename(result_path)],
+      vm_util.GetTempDir(), label='cassandra_stress')
+  with open(local_path) as result_file:
+    lines = result_file.readlines()
+  resp = ''.join(lines[-20:])
   for metric in RESULTS_METRICS:
     value = regex_util.ExtractGroup(r'%s[\t ]+: ([\d\.:]+)' % metric, resp)
     if metric == RESULTS_METRICS[-1]:  # Total operation time
@@ -453,6 +582,66 @@ def CollectResultFile(vm, results):
           int(value[0]) * 3600 + int(value[1]) * 60 + int(value[2]))
     else:
       results[metric].append(float(value))
+  stdout, _ = vm.RemoteCommand('cat %s' % _TimingFilePath(vm))
+  launch_time, end_time = [float(time) for time in stdout.split()]
+  return LoaderIntervals(launch_time, end_time,
+                         AlignIntervals(ParseIntervals(lines), end_time))
+
+
+def GetAlignedSamples(loaders, metadata):
+  """Returns samples of the merged series of all loaders and of their skew.
+
+  Args:
+    loaders: list of LoaderIntervals. One per loader.
+    metadata: dict. Contains metadata for this benchmark.
+
+  Returns:
+    A list of sample.Sample objects.
+  """
+  results = []
+  launch_times = [loader.launch_time for loader in loaders]
+  end_times = [loader.end_time for loader in loaders]
+  results.append(sample.Sample('loader launch skew',
+                               max(launch_times) - min(launch_times),
+                               'seconds', metadata))
+  start_times = [loader.intervals[0][0] for loader in loaders
+                 if loader.intervals]
+  if start_times:
+    results.append(sample.Sample('loader start skew',
+                                 max(start_times) - min(start_times),
+                                 'seconds', metadata))
+  results.append(sample.Sample('loader end skew',
+                               max(end_times) - min(end_times),
+                               'seconds', metadata))
+  merged = MergeIntervals([loader.intervals for loader in loaders])
+  if not merged:
+    logging.warning('The loaders were never all active at once. Not '
+                    'reporting aligned results.')
+    return results
+  for interval in merged:
+    interval_metadata = metadata.copy()
+    interval_metadata.update({
+        'interval_start': interval.start - merged[0].start,
+        'latency mean': interval.latency_mean,
+        'latency max': interval.latency_max})
+    results.append(sample.Sample('aligned interval op rate',
+                                 interval.op_rate, 'operations per second',
+                                 interval_metadata, timestamp=interval.start))
+  op_rate = math.fsum(interval.op_rate for interval in merged) / len(merged)
+  window_metadata = metadata.copy()
+  window_metadata['window_seconds'] = len(merged) * MERGED_INTERVAL_SECONDS
+  results.append(sample.Sample('aligned op rate', op_rate,
+                               'operations per second', window_metadata))
+  latency_mean = sample.WeightedMean(
+      [interval.latency_mean for interval in merged],
+      [interval.op_rate for interval in merged])
+  results.append(sample.Sample('aligned latency mean', latency_mean, 'ms',
+                               window_metadata))
+  results.append(sample.Sample(
+      'aligned latency max',
+      max(interval.latency_max for interval in merged), 'ms',
+      window_metadata))
+  return results
 
 
 def CollectResults(benchmark_spec, metadata):
@@ -471,7 +660,7 @@ def CollectResults(benchmark_spec, metadata):
   loader_vms = vm_dict[CLIENT_GROUP]
   raw_results = collections.defaultdict(list)
   args = [((vm, raw_results), {}) for vm in loader_vms]
-  vm_util.RunThreaded(CollectResultFile, args)
+  loaders = vm_util.RunThreaded(CollectResultFile, args)
   results = []
   for metric in RESULTS_METRICS:
     if metric in MAXIMUM_METRICS:
@@ -487,6 +676,7 @@ def CollectResults(benchmark_spec, metadata):
     elif metric == 'Total operation time':
       unit = 'seconds'
     results.append(sample.Sample(metric, value, unit, metadata))
+  results.extend(GetAlignedSamples(loaders, metadata))
   logging.info('Cassandra results:\n%s', results)
   return results
 
@@ -12,9 +12,21 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Records the time required to boot a cluster of VMs."""
+"""Records the time required to boot a cluster of VMs.
+
+Besides the total boot time of each VM, bring-up is broken down into phases
+delimited by the timestamps recorded while provisioning (see _BOOT_PHASES),
+and the guest's own view of its boot is collected with systemd-analyze. Each
+is reported per VM and as percentiles across the cluster. How long each
+scratch disk took to create, attach and set up is reported as well.
+"""
+
+import collections
+import logging
+import re
 
 from perfkitbenchmarker import configs
+from perfkitbenchmarker import os_types
 from perfkitbenchmarker import vm_util
 from perfkitbenchmarker import sample
 
@@ -40,11 +52,135 @@ def Prepare(unused_benchmark_spec):
   pass
 
 
+# Phases of VM bring-up, in order, with the VM attribute holding the time at
+# which each phase ended. Each phase starts when the previous one ended, and
+# the first one when the create request was issued.
+_BOOT_PHASES = [
+    # The create request was accepted and the instance is visible.
+    ('api_accept', 'create_end_time'),
+    # The provider reports the instance as ready (running).
+    ('instance_running', 'resource_ready_time'),
+    # The first remote command over SSH (or WinRM) succeeded.
+    ('first_ssh', 'bootable_time'),
+    ('startup', 'startup_complete_time'),
+    ('scratch_disks', 'scratch_disks_ready_time'),
+    ('prepare_environment', 'prepare_complete_time'),
+]
+_CLUSTER_PERCENTILES = [50, 90, 99]
+
+# Matches the phases of "Startup finished in 1.2s (kernel) + 1min 3.4s
+# (userspace) = 1min 4.6s".
+_SYSTEMD_PHASE_RE = re.compile(r'((?:\d+(?:\.\d+)?(?:h|min|ms|s|us)\s*)+)'
+                               r'\((\w+)\)')
+_SYSTEMD_TOTAL_RE = re.compile(r'=\s*((?:\d+(?:\.\d+)?(?:h|min|ms|s|us)\s*)+)')
+_SYSTEMD_UNITS = {'h': 3600, 'min': 60, 's': 1, 'ms': 1e-3, 'us': 1e-6}
+
+
+def _GetClusterSamples(metric, values_by_key, key_name, metadata):
+  """Returns samples of percentiles of values across the cluster.
+
+  Args:
+    metric: string. The metric of the per-VM samples.
+    values_by_key: dict mapping a phase name to the list of its values.
+    key_name: string. The metadata key of the phase name.
+    metadata: dict. Metadata common to all samples.
+  """
+  samples = []
+  for key, values in sorted(values_by_key.iteritems()):
+    stats = sample.PercentileCalculator(values,
+                                        percentiles=_CLUSTER_PERCENTILES)
+    for stat in ['p%s' % p for p in _CLUSTER_PERCENTILES] + ['average']:
+      sample_metadata = metadata.copy()
+      sample_metadata[key_name] = key
+      samples.append(sample.Sample('%s %s' % (metric, stat), stats[stat],
+                                   'seconds', sample_metadata))
+  return samples
+
+
+def GetBootPhaseSamples(vms):
+  """Creates Samples for the phases of bringing up a list of VMs.
+
+  Args:
+    vms: List of BaseVirtualMachine subclasses.
+
+  Returns:
+    List of Samples. There is a 'Boot Phase Time' sample per VM and phase
+    whose end was recorded, and 'Boot Phase Time <stat>' samples with the
+    percentiles of each phase across the VMs.
+  """
+  samples = []
+  durations = {}
+  for vm_index, vm in enumerate(vms):
+    start_time = vm.create_start_time
+    if not start_time:
+      continue
+    for phase, attribute in _BOOT_PHASES:
+      end_time = getattr(vm, attribute, None)
+      if not end_time:
+        continue
+      duration = max(end_time - start_time, 0)
+      metadata = {'machine_instance': vm_index, 'num_vms': len(vms),
+                  'os_type': vm.OS_TYPE, 'boot_phase': phase,
+                  'time_since_create_start': end_time - vm.create_start_time}
+      samples.append(sample.Sample('Boot Phase Time', duration, 'seconds',
+                                   metadata))
+      durations.setdefault(phase, []).append(duration)
+      start_time = max(start_time, end_time)
+  samples.extend(_GetClusterSamples('Boot Phase Time', durations,
+                                    'boot_phase', {'num_vms': len(vms)}))
+  return samples
+
+
+def _GetScratchDiskSteps(scratch_disk):
+  """Yields (disk, step, seconds) for each measured step of a scratch disk.
+
+  The disks that make up a striped disk are included as well.
+  """
+  for d in scratch_disk.disks if scratch_disk.is_striped else [scratch_disk]:
+    if d.create_start_time and d.create_end_time:
+      yield d, 'create', d.create_end_time - d.create_start_time
+    if d.attach_start_time and d.attach_end_time:
+      yield d, 'attach', d.attach_end_time - d.attach_start_time
+  for step, seconds in sorted(scratch_disk.setup_seconds.iteritems()):
+    yield scratch_disk, step, seconds
+
+
+def GetScratchDiskSamples(vms):
+  """Creates Samples for setting up the scratch disks of a list of VMs.
+
+  Args:
+    vms: List of BaseVirtualMachine subclasses.
+
+  Returns:
+    List of Samples. There is a 'Scratch Disk Time' sample per disk and
+    measured step (create, attach, stripe, format and mount), and
+    'Scratch Disk Time <stat>' samples with the percentiles of each step
+    across all disks.
+  """
+  samples = []
+  durations = {}
+  for vm_index, vm in enumerate(vms):
+    for scratch_disk in vm.scratch_disks:
+      for d, step, seconds in _GetScratchDiskSteps(scratch_disk):
+        metadata = {'machine_instance': vm_index, 'num_vms': len(vms),
+                    'disk_step': step, 'disk_type': d.disk_type,
+                    'mount_point': scratch_disk.mount_point,
+                    'num_striped_disks': scratch_disk.num_striped_disks}
+        samples.append(sample.Sample('Scratch Disk Time', seconds, 'seconds',
+                                     metadata))
+        durations.setdefault(step, []).append(seconds)
+  samples.extend(_GetClusterSamples('Scratch Disk Time', durations,
+                                    'disk_step', {'num_vms': len(vms)}))
+  return samples
+
+
 def GetTimeToBoot(vms):
   """Creates Samples for the boot time of a list of VMs.
 
   The boot time is the time difference from before the VM is created to when
-  the VM is responsive to SSH commands.
+  the VM is responsive to SSH commands. The boot phase samples of
+  GetBootPhaseSamples and the scratch disk samples of GetScratchDiskSamples
+  are included as well.
 
   Args:
     vms: List of BaseVirtualMachine subclasses.
@@ -54,7 +190,8 @@ def GetTimeToBoot(vms):
   """
   def _GetTimeToBoot(vm, vm_index):
     metadata = {'num_cpus': vm.num_cpus, 'machine_instance': vm_index,
-                'num_vms': len(vms), 'os_type': vm.OS_TYPE}
+                'num_vms': len(vms), 'os_type': vm.OS_TYPE,
+                'bulk_create_size': vm.bulk_create_size}
     assert vm.bootable_time
     assert vm.create_start_time
     assert vm.bootable_time >= vm.create_start_time
@@ -63,6 +200,72 @@ def GetTimeToBoot(vms):
   params = [((vm, i), {}) for i, vm in enumerate(vms)]
   samples = vm_util.RunThreaded(_GetTimeToBoot, params)
   assert len(samples) == len(vms)
+  return samples + GetBootPhaseSamples(vms) + GetScratchDiskSamples(vms)
+
+
+def _ParseSystemdDuration(text):
+  """Parses a systemd time span such as '1min 2.345s' into seconds."""
+  return sum(float(value) * _SYSTEMD_UNITS[unit] for value, unit in
+             re.findall(r'(\d+(?:\.\d+)?)(h|min|ms|s|us)', text))
+
+
+def ParseSystemdAnalyze(output):
+  """Parses the output of 'systemd-analyze'.
+
+  Args:
+    output: string. E.g. 'Startup finished in 1.2s (kernel) + 3.4s (userspace)
+        = 4.6s'.
+
+  Returns:
+    OrderedDict mapping each guest boot phase (e.g. 'kernel', 'userspace' and
+    'total') to its duration in seconds, or None if the guest has not finished
+    booting.
+  """
+  if 'Startup finished' not in output:
+    return None
+  phases = [(phase, _ParseSystemdDuration(duration))
+            for duration, phase in _SYSTEMD_PHASE_RE.findall(output)]
+  total = _SYSTEMD_TOTAL_RE.search(output)
+  if total:
+    phases.append(('total', _ParseSystemdDuration(total.group(1))))
+  return collections.OrderedDict(phases)
+
+
+def GetGuestBootSamples(vms):
+  """Creates Samples of the boot phases reported by each guest's systemd.
+
+  VMs without systemd (or Windows VMs) are skipped.
+
+  Args:
+    vms: List of BaseVirtualMachine subclasses.
+
+  Returns:
+    List of Samples. There is a 'Guest Boot Time' sample per VM and guest
+    phase, and 'Guest Boot Time <stat>' samples with the percentiles of each
+    phase across the VMs.
+  """
+  def _GetGuestBootPhases(vm):
+    if vm.OS_TYPE == os_types.WINDOWS:
+      return None
+    stdout, _ = vm.RemoteCommand('systemd-analyze', ignore_failure=True,
+                                 suppress_warning=True)
+    phases = ParseSystemdAnalyze(stdout)
+    if phases is None:
+      logging.info('No systemd boot times on %s: %s', vm, stdout.strip())
+    return phases
+
+  samples = []
+  durations = {}
+  for vm_index, phases in enumerate(vm_util.RunThreaded(_GetGuestBootPhases,
+                                                        vms)):
+    for phase, duration in (phases or {}).iteritems():
+      metadata = {'machine_instance': vm_index, 'num_vms': len(vms),
+                  'guest_boot_phase': phase}
+      samples.append(sample.Sample('Guest Boot Time', duration, 'seconds',
+                                   metadata))
+      durations.setdefault(phase, []).append(duration)
+  samples.extend(_GetClusterSamples('Guest Boot Time', durations,
+                                    'guest_boot_phase', {'num_vms': len(vms)}))
   return samples
 
 
@@ -74,9 +277,9 @@ def Run(benchmark_spec):
         required to run the benchmark.
 
   Returns:
-    An empty list (all boot samples will be added later).
+    The guest boot samples. All other boot samples will be added later.
   """
-  return []
+  return GetGuestBootSamples(benchmark_spec.vms)
 
 
 def Cleanup(unused_benchmark_spec):
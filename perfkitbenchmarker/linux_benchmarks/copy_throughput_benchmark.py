@@ -16,19 +16,39 @@
 
 cp and dd between two attached disks on same vm.
 scp copy across different vms using external networks.
+The parallel modes split the data across several streams between two vms,
+using scp, rsync or tar piped over a plain TCP connection.
 """
 import logging
 import posixpath
+import re
 
 from perfkitbenchmarker import configs
 from perfkitbenchmarker import data
+from perfkitbenchmarker import errors
+from perfkitbenchmarker import file_distribution
 from perfkitbenchmarker import flags
 from perfkitbenchmarker import linux_virtual_machine
 from perfkitbenchmarker import sample
 from perfkitbenchmarker import vm_util
 
-flags.DEFINE_enum('copy_benchmark_mode', 'cp', ['cp', 'dd', 'scp'],
-                  'Runs either cp, dd or scp tests.')
+PARALLEL_SCP = 'parallel_scp'
+PARALLEL_RSYNC = 'parallel_rsync'
+PARALLEL_TAR = 'parallel_tar'
+PARALLEL_MODES = [PARALLEL_SCP, PARALLEL_RSYNC, PARALLEL_TAR]
+
+flags.DEFINE_enum('copy_benchmark_mode', 'cp', ['cp', 'dd', 'scp'] +
+                  PARALLEL_MODES,
+                  'Runs either cp, dd or scp tests, or copies the data '
+                  'between two vms in --copy_parallel_streams streams with '
+                  'scp, rsync over ssh, or tar piped over a TCP connection '
+                  'to netcat.')
+flags.DEFINE_integer('copy_parallel_streams', 4,
+                     'The number of streams that the parallel modes split '
+                     'the data across.', lower_bound=1)
+flags.DEFINE_boolean('copy_compress', False,
+                     'Whether the parallel modes compress the data in '
+                     'flight (scp -C, rsync -z, tar -z).')
 
 FLAGS = flags.FLAGS
 
@@ -54,12 +74,14 @@ DATA_SIZE_IN_MB = 256.1
 DISK_SIZE_IN_GB = 500
 # Unit for all benchmarks
 UNIT = 'MB/sec'
+# The first netcat port of parallel_tar. Stream i listens on the port after.
+TAR_PORT_START = 20000
 
 
 def GetConfig(user_config):
   """Decide number of vms needed and return infomation for copy benchmark."""
   config = configs.LoadConfig(BENCHMARK_CONFIG, user_config, BENCHMARK_NAME)
-  if FLAGS.copy_benchmark_mode == 'scp':
+  if FLAGS.copy_benchmark_mode in ['scp'] + PARALLEL_MODES:
     config['vm_groups']['default']['vm_count'] = 2
     config['vm_groups']['default']['disk_count'] = 1
   return config
@@ -80,10 +102,7 @@ def PrepareDataFile(vm):
   Args:
     vm: The VM needs data file.
   """
-  file_path = data.ResourcePath(DATA_FILE)
-  vm.PushFile(file_path, '%s/' % vm.GetScratchDir(0))
-  vm.RemoteCommand('cd %s/; bash cloud-storage-workload.sh'
-                   % vm.GetScratchDir(0))
+  vm.RemoteCommand('cd %s/; bash %s' % (vm.GetScratchDir(0), DATA_FILE))
 
 
 def PreparePrivateKey(vm):
@@ -99,7 +118,18 @@ def Prepare(benchmark_spec):
   """
   vms = benchmark_spec.vms
   vm_util.RunThreaded(PreparePrivateKey, vms)
+  file_distribution.DistributeFile(
+      vms, data.ResourcePath(DATA_FILE),
+      posixpath.join(vms[0].GetScratchDir(0), DATA_FILE))
   vm_util.RunThreaded(PrepareDataFile, vms)
+  if FLAGS.copy_benchmark_mode == PARALLEL_RSYNC:
+    vm_util.RunThreaded(lambda vm: vm.Install('rsync'), vms)
+  elif FLAGS.copy_benchmark_mode == PARALLEL_TAR:
+    vm_util.RunThreaded(lambda vm: vm.Install('netcat'), vms)
+    if vm_util.ShouldRunOnExternalIpAddress():
+      for vm in vms:
+        vm.AllowPort(TAR_PORT_START,
+                     TAR_PORT_START + FLAGS.copy_parallel_streams - 1)
 
 
 def RunCp(vms):
@@ -175,10 +205,40 @@ def RunScp(vms):
   return result
 
 
+def RunParallelCopy(vms):
+  """Run the parallel copy benchmark of --copy_benchmark_mode.
+
+  Args:
+    vms: The vms copying to each other.
+
+  Returns:
+    A list of sample.Sample objects.
+  """
+  cipher = None
+  if FLAGS.copy_benchmark_mode != PARALLEL_TAR:
+    cipher = ChooseSshCipher(vms)
+  result = RunParallelCopySingleDirection(vms[0], vms[1], cipher)
+  result += RunParallelCopySingleDirection(vms[1], vms[0], cipher)
+  return result
+
+
 MODE_FUNCTION_DICTIONARY = {
     'cp': RunCp,
     'dd': RunDd,
-    'scp': RunScp}
+    'scp': RunScp,
+    PARALLEL_SCP: RunParallelCopy,
+    PARALLEL_RSYNC: RunParallelCopy,
+    PARALLEL_TAR: RunParallelCopy}
+
+
+def _GetDirectionMetadata(sending_vm, receiving_vm):
+  """Returns the metadata describing the vms of a copy."""
+  metadata = {}
+  for vm_specifier, vm in ('receiving', receiving_vm), ('sending', sending_vm):
+    metadata['{0}_zone'.format(vm_specifier)] = vm.zone
+    for k, v in vm.GetMachineTypeDict().iteritems():
+      metadata['{0}_{1}'.format(vm_specifier, k)] = v
+  return metadata
 
 
 def RunScpSingleDirection(sending_vm, receiving_vm, cipher):
@@ -197,11 +257,7 @@ def RunScpSingleDirection(sending_vm, receiving_vm, cipher):
     A list of sample.Sample objects.
   """
   results = []
-  metadata = {}
-  for vm_specifier, vm in ('receiving', receiving_vm), ('sending', sending_vm):
-    metadata['{0}_zone'.format(vm_specifier)] = vm.zone
-    for k, v in vm.GetMachineTypeDict().iteritems():
-      metadata['{0}_{1}'.format(vm_specifier, k)] = v
+  metadata = _GetDirectionMetadata(sending_vm, receiving_vm)
 
   cmd_template = ('sudo sync; sudo sysctl vm.drop_caches=3; '
                   'time /usr/bin/scp -o StrictHostKeyChecking=no -i %s -c %s '
@@ -232,6 +288,213 @@ def RunScpSingleDirection(sending_vm, receiving_vm, cipher):
   return results
 
 
+def SplitFiles(files, num_streams):
+  """Splits files across streams so that they copy similar amounts of data.
+
+  Args:
+    files: list of (size in bytes, path) tuples.
+    num_streams: int. The number of streams.
+
+  Returns:
+    A list of the non-empty streams, each a list of (size, path) tuples.
+  """
+  streams = [[] for _ in xrange(num_streams)]
+  stream_sizes = [0] * num_streams
+  # Largest first, each to the least loaded stream.
+  for size, path in sorted(files, reverse=True):
+    index = stream_sizes.index(min(stream_sizes))
+    streams[index].append((size, path))
+    stream_sizes[index] += size
+  return [stream for stream in streams if stream]
+
+
+def GetParallelCopyCommands(mode, streams, sending_vm, receiving_vm,
+                            ip_address, target_dir, cipher, compress):
+  """Returns the commands that copy each stream.
+
+  Args:
+    mode: string. One of PARALLEL_MODES.
+    streams: list of lists of (size, path) tuples, as returned by SplitFiles.
+    sending_vm: The vm sending the data.
+    receiving_vm: The vm receiving the data.
+    ip_address: string. The address of receiving_vm to send to.
+    target_dir: string. The directory on receiving_vm to copy to.
+    cipher: string. The SSH cipher of scp and rsync.
+    compress: boolean. Whether to compress the data in flight.
+
+  Returns:
+    A tuple of (receiving command, list of sending commands). The receiving
+    command, if not None, must be run on receiving_vm before the others.
+  """
+  ssh_options = '-o StrictHostKeyChecking=no -i %s -c %s' % (
+      linux_virtual_machine.REMOTE_KEY_PATH, cipher)
+  destination = '%s@%s:%s/' % (receiving_vm.user_name, ip_address, target_dir)
+  receive_cmd = None
+  send_cmds = []
+  if mode == PARALLEL_TAR:
+    tar_compress = 'z' if compress else ''
+    listeners = []
+    for i, stream in enumerate(streams):
+      port = TAR_PORT_START + i
+      listeners.append(
+          'nohup sh -c "nc -l {port} < /dev/null | tar -x{z} -C {dir}" '
+          '&> /dev/null &'.format(port=port, z=tar_compress, dir=target_dir))
+      send_cmds.append(
+          'tar -c{z} -C {dir} {files} > /dev/tcp/{ip}/{port}'.format(
+              z=tar_compress, dir=posixpath.dirname(stream[0][1]),
+              files=' '.join(posixpath.basename(path)
+                             for _, path in stream),
+              ip=ip_address, port=port))
+    # Give the listeners time to bind before the senders connect.
+    receive_cmd = ' '.join(listeners) + ' sleep 1'
+  else:
+    for stream in streams:
+      files = ' '.join(path for _, path in stream)
+      if mode == PARALLEL_SCP:
+        send_cmds.append('/usr/bin/scp %s %s%s %s' % (
+            ssh_options, '-C ' if compress else '', files, destination))
+      else:
+        send_cmds.append('rsync -a %s-e "ssh %s" %s %s' % (
+            '-z ' if compress else '', ssh_options, files, destination))
+  return receive_cmd, send_cmds
+
+
+def GetParallelCopyScript(send_cmds):
+  """Returns a command that runs send_cmds in parallel and times each one.
+
+  Each command prints "stream <index> <start> <end> <exit status>" when it
+  ends, and the whole command prints "total <start> <end>" last.
+  """
+  workers = ' '.join(
+      '(s=$(date +%s.%N); ' + cmd + '; rc=$?; echo "stream ' + str(i) +
+      ' $s $(date +%s.%N) $rc") &' for i, cmd in enumerate(send_cmds))
+  return ('start=$(date +%s.%N); ' + workers +
+          ' wait; echo "total $start $(date +%s.%N)"')
+
+
+def GetKillListenersCommand(num_streams):
+  """Returns a command that kills the tar listeners left by failed streams."""
+  ports = '|'.join(str(TAR_PORT_START + i) for i in xrange(num_streams))
+  return 'pkill -f "nc -l (%s)( |$)" || true' % ports
+
+
+def ParseParallelCopyOutput(stdout, num_streams):
+  """Parses the output of GetParallelCopyScript.
+
+  Args:
+    stdout: string. The output of the script.
+    num_streams: int. The number of streams the script ran.
+
+  Returns:
+    A tuple of (total seconds, dict mapping stream index to its seconds).
+
+  Raises:
+    errors.Benchmarks.RunError: If a stream failed or is missing.
+  """
+  stream_seconds = {}
+  total_seconds = None
+  for line in stdout.splitlines():
+    match = re.match(r'stream (\d+) (\S+) (\S+) (\d+)$', line.strip())
+    if match:
+      if int(match.group(4)):
+        raise errors.Benchmarks.RunError(
+            'Copy stream %s failed: %s' % (match.group(1), stdout))
+      stream_seconds[int(match.group(1))] = (float(match.group(3)) -
+                                             float(match.group(2)))
+    match = re.match(r'total (\S+) (\S+)$', line.strip())
+    if match:
+      total_seconds = float(match.group(2)) - float(match.group(1))
+  if total_seconds is None:
+    raise errors.Benchmarks.RunError('Copy did not finish: %s' % stdout)
+  missing = sorted(set(xrange(num_streams)) - set(stream_seconds))
+  if missing:
+    raise errors.Benchmarks.RunError(
+        'Copy streams %s did not report: %s' % (missing, stdout))
+  return total_seconds, stream_seconds
+
+
+def RunParallelCopySingleDirection(sending_vm, receiving_vm, cipher):
+  """Copy the data from sending_vm to receiving_vm in parallel streams.
+
+  Like RunScpSingleDirection, copies over the external and, if reachable, the
+  internal IP address of receiving_vm.
+
+  Args:
+    sending_vm: The vm the data is copied from.
+    receiving_vm: The vm the data is copied to.
+    cipher: Name of the SSH cipher to use, if the mode uses SSH.
+
+  Returns:
+    A list of sample.Sample objects: one '<mode> throughput' sample per IP
+    type with the aggregate throughput and the distribution of the stream
+    throughputs as metadata, and one '<mode> stream throughput' sample per
+    stream.
+  """
+  mode = FLAGS.copy_benchmark_mode
+  metadata = _GetDirectionMetadata(sending_vm, receiving_vm)
+  metadata.update({'streams': FLAGS.copy_parallel_streams,
+                   'compression': FLAGS.copy_compress})
+  stdout, _ = sending_vm.RemoteCommand(
+      "stat -c '%%s %%n' %s/data/*" % sending_vm.GetScratchDir(0))
+  files = [(int(size), path) for size, path in
+           (line.split(None, 1) for line in stdout.splitlines() if line)]
+  streams = SplitFiles(files, FLAGS.copy_parallel_streams)
+  total_mb = sum(size for size, _ in files) / 1e6
+
+  def RunForIpAddress(ip_address, ip_type):
+    """Run the parallel copy against a destination IP address."""
+    target_dir = posixpath.join(receiving_vm.GetScratchDir(0), ip_type)
+    receiving_vm.RemoteCommand('mkdir %s' % target_dir)
+    receive_cmd, send_cmds = GetParallelCopyCommands(
+        mode, streams, sending_vm, receiving_vm, ip_address, target_dir,
+        cipher, FLAGS.copy_compress)
+    if receive_cmd:
+      receiving_vm.RemoteCommand(receive_cmd)
+    try:
+      stdout, _ = sending_vm.RemoteCommand(
+          'sudo sync; sudo sysctl vm.drop_caches=3; ' +
+          GetParallelCopyScript(send_cmds))
+      total_seconds, stream_seconds = ParseParallelCopyOutput(stdout,
+                                                              len(streams))
+    except (errors.Benchmarks.RunError,
+            errors.VirtualMachine.RemoteCommandError):
+      if receive_cmd:
+        receiving_vm.RemoteCommand(GetKillListenersCommand(len(streams)))
+      raise
+    finally:
+      receiving_vm.RemoteCommand('rm -rf %s' % target_dir)
+
+    meta = metadata.copy()
+    meta['ip_type'] = ip_type
+    results = []
+    stream_throughputs = []
+    for i, stream in enumerate(streams):
+      stream_mb = sum(size for size, _ in stream) / 1e6
+      stream_throughputs.append(stream_mb / stream_seconds[i])
+      stream_meta = {'stream': i, 'stream_megabytes': stream_mb}
+      stream_meta.update(meta)
+      results.append(sample.Sample('%s stream throughput' % mode,
+                                   stream_throughputs[-1], UNIT,
+                                   stream_meta))
+    stats = sample.PercentileCalculator(stream_throughputs, [50, 90])
+    meta.update(('stream_throughput_%s' % stat, value)
+                for stat, value in stats.iteritems())
+    meta['stream_throughput_min'] = min(stream_throughputs)
+    meta['stream_throughput_max'] = max(stream_throughputs)
+    results.insert(0, sample.Sample('%s throughput' % mode,
+                                    total_mb / total_seconds, UNIT, meta))
+    return results
+
+  results = []
+  if vm_util.ShouldRunOnExternalIpAddress():
+    results.extend(RunForIpAddress(receiving_vm.ip_address, 'external'))
+
+  if vm_util.ShouldRunOnInternalIpAddress(sending_vm, receiving_vm):
+    results.extend(RunForIpAddress(receiving_vm.internal_ip, 'internal'))
+
+  return results
+
+
 def Run(benchmark_spec):
   """Run cp/scp on target vms.
 
@@ -18,6 +18,7 @@ Man: http://manpages.ubuntu.com/manpages/natty/man1/fio.1.html
 Quick howto: http://www.bluestop.org/fio/HOWTO.txt
 """
 
+import collections
 import json
 import logging
 import posixpath
@@ -26,11 +27,13 @@ import time
 
 import jinja2
 
+from perfkitbenchmarker import artifact_collection
 from perfkitbenchmarker import configs
 from perfkitbenchmarker import data
 from perfkitbenchmarker import errors
 from perfkitbenchmarker import flags
 from perfkitbenchmarker import flag_util
+from perfkitbenchmarker import sample
 from perfkitbenchmarker import units
 from perfkitbenchmarker import vm_util
 from perfkitbenchmarker.linux_packages import fio
@@ -156,6 +159,51 @@ flags.DEFINE_integer('fio_log_hist_msec', 1000,
                      'Same as fio_log_avg_msec, but logs entries for '
                      'completion latency histograms. If set to 0, histogram '
                      'logging is disabled.')
+flags.DEFINE_boolean('fio_per_device', False,
+                     'Instead of the scratch disk itself, run the generated '
+                     'jobs against each of its raw devices at once, e.g. '
+                     'each local NVMe device of a striped disk, and add up '
+                     'their results. Each device gets its own job group. '
+                     'Requires a --fio_target_mode against the device and '
+                     '--fio_generate_scenarios.')
+flags.DEFINE_boolean('fio_pin_numa', True,
+                     'With --fio_per_device, pin the jobs of each device to '
+                     'the CPUs of the device\'s NUMA node.')
+flags.DEFINE_boolean('fio_sweep', False,
+                     'Instead of running the configured jobs, search for the '
+                     'knee of the disk: the configuration with the most IOPS '
+                     'whose p99 latency is acceptable. Short probe runs '
+                     'sweep --fio_sweep_io_depths, --fio_sweep_num_jobs and '
+                     '--fio_sweep_blocksizes for --fio_sweep_scenario, and '
+                     'each series stops early once latency saturates. '
+                     'Cannot use with --fio_jobfile.')
+flags.DEFINE_enum('fio_sweep_scenario', 'random_read', sorted(SCENARIOS),
+                  'The scenario whose parameters --fio_sweep searches.')
+flag_util.DEFINE_integerlist('fio_sweep_io_depths',
+                             flag_util.IntegerList([1, 2, 4, 8, 16, 32, 64,
+                                                    128, 256]),
+                             'The IO queue depths that --fio_sweep tries, in '
+                             'increasing order.')
+flag_util.DEFINE_integerlist('fio_sweep_num_jobs',
+                             flag_util.IntegerList([1, 2, 4]),
+                             'The numbers of fio jobs that --fio_sweep tries, '
+                             'in increasing order.')
+flags.DEFINE_list('fio_sweep_blocksizes', ['4KiB'],
+                  'The block sizes that --fio_sweep tries, e.g. 4KiB,64KiB.')
+flags.DEFINE_integer('fio_sweep_probe_runtime', 30,
+                     'The number of seconds of each --fio_sweep probe run.',
+                     lower_bound=1)
+flags.DEFINE_float('fio_sweep_max_p99_usec', None,
+                   'The highest acceptable p99 latency in microseconds. '
+                   'Deeper queues are not tried once it is exceeded, and the '
+                   'knee must not exceed it. If not set, the knee is the '
+                   'configuration with the fewest outstanding IOs that comes '
+                   'within --fio_sweep_min_gain of the most IOPS.',
+                   lower_bound=0)
+flags.DEFINE_float('fio_sweep_min_gain', 0.05,
+                   'A series of probes is saturated, and stops, once adding '
+                   'outstanding IOs raises IOPS by less than this fraction.',
+                   lower_bound=0)
 
 
 FLAGS_IGNORED_FOR_CUSTOM_JOBFILE = {
@@ -240,6 +288,48 @@ numjobs={{numjob}}
 {%- endfor %}
 """
 
+PER_DEVICE_JOB_FILE_TEMPLATE = """
+[global]
+ioengine=libaio
+invalidate=1
+direct=1
+runtime={{runtime}}
+time_based
+do_verify=0
+verify_fatal=0
+randrepeat=0
+group_reporting=1
+{%- for parameter in parameters %}
+{{parameter}}
+{%- endfor %}
+{%- for scenario in scenarios %}
+{%- for iodepth in iodepths %}
+{%- for numjob in numjobs %}
+{%- for device in devices %}
+
+[{{scenario['name']}}-io-depth-{{iodepth}}-num-jobs-{{numjob}}{{device_suffix}}{{loop.index0}}]
+{%- if loop.first %}
+stonewall
+{%- endif %}
+new_group
+filename={{device['path']}}
+{%- if device['cpus'] %}
+cpus_allowed={{device['cpus']}}
+{%- endif %}
+rw={{scenario['rwkind']}}
+blocksize={{scenario['blocksize']}}
+iodepth={{iodepth}}
+size={{size}}
+numjobs={{numjob}}
+{%- endfor %}
+{%- endfor %}
+{%- endfor %}
+{%- endfor %}
+"""
+
+# Separates the name of a per-device job from its device index.
+PER_DEVICE_JOB_SUFFIX = '-device-'
+
 SECONDS_PER_MINUTE = 60
 
 
@@ -262,6 +352,21 @@ def GenerateJobFileString(filename, scenario_strings,
     The contents of a fio job file, as a string.
   """
 
+  job_file_template = jinja2.Template(JOB_FILE_TEMPLATE,
+                                      undefined=jinja2.StrictUndefined)
+
+  return str(job_file_template.render(
+      runtime=runtime,
+      filename=filename,
+      size=_GetSizeString(working_set_size),
+      scenarios=_GetScenarios(scenario_strings, block_size),
+      iodepths=io_depths,
+      numjobs=num_jobs,
+      parameters=parameters))
+
+
+def _GetScenarios(scenario_strings, block_size):
+  """Returns the SCENARIOS named by scenario_strings, with block_size."""
   if 'all' in scenario_strings:
     scenarios = SCENARIOS.itervalues()
   else:
@@ -270,27 +375,158 @@ def GenerateJobFileString(filename, scenario_strings,
         logging.error('Unknown scenario name %s', name)
     scenarios = (SCENARIOS[name] for name in scenario_strings)
 
-  size_string = str(working_set_size) + 'G' if working_set_size else '100%'
   if block_size is not None:
     # If we don't make a copy here, this will modify the global
     # SCENARIOS variable.
     scenarios = [scenario.copy() for scenario in scenarios]
     for scenario in scenarios:
       scenario['blocksize'] = str(long(block_size.m_as(units.byte))) + 'B'
+  return scenarios
 
-  job_file_template = jinja2.Template(JOB_FILE_TEMPLATE,
+
+def _GetSizeString(working_set_size):
+  return str(working_set_size) + 'G' if working_set_size else '100%'
+
+
+def GeneratePerDeviceJobFileString(devices, scenario_strings, io_depths,
+                                   num_jobs, working_set_size, block_size,
+                                   runtime, parameters):
+  """Make a string with a fio job file that tests several devices at once.
+
+  For each scenario, IO depth and number of jobs, there is one job group per
+  device. The groups of one configuration run concurrently, and are
+  reported separately.
+
+  Args:
+    devices: list of dicts, one per device, with its 'path' and 'cpus', the
+      list of CPUs to run its jobs on or '' for any. See
+      GetDevicePlacement.
+    See GenerateJobFileString for the other arguments.
+
+  Returns:
+    The contents of a fio job file, as a string.
+  """
+  job_file_template = jinja2.Template(PER_DEVICE_JOB_FILE_TEMPLATE,
                                       undefined=jinja2.StrictUndefined)
 
   return str(job_file_template.render(
       runtime=runtime,
-      filename=filename,
-      size=size_string,
-      scenarios=scenarios,
+      devices=devices,
+      device_suffix=PER_DEVICE_JOB_SUFFIX,
+      size=_GetSizeString(working_set_size),
+      scenarios=_GetScenarios(scenario_strings, block_size),
       iodepths=io_depths,
       numjobs=num_jobs,
       parameters=parameters))
 
 
+def ParseNumaNodeCpus(numactl_output):
+  """Parses the CPUs of each NUMA node from 'numactl --hardware'.
+
+  Args:
+    numactl_output: string. Contains lines like 'node 0 cpus: 0 1 2 3'.
+
+  Returns:
+    A dict mapping each NUMA node with CPUs to its CPUs, as a fio CPU list
+    such as '0,1,2,3'.
+  """
+  node_cpus = {}
+  for match in re.finditer(r'^node (\d+) cpus:(.*)$', numactl_output,
+                           re.MULTILINE):
+    cpus = match.group(2).split()
+    if cpus:
+      node_cpus[int(match.group(1))] = ','.join(cpus)
+  return node_cpus
+
+
+def GetDevicePlacement(vm, disk, pin_numa):
+  """Returns the raw devices of a disk and the CPUs to test each from.
+
+  Args:
+    vm: a linux_virtual_machine.BaseLinuxMixin object.
+    disk: the disk.BaseDisk object to test against. The raw devices of a
+      striped disk are its members.
+    pin_numa: bool. Whether to run the jobs of each device on the CPUs of
+      its NUMA node.
+
+  Returns:
+    A list of dicts, one per device, with its 'path', 'numa_node' (-1 if
+    unknown) and 'cpus' (see GeneratePerDeviceJobFileString).
+  """
+  if disk.is_striped:
+    paths = [d.GetDevicePath() for d in disk.disks]
+  else:
+    paths = [disk.GetDevicePath()]
+  node_cpus = {}
+  if pin_numa:
+    vm.Install('numactl')
+    stdout, _ = vm.RemoteCommand('numactl --hardware')
+    node_cpus = ParseNumaNodeCpus(stdout)
+  devices = []
+  for path in paths:
+    numa_node = -1
+    if pin_numa:
+      # The block device's parent is either the PCI device or, for NVMe, the
+      # controller, whose own parent is the PCI device.
+      stdout, _ = vm.RemoteCommand(
+          'name=$(basename $(readlink -f {0})); '
+          'cat /sys/block/$name/device/numa_node '
+          '/sys/block/$name/device/device/numa_node 2>/dev/null | head -1'
+          .format(path), ignore_failure=True)
+      if stdout.strip():
+        numa_node = int(stdout.strip())
+    devices.append({'path': path, 'numa_node': numa_node,
+                    'cpus': node_cpus.get(numa_node, '')})
+    logging.info('fio will test %s from NUMA node %s (CPUs %s).', path,
+                 numa_node, devices[-1]['cpus'] or 'any')
+  return devices
+
+
+def AggregateDeviceSamples(samples, num_devices):
+  """Adds up the samples of the per-device job groups of each configuration.
+
+  Args:
+    samples: list of sample.Sample objects, as returned by fio.ParseResults
+      for a job file from GeneratePerDeviceJobFileString.
+    num_devices: int. The number of devices tested.
+
+  Returns:
+    A list of sample.Sample objects. For each configuration and data
+    direction, the IOPS and bandwidth of all devices are added up, and the
+    p99 latency is the highest of theirs. The metrics are those of the
+    configuration run against a single target, e.g.
+    'random_read-io-depth-1-num-jobs-1:read:iops'.
+  """
+  aggregates = collections.OrderedDict()
+  for device_sample in samples:
+    job = device_sample.metadata.get('fio_job', '')
+    if (PER_DEVICE_JOB_SUFFIX not in job or
+        not device_sample.metric.startswith(job)):
+      continue
+    suffix = device_sample.metric[len(job):]
+    if suffix.endswith(':latency:p99'):
+      combine = max
+    elif suffix.endswith(':iops') or suffix.endswith(':bandwidth'):
+      combine = sum
+    else:
+      continue
+    config = job.rsplit(PER_DEVICE_JOB_SUFFIX, 1)[0]
+    metric = config + suffix
+    if metric not in aggregates:
+      metadata = {key: value
+                  for key, value in device_sample.metadata.iteritems()
+                  if key not in ('filename', 'cpus_allowed', 'new_group') and
+                  not key.startswith('bw_')}
+      metadata.update({'fio_job': config, 'num_devices': num_devices,
+                       'per_device_aggregate': True})
+      aggregates[metric] = (combine, device_sample.unit, metadata, [])
+    aggregates[metric][3].append(device_sample.value)
+  results = []
+  for metric, (combine, unit, metadata, values) in aggregates.iteritems():
+    results.append(sample.Sample(metric, combine(values), unit, metadata))
+  return results
+
+
 FILENAME_PARAM_REGEXP = re.compile('filename\s*=.*$', re.MULTILINE)
 
 
@@ -361,6 +597,8 @@ def GetOrGenerateJobFileString(job_file_path, scenario_strings,
                                  runtime, parameters)
 
 
+_BLOCKSIZE_PARSER = flag_util.UnitsParser(convertible_to=units.byte)
+
 NEED_SIZE_MESSAGE = ('You must specify the working set size when using '
                      'generated scenarios with a filesystem.')
 
@@ -378,12 +616,31 @@ def WarnOnBadFlags():
                       ', '.join(ignored_flags))
 
   if (FLAGS.fio_jobfile is None and
-      FLAGS.fio_generate_scenarios and
+      (FLAGS.fio_generate_scenarios or FLAGS.fio_sweep) and
       not FLAGS.fio_working_set_size and
       not AgainstDevice()):
     logging.error(NEED_SIZE_MESSAGE)
     raise errors.Benchmarks.PrepareException(NEED_SIZE_MESSAGE)
 
+  if FLAGS.fio_sweep:
+    if FLAGS.fio_jobfile:
+      raise errors.Benchmarks.PrepareException(
+          '--fio_sweep generates its own jobs and cannot use --fio_jobfile.')
+    for block_size in FLAGS.fio_sweep_blocksizes:
+      try:
+        _BLOCKSIZE_PARSER.Parse(block_size)
+      except ValueError as e:
+        raise errors.Benchmarks.PrepareException(
+            'Invalid --fio_sweep_blocksizes: %s' % e)
+
+  if FLAGS.fio_per_device and (FLAGS.fio_jobfile or FLAGS.fio_sweep or
+                               not FLAGS.fio_generate_scenarios or
+                               not AgainstDevice()):
+    raise errors.Benchmarks.PrepareException(
+        '--fio_per_device requires --fio_generate_scenarios and a '
+        '--fio_target_mode against the device, and cannot use --fio_jobfile '
+        'or --fio_sweep.')
+
 
 def GetConfig(user_config):
   config = configs.LoadConfig(BENCHMARK_CONFIG, user_config, BENCHMARK_NAME)
@@ -419,9 +676,9 @@ def CheckPrerequisites(benchmark_config):
 def Prepare(benchmark_spec):
   """Prepare the virtual machine to run FIO.
 
-     This includes installing fio, bc, and libaio1 and pre-filling the
-     attached disk. We also make sure the job file is always located
-     at the same path on the local machine.
+     This includes installing fio, bc, and libaio1, pre-warming (see
+     --fio_prewarm) and pre-filling the attached disk. We also make sure the
+     job file is always located at the same path on the local machine.
 
   Args:
     benchmark_spec: The benchmark specification. Contains all data that is
@@ -435,7 +692,22 @@ def Prepare(benchmark_spec):
   # Choose a disk or file name and optionally fill it
   disk = vm.scratch_disks[0]
 
-  if FillTarget():
+  # The pre-warm samples are reported by Run.
+  benchmark_spec.prewarm_samples = fio.PrewarmScratchDisk(vm, disk,
+                                                          FLAGS.fio_prewarm)
+
+  if FLAGS.fio_per_device:
+    benchmark_spec.fio_devices = GetDevicePlacement(vm, disk,
+                                                    FLAGS.fio_pin_numa)
+    if disk.is_striped:
+      # Release the members of the RAID array, which is not tested.
+      vm.RemoteCommand('sudo mdadm --stop %s' % disk.GetDevicePath())
+    if FillTarget():
+      logging.info('Fill devices of %s on %s', disk.GetDevicePath(), vm)
+      members = disk.disks if disk.is_striped else [disk]
+      vm_util.RunThreaded(
+          lambda member: FillDevice(vm, member, FLAGS.fio_fill_size), members)
+  elif FillTarget():
     logging.info('Fill device %s on %s', disk.GetDevicePath(), vm)
     FillDevice(vm, disk, FLAGS.fio_fill_size)
 
@@ -449,33 +721,18 @@ def Prepare(benchmark_spec):
     vm.MountDisk(disk.GetDevicePath(), disk.mount_point)
 
 
-def Run(benchmark_spec):
-  """Spawn fio and gather the results.
+def RunJobFile(vm, disk, job_file_string, extra_flags=''):
+  """Runs fio on the VM with the given job file.
 
   Args:
-    benchmark_spec: The benchmark specification. Contains all data that is
-        required to run the benchmark.
+    vm: a linux_virtual_machine.BaseLinuxMixin object.
+    disk: the disk.BaseDisk object to test against.
+    job_file_string: string. The contents of the fio job file.
+    extra_flags: string. Additional fio command line flags.
 
   Returns:
-    A list of sample.Sample objects.
+    The fio results, parsed from their json format.
   """
-  vm = benchmark_spec.vms[0]
-  logging.info('FIO running on %s', vm)
-
-  disk = vm.scratch_disks[0]
-  mount_point = disk.mount_point
-
-  job_file_string = GetOrGenerateJobFileString(
-      FLAGS.fio_jobfile,
-      FLAGS.fio_generate_scenarios,
-      AgainstDevice(),
-      disk,
-      FLAGS.fio_io_depths,
-      FLAGS.fio_num_jobs,
-      FLAGS.fio_working_set_size,
-      FLAGS.fio_blocksize,
-      FLAGS.fio_runtime,
-      FLAGS.fio_parameters)
   job_file_path = vm_util.PrependTempDir(LOCAL_JOB_FILE_NAME)
   with open(job_file_path, 'w') as job_file:
     job_file.write(job_file_string)
@@ -483,38 +740,236 @@ def Run(benchmark_spec):
 
   vm.PushFile(job_file_path, REMOTE_JOB_FILE_PATH)
 
-  if AgainstDevice():
+  if FLAGS.fio_per_device:
+    # The job file names the devices.
+    fio_command = 'sudo %s --output-format=json %s' % (
+        fio.FIO_PATH, REMOTE_JOB_FILE_PATH)
+  elif AgainstDevice():
     fio_command = 'sudo %s --output-format=json --filename=%s %s' % (
         fio.FIO_PATH, disk.GetDevicePath(), REMOTE_JOB_FILE_PATH)
   else:
     fio_command = 'sudo %s --output-format=json --directory=%s %s' % (
-        fio.FIO_PATH, mount_point, REMOTE_JOB_FILE_PATH)
+        fio.FIO_PATH, disk.mount_point, REMOTE_JOB_FILE_PATH)
+  if extra_flags:
+    fio_command = ' '.join([fio_command, extra_flags])
+
+  stdout, _ = vm.RobustRemoteCommand(fio_command, should_log=True)
+  return json.loads(stdout)
+
+
+# One probe run of --fio_sweep. 'samples' are the probe's fio.ParseResults
+# samples.
+SweepPoint = collections.namedtuple(
+    'SweepPoint', ['block_size', 'num_jobs', 'io_depth', 'iops', 'p99_usec',
+                   'samples'])
+
+
+def _GetSweepPoint(block_size, num_jobs, io_depth, samples):
+  """Summarizes the samples of one probe run as a SweepPoint.
+
+  The IOPS of all data directions are added up, and the p99 latency is the
+  highest of theirs.
+  """
+  iops = sum(s.value for s in samples if s.metric.endswith(':iops'))
+  p99_usec = max([s.value for s in samples
+                  if s.metric.endswith(':latency:p99')] or [0])
+  return SweepPoint(block_size, num_jobs, io_depth, iops, p99_usec, samples)
 
+
+def IsSaturated(previous, current, min_gain, max_p99_usec):
+  """Returns whether a series of probes with more outstanding IOs should stop.
+
+  Args:
+    previous: SweepPoint or None. The previous probe of the series.
+    current: SweepPoint. The latest probe of the series.
+    min_gain: float. See --fio_sweep_min_gain.
+    max_p99_usec: float or None. See --fio_sweep_max_p99_usec.
+  """
+  if max_p99_usec is not None and current.p99_usec > max_p99_usec:
+    return True
+  return (previous is not None and
+          current.iops < previous.iops * (1 + min_gain))
+
+
+def FindKnee(points, min_gain, max_p99_usec):
+  """Returns the knee of a saturation curve.
+
+  Args:
+    points: list of SweepPoints.
+    min_gain: float. See --fio_sweep_min_gain.
+    max_p99_usec: float or None. See --fio_sweep_max_p99_usec.
+
+  Returns:
+    If max_p99_usec is given, the point with the most IOPS whose p99 latency
+    does not exceed it. Otherwise, the point with the fewest outstanding IOs
+    whose IOPS are within min_gain of the most IOPS. None if no point
+    qualifies.
+  """
+  if max_p99_usec is not None:
+    points = [point for point in points if point.p99_usec <= max_p99_usec]
+    return max(points, key=lambda point: point.iops) if points else None
+  if not points:
+    return None
+  best_iops = max(point.iops for point in points)
+  return min((point for point in points
+              if point.iops * (1 + min_gain) >= best_iops),
+             key=lambda point: (point.num_jobs * point.io_depth,
+                                -point.iops))
+
+
+def _GetSweepMetadata(point):
+  return {'fio_sweep_blocksize': point.block_size,
+          'fio_sweep_num_jobs': point.num_jobs,
+          'fio_sweep_io_depth': point.io_depth,
+          'fio_sweep_outstanding_ios': point.num_jobs * point.io_depth,
+          'fio_sweep_scenario': FLAGS.fio_sweep_scenario}
+
+
+def RunSweep(vm, disk):
+  """Sweeps fio parameters to find the knee of the disk.
+
+  For each block size and number of jobs, probes are run at increasing IO
+  depths until latency saturates (see IsSaturated). Larger numbers of jobs
+  are skipped once they stop adding IOPS.
+
+  Args:
+    vm: a linux_virtual_machine.BaseLinuxMixin object.
+    disk: the disk.BaseDisk object to test against.
+
+  Returns:
+    A list of sample.Sample objects: 'Sweep IOPS' and 'Sweep p99 Latency'
+    samples for each probe, which form the saturation curve, and for each
+    block size, a 'Knee IOPS' sample along with the fio samples of the knee
+    probe.
+  """
+  filename = disk.GetDevicePath() if AgainstDevice() else DEFAULT_TEMP_FILE_NAME
+  samples = []
+  for block_size in FLAGS.fio_sweep_blocksizes:
+    points = []
+    best_series_iops = None
+    for num_jobs in FLAGS.fio_sweep_num_jobs:
+      previous = None
+      for io_depth in FLAGS.fio_sweep_io_depths:
+        job_file_string = GenerateJobFileString(
+            filename, [FLAGS.fio_sweep_scenario], [io_depth], [num_jobs],
+            FLAGS.fio_working_set_size, _BLOCKSIZE_PARSER.Parse(block_size),
+            FLAGS.fio_sweep_probe_runtime, FLAGS.fio_parameters)
+        logging.info('FIO sweep probe: blocksize=%s numjobs=%d iodepth=%d',
+                     block_size, num_jobs, io_depth)
+        point = _GetSweepPoint(
+            block_size, num_jobs, io_depth,
+            fio.ParseResults(job_file_string,
+                             RunJobFile(vm, disk, job_file_string)))
+        points.append(point)
+        metadata = _GetSweepMetadata(point)
+        samples.append(sample.Sample('Sweep IOPS', point.iops, '', metadata))
+        samples.append(sample.Sample('Sweep p99 Latency', point.p99_usec,
+                                     'usec', metadata))
+        if IsSaturated(previous, point, FLAGS.fio_sweep_min_gain,
+                       FLAGS.fio_sweep_max_p99_usec):
+          break
+        previous = point
+      series_iops = max(point.iops for point in points
+                        if point.num_jobs == num_jobs)
+      if (best_series_iops is not None and
+          series_iops < best_series_iops * (1 + FLAGS.fio_sweep_min_gain)):
+        break
+      best_series_iops = max(best_series_iops, series_iops)
+
+    knee = FindKnee(points, FLAGS.fio_sweep_min_gain,
+                    FLAGS.fio_sweep_max_p99_usec)
+    if knee is None:
+      logging.warning('No fio sweep probe with blocksize %s met the p99 '
+                      'latency limit of %s usec.', block_size,
+                      FLAGS.fio_sweep_max_p99_usec)
+      continue
+    metadata = _GetSweepMetadata(knee)
+    metadata['fio_sweep_p99_usec'] = knee.p99_usec
+    samples.append(sample.Sample('Knee IOPS', knee.iops, '', metadata))
+    for knee_sample in knee.samples:
+      knee_sample.metadata.update(_GetSweepMetadata(knee))
+      knee_sample.metadata['fio_sweep_knee'] = True
+      samples.append(knee_sample)
+  return samples
+
+
+def Run(benchmark_spec):
+  """Spawn fio and gather the results.
+
+  Args:
+    benchmark_spec: The benchmark specification. Contains all data that is
+        required to run the benchmark.
+
+  Returns:
+    A list of sample.Sample objects.
+  """
+  vm = benchmark_spec.vms[0]
+  logging.info('FIO running on %s', vm)
+
+  disk = vm.scratch_disks[0]
+
+  if FLAGS.fio_sweep:
+    samples = RunSweep(vm, disk)
+    samples.extend(benchmark_spec.prewarm_samples)
+    benchmark_spec.prewarm_samples = []
+    return samples
+
+  if FLAGS.fio_per_device:
+    job_file_string = GeneratePerDeviceJobFileString(
+        benchmark_spec.fio_devices,
+        FLAGS.fio_generate_scenarios,
+        FLAGS.fio_io_depths,
+        FLAGS.fio_num_jobs,
+        FLAGS.fio_working_set_size,
+        FLAGS.fio_blocksize,
+        FLAGS.fio_runtime,
+        FLAGS.fio_parameters)
+  else:
+    job_file_string = GetOrGenerateJobFileString(
+        FLAGS.fio_jobfile,
+        FLAGS.fio_generate_scenarios,
+        AgainstDevice(),
+        disk,
+        FLAGS.fio_io_depths,
+        FLAGS.fio_num_jobs,
+        FLAGS.fio_working_set_size,
+        FLAGS.fio_blocksize,
+        FLAGS.fio_runtime,
+        FLAGS.fio_parameters)
   collect_logs = any([FLAGS.fio_lat_log, FLAGS.fio_bw_log, FLAGS.fio_iops_log,
                       FLAGS.fio_hist_log])
 
   log_file_base = ''
+  log_flags = ''
   if collect_logs:
     log_file_base = '%s_%s' % (PKB_FIO_LOG_FILE_NAME, str(time.time()))
-    fio_command = ' '.join([fio_command, GetLogFlags(log_file_base)])
+    log_flags = GetLogFlags(log_file_base)
 
   # TODO(user): This only gives results at the end of a job run
   #      so the program pauses here with no feedback to the user.
   #      This is a pretty lousy experience.
   logging.info('FIO Results:')
 
-  stdout, stderr = vm.RobustRemoteCommand(fio_command, should_log=True)
+  fio_json_result = RunJobFile(vm, disk, job_file_string, log_flags)
   bin_vals = []
   if collect_logs:
-    vm.PullFile(vm_util.GetTempDir(), '%s*.log' % log_file_base)
+    artifact_collection.CollectArtifacts(
+        vm, '~', ['%s*.log' % log_file_base], vm_util.GetTempDir(),
+        label='fio_logs')
     if FLAGS.fio_hist_log:
       num_logs = int(vm.RemoteCommand(
           'ls %s_clat_hist.*.log | wc -l' % log_file_base)[0])
       bin_vals += [fio.ComputeHistogramBinVals(
           vm, '%s_clat_hist.%s.log' % (
               log_file_base, idx + 1)) for idx in range(num_logs)]
-  samples = fio.ParseResults(job_file_string, json.loads(stdout),
+  samples = fio.ParseResults(job_file_string, fio_json_result,
                              log_file_base=log_file_base, bin_vals=bin_vals)
+  if FLAGS.fio_per_device:
+    samples.extend(AggregateDeviceSamples(samples,
+                                          len(benchmark_spec.fio_devices)))
+  # Only the first run reports the pre-warm samples.
+  samples.extend(benchmark_spec.prewarm_samples)
+  benchmark_spec.prewarm_samples = []
 
   return samples
 
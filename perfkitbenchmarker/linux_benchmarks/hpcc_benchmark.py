@@ -43,6 +43,7 @@ import re
 
 from perfkitbenchmarker import configs
 from perfkitbenchmarker import data
+from perfkitbenchmarker import file_distribution
 from perfkitbenchmarker import flags
 from perfkitbenchmarker import regex_util
 from perfkitbenchmarker import sample
@@ -171,11 +172,15 @@ def PrepareBinaries(vms):
   else:
     master_vm.RemoteCommand('cp %s/hpcc hpcc' % hpcc.HPCC_DIR)
 
-  for vm in vms[1:]:
-    vm.Install('fortran')
-    master_vm.MoveFile(vm, 'hpcc', 'hpcc')
-    master_vm.MoveFile(vm, '/usr/bin/orted', 'orted')
-    vm.RemoteCommand('sudo mv orted /usr/bin/orted')
+  slave_vms = vms[1:]
+  if not slave_vms:
+    return
+  vm_util.RunThreaded(lambda vm: vm.Install('fortran'), slave_vms)
+  file_distribution.DistributeRemoteFile(master_vm, slave_vms, 'hpcc')
+  file_distribution.DistributeRemoteFile(master_vm, slave_vms,
+                                         '/usr/bin/orted', 'orted')
+  vm_util.RunThreaded(
+      lambda vm: vm.RemoteCommand('sudo mv orted /usr/bin/orted'), slave_vms)
 
 
 def Prepare(benchmark_spec):
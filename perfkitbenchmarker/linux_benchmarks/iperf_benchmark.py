@@ -18,8 +18,13 @@ Docs:
 http://iperf.fr/
 
 Runs Iperf to collect network throughput.
+
+With --iperf_tool=iperf3, the run uses iperf3's JSON output and also reports
+the throughput of every interval and stream, TCP retransmits and congestion
+windows, and UDP loss and jitter, so ramp-up and throttling are visible.
 """
 
+import json
 import logging
 import re
 
@@ -41,6 +46,27 @@ flags.DEFINE_integer('iperf_timeout', None,
                      'killing iperf client command.',
                      lower_bound=1)
 
+IPERF = 'iperf'
+IPERF3 = 'iperf3'
+
+flags.DEFINE_enum('iperf_tool', IPERF, [IPERF, IPERF3],
+                  'The tool to run. "iperf" runs iperf2 and reports the '
+                  'aggregate throughput. "iperf3" also reports per-interval '
+                  'and per-stream results.')
+flags.DEFINE_float('iperf3_interval', 1,
+                   'Seconds between the periodic iperf3 reports.',
+                   lower_bound=0.1)
+flags.DEFINE_boolean('iperf3_udp', False,
+                     'Whether iperf3 sends UDP instead of TCP.')
+flags.DEFINE_string('iperf3_bitrate', None,
+                    'The target bitrate of each iperf3 stream, e.g. "2G". '
+                    'Defaults to 1 Mbits/sec for UDP and unlimited for TCP.')
+flags.DEFINE_boolean('iperf3_bidirectional', False,
+                     'Whether iperf3 sends in both directions at the same '
+                     'time (--bidir, needs iperf3 3.7 or later). If so, '
+                     'each pair of VMs is tested once instead of once per '
+                     'direction.')
+
 FLAGS = flags.FLAGS
 
 BENCHMARK_NAME = 'iperf'
@@ -76,11 +102,11 @@ def Prepare(benchmark_spec):
             vms)))
 
   for vm in vms:
-    vm.Install('iperf')
+    vm.Install(FLAGS.iperf_tool)
     if vm_util.ShouldRunOnExternalIpAddress():
       vm.AllowPort(IPERF_PORT)
-    stdout, _ = vm.RemoteCommand(('nohup iperf --server --port %s &> /dev/null'
-                                  '& echo $!') % IPERF_PORT)
+    stdout, _ = vm.RemoteCommand(('nohup %s --server --port %s &> /dev/null'
+                                  '& echo $!') % (FLAGS.iperf_tool, IPERF_PORT))
     # TODO store this in a better place once we have a better place
     vm.iperf_server_pid = stdout.strip()
 
@@ -153,6 +179,154 @@ def _RunIperf(sending_vm, receiving_vm, receiving_ip_address, ip_type):
   return sample.Sample('Throughput', total_throughput, 'Mbits/sec', metadata)
 
 
+def _GetIperf3Direction(stream):
+  """Returns whether an iperf3 stream is 'forward' (client to server)."""
+  return 'forward' if stream.get('sender', True) else 'reverse'
+
+
+def ParseIperf3Results(results, metadata):
+  """Creates samples from the JSON output of an iperf3 client.
+
+  Args:
+    results: dict. The parsed output of iperf3 --json.
+    metadata: dict. Metadata to add to every sample.
+
+  Returns:
+    A list of sample.Sample objects:
+      'Throughput' per direction, from the receiver's view of the whole run.
+      'Interval Throughput' per interval and direction, with the start and
+          end of the interval in seconds as metadata. TCP intervals also get
+          an 'Interval Retransmits' sample.
+      'Stream Interval Throughput' per interval and stream, with the stream's
+          retransmits, congestion window and RTT as metadata for TCP.
+      'Stream Throughput' per stream for the whole run.
+      'Jitter' and 'Packet Loss' for UDP, as measured by the receiver.
+  """
+  if 'error' in results:
+    raise ValueError('iperf3 failed: %s' % results['error'])
+  udp = results['start']['test_start']['protocol'] == 'UDP'
+  samples = []
+  for interval in results['intervals']:
+    directions = {}
+    for stream in interval['streams']:
+      direction = _GetIperf3Direction(stream)
+      stream_metadata = {'direction': direction,
+                         'stream': stream['socket'],
+                         'interval_start': stream['start'],
+                         'interval_end': stream['end'],
+                         'omitted': stream['omitted']}
+      for key in ('retransmits', 'snd_cwnd', 'rtt'):
+        if key in stream:
+          stream_metadata[key] = stream[key]
+      stream_metadata.update(metadata)
+      samples.append(sample.Sample(
+          'Stream Interval Throughput', stream['bits_per_second'] / 1e6,
+          'Mbits/sec', stream_metadata))
+      totals = directions.setdefault(
+          direction, {'interval_start': stream['start'],
+                      'interval_end': stream['end'],
+                      'bits_per_second': 0, 'retransmits': 0})
+      totals['bits_per_second'] += stream['bits_per_second']
+      totals['retransmits'] += stream.get('retransmits', 0)
+    for direction, totals in sorted(directions.iteritems()):
+      interval_metadata = {'direction': direction,
+                           'interval_start': totals['interval_start'],
+                           'interval_end': totals['interval_end']}
+      interval_metadata.update(metadata)
+      samples.append(sample.Sample(
+          'Interval Throughput', totals['bits_per_second'] / 1e6,
+          'Mbits/sec', interval_metadata))
+      if not udp:
+        samples.append(sample.Sample(
+            'Interval Retransmits', totals['retransmits'], 'count',
+            interval_metadata))
+
+  end = results['end']
+  directions = {}
+  for stream in end['streams']:
+    # UDP streams describe both sides in 'udp'. TCP streams have a 'sender'
+    # and a 'receiver' view, and the receiver's is the goodput.
+    stream_end = stream.get('udp') or stream['receiver']
+    direction = _GetIperf3Direction(stream_end)
+    stream_metadata = {'direction': direction, 'stream': stream_end['socket']}
+    if not udp:
+      stream_metadata['retransmits'] = stream['sender'].get('retransmits')
+      stream_metadata['max_snd_cwnd'] = stream['sender'].get('max_snd_cwnd')
+    stream_metadata.update(metadata)
+    samples.append(sample.Sample(
+        'Stream Throughput', stream_end['bits_per_second'] / 1e6,
+        'Mbits/sec', stream_metadata))
+    totals = directions.setdefault(direction, {
+        'bits_per_second': 0, 'retransmits': 0, 'jitter_ms': [],
+        'packets': 0, 'lost_packets': 0})
+    totals['bits_per_second'] += stream_end['bits_per_second']
+    if udp:
+      totals['jitter_ms'].append(stream_end['jitter_ms'])
+      totals['packets'] += stream_end['packets']
+      totals['lost_packets'] += stream_end['lost_packets']
+    elif stream['sender'].get('retransmits', -1) >= 0:
+      # iperf3 reports -1 when the sender couldn't count retransmits.
+      totals['retransmits'] += stream['sender']['retransmits']
+  for direction, totals in sorted(directions.iteritems()):
+    direction_metadata = {'direction': direction}
+    direction_metadata.update(metadata)
+    if not udp:
+      direction_metadata['retransmits'] = totals['retransmits']
+    samples.append(sample.Sample('Throughput',
+                                 totals['bits_per_second'] / 1e6,
+                                 'Mbits/sec', direction_metadata))
+    if udp:
+      samples.append(sample.Sample(
+          'Jitter', sum(totals['jitter_ms']) / len(totals['jitter_ms']),
+          'ms', direction_metadata))
+      if totals['packets']:
+        samples.append(sample.Sample(
+            'Packet Loss',
+            100.0 * totals['lost_packets'] / totals['packets'], '%',
+            direction_metadata))
+  return samples
+
+
+@vm_util.Retry(max_retries=IPERF_RETRIES)
+def _RunIperf3(sending_vm, receiving_vm, receiving_ip_address, ip_type):
+  """Run iperf3 using sending 'vm' to connect to 'ip_address'.
+
+  See _RunIperf for the arguments.
+
+  Returns:
+    A list of samples. See ParseIperf3Results.
+  """
+  iperf_cmd = ('iperf3 --client %s --port %s --time %s --parallel %s '
+               '--interval %s --json' %
+               (receiving_ip_address, IPERF_PORT,
+                FLAGS.iperf_runtime_in_seconds,
+                FLAGS.iperf_sending_thread_count, FLAGS.iperf3_interval))
+  if FLAGS.iperf3_udp:
+    iperf_cmd += ' --udp'
+  if FLAGS.iperf3_bitrate:
+    iperf_cmd += ' -b %s' % FLAGS.iperf3_bitrate
+  if FLAGS.iperf3_bidirectional:
+    iperf_cmd += ' --bidir'
+  timeout_buffer = FLAGS.iperf_timeout or 30 + FLAGS.iperf_sending_thread_count
+  stdout, _ = sending_vm.RemoteCommand(iperf_cmd,
+                                       timeout=FLAGS.iperf_runtime_in_seconds +
+                                       timeout_buffer)
+  metadata = {
+      'receiving_machine_type': receiving_vm.machine_type,
+      'receiving_zone': receiving_vm.zone,
+      'sending_machine_type': sending_vm.machine_type,
+      'sending_thread_count': FLAGS.iperf_sending_thread_count,
+      'sending_zone': sending_vm.zone,
+      'runtime_in_seconds': FLAGS.iperf_runtime_in_seconds,
+      'ip_type': ip_type,
+      'iperf_tool': IPERF3,
+      'protocol': 'UDP' if FLAGS.iperf3_udp else 'TCP',
+      'bitrate': FLAGS.iperf3_bitrate,
+      'bidirectional': FLAGS.iperf3_bidirectional
+  }
+  return ParseIperf3Results(json.loads(stdout), metadata)
+
+
 def Run(benchmark_spec):
   """Run iperf on the target vm.
 
@@ -168,22 +342,33 @@ def Run(benchmark_spec):
 
   logging.info('Iperf Results:')
 
+  if FLAGS.iperf_tool == IPERF3:
+    # iperf3 returns a list of samples rather than a single one.
+    run_iperf = _RunIperf3
+    add_results = results.extend
+  else:
+    run_iperf = _RunIperf
+    add_results = results.append
   # Send traffic in both directions
-  for sending_vm, receiving_vm in vms, reversed(vms):
+  pairs = [vms, reversed(vms)]
+  if FLAGS.iperf_tool == IPERF3 and FLAGS.iperf3_bidirectional:
+    # A bidirectional test already covers both directions.
+    pairs = [vms]
+  for sending_vm, receiving_vm in pairs:
     # Send using external IP addresses
     if vm_util.ShouldRunOnExternalIpAddress():
-      results.append(_RunIperf(sending_vm,
-                               receiving_vm,
-                               receiving_vm.ip_address,
-                               'external'))
+      add_results(run_iperf(sending_vm,
+                            receiving_vm,
+                            receiving_vm.ip_address,
+                            'external'))
 
     # Send using internal IP addresses
     if vm_util.ShouldRunOnInternalIpAddress(sending_vm,
                                             receiving_vm):
-      results.append(_RunIperf(sending_vm,
-                               receiving_vm,
-                               receiving_vm.internal_ip,
-                               'internal'))
+      add_results(run_iperf(sending_vm,
+                            receiving_vm,
+                            receiving_vm.internal_ip,
+                            'internal'))
 
   return results
 
@@ -16,9 +16,15 @@
 
 Runs TCP_RR, TCP_STREAM benchmarks from netperf and compute total throughput
 and average latency inside mesh network.
-"""
 
+With --mesh_network_schedule=round_robin, the pairs of VMs are instead tested
+in rounds of disjoint pairs, as in a round-robin tournament, so that each VM
+takes part in one flow per round. Each VM runs its whole schedule from a
+script pushed to it, and the throughput and latency of every ordered pair
+are reported.
+"""
 
+import json
 import logging
 import re
 import threading
@@ -37,6 +43,20 @@ flags.DEFINE_integer('num_connections', 1,
 flags.DEFINE_integer('num_iterations', 1,
                      'Number of iterations for each run.')
 
+ALL_AT_ONCE = 'all_at_once'
+ROUND_ROBIN = 'round_robin'
+flags.DEFINE_enum('mesh_network_schedule', ALL_AT_ONCE,
+                  [ALL_AT_ONCE, ROUND_ROBIN],
+                  'How the pairs of VMs are tested. "all_at_once" runs '
+                  'netperf from every VM to every other VM at the same time '
+                  'and reports the totals. "round_robin" runs rounds of '
+                  'disjoint pairs, one flow per VM per round, and reports '
+                  'the throughput and latency of every pair.')
+flags.DEFINE_integer('mesh_network_round_margin', 5,
+                     'With --mesh_network_schedule=round_robin, the number of '
+                     'seconds added to each test of a round, so that the '
+                     'rounds of all VMs stay separate.', lower_bound=0)
+
 
 FLAGS = flags.FLAGS
 
@@ -56,6 +76,14 @@ NETPERF_BENCHMARKSS = ['TCP_RR', 'TCP_STREAM']
 VALUE_INDEX = 1
 RESULT_LOCK = threading.Lock()
 
+DEFAULT_NETPERF_DURATION = 10
+SCHEDULE_SCRIPT = 'mesh_network_schedule.sh'
+SCHEDULE_RESULT_FILE = 'mesh_network_results.txt'
+# Marks the start of each flow's output in a schedule result file.
+FLOW_MARKER = '#flow'
+# Seconds between launching the schedules and their first round.
+SCHEDULE_START_DELAY = 30
+
 
 def GetConfig(user_config):
   config = configs.LoadConfig(BENCHMARK_CONFIG, user_config, BENCHMARK_NAME)
@@ -136,6 +164,181 @@ def RunNetperf(vm, benchmark_name, servers, result):
     result[VALUE_INDEX] += value
 
 
+def RoundRobinSchedule(num_vms):
+  """Returns rounds of disjoint pairs that cover every ordered pair of VMs.
+
+  Uses the circle method of round-robin tournaments: one VM stays in place
+  while the others rotate around it. With an odd number of VMs, one VM sits
+  out each round. The rounds are then repeated with the roles reversed.
+
+  Args:
+    num_vms: int. The number of VMs.
+
+  Returns:
+    A list of rounds, each a list of (client index, server index) tuples in
+    which no VM appears twice.
+  """
+  players = range(num_vms)
+  if num_vms % 2:
+    players.append(None)
+  num_players = len(players)
+  rounds = []
+  for _ in xrange(num_players - 1):
+    pairs = [(players[i], players[num_players - 1 - i])
+             for i in xrange(num_players / 2)]
+    rounds.append([pair for pair in pairs if None not in pair])
+    players = [players[0], players[-1]] + players[1:-1]
+  return rounds + [[(server, client) for client, server in round_pairs]
+                   for round_pairs in rounds]
+
+
+def GetScheduleScript(vm_index, vms, schedule, start_time, slot_seconds,
+                      duration):
+  """Returns the script that runs one VM's part of a round-robin schedule.
+
+  The script waits for the start of each round in which the VM is a client
+  and runs each netperf benchmark to the round's server. The output of each
+  flow is appended to SCHEDULE_RESULT_FILE after a FLOW_MARKER line.
+
+  Args:
+    vm_index: int. The index of the VM in vms.
+    vms: list of VMs.
+    schedule: list of rounds. See RoundRobinSchedule.
+    start_time: int. The time at which the first round starts, in seconds
+        since the epoch on the VMs' clocks.
+    slot_seconds: int. The length of a round.
+    duration: int. The length of each netperf test.
+  """
+  lines = ['#!/bin/bash',
+           'wait_until() {',
+           '  local now=$(date +%s)',
+           '  if [ $1 -gt $now ]; then sleep $(($1 - now)); fi',
+           '}',
+           ': > %s' % SCHEDULE_RESULT_FILE]
+  for round_index, pairs in enumerate(schedule):
+    for client, server in pairs:
+      if client != vm_index:
+        continue
+      round_start = start_time + round_index * slot_seconds
+      for benchmark_index, benchmark_name in enumerate(NETPERF_BENCHMARKSS):
+        netperf_cmd = ('./netperf -P 0 -t {0} -H {1} -l {2} &'.format(
+            benchmark_name, vms[server].internal_ip, duration))
+        lines.append('wait_until %d' % (
+            round_start + benchmark_index * slot_seconds /
+            len(NETPERF_BENCHMARKSS)))
+        lines.append('echo "%s %d %s %d" >> %s' % (
+            FLOW_MARKER, round_index, benchmark_name, server,
+            SCHEDULE_RESULT_FILE))
+        lines.append('(%s wait) >> %s 2>&1' % (
+            ' '.join([netperf_cmd] * FLAGS.num_connections),
+            SCHEDULE_RESULT_FILE))
+  return '\n'.join(lines) + '\n'
+
+
+def ParseScheduleResults(output):
+  """Parses the result file of one VM's schedule.
+
+  Args:
+    output: string. The contents of SCHEDULE_RESULT_FILE.
+
+  Returns:
+    A dict mapping (benchmark name, server index) to the list of values
+    reported by each connection: the throughput in Mbits/sec for TCP_STREAM
+    and the transaction rate per second for TCP_RR.
+  """
+  results = {}
+  for flow in output.split(FLOW_MARKER)[1:]:
+    header, _, netperf_output = flow.partition('\n')
+    _, benchmark_name, server = header.split()
+    results[benchmark_name, int(server)] = [
+        float(value) for value in
+        re.findall(r'(\d+\.\d+)\s*$', netperf_output, re.MULTILINE)]
+  return results
+
+
+def RunRoundRobin(vms):
+  """Runs the netperf benchmarks on all ordered pairs of VMs in rounds.
+
+  Args:
+    vms: list of VMs.
+
+  Returns:
+    A list of samples. There are 'TCP_STREAM_Throughput' and
+    'TCP_RR_Latency' samples for each ordered pair of VMs, and
+    'TCP_STREAM_Throughput_Matrix' and 'TCP_RR_Latency_Matrix' samples whose
+    values are the averages over all pairs, with the whole matrices as
+    metadata.
+  """
+  num_vms = len(vms)
+  schedule = RoundRobinSchedule(num_vms)
+  duration = FLAGS.duration_in_seconds or DEFAULT_NETPERF_DURATION
+  slot_seconds = ((duration + FLAGS.mesh_network_round_margin) *
+                  len(NETPERF_BENCHMARKSS))
+  stdout, _ = vms[0].RemoteCommand('date +%s')
+  start_time = (int(stdout) + SCHEDULE_START_DELAY +
+                num_vms * FLAGS.mesh_network_round_margin)
+
+  def _RunSchedule(vm_index):
+    vm = vms[vm_index]
+    local_path = vm_util.PrependTempDir('%s.%d' % (SCHEDULE_SCRIPT, vm_index))
+    with open(local_path, 'w') as script:
+      script.write(GetScheduleScript(vm_index, vms, schedule, start_time,
+                                     slot_seconds, duration))
+    vm.PushFile(local_path, SCHEDULE_SCRIPT)
+    vm.RobustRemoteCommand('bash %s' % SCHEDULE_SCRIPT)
+    output, _ = vm.RemoteCommand('cat %s' % SCHEDULE_RESULT_FILE)
+    return ParseScheduleResults(output)
+
+  logging.info('Running %d rounds of %d seconds on %d VMs.', len(schedule),
+               slot_seconds, num_vms)
+  results_by_client = vm_util.RunThreaded(_RunSchedule, range(num_vms),
+                                          num_vms)
+
+  metadata = {'number_machines': num_vms,
+              'number_connections': FLAGS.num_connections,
+              'number_rounds': len(schedule),
+              'netperf_duration': duration,
+              'mesh_network_schedule': ROUND_ROBIN}
+  matrices = {benchmark_name: [[None] * num_vms for _ in xrange(num_vms)]
+              for benchmark_name in NETPERF_BENCHMARKSS}
+  samples = []
+  for client, results in enumerate(results_by_client):
+    for server in xrange(num_vms):
+      if server == client:
+        continue
+      for benchmark_name in NETPERF_BENCHMARKSS:
+        values = results.get((benchmark_name, server), [])
+        if len(values) != FLAGS.num_connections:
+          raise errors.Benchmarks.RunError(
+              'Netserver on %s not reachable from %s. Expecting %s %s '
+              'results, got %s.' % (vms[server], vms[client],
+                                    FLAGS.num_connections, benchmark_name,
+                                    len(values)))
+        pair_metadata = metadata.copy()
+        pair_metadata.update({'sending_machine': client,
+                              'receiving_machine': server})
+        if benchmark_name == 'TCP_RR':
+          value = sum(1000.0 / rate for rate in values) / len(values)
+          samples.append(sample.Sample('TCP_RR_Latency', value, 'ms',
+                                       pair_metadata))
+        else:
+          value = sum(values)
+          samples.append(sample.Sample('TCP_STREAM_Throughput', value,
+                                       'Mbits/sec', pair_metadata))
+        matrices[benchmark_name][client][server] = value
+
+  for benchmark_name, metric, unit in (
+      ('TCP_STREAM', 'TCP_STREAM_Throughput_Matrix', 'Mbits/sec'),
+      ('TCP_RR', 'TCP_RR_Latency_Matrix', 'ms')):
+    matrix = matrices[benchmark_name]
+    values = [v for row in matrix for v in row if v is not None]
+    matrix_metadata = metadata.copy()
+    matrix_metadata['matrix'] = json.dumps(matrix)
+    samples.append(sample.Sample(metric, sum(values) / len(values), unit,
+                                 matrix_metadata))
+  return samples
+
+
 def Run(benchmark_spec):
   """Run netperf on target vms.
 
@@ -148,6 +351,8 @@ def Run(benchmark_spec):
         the sample metric (string), value (float), unit (string).
   """
   vms = benchmark_spec.vms
+  if FLAGS.mesh_network_schedule == ROUND_ROBIN:
+    return RunRoundRobin(vms)
   num_vms = len(vms)
   results = []
   for netperf_benchmark in NETPERF_BENCHMARKSS:
@@ -193,3 +398,4 @@ def Cleanup(benchmark_spec):
     vm.RemoteCommand('pkill -9 netserver')
     vm.RemoteCommand('rm netserver')
     vm.RemoteCommand('rm netperf')
+    vm.RemoteCommand('rm -f %s %s' % (SCHEDULE_SCRIPT, SCHEDULE_RESULT_FILE))
@@ -28,7 +28,6 @@ As other cloud providers deliver a managed MySQL service, we will add it here.
 import json
 import logging
 import re
-import StringIO
 import time
 import uuid
 
@@ -39,6 +38,7 @@ from perfkitbenchmarker import sample
 from perfkitbenchmarker import vm_util
 from perfkitbenchmarker.providers.aws import aws_network
 from perfkitbenchmarker.providers.aws import util
+from perfkitbenchmarker.linux_packages import sysbench
 from perfkitbenchmarker.linux_packages import sysbench05plus
 
 FLAGS = flags.FLAGS
@@ -63,6 +63,10 @@ flags.DEFINE_integer('sysbench_latency_percentile', 99,
 flags.DEFINE_integer('sysbench_report_interval', 2,
                      'The interval, in seconds, we ask sysbench to report '
                      'results.')
+flags.DEFINE_boolean('sysbench_histogram', False,
+                     'Whether sysbench prints the latency histogram of the '
+                     'run, which is reported as a distribution. Needs '
+                     'sysbench 1.0 or later.')
 
 BENCHMARK_NAME = 'mysql_service'
 BENCHMARK_CONFIG = """
@@ -182,38 +186,17 @@ def ParseSysbenchOutput(sysbench_output, results, metadata):
   < We care about the response time section above, these are latency numbers>
   < then there are some outputs after this, we don't care either>
 
+  The per-interval, steady state and --histogram samples of
+  sysbench.GetSamples follow those.
+
   Args:
     sysbench_output: The output from sysbench.
     results: The dictionary to store results based on sysbench output.
     metadata: The metadata to be passed along to the Samples class.
   """
-  all_tps = []
-  seen_general_statistics = False
-  seen_response_time = False
-
-  response_times = {}
-
-  sysbench_output_io = StringIO.StringIO(sysbench_output)
-  for line in sysbench_output_io.readlines():
-    if re.match('^\[', line):
-      tps = re.findall('tps: (.*?),', line)
-      all_tps.append(float(tps[0]))
-      continue
-
-    if line.startswith('General statistics:'):
-      seen_general_statistics = True
-      continue
-
-    if seen_general_statistics:
-      if re.match('^ +response time:.*', line):
-        seen_response_time = True
-        continue
-
-    if seen_general_statistics and seen_response_time:
-      for token in RESPONSE_TIME_TOKENS:
-        search_string = '.*%s: +(.*)ms' % token
-        if re.findall(search_string, line):
-          response_times[token] = float(re.findall(search_string, line)[0])
+  parsed = sysbench.ParseSysbenchOutput(sysbench_output)
+  all_tps = [interval.tps for interval in parsed.intervals]
+  response_times = parsed.latency
 
   tps_line = ', '.join(map(str, all_tps))
   # Print all tps data points in the log for reference. And report
@@ -266,6 +249,8 @@ def ParseSysbenchOutput(sysbench_output, results, metadata):
         MS_UNIT,
         metadata))
 
+  results.extend(sysbench.GetSamples(parsed, metadata))
+
 
 def _IssueSysbenchCommand(vm, duration):
   """Issues a sysbench run command given a vm and a duration.
@@ -304,6 +289,8 @@ def _IssueSysbenchCommand(vm, duration):
                       vm.db_instance_master_password,
                       '--mysql-host=%s' % vm.db_instance_address,
                       'run']
+    if FLAGS.sysbench_histogram:
+      run_cmd_tokens.insert(-1, '--histogram=on')
     run_cmd = ' '.join(run_cmd_tokens)
     stdout, stderr = vm.RobustRemoteCommand(run_cmd)
     logging.info('Sysbench results: \n stdout is:\n%s\nstderr is\n%s',
@@ -27,11 +27,13 @@ import csv
 import io
 import json
 import logging
+import re
 
 from collections import Counter
 
 from perfkitbenchmarker import configs
 from perfkitbenchmarker import data
+from perfkitbenchmarker import errors
 from perfkitbenchmarker import flag_util
 from perfkitbenchmarker import flags
 from perfkitbenchmarker import sample
@@ -61,6 +63,15 @@ flags.DEFINE_integer('netperf_thinktime_run_length', 0,
                      'The number of contiguous numbers to sum at a time in the '
                      'thinktime array.')
 
+flags.DEFINE_bool('netperf_many_flows', False,
+                  'If true, spreads the streams across the NIC queues and '
+                  'CPUs of both VMs: stream i runs netperf and its netserver '
+                  'pinned with taskset to CPU i modulo the VM\'s CPU count, '
+                  'and transmit and receive packet steering (XPS/RPS) are '
+                  'configured so that each core uses its own queues. '
+                  'Per-flow throughput and per-core CPU utilization of both '
+                  'VMs are reported, to tell host limits from network limits.')
+
 ALL_BENCHMARKS = ['TCP_RR', 'TCP_CRR', 'TCP_STREAM', 'UDP_RR']
 flags.DEFINE_list('netperf_benchmarks', ALL_BENCHMARKS,
                   'The netperf benchmark(s) to run.')
@@ -92,6 +103,13 @@ REMOTE_SCRIPT = 'netperf_test.py'
 
 PERCENTILES = [50, 90, 99]
 
+# The /proc/stat columns counted as CPU time: user, nice, system, idle, iowait,
+# irq, softirq and steal. Guest time is already included in user time.
+_PROC_STAT_COLUMNS = 8
+_PROC_STAT_IDLE = 3
+_PROC_STAT_IOWAIT = 4
+_PROC_STAT_SOFTIRQ = 6
+
 
 def GetConfig(user_config):
   return configs.LoadConfig(BENCHMARK_CONFIG, user_config, BENCHMARK_NAME)
@@ -102,6 +120,77 @@ def PrepareNetperf(vm):
   vm.Install('netperf')
 
 
+def CpuMask(cpus):
+  """Returns the sysfs bitmap string of a set of CPUs, e.g. '00000005'.
+
+  Args:
+    cpus: iterable of integer CPU numbers.
+
+  Returns:
+    The hex mask in comma separated 32 bit groups, as in xps_cpus.
+  """
+  mask = sum(1 << cpu for cpu in set(cpus))
+  groups = []
+  while True:
+    groups.append('%08x' % (mask & 0xffffffff))
+    mask >>= 32
+    if not mask:
+      break
+  return ','.join(reversed(groups))
+
+
+def _GetInterface(vm, peer_ip):
+  """Returns the name of the network interface that vm uses for peer_ip."""
+  stdout, _ = vm.RemoteCommand('ip -o route get %s' % peer_ip)
+  match = re.search(r'\bdev (\S+)', stdout)
+  if not match:
+    raise ValueError('No interface found for %s in: %s' % (peer_ip, stdout))
+  return match.group(1)
+
+
+def ConfigureSteering(vm, peer_ip):
+  """Spreads the flows of vm's interface to peer_ip across its queues.
+
+  Transmit queue q is reserved for the CPUs numbered q modulo the number of
+  transmit queues (XPS), so pinned senders don't share a queue lock. When the
+  NIC has fewer receive queues than the VM has CPUs, receive packet steering
+  (RPS) spreads the protocol processing of each receive queue across the CPUs
+  in the same way, instead of leaving it on the CPU taking the interrupt.
+
+  Args:
+    vm: The VM to configure.
+    peer_ip: string. The IP address of the other netperf VM.
+
+  Returns:
+    A dict of metadata describing the queues of the interface.
+  """
+  interface = _GetInterface(vm, peer_ip)
+  queues_dir = '/sys/class/net/%s/queues' % interface
+  stdout, _ = vm.RemoteCommand('ls %s' % queues_dir)
+  queues = stdout.split()
+  rx_queues = len([queue for queue in queues if queue.startswith('rx-')])
+  tx_queues = len([queue for queue in queues if queue.startswith('tx-')])
+  use_rps = 0 < rx_queues < vm.num_cpus
+  settings = [('tx', 'xps_cpus', tx_queues)]
+  if use_rps:
+    settings.append(('rx', 'rps_cpus', rx_queues))
+  commands = []
+  for kind, setting, num_queues in settings:
+    for queue in xrange(num_queues):
+      mask = CpuMask(cpu for cpu in xrange(vm.num_cpus)
+                     if cpu % num_queues == queue)
+      commands.append('echo %s | sudo tee %s/%s-%d/%s' % (
+          mask, queues_dir, kind, queue, setting))
+  if commands:
+    # Some virtual NICs don't support XPS, which only costs the queue spread.
+    try:
+      vm.RemoteCommand(' && '.join(commands))
+    except errors.VirtualMachine.RemoteCommandError as e:
+      logging.warning('Could not configure packet steering on %s: %s', vm, e)
+  return {'interface': interface, 'rx_queues': rx_queues,
+          'tx_queues': tx_queues, 'rps': use_rps}
+
+
 def Prepare(benchmark_spec):
   """Install netperf on the target vm.
 
@@ -119,11 +208,30 @@ def Prepare(benchmark_spec):
   if vm_util.ShouldRunOnExternalIpAddress():
     # Open all of the command and data ports
     vms[1].AllowPort(PORT_START, PORT_START + num_streams * 2 - 1)
-  netserver_cmd = ('for i in $(seq {port_start} 2 {port_end}); do '
-                   '{netserver_path} -p $i & done').format(
-                       port_start=PORT_START,
-                       port_end=PORT_START + num_streams * 2 - 1,
-                       netserver_path=netperf.NETSERVER_PATH)
+  if FLAGS.netperf_many_flows:
+    # Pin the netserver of stream i to the CPU its netperf is pinned to.
+    netserver_cmd = ('for i in $(seq 0 {last_stream}); do '
+                     'taskset -c $((i % {num_cpus})) '
+                     '{netserver_path} -p $(({port_start} + 2 * i)) & '
+                     'done').format(
+                         last_stream=num_streams - 1,
+                         num_cpus=vms[1].num_cpus,
+                         port_start=PORT_START,
+                         netserver_path=netperf.NETSERVER_PATH)
+    steering = vm_util.RunThreaded(
+        ConfigureSteering, [((vms[0], vms[1].internal_ip), {}),
+                            ((vms[1], vms[0].internal_ip), {})])
+    benchmark_spec.netperf_steering = {}
+    for role, vm_steering in zip(('sending', 'receiving'), steering):
+      benchmark_spec.netperf_steering.update(
+          ('%s_%s' % (role, key), value)
+          for key, value in vm_steering.iteritems())
+  else:
+    netserver_cmd = ('for i in $(seq {port_start} 2 {port_end}); do '
+                     '{netserver_path} -p $i & done').format(
+                         port_start=PORT_START,
+                         port_end=PORT_START + num_streams * 2 - 1,
+                         netserver_path=netperf.NETSERVER_PATH)
   vms[1].RemoteCommand(netserver_cmd)
 
   # Install some stuff on the client vm
@@ -269,7 +377,73 @@ def _ParseNetperfOutput(stdout, metadata, benchmark_name,
   return (throughput_sample, latency_samples, latency_hist)
 
 
-def RunNetperf(vm, benchmark_name, server_ip, num_streams):
+def ParseProcStat(stdout):
+  """Parses the per-CPU lines of /proc/stat.
+
+  Args:
+    stdout: The contents of /proc/stat.
+
+  Returns:
+    A dict mapping each CPU number to its list of cumulative time counters.
+  """
+  cpu_times = {}
+  for line in stdout.splitlines():
+    match = re.match(r'cpu(\d+)\s+(.*)', line)
+    if match:
+      cpu_times[int(match.group(1))] = [
+          int(value) for value in match.group(2).split()[:_PROC_STAT_COLUMNS]]
+  return cpu_times
+
+
+def _GetCpuTimes(vm):
+  """Returns the parsed /proc/stat of vm."""
+  stdout, _ = vm.RemoteCommand('cat /proc/stat')
+  return ParseProcStat(stdout)
+
+
+def GetCpuUtilizationSamples(before, after, role, metadata):
+  """Creates samples of the per-core CPU utilization between two snapshots.
+
+  Args:
+    before: dict. The result of ParseProcStat at the start of the run.
+    after: dict. The result of ParseProcStat at the end of the run.
+    role: string. 'sending' or 'receiving'.
+    metadata: dict. Metadata to add to the samples.
+
+  Returns:
+    A list of sample.Sample objects: one 'CPU_Utilization' sample per core,
+    with the share of softirq time as metadata, and a 'CPU_Utilization_max'
+    sample for the busiest core. A core near 100% while the others are idle
+    means the host, not the network, limits the run.
+  """
+  samples = []
+  utilizations = {}
+  for cpu in sorted(set(before) & set(after)):
+    deltas = [end - start for start, end in zip(before[cpu], after[cpu])]
+    total = sum(deltas)
+    if not total:
+      continue
+    idle = deltas[_PROC_STAT_IDLE] + deltas[_PROC_STAT_IOWAIT]
+    utilizations[cpu] = 100.0 * (total - idle) / total
+    cpu_metadata = {'vm_role': role, 'cpu': cpu,
+                    'softirq_percent':
+                        100.0 * deltas[_PROC_STAT_SOFTIRQ] / total}
+    cpu_metadata.update(metadata)
+    samples.append(sample.Sample('CPU_Utilization', utilizations[cpu],
+                                 '%', cpu_metadata))
+  if utilizations:
+    busiest_cpu = max(utilizations, key=utilizations.get)
+    max_metadata = {'vm_role': role, 'cpu': busiest_cpu,
+                    'average_percent':
+                        sum(utilizations.values()) / len(utilizations)}
+    max_metadata.update(metadata)
+    samples.append(sample.Sample('CPU_Utilization_max',
+                                 utilizations[busiest_cpu], '%',
+                                 max_metadata))
+  return samples
+
+
+def RunNetperf(vm, benchmark_name, server_ip, num_streams, server_vm=None):
   """Spawns netperf on a remote VM, parses results.
 
   Args:
@@ -277,10 +451,12 @@ def RunNetperf(vm, benchmark_name, server_ip, num_streams):
     benchmark_name: The netperf benchmark to run, see the documentation.
     server_ip: A machine that is running netserver.
     num_streams: The number of netperf client threads to run.
+    server_vm: The VM running netserver. Required with --netperf_many_flows.
 
   Returns:
     A sample.Sample object with the result.
   """
+  many_flows = FLAGS.netperf_many_flows
   enable_latency_histograms = FLAGS.netperf_enable_histograms or num_streams > 1
   # Throughput benchmarks don't have latency histograms
   enable_latency_histograms = enable_latency_histograms and \
@@ -326,8 +502,13 @@ def RunNetperf(vm, benchmark_name, server_ip, num_streams):
   remote_script_path = '/tmp/run/%s' % REMOTE_SCRIPT
   remote_cmd = '%s --netperf_cmd="%s" --num_streams=%s --port_start=%s' % \
                (remote_script_path, netperf_cmd, num_streams, PORT_START)
+  if many_flows:
+    remote_cmd += ' --num_cpus=%s' % vm.num_cpus
+    cpu_times_before = vm_util.RunThreaded(_GetCpuTimes, [vm, server_vm])
   remote_stdout, _ = vm.RemoteCommand(remote_cmd,
                                       timeout=remote_cmd_timeout)
+  if many_flows:
+    cpu_times_after = vm_util.RunThreaded(_GetCpuTimes, [vm, server_vm])
 
   # Decode stdouts, stderrs, and return codes from remote command's stdout
   stdouts, stderrs, return_codes = json.loads(remote_stdout)
@@ -336,20 +517,38 @@ def RunNetperf(vm, benchmark_name, server_ip, num_streams):
   metadata = {'netperf_test_length': FLAGS.netperf_test_length,
               'max_iter': FLAGS.netperf_max_iter or 1,
               'sending_thread_count': num_streams}
+  if many_flows:
+    metadata['netperf_many_flows'] = True
 
   parsed_output = [_ParseNetperfOutput(stdout, metadata, benchmark_name,
                                        enable_latency_histograms)
                    for stdout in stdouts]
 
+  samples = []
+  if many_flows:
+    for role, before, after in zip(('sending', 'receiving'),
+                                   cpu_times_before, cpu_times_after):
+      cpu_metadata = {'benchmark_name': benchmark_name}
+      cpu_metadata.update(metadata)
+      samples.extend(GetCpuUtilizationSamples(before, after, role,
+                                              cpu_metadata))
+    for stream, (throughput_sample, _, _) in enumerate(parsed_output):
+      flow_metadata = {'stream': stream,
+                       'sending_cpu': stream % vm.num_cpus,
+                       'receiving_cpu': stream % server_vm.num_cpus}
+      flow_metadata.update(throughput_sample.metadata)
+      samples.append(sample.Sample(
+          throughput_sample.metric.replace(benchmark_name,
+                                           benchmark_name + '_Flow', 1),
+          throughput_sample.value, throughput_sample.unit, flow_metadata))
+
   if len(parsed_output) == 1:
     # Only 1 netperf thread
     throughput_sample, latency_samples, histogram = parsed_output[0]
-    return [throughput_sample] + latency_samples
+    return [throughput_sample] + latency_samples + samples
   else:
     # Multiple netperf threads
 
-    samples = []
-
     # Unzip parsed output
     # Note that latency_samples are invalid with multiple threads because stats
     # are computed per-thread by netperf, so we don't use them here.
@@ -413,6 +612,8 @@ def Run(benchmark_spec):
       'receiving_zone': server_vm.zone,
       'receiving_machine_type': server_vm.machine_type
   }
+  if FLAGS.netperf_many_flows:
+    metadata.update(benchmark_spec.netperf_steering)
 
   for num_streams in FLAGS.netperf_num_streams:
     assert(num_streams >= 1)
@@ -420,7 +621,8 @@ def Run(benchmark_spec):
     for netperf_benchmark in FLAGS.netperf_benchmarks:
       if vm_util.ShouldRunOnExternalIpAddress():
         external_ip_results = RunNetperf(client_vm, netperf_benchmark,
-                                         server_vm.ip_address, num_streams)
+                                         server_vm.ip_address, num_streams,
+                                         server_vm=server_vm)
         for external_ip_result in external_ip_results:
           external_ip_result.metadata['ip_type'] = 'external'
           external_ip_result.metadata.update(metadata)
@@ -428,7 +630,8 @@ def Run(benchmark_spec):
 
       if vm_util.ShouldRunOnInternalIpAddress(client_vm, server_vm):
         internal_ip_results = RunNetperf(client_vm, netperf_benchmark,
-                                         server_vm.internal_ip, num_streams)
+                                         server_vm.internal_ip, num_streams,
+                                         server_vm=server_vm)
         for internal_ip_result in internal_ip_results:
           internal_ip_result.metadata.update(metadata)
           internal_ip_result.metadata['ip_type'] = 'internal'
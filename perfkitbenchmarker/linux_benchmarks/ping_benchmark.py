@@ -15,12 +15,40 @@
 """Runs ping.
 
 This benchmark runs ping using the internal ips of vms in the same zone.
+Both directions are pinged at the same time.
+
+With --ping_mode=histogram, ping sends probes at a sub-millisecond interval
+and the RTT of every probe is bucketed on the sending VM, so the latency
+distribution (p50/p99/p99.9) and jitter are reported instead of only the
+min/avg/max/mdev summary.
 """
 
+import json
 import logging
+import re
+
 from perfkitbenchmarker import configs
+from perfkitbenchmarker import flags
 from perfkitbenchmarker import sample
-import re
+from perfkitbenchmarker import vm_util
+
+SUMMARY = 'summary'
+HISTOGRAM = 'histogram'
+
+flags.DEFINE_enum('ping_mode', SUMMARY, [SUMMARY, HISTOGRAM],
+                  'How to ping. "summary" sends 100 pings a second apart and '
+                  'reports the min/avg/max/mdev summary. "histogram" sends '
+                  '--ping_histogram_count pings --ping_histogram_interval '
+                  'apart and reports latency percentiles and jitter.')
+flags.DEFINE_integer('ping_histogram_count', 100000,
+                     'The number of pings to send in histogram mode.',
+                     lower_bound=1)
+flags.DEFINE_float('ping_histogram_interval', 0.0002,
+                   'The interval between pings in histogram mode, in '
+                   'seconds. Intervals under 0.2s need root, so ping runs '
+                   'with sudo.', lower_bound=0)
+
+FLAGS = flags.FLAGS
 
 
 BENCHMARK_NAME = 'ping'
@@ -36,6 +64,18 @@ ping:
 
 METRICS = ('Min Latency', 'Average Latency', 'Max Latency', 'Latency Std Dev')
 
+HISTOGRAM_PERCENTILES = (50, 90, 99, 99.9)
+
+# Buckets the RTT of each reply by its printed value (ping prints three
+# significant digits, e.g. "time=0.123 ms"), and computes the jitter as the
+# mean absolute difference between consecutive RTTs, as in RFC 3550.
+_HISTOGRAM_AWK = (
+    '/time=/ {split($0, f, "time="); split(f[2], t, " "); rtt = t[1]; '
+    'h[rtt]++; if (n++) {d = rtt - prev; j += (d < 0 ? -d : d)} prev = rtt} '
+    '/packets transmitted/ {print} '
+    'END {for (r in h) print "rtt", r, h[r]; '
+    'if (n > 1) print "jitter", j / (n - 1)}')
+
 
 def GetConfig(user_config):
   return configs.LoadConfig(BENCHMARK_CONFIG, user_config, BENCHMARK_NAME)
@@ -65,12 +105,13 @@ def Run(benchmark_spec):
     A list of sample.Sample objects.
   """
   vms = benchmark_spec.vms
+  run_ping = _RunPingHistogram if FLAGS.ping_mode == HISTOGRAM else _RunPing
+  directions = [((sending_vm, receiving_vm, receiving_vm.internal_ip,
+                  'internal'), {})
+                for sending_vm, receiving_vm in (vms, reversed(vms))]
   results = []
-  for sending_vm, receiving_vm in vms, reversed(vms):
-    results = results + _RunPing(sending_vm,
-                                 receiving_vm,
-                                 receiving_vm.internal_ip,
-                                 'internal')
+  for direction_results in vm_util.RunThreaded(run_ping, directions):
+    results.extend(direction_results)
   return results
 
 
@@ -103,6 +144,85 @@ def _RunPing(sending_vm, receiving_vm, receiving_ip, ip_type):
   return results
 
 
+def ParseHistogramOutput(stdout):
+  """Parses the output of ping piped through _HISTOGRAM_AWK.
+
+  Args:
+    stdout: The output of the ping command.
+
+  Returns:
+    A tuple of (histogram, jitter, transmitted, received). histogram maps each
+    RTT in ms to the number of replies with that RTT, and jitter is in ms or
+    None if there were fewer than two replies.
+  """
+  histogram = {}
+  jitter = None
+  transmitted = received = 0
+  for line in stdout.splitlines():
+    fields = line.split()
+    if not fields:
+      continue
+    if fields[0] == 'rtt':
+      rtt = float(fields[1])
+      histogram[rtt] = histogram.get(rtt, 0) + int(fields[2])
+    elif fields[0] == 'jitter':
+      jitter = float(fields[1])
+    else:
+      match = re.search(r'(\d+) packets transmitted, (\d+) received', line)
+      if match:
+        transmitted, received = (int(value) for value in match.groups())
+  return histogram, jitter, transmitted, received
+
+
+def _RunPingHistogram(sending_vm, receiving_vm, receiving_ip, ip_type):
+  """Run a high rate ping from 'sending_vm' to 'receiving_ip'.
+
+  See _RunPing for the arguments.
+
+  Returns:
+    A list of samples with the latency percentiles, jitter, packet loss and
+    the latency histogram.
+  """
+  if not sending_vm.IsReachable(receiving_vm):
+    logging.warn('%s is not reachable from %s', receiving_vm, sending_vm)
+    return []
+
+  ping_cmd = "sudo ping -i %s -c %s -W 1 %s | awk '%s'" % (
+      FLAGS.ping_histogram_interval, FLAGS.ping_histogram_count,
+      receiving_ip, _HISTOGRAM_AWK)
+  stdout, _ = sending_vm.RemoteCommand(ping_cmd)
+  histogram, jitter, transmitted, received = ParseHistogramOutput(stdout)
+  if not histogram:
+    raise ValueError('No ping replies from %s: %s' % (receiving_ip, stdout))
+
+  metadata = {'ip_type': ip_type,
+              'receiving_zone': receiving_vm.zone,
+              'sending_zone': sending_vm.zone,
+              'ping_mode': HISTOGRAM,
+              'ping_interval': FLAGS.ping_histogram_interval,
+              'ping_count': transmitted}
+  num_replies = sum(histogram.itervalues())
+  average = sum(rtt * count for rtt, count in histogram.iteritems())
+  results = [
+      sample.Sample('Min Latency', min(histogram), 'ms', metadata),
+      sample.Sample('Average Latency', average / num_replies, 'ms', metadata),
+      sample.Sample('Max Latency', max(histogram), 'ms', metadata)]
+  percentiles = sample.HistogramPercentiles(histogram, HISTOGRAM_PERCENTILES)
+  for percentile, value in sorted(percentiles.iteritems()):
+    results.append(sample.Sample('Latency p%s' % percentile, value, 'ms',
+                                 metadata))
+  if jitter is not None:
+    results.append(sample.Sample('Latency Jitter', jitter, 'ms', metadata))
+  if transmitted:
+    results.append(sample.Sample(
+        'Packet Loss', 100.0 * (transmitted - received) / transmitted, '%',
+        metadata))
+  hist_metadata = {'histogram': json.dumps(sorted(histogram.iteritems()))}
+  hist_metadata.update(metadata)
+  results.append(sample.Sample('Latency Histogram', 0, 'ms', hist_metadata))
+  return results
+
+
 def Cleanup(benchmark_spec):  # pylint: disable=unused-argument
   """Cleanup ping on the target vm (by uninstalling).
 
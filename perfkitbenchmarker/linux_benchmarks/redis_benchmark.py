@@ -19,9 +19,16 @@ Redis.
 
 Redis homepage: http://redis.io/
 memtier_benchmark homepage: https://github.com/RedisLabs/memtier_benchmark
+
+Each step of the client thread sweep runs one memtier_benchmark per Redis
+process, spread across the load VMs. Each memtier run writes JSON and HDR
+histogram output that is parsed locally: the warm-up and cool-down seconds
+are left out of the throughput, and the histograms of all clients are merged
+for the latency percentiles.
 """
 
 import collections
+import json
 import logging
 
 from perfkitbenchmarker import configs
@@ -29,6 +36,7 @@ from perfkitbenchmarker import errors
 from perfkitbenchmarker import flags
 from perfkitbenchmarker import sample
 from perfkitbenchmarker import vm_util
+from perfkitbenchmarker.linux_packages import memtier
 from perfkitbenchmarker.linux_packages import redis_server
 
 flags.DEFINE_integer('redis_numprocesses', 1, 'Number of Redis processes to '
@@ -37,8 +45,26 @@ flags.DEFINE_integer('redis_clients', 5, 'Number of redis loadgen clients')
 flags.DEFINE_string('redis_setgetratio', '1:0', 'Ratio of reads to write '
                     'performed by the memtier benchmark, default is '
                     '\'1:0\', ie: writes only.')
-
-MEMTIER_COMMIT = '1.2.0'
+flags.DEFINE_integer('redis_warmup_seconds', 10,
+                     'Seconds at the start of each memtier run that are left '
+                     'out of the throughput.', lower_bound=0)
+flags.DEFINE_integer('redis_test_seconds', 20,
+                     'Seconds of each memtier run that are measured.',
+                     lower_bound=1)
+flags.DEFINE_integer('redis_cooldown_seconds', 10,
+                     'Seconds at the end of each memtier run that are left '
+                     'out of the throughput, so that the measured seconds of '
+                     'all clients overlap.', lower_bound=0)
+flags.DEFINE_integer('redis_saturation_steps', 3,
+                     'The thread sweep stops once this many steps in a row '
+                     'have not raised the best throughput by at least 2%.',
+                     lower_bound=1)
+
+# The minimum throughput gain of a step over the best one so far.
+SATURATION_GAIN = 0.02
+LATENCY_PERCENTILES = [50, 90, 99, 99.9]
+# Separates the JSON output of memtier from its HDR histogram.
+_HDR_SEPARATOR = '#hdr-histogram'
 FIRST_PORT = 6379
 FLAGS = flags.FLAGS
 
@@ -96,8 +122,9 @@ def Prepare(benchmark_spec):
   vm_util.RunThreaded(PrepareLoadgen, args)
 
 
-RedisResult = collections.namedtuple('RedisResult',
-                                     ['throughput', 'average_latency'])
+RedisResult = collections.namedtuple(
+    'RedisResult',
+    ['throughput', 'average_latency', 'command_stats', 'histogram'])
 
 
 def RunLoad(redis_vm, load_vm, threads, port, test_id):
@@ -108,36 +135,33 @@ def RunLoad(redis_vm, load_vm, threads, port, test_id):
     load_vm: The vm that will run the memtier_benchmark.
     threads: The number of threads to run in this memtier_benchmark process.
     port: the port to target on the redis_vm.
+    test_id: int. Names the output files of this memtier_benchmark.
   Returns:
-    A throughput, latency tuple, or None if threads was 0.
+    A RedisResult, or None if threads was 0. command_stats maps 'Sets',
+    'Gets' and 'Totals' to (throughput, average latency) tuples, and
+    histogram maps latencies in ms to request counts.
   """
   if threads == 0:
     return None
-  base_cmd = ('memtier_benchmark -s %s  -p %d  -d 128 '
-              '--ratio %s --key-pattern S:S -x 1 -c 1 -t %d '
-              '--test-time=%d --random-data > %s ;')
-  final_cmd = (base_cmd % (redis_vm.internal_ip, port,
-                           FLAGS.redis_setgetratio, threads, 10,
-                           '/dev/null') +
-               base_cmd % (redis_vm.internal_ip, port,
-                           FLAGS.redis_setgetratio, threads, 20,
-                           'outfile-%d' % test_id) +
-               base_cmd % (redis_vm.internal_ip, port,
-                           FLAGS.redis_setgetratio, threads, 10,
-                           '/dev/null'))
-
-  load_vm.RemoteCommand(final_cmd)
-  output, _ = load_vm.RemoteCommand('cat outfile-%d | grep Totals | '
-                                    'tr -s \' \' | cut -d \' \' -f 2' % test_id)
-  throughput = float(output)
-  output, _ = load_vm.RemoteCommand('cat outfile-%d | grep Totals | '
-                                    'tr -s \' \' | cut -d \' \' -f 5' % test_id)
-  latency = float(output)
-
-  output, _ = load_vm.RemoteCommand('cat outfile-%d' % test_id)
-  logging.info(output)
-
-  return RedisResult(throughput, latency)
+  prefix = 'memtier-%d' % test_id
+  test_time = (FLAGS.redis_warmup_seconds + FLAGS.redis_test_seconds +
+               FLAGS.redis_cooldown_seconds)
+  cmd = ('memtier_benchmark -s %s -p %d -d 128 '
+         '--ratio %s --key-pattern S:S -x 1 -c 1 -t %d '
+         '--test-time=%d --random-data --hide-histogram '
+         '--json-out-file=%s.json --hdr-file-prefix=%s > /dev/null && '
+         'cat %s.json && echo %s && cat %s%s' %
+         (redis_vm.internal_ip, port, FLAGS.redis_setgetratio, threads,
+          test_time, prefix, prefix, prefix, _HDR_SEPARATOR, prefix,
+          memtier.HDR_FULL_RUN_SUFFIX))
+  output, _ = load_vm.RemoteCommand(cmd)
+  json_output, hgrm = output.split(_HDR_SEPARATOR)
+  command_stats = memtier.ParseJsonResults(json.loads(json_output),
+                                           FLAGS.redis_warmup_seconds,
+                                           FLAGS.redis_cooldown_seconds)
+  throughput, latency = command_stats['Totals']
+  return RedisResult(throughput, latency, command_stats,
+                     memtier.ParseHdrHistogram(hgrm))
 
 
 def Run(benchmark_spec):
@@ -159,6 +183,9 @@ def Run(benchmark_spec):
   results = []
   num_servers = redis_vm.num_cpus * FLAGS.redis_numprocesses
   max_throughput_for_completion_latency_under_1ms = 0.0
+  best_throughput = 0.0
+  best_metadata = {}
+  steps_without_gain = 0
 
   while latency < latency_threshold:
     threads += max(1, int(threads * .15))
@@ -169,7 +196,8 @@ def Run(benchmark_spec):
              {}) for i in range(num_loaders)]
     client_results = [i for i in vm_util.RunThreaded(RunLoad, args)
                       if i is not None]
-    logging.info('Redis results by client: %s', client_results)
+    logging.info('Redis results by client: %s',
+                 [r[:2] for r in client_results])
     throughput = sum(r.throughput for r in client_results)
 
     if not throughput:
@@ -177,21 +205,49 @@ def Run(benchmark_spec):
           'Zero throughput for {} threads: {}'.format(threads, client_results))
 
     # Average latency across clients
-    latency = (sum(client_latency * client_throughput
-                   for client_latency, client_throughput in client_results) /
+    latency = (sum(r.average_latency * r.throughput
+                   for r in client_results) /
                throughput)
 
     if latency < 1.0:
         max_throughput_for_completion_latency_under_1ms = max(
             max_throughput_for_completion_latency_under_1ms,
             throughput)
+    metadata = {'latency': latency, 'threads': threads}
+    for command in ('Sets', 'Gets'):
+      metadata['%s_throughput' % command.lower()] = sum(
+          r.command_stats[command][0] for r in client_results
+          if command in r.command_stats)
+    histogram = collections.Counter()
+    for r in client_results:
+      histogram.update(r.histogram)
+    if histogram:
+      percentiles = sample.HistogramPercentiles(histogram,
+                                                LATENCY_PERCENTILES)
+      for percentile, value in sorted(percentiles.iteritems()):
+        metadata['latency_p%s' % percentile] = value
+        results.append(sample.Sample('latency_p%s' % percentile, value, 'ms',
+                                     {'threads': threads,
+                                      'throughput': throughput}))
     results.append(sample.Sample('throughput', throughput, 'req/s',
-                                 {'latency': latency, 'threads': threads}))
+                                 metadata))
+    if throughput > best_throughput * (1 + SATURATION_GAIN):
+      steps_without_gain = 0
+    else:
+      steps_without_gain += 1
+    if throughput > best_throughput:
+      best_throughput = throughput
+      best_metadata = metadata
     logging.info('Threads : %d  (%f, %f) < %f', threads, throughput, latency,
                  latency_threshold)
     if threads == 1:
       latency_threshold = latency * 20
+    if steps_without_gain >= FLAGS.redis_saturation_steps:
+      logging.info('Throughput saturated at %d threads.', threads)
+      break
 
+  results.append(sample.Sample('saturation_throughput', best_throughput,
+                               'req/s', best_metadata))
   results.append(sample.Sample(
                  'max_throughput_for_completion_latency_under_1ms',
                  max_throughput_for_completion_latency_under_1ms,
@@ -18,10 +18,10 @@ Manual: http://sysbench.sourceforge.net/docs/#database_mode
 """
 
 import logging
-import re
 
 from perfkitbenchmarker import configs
 from perfkitbenchmarker import sample
+from perfkitbenchmarker.linux_packages import sysbench
 
 BENCHMARK_NAME = 'sysbench_oltp'
 BENCHMARK_CONFIG = """
@@ -89,9 +89,15 @@ def Run(benchmark_spec):
   logging.info('Sysbench OLTP Results:')
   sysbench_cmd = SYSBENCH_CMD + '--num-threads=%s ' % vm.num_cpus
   stdout, _ = vm.RemoteCommand(sysbench_cmd + 'run', should_log=True)
-  match = re.search('\\s+transactions:.+\\(([0-9]+\\.[0-9]+)', stdout)
-  value = float(match.group(1))
-  return [sample.Sample('OLTP Transaction Rate', value, 'Transactions/sec')]
+  parsed = sysbench.ParseSysbenchOutput(stdout)
+  results = [sample.Sample('OLTP Transaction Rate', parsed.tps,
+                           'Transactions/sec')]
+  metadata = {'latency_percentile': parsed.latency_percentile}
+  for token, value in sorted(parsed.latency.iteritems()):
+    results.append(sample.Sample('OLTP Latency %s' % token, value,
+                                 'milliseconds', metadata))
+  results.extend(sysbench.GetSamples(parsed, {}, 'OLTP'))
+  return results
 
 
 def Cleanup(benchmark_spec):
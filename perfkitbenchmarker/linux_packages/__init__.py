@@ -44,8 +44,10 @@ INSTALL_DIR = '/opt/pkb'
 
 
 def _LoadPackages():
-  packages = dict([(module.__name__.split('.')[-1], module) for module in
-                   import_util.LoadModulesForPath(__path__, __name__)])
+  """Returns a dict of package names to package modules, imported on use."""
+  packages = import_util.LazyModuleDict(
+      {name.split('.')[-1]: name for name in
+       import_util.ListModuleNames(__path__, __name__)})
   packages.update(packages['docker'].CreateImagePackages())
   return packages
 
@@ -13,13 +13,20 @@
 # limitations under the License.
 
 """Module containing fio installation, cleanup, parsing functions."""
+import collections
 import csv
 import ConfigParser
 import io
+import itertools
 import json
+import logging
+import pipes
+import posixpath
 import time
 
 from collections import Counter
+from perfkitbenchmarker import artifact_collection
+from perfkitbenchmarker import errors
 from perfkitbenchmarker import flags
 from perfkitbenchmarker import regex_util
 from perfkitbenchmarker import sample
@@ -49,6 +56,37 @@ FIO_HIST_LOG_PARSER_PATCH = 'fiologparser_hist.patch'
 FIO_HIST_LOG_PARSER_PATH = '%s/tools/hist' % FIO_DIR
 FIO_HIST_LOG_PARSER = 'fiologparser_hist.py'
 
+# Modes for --fio_prewarm
+PREWARM_NONE = 'none'
+PREWARM_READ = 'read'
+PREWARM_WRITE = 'write'
+PREWARM_LOG_FILE_BASE = 'pkb_fio_prewarm'
+PREWARM_BLOCKSIZE = 1024 * 1024
+# Lists the devices of the VM that were already pre-warmed, one per line.
+PREWARM_STATE_FILE = posixpath.join(INSTALL_DIR, 'fio_prewarmed_devices')
+
+flags.DEFINE_enum('fio_prewarm', PREWARM_NONE,
+                  [PREWARM_NONE, PREWARM_READ, PREWARM_WRITE],
+                  'Whether fio benchmarks first touch every block of the '
+                  'scratch disk, so that their results do not include the '
+                  'first-touch penalties of new or restored cloud volumes. '
+                  '"read" reads the whole device and keeps its contents. '
+                  '"write" overwrites it, and is only allowed for disks '
+                  'that are not mounted. Devices that were already '
+                  'pre-warmed on the VM are skipped.')
+flags.DEFINE_integer('fio_prewarm_jobs_per_device', 4,
+                     'The number of fio jobs that pre-warm each device '
+                     'concurrently, each covering an equal share of it.',
+                     lower_bound=1)
+flags.DEFINE_integer('fio_prewarm_iodepth', 32,
+                     'The IO queue depth of each pre-warm fio job.',
+                     lower_bound=1)
+flags.DEFINE_integer('fio_prewarm_log_msec', 1000,
+                     'The interval in milliseconds of the pre-warm '
+                     'throughput samples.', lower_bound=1)
+
+FLAGS = flags.FLAGS
+
 
 def _Install(vm):
   """Installs the fio package on the VM."""
@@ -58,7 +96,7 @@ def _Install(vm):
   vm.RemoteCommand('git clone {0} {1}'.format(GIT_REPO, FIO_DIR))
   vm.RemoteCommand('cd {0} && git checkout {1}'.format(FIO_DIR, GIT_TAG))
   vm.RemoteCommand('cd {0} && ./configure && make'.format(FIO_DIR))
-  if flags.FLAGS.fio_hist_log:
+  if FLAGS.fio_hist_log:
     vm.PushDataFile(FIO_HIST_LOG_PARSER_PATCH)
     vm.RemoteCommand(
         ('cp {log_parser_path}/{log_parser} ./; '
@@ -306,3 +344,166 @@ def _ParseHistogram(hist, mean_bin_vals, metric_prefix='',
             ':'.join([metric_prefix, str(bs), rw, 'histogram']),
             0, 'us', metadata))
   return samples
+
+
+def GetPrewarmCommand(devices, mode, jobs_per_device, iodepth, log_file_base,
+                      log_msec):
+  """Returns a fio command that reads or writes every block of some devices.
+
+  Each device is split into equal, contiguous shares, each of which is
+  accessed sequentially by its own job, and all jobs run concurrently.
+
+  Args:
+    devices: list of (device path, size in bytes) tuples.
+    mode: string. PREWARM_READ or PREWARM_WRITE.
+    jobs_per_device: int. The number of jobs per device.
+    iodepth: int. The IO queue depth of each job.
+    log_file_base: string. Base name of the per-job bandwidth logs.
+    log_msec: int. The interval of the bandwidth log entries.
+
+  Returns:
+    The command as a string.
+  """
+  command = [
+      'sudo', FIO_PATH, '--output-format=json', '--ioengine=libaio',
+      '--direct=1', '--invalidate=1', '--blocksize=%d' % PREWARM_BLOCKSIZE,
+      '--iodepth=%d' % iodepth, '--rw=%s' % mode,
+      '--write_bw_log=%s' % log_file_base, '--log_avg_msec=%d' % log_msec]
+  for device_index, (device_path, size) in enumerate(devices):
+    # Shares are rounded up to whole blocks, so the last one may be smaller.
+    num_blocks = -(-size // PREWARM_BLOCKSIZE)
+    share = -(-num_blocks // jobs_per_device) * PREWARM_BLOCKSIZE
+    offset = 0
+    job_index = 0
+    while offset < size:
+      command.extend([
+          '--name=prewarm-%d-%d' % (device_index, job_index),
+          '--filename=%s' % device_path, '--offset=%d' % offset,
+          '--size=%d' % min(share, size - offset)])
+      offset += share
+      job_index += 1
+  return ' '.join(command)
+
+
+def ParsePrewarmBandwidthLogs(logs, log_msec):
+  """Sums the bandwidth logs of all pre-warm jobs into throughput over time.
+
+  Args:
+    logs: iterable of strings. The lines of the fio bandwidth logs of the
+        jobs, 'msec, KB/s, data direction, block size'.
+    log_msec: int. The interval of the log entries.
+
+  Returns:
+    A list of (seconds since the start, KB/s) tuples, sorted by time.
+  """
+  totals = collections.defaultdict(float)
+  for line in logs:
+    fields = line.split(',')
+    if len(fields) < 2:
+      continue
+    totals[int(round(float(fields[0]) / log_msec))] += float(fields[1])
+  return [(index * log_msec / 1000.0, kb_per_sec)
+          for index, kb_per_sec in sorted(totals.iteritems())]
+
+
+def _DescribeDevice(vm, device_path):
+  """Returns the size of a device in bytes, and a string identifying it.
+
+  The device's serial number identifies it across reattachments, if the
+  device reports one. Otherwise its path does.
+  """
+  stdout, _ = vm.RemoteCommand(
+      'sudo blockdev --getsize64 {0} && '
+      '(lsblk --nodeps --noheadings --output SERIAL {0} || true)'.format(
+          device_path))
+  lines = stdout.split()
+  size = int(lines[0])
+  serial = lines[1] if len(lines) > 1 else device_path
+  return size, '%s:%d' % (serial, size)
+
+
+def PrewarmScratchDisk(vm, disk, mode):
+  """Reads or writes every block of a scratch disk before benchmarking it.
+
+  Reads are spread over the members of a striped disk directly. Writes go
+  to the striped device so that the RAID metadata on its members survives.
+  Devices that were already pre-warmed on the VM are skipped.
+
+  Args:
+    vm: a linux_virtual_machine.BaseLinuxMixin object.
+    disk: a disk.BaseDisk attached to the given vm.
+    mode: string. One of the --fio_prewarm modes.
+
+  Returns:
+    A list of sample.Sample objects: 'Prewarm Throughput' samples with the
+    throughput of each --fio_prewarm_log_msec interval, and the 'Prewarm
+    Time' and 'Prewarm Bandwidth' of the whole pre-warm. Empty if there was
+    nothing to pre-warm.
+
+  Raises:
+    errors.Benchmarks.PrepareException: if asked to overwrite a mounted disk.
+  """
+  if mode == PREWARM_NONE:
+    return []
+  if mode == PREWARM_WRITE and disk.mount_point:
+    raise errors.Benchmarks.PrepareException(
+        'Cannot pre-warm %s by writing to it because it is mounted at %s. '
+        'Use --fio_prewarm=%s instead.' % (disk.GetDevicePath(),
+                                           disk.mount_point, PREWARM_READ))
+  if mode == PREWARM_READ and disk.is_striped:
+    device_paths = [d.GetDevicePath() for d in disk.disks]
+    jobs_per_device = FLAGS.fio_prewarm_jobs_per_device
+  else:
+    device_paths = [disk.GetDevicePath()]
+    jobs_per_device = (FLAGS.fio_prewarm_jobs_per_device *
+                       (len(disk.disks) if disk.is_striped else 1))
+
+  stdout, _ = vm.RemoteCommand('cat %s' % PREWARM_STATE_FILE,
+                               ignore_failure=True, suppress_warning=True)
+  prewarmed = set(stdout.split())
+  devices, device_ids = [], []
+  for device_path in device_paths:
+    size, device_id = _DescribeDevice(vm, device_path)
+    if device_id in prewarmed:
+      logging.info('Not pre-warming %s on %s: it is already initialized.',
+                   device_path, vm)
+      continue
+    devices.append((device_path, size))
+    device_ids.append(device_id)
+  if not devices:
+    return []
+
+  log_file_base = '%s_%s' % (PREWARM_LOG_FILE_BASE, int(time.time()))
+  log_msec = FLAGS.fio_prewarm_log_msec
+  logging.info('Pre-warming %s on %s (%s).',
+               ', '.join(path for path, _ in devices), vm, mode)
+  start_time = time.time()
+  vm.RobustRemoteCommand(GetPrewarmCommand(
+      devices, mode, jobs_per_device, FLAGS.fio_prewarm_iodepth,
+      log_file_base, log_msec))
+  elapsed = time.time() - start_time
+  logs = artifact_collection.StreamArtifacts(
+      vm, '~', ['%s_bw.*.log' % log_file_base])
+  intervals = ParsePrewarmBandwidthLogs(
+      itertools.chain.from_iterable(log for _, log in logs), log_msec)
+  vm.RemoteCommand('sudo rm -f %s_bw.*.log' % log_file_base)
+  vm.RemoteCommand('printf "%%s\\n" %s >> %s' % (
+      ' '.join(pipes.quote(device_id) for device_id in device_ids),
+      PREWARM_STATE_FILE))
+
+  metadata = {'prewarm_mode': mode,
+              'prewarm_devices': ','.join(path for path, _ in devices),
+              'prewarm_jobs_per_device': jobs_per_device,
+              'prewarm_iodepth': FLAGS.fio_prewarm_iodepth}
+  samples = []
+  for seconds, kb_per_sec in intervals:
+    interval_metadata = metadata.copy()
+    interval_metadata['prewarm_elapsed_sec'] = seconds
+    samples.append(sample.Sample('Prewarm Throughput', kb_per_sec, 'KB/s',
+                                 interval_metadata))
+  total_bytes = sum(size for _, size in devices)
+  samples.append(sample.Sample('Prewarm Time', elapsed, 'seconds', metadata))
+  samples.append(sample.Sample('Prewarm Bandwidth',
+                               total_bytes / 1024.0 / elapsed, 'KB/s',
+                               metadata))
+  return samples
@@ -15,10 +15,15 @@
 
 """Module containing memtier installation and cleanup functions."""
 
+import re
+
 from perfkitbenchmarker.linux_packages import INSTALL_DIR
 
 GIT_REPO = 'https://github.com/RedisLabs/memtier_benchmark'
-GIT_TAG = '1.2.0'
+# 2.0.0 adds a per-second time series to the --json-out-file output.
+GIT_TAG = '2.0.0'
+# memtier writes the latency histogram of the whole run to this file, in ms.
+HDR_FULL_RUN_SUFFIX = '_FULL_RUN_1.hgrm'
 LIBEVENT_TAR = 'libevent-2.0.21-stable.tar.gz'
 LIBEVENT_URL = 'https://github.com/downloads/libevent/libevent/' + LIBEVENT_TAR
 LIBEVENT_DIR = '%s/libevent-2.0.21-stable' % INSTALL_DIR
@@ -41,8 +46,9 @@ def YumInstall(vm):
   vm.RemoteCommand('git clone {0} {1}'.format(GIT_REPO, MEMTIER_DIR))
   vm.RemoteCommand('cd {0} && git checkout {1}'.format(MEMTIER_DIR, GIT_TAG))
   pkg_config = 'PKG_CONFIG_PATH=/usr/local/lib/pkgconfig:${PKG_CONFIG_PATH}'
-  vm.RemoteCommand('cd {0} && autoreconf -ivf && {1} ./configure && '
-                   'sudo make install'.format(MEMTIER_DIR, pkg_config))
+  vm.RemoteCommand('cd {0} && autoreconf -ivf && {1} ./configure '
+                   '--disable-tls && sudo make install'.format(MEMTIER_DIR,
+                                                               pkg_config))
 
 
 def AptInstall(vm):
@@ -51,8 +57,86 @@ def AptInstall(vm):
   vm.InstallPackages(APT_PACKAGES)
   vm.RemoteCommand('git clone {0} {1}'.format(GIT_REPO, MEMTIER_DIR))
   vm.RemoteCommand('cd {0} && git checkout {1}'.format(MEMTIER_DIR, GIT_TAG))
-  vm.RemoteCommand('cd {0} && autoreconf -ivf && ./configure && '
-                   'sudo make install'.format(MEMTIER_DIR))
+  vm.RemoteCommand('cd {0} && autoreconf -ivf && ./configure --disable-tls '
+                   '&& sudo make install'.format(MEMTIER_DIR))
+
+
+def ParseHdrHistogram(hgrm):
+  """Parses an HdrHistogram percentile distribution written by memtier.
+
+  Args:
+    hgrm: string. The contents of a .hgrm file, with lines of "Value
+        Percentile TotalCount 1/(1-Percentile)" lines.
+
+  Returns:
+    A dict mapping each latency value in ms to the number of requests with
+    that latency. Requests are attributed to the value of the line on which
+    they are first counted, so histograms of several clients can be added.
+  """
+  histogram = {}
+  previous_count = 0
+  for line in hgrm.splitlines():
+    fields = line.split()
+    # The 100th percentile line has no 1/(1-Percentile) column.
+    if len(fields) not in (3, 4) or not re.match(r'\d', fields[0]):
+      continue
+    value, total_count = float(fields[0]), int(fields[2])
+    if total_count > previous_count:
+      histogram[value] = (histogram.get(value, 0) +
+                          total_count - previous_count)
+      previous_count = total_count
+  return histogram
+
+
+def _GetTotalLatency(second):
+  """Returns the summed latency in ms of a second of a memtier time series."""
+  if 'Accumulated Latency' in second:
+    # Accumulated in microseconds.
+    return second['Accumulated Latency'] / 1000.0
+  return second['Count'] * second['Average Latency']
+
+
+def ParseJsonResults(results, warmup_seconds=0, cooldown_seconds=0):
+  """Parses the --json-out-file output of memtier_benchmark.
+
+  The seconds of the run's time series before warmup_seconds and in the last
+  cooldown_seconds are left out, so that clients started at slightly
+  different times only count the time they were all running. Without a time
+  series, the whole run is used.
+
+  Args:
+    results: dict. The parsed JSON output.
+    warmup_seconds: int. The number of seconds to leave out at the start.
+    cooldown_seconds: int. The number of seconds to leave out at the end.
+
+  Returns:
+    A dict mapping each command ('Sets', 'Gets' and 'Totals') to a tuple of
+    (operations per second, average latency in ms).
+  """
+  stats = results['ALL STATS']
+  parsed = {}
+  for command in ('Sets', 'Gets', 'Totals'):
+    if command not in stats:
+      continue
+    command_stats = stats[command]
+    series = command_stats.get('Time-Serie')
+    if series:
+      seconds = sorted(int(second) for second in series)
+      window = [series[str(second)] for second in seconds
+                if warmup_seconds <= second < len(seconds) - cooldown_seconds]
+    else:
+      window = None
+    if window:
+      count = sum(second['Count'] for second in window)
+      latency = 0.0
+      if count:
+        latency = sum(_GetTotalLatency(second) for second in window) / count
+      parsed[command] = (float(count) / len(window), latency)
+    else:
+      parsed[command] = (command_stats['Ops/sec'],
+                         command_stats.get('Average Latency',
+                                           command_stats.get('Latency')))
+  return parsed
 
 
 def _Uninstall(vm):
@@ -0,0 +1,30 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module containing rsync installation and cleanup functions."""
+
+
+def _Install(vm):
+  """Installs the rsync package on the VM."""
+  vm.InstallPackages('rsync')
+
+
+def YumInstall(vm):
+  """Installs the rsync package on the VM."""
+  _Install(vm)
+
+
+def AptInstall(vm):
+  """Installs the rsync package on the VM."""
+  _Install(vm)
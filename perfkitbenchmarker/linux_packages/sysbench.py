@@ -13,7 +13,259 @@
 # limitations under the License.
 
 
-"""Module containing sysbench installation and cleanup functions."""
+"""Module containing sysbench installation and cleanup functions.
+
+Also contains the sysbench output parser shared by the sysbench based
+benchmarks. It reads sysbench 0.4, 0.5 and 1.0 output in a single pass over
+its lines.
+"""
+
+import collections
+import json
+import logging
+import re
+
+from perfkitbenchmarker import flags
+from perfkitbenchmarker import sample
+
+flags.DEFINE_float('sysbench_steady_state_tolerance', 0.1,
+                   'Intervals count as steady once their tps is within this '
+                   'fraction of the tps of the second half of the run. The '
+                   'intervals before the first steady window are reported '
+                   'as warm-up.', lower_bound=0)
+flags.DEFINE_integer('sysbench_steady_state_window', 3,
+                     'The number of consecutive steady intervals that end '
+                     'the warm-up.', lower_bound=1)
+
+FLAGS = flags.FLAGS
+
+HISTOGRAM_PERCENTILES = [50, 90, 99, 99.9]
+
+# One reporting interval of a run with --report-interval.
+SysbenchInterval = collections.namedtuple(
+    'SysbenchInterval', ['time', 'threads', 'tps', 'qps', 'latency',
+                         'errors', 'reconnects'])
+
+
+class SysbenchResults(object):
+  """The parsed output of a sysbench run.
+
+  Attributes:
+    intervals: list of SysbenchIntervals, with latency in ms at
+        latency_percentile.
+    tps: float. The transactions per second of the whole run, or None.
+    qps: float. The queries per second of the whole run, or None.
+    latency: dict mapping 'min', 'avg', 'max' and 'percentile' to the
+        latencies of the whole run in ms.
+    latency_percentile: float. The percentile of latency['percentile'] and of
+        the interval latencies.
+    histogram: dict mapping latencies in ms to event counts, from sysbench
+        1.0's --histogram. Empty without it.
+  """
+
+  def __init__(self):
+    self.intervals = []
+    self.tps = None
+    self.qps = None
+    self.latency = {}
+    self.latency_percentile = None
+    self.histogram = {}
+
+
+# [   2s] threads: 16, tps: 526.38, reads: 7446.79, writes: 2105.52, response
+# time: 210.67ms (99%), errors: 0.00, reconnects:  0.00
+_INTERVAL_05_RE = re.compile(
+    r'\[\s*(\d+)s\] threads: (\d+), tps: ([\d.]+), reads(?:/s)?: ([\d.]+), '
+    r'writes(?:/s)?: ([\d.]+), response time: ([\d.]+)ms \(([\d.]+)%\), '
+    r'errors(?:/s)?: ([\d.]+), reconnects(?:/s)?:\s*([\d.]+)')
+# [ 2s ] thds: 16 tps: 526.38 qps: 10553.27 (r/w/o: 7446.79/2105.52/1000.96)
+# lat (ms,99%): 210.67 err/s: 0.00 reconn/s: 0.00
+_INTERVAL_10_RE = re.compile(
+    r'\[\s*(\d+)s \] thds: (\d+) tps: ([\d.]+) qps: ([\d.]+) .*'
+    r'lat \(ms,([\d.]+)%\): ([\d.]+) err/s:? ([\d.]+) reconn/s: ([\d.]+)')
+# transactions:                        10000  (586.29 per sec.)
+_RATE_RE = re.compile(r'(transactions|queries|read/write requests):'
+                      r'\s+\d+\s+\(([\d.]+) per sec\.\)')
+# Headers of the latency summary in 0.5, 0.4 and 1.0.
+_LATENCY_HEADERS = ('response time:', 'per-request statistics:',
+                    'Latency (ms):')
+# approx.  99 percentile:              57.15ms, or 95th percentile: 57.15
+_LATENCY_RE = re.compile(r'(min|avg|max|approx\.\s+([\d.]+) percentile|'
+                         r'([\d.]+)th percentile):\s+([\d.]+)(ms)?$')
+#       18.608 |**                                       3
+_HISTOGRAM_RE = re.compile(r'([\d.]+)\s+\|\**\s+(\d+)$')
+
+
+def ParseSysbenchOutput(lines):
+  """Parses the output of a sysbench run.
+
+  Args:
+    lines: The output, as a string or an iterable of lines such as a file.
+
+  Returns:
+    A SysbenchResults.
+  """
+  if isinstance(lines, basestring):
+    lines = lines.splitlines()
+  results = SysbenchResults()
+  section = None
+  for line in lines:
+    line = line.strip()
+    match = _INTERVAL_05_RE.match(line)
+    if match:
+      (time, threads, tps, reads, writes, latency, percentile, errors,
+       reconnects) = match.groups()
+      results.intervals.append(SysbenchInterval(
+          int(time), int(threads), float(tps), float(reads) + float(writes),
+          float(latency), float(errors), float(reconnects)))
+      results.latency_percentile = float(percentile)
+      continue
+    match = _INTERVAL_10_RE.match(line)
+    if match:
+      (time, threads, tps, qps, percentile, latency, errors,
+       reconnects) = match.groups()
+      results.intervals.append(SysbenchInterval(
+          int(time), int(threads), float(tps), float(qps), float(latency),
+          float(errors), float(reconnects)))
+      results.latency_percentile = float(percentile)
+      continue
+    match = _RATE_RE.match(line)
+    if match:
+      if match.group(1) == 'transactions':
+        results.tps = float(match.group(2))
+      else:
+        results.qps = float(match.group(2))
+      continue
+    if line in _LATENCY_HEADERS:
+      section = 'latency'
+      continue
+    if line.startswith('Latency histogram'):
+      section = 'histogram'
+      continue
+    if section == 'latency':
+      match = _LATENCY_RE.match(line)
+      if match:
+        if match.group(1) in ('min', 'avg', 'max'):
+          results.latency[match.group(1)] = float(match.group(4))
+        else:
+          results.latency['percentile'] = float(match.group(4))
+          results.latency_percentile = float(match.group(2) or
+                                             match.group(3))
+        continue
+      if not line.startswith('sum:'):
+        section = None
+    elif section == 'histogram':
+      match = _HISTOGRAM_RE.match(line)
+      if match:
+        results.histogram[float(match.group(1))] = int(match.group(2))
+      elif not line.startswith('value'):
+        section = None
+  return results
+
+
+def _Median(values):
+  values = sorted(values)
+  middle = len(values) // 2
+  if len(values) % 2:
+    return values[middle]
+  return (values[middle - 1] + values[middle]) / 2.0
+
+
+def FindSteadyState(values, tolerance, window):
+  """Returns the index of the first value of the steady state of a run.
+
+  The reference is the median of the second half of the values. The steady
+  state starts with the first 'window' consecutive values that are all
+  within 'tolerance' of the reference.
+
+  Args:
+    values: list of floats, e.g. the tps of each interval.
+    tolerance: float. The allowed deviation, as a fraction of the reference.
+    window: int. The number of consecutive values that must be steady.
+
+  Returns:
+    The index, or None if the run never became steady. Runs with fewer than
+    'window' values are taken as steady from the start.
+  """
+  if len(values) < window:
+    return 0
+  reference = _Median(values[len(values) // 2:])
+  for start in xrange(len(values) - window + 1):
+    if all(abs(value - reference) <= tolerance * reference
+           for value in values[start:start + window]):
+      return start
+  return None
+
+
+def GetSamples(results, metadata, metric_prefix='sysbench'):
+  """Creates the interval, steady state and histogram samples of a run.
+
+  Args:
+    results: SysbenchResults.
+    metadata: dict. Metadata to add to every sample.
+    metric_prefix: string. Prefix of the metric names.
+
+  Returns:
+    A list of sample.Sample objects:
+      '<prefix> interval tps' per interval, with the interval's qps, latency,
+          errors and reconnects as metadata.
+      '<prefix> steady state tps' and '<prefix> steady state qps', the
+          averages of the intervals after the warm-up.
+      '<prefix> latency p<N>' from the --histogram distribution, and a
+          '<prefix> latency histogram' sample holding it.
+  """
+  samples = []
+  intervals = results.intervals
+  steady_start = FindSteadyState([interval.tps for interval in intervals],
+                                 FLAGS.sysbench_steady_state_tolerance,
+                                 FLAGS.sysbench_steady_state_window)
+  if steady_start is None:
+    logging.warning('sysbench never reached a steady state. Reporting all '
+                    'intervals as steady.')
+  for i, interval in enumerate(intervals):
+    interval_metadata = {
+        'time': interval.time, 'threads': interval.threads,
+        'qps': interval.qps, 'latency_ms': interval.latency,
+        'latency_percentile': results.latency_percentile,
+        'errors_per_sec': interval.errors,
+        'reconnects_per_sec': interval.reconnects,
+        'steady_state': i >= (steady_start or 0)}
+    interval_metadata.update(metadata)
+    samples.append(sample.Sample('%s interval tps' % metric_prefix,
+                                 interval.tps, 'transactions/sec',
+                                 interval_metadata))
+  steady = intervals[steady_start or 0:]
+  if steady:
+    warmup_seconds = intervals[steady_start - 1].time if steady_start else 0
+    latency_ms = sum(interval.latency for interval in steady) / len(steady)
+    steady_metadata = {
+        'steady_state_found': steady_start is not None,
+        'warmup_seconds': warmup_seconds,
+        'steady_state_intervals': len(steady),
+        'latency_ms': latency_ms,
+        'latency_percentile': results.latency_percentile}
+    steady_metadata.update(metadata)
+    samples.append(sample.Sample(
+        '%s steady state tps' % metric_prefix,
+        sum(interval.tps for interval in steady) / len(steady),
+        'transactions/sec', steady_metadata))
+    samples.append(sample.Sample(
+        '%s steady state qps' % metric_prefix,
+        sum(interval.qps for interval in steady) / len(steady),
+        'queries/sec', steady_metadata))
+  if results.histogram:
+    percentiles = sorted(sample.HistogramPercentiles(
+        results.histogram, HISTOGRAM_PERCENTILES).iteritems())
+    for percentile, value in percentiles:
+      samples.append(sample.Sample('%s latency p%s' % (metric_prefix,
+                                                       percentile),
+                                   value, 'milliseconds', metadata))
+    histogram_metadata = {'histogram': json.dumps(
+        sorted(results.histogram.iteritems()))}
+    histogram_metadata.update(metadata)
+    samples.append(sample.Sample('%s latency histogram' % metric_prefix, 0,
+                                 'milliseconds', histogram_metadata))
+  return samples
 
 
 def _Install(vm):
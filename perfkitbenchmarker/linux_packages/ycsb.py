@@ -20,8 +20,10 @@ https://github.com/brianfrankcooper/YCSB
 
 For PerfKitBenchmarker, we wrap YCSB to:
 
-  * Pre-load a database with a fixed number of records.
-  * Execute a collection of workloads under a staircase load.
+  * Pre-load a database with a fixed number of records, optionally in
+    resumable chunks.
+  * Execute a collection of workloads under a staircase load, or search for
+    the highest throughput that meets a latency SLO.
   * Parse the results into PerfKitBenchmarker samples.
 
 The 'YCSBExecutor' class handles executing YCSB on a collection of client VMs.
@@ -36,6 +38,7 @@ per client VM, with an initial database size of 1GB (1k records).
 Each workload runs for at most 30 minutes.
 """
 import bisect
+import calendar
 import collections
 import copy
 import csv
@@ -47,12 +50,17 @@ import logging
 import operator
 import os
 import posixpath
+import Queue
+import threading
 import time
 
+from perfkitbenchmarker import context
 from perfkitbenchmarker import data
 from perfkitbenchmarker import events
+from perfkitbenchmarker import file_distribution
 from perfkitbenchmarker import flags
 from perfkitbenchmarker import sample
+from perfkitbenchmarker import spec_journal
 from perfkitbenchmarker import vm_util
 from perfkitbenchmarker.linux_packages import INSTALL_DIR
 
@@ -122,10 +130,74 @@ flags.DEFINE_integer('ycsb_operation_count', 1000000, 'Number of operations '
 flags.DEFINE_integer('ycsb_timelimit', 1800, 'Maximum amount of time to run '
                      'each workload / client count combination. Set to 0 for '
                      'unlimited time.')
+flags.DEFINE_integer('ycsb_status_interval', 0,
+                     'If set, the run stage reports its status every this '
+                     'many seconds (YCSB\'s -s option). The status of all '
+                     'client VMs is merged into throughput and latency time '
+                     'series, and intervals of low throughput are reported '
+                     'as stalls. See --ycsb_stall_threshold.', lower_bound=0)
+flags.DEFINE_float('ycsb_stall_threshold', 0.5,
+                   'An interval of the status time series is a stall if its '
+                   'throughput is below this fraction of the median '
+                   'throughput. Only used with --ycsb_status_interval.')
+flags.DEFINE_integer('ycsb_load_chunk_records', 0,
+                     'If set, the load stage splits the records into chunks '
+                     'of this many records, which the loaders take from a '
+                     'shared queue. Completed chunks are recorded in the '
+                     'benchmark spec, so a failed load resumes with the '
+                     'remaining chunks when it is run again. By default, each '
+                     'client VM loads one contiguous range of records.',
+                     lower_bound=0)
+flags.DEFINE_integer('ycsb_load_workers_per_client', 1,
+                     'Number of YCSB load processes that each client VM runs '
+                     'at once. Only used with --ycsb_load_chunk_records.',
+                     lower_bound=1)
+flags.DEFINE_boolean('ycsb_target_search', False,
+                     'Instead of running each workload with each thread count '
+                     'of --ycsb_threads_per_client, search for the highest '
+                     'total -target throughput that meets the latency SLO set '
+                     'by --ycsb_slo_latency_ms and --ycsb_slo_percentile. '
+                     'Each step of the search is a short run, and the '
+                     'throughput and latency of each step are reported.')
+flags.DEFINE_float('ycsb_slo_latency_ms', 10.0,
+                   'The latency, in milliseconds, that the '
+                   '--ycsb_slo_percentile latency of every operation must '
+                   'not exceed. Only used with --ycsb_target_search.')
+flags.DEFINE_float('ycsb_slo_percentile', 99.0,
+                   'The latency percentile of the SLO. Only used with '
+                   '--ycsb_target_search.')
+flags.DEFINE_integer('ycsb_target_search_steps', 8,
+                     'The maximum number of throttled runs of the target '
+                     'search, after the unthrottled run that finds the '
+                     'saturation throughput.', lower_bound=1)
+flags.DEFINE_integer('ycsb_target_search_step_seconds', 120,
+                     'Maximum amount of time to run each step of the target '
+                     'search.', lower_bound=1)
 
 # Default loading thread count for non-batching backends.
 DEFAULT_PRELOAD_THREADS = 32
 
+# A step of the target search only meets the SLO if the loaders achieved at
+# least this fraction of its target.
+TARGET_ACHIEVED_FRACTION = 0.95
+# The target search stops once the bounds are within this fraction of the
+# upper bound.
+TARGET_SEARCH_RESOLUTION = 0.02
+
+
+def PlanLoadChunks(record_count, chunk_records):
+  """Splits the records to load into chunks.
+
+  Args:
+    record_count: int. The number of records to load.
+    chunk_records: int. The maximum number of records per chunk.
+
+  Returns:
+    A list of (insertstart, insertcount) tuples.
+  """
+  return [(start, min(chunk_records, record_count - start))
+          for start in xrange(0, record_count, chunk_records)]
+
 
 def _GetThreadsPerLoaderList():
   """Returns the list of client counts per VM to use in staircase load."""
@@ -279,6 +351,140 @@ def ParseResults(ycsb_result_string, data_type='histogram'):
   return result
 
 
+# A status line, e.g.
+#   2017-05-01 10:00:10:123 10 sec: 12345 operations; 1234.5 current ops/sec;
+#   est completion in 1 minute [READ AverageLatency(us)=456.78]
+_STATUS_RE = re.compile(
+    r'^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d):(\d{3}) \d+ sec: \d+ operations;'
+    r'(?: ([\d.]+) current ops/sec;)?(.*)$')
+# The latency of an operation in a status line: '[READ AverageLatency(us)=X]'
+# for histogram measurements, or '[READ: Count=N, ..., Avg=X, ...]' for
+# hdrhistogram measurements.
+_STATUS_LATENCY_RE = re.compile(
+    r'\[([A-Z-]+)(?: AverageLatency\(us\)=|: [^\]]*\bAvg=)([\d.]+)[^\]]*\]')
+
+# A status interval of a client. Times are in seconds since the epoch and
+# latencies map lower case operation names to their average in ms.
+StatusInterval = collections.namedtuple(
+    'StatusInterval', ['start', 'end', 'throughput', 'latencies'])
+
+
+def ParseStatusLines(lines):
+  """Parses the status lines that YCSB prints with -s.
+
+  Lines are parsed one at a time, and other lines are ignored, so this can
+  consume YCSB's output as it is read. Status times are taken to be in UTC,
+  the default time zone of the VMs.
+
+  Args:
+    lines: iterable of strings. YCSB's output.
+
+  Yields:
+    A StatusInterval for each status line after the first.
+  """
+  previous_end = None
+  for line in lines:
+    match = _STATUS_RE.match(line.strip())
+    if not match:
+      continue
+    date, milliseconds, throughput, rest = match.groups()
+    end = (calendar.timegm(time.strptime(date, '%Y-%m-%d %H:%M:%S')) +
+           int(milliseconds) / 1000.0)
+    if previous_end is not None and end > previous_end:
+      latencies = {operation.lower(): float(latency) / 1000
+                   for operation, latency in _STATUS_LATENCY_RE.findall(rest)
+                   if operation != 'CLEANUP'}
+      yield StatusInterval(previous_end, end, float(throughput or 0),
+                           latencies)
+    previous_end = end
+
+
+def MergeStatusIntervals(client_intervals, width):
+  """Merges the status intervals of all clients onto a common time grid.
+
+  The grid only covers the window in which all clients reported their
+  status. See sample.GridIntervals.
+
+  Args:
+    client_intervals: list. The list of StatusIntervals of each client.
+    width: int. The width of the grid intervals in seconds.
+
+  Returns:
+    A list of StatusIntervals, with the sum of the clients' throughputs and
+    the average of their latencies weighted by throughput. Empty if the
+    clients never reported at the same time.
+  """
+  merged = []
+  for start, current in sample.GridIntervals(client_intervals, width):
+    latencies = {}
+    operations = set(itertools.chain.from_iterable(
+        interval.latencies for interval in current))
+    for operation in operations:
+      reporting = [interval for interval in current
+                   if operation in interval.latencies]
+      latencies[operation] = sample.WeightedMean(
+          [interval.latencies[operation] for interval in reporting],
+          [interval.throughput for interval in reporting])
+    merged.append(StatusInterval(
+        start, start + width,
+        sum(interval.throughput for interval in current), latencies))
+  return merged
+
+
+def _CreateStatusSamples(client_intervals, width, stall_threshold, **kwargs):
+  """Creates time-series and stall samples from the clients' status.
+
+  Args:
+    client_intervals: list. The list of StatusIntervals of each client.
+    width: int. The status interval in seconds.
+    stall_threshold: float. The fraction of the median throughput below which
+        an interval is a stall.
+    **kwargs: Base metadata for each sample.
+
+  Returns:
+    List of sample.Sample objects.
+  """
+  merged = MergeStatusIntervals(client_intervals, width)
+  if not merged:
+    logging.warning('The YCSB clients never reported their status at the same '
+                    'time.')
+    return []
+  samples = []
+  for interval in merged:
+    meta = kwargs.copy()
+    meta['interval_start'] = interval.start - merged[0].start
+    samples.append(sample.Sample('overall Interval Throughput',
+                                 interval.throughput, 'ops/sec', meta,
+                                 timestamp=interval.start))
+    for operation, latency in sorted(interval.latencies.iteritems()):
+      samples.append(sample.Sample(
+          '%s Interval AverageLatency' % operation, latency, 'ms', meta,
+          timestamp=interval.start))
+
+  throughputs = sorted(interval.throughput for interval in merged)
+  median = throughputs[len(throughputs) // 2]
+  stalls = []
+  for index, interval in enumerate(merged):
+    if interval.throughput < stall_threshold * median:
+      if stalls and stalls[-1][1] == index - 1:
+        stalls[-1][1] = index
+      else:
+        stalls.append([index, index])
+  meta = kwargs.copy()
+  meta.update(median_interval_throughput=median,
+              stall_threshold=stall_threshold,
+              stall_starts=','.join(
+                  str(merged[first].start - merged[0].start)
+                  for first, _ in stalls),
+              longest_stall=max([width * (last - first + 1)
+                                 for first, last in stalls] or [0]))
+  samples.append(sample.Sample('Stall Count', len(stalls), 'count', meta))
+  samples.append(sample.Sample(
+      'Stall Time', width * sum(last - first + 1 for first, last in stalls),
+      'seconds', meta))
+  return samples
+
+
 def _CumulativeSum(xs):
   total = 0
   for x in xs:
@@ -491,6 +697,22 @@ def _CreateSamples(ycsb_result, include_histogram=True, **kwargs):
             count, 'count', meta)
 
 
+def _GetSloLatency(ycsb_result, percentile):
+  """Returns the highest 'percentile' latency of the operations in a result.
+
+  Args:
+    ycsb_result: dict. Result of ParseResults or _CombineResults.
+    percentile: float. The latency percentile, in the interval [0, 100].
+
+  Returns:
+    The latency in ms, or None if no operation has a histogram.
+  """
+  latencies = [
+      _PercentilesFromHistogram(group['histogram'], [percentile]).values()[0]
+      for group in ycsb_result['groups'].itervalues() if group['histogram']]
+  return max(latencies) if latencies else None
+
+
 class YCSBExecutor(object):
   """Load data and run benchmarks using YCSB.
 
@@ -555,6 +777,9 @@ class YCSBExecutor(object):
       command.extend(('-p', '{0}={1}'.format(parameter, value)))
 
     command.append('-p measurementtype=histogram')
+    if command_name == 'run' and FLAGS.ycsb_status_interval:
+      command.append('-s -p status.interval={0}'.format(
+          FLAGS.ycsb_status_interval))
     return 'cd %s; %s' % (YCSB_DIR, ' '.join(command))
 
   @property
@@ -607,9 +832,7 @@ class YCSBExecutor(object):
                      (1 if i < (record_count % len(vms)) else 0)
                      for i in xrange(len(vms))]
 
-    def PushWorkload(vm):
-      vm.PushFile(workload_file, remote_path)
-    vm_util.RunThreaded(PushWorkload, vms)
+    file_distribution.DistributeFile(vms, workload_file, remote_path)
 
     kwargs['parameter_files'] = [remote_path]
 
@@ -623,17 +846,26 @@ class YCSBExecutor(object):
       results.append(self._Load(vms[loader_index], **kw))
       logging.info('VM %d (%s) finished', loader_index, vms[loader_index])
 
+    samples = []
     start = time.time()
-    vm_util.RunThreaded(_Load, range(len(vms)))
+    if FLAGS.ycsb_load_chunk_records:
+      results, chunk_samples = self._LoadChunks(
+          vms, record_count, workload_meta, kwargs)
+      samples.extend(chunk_samples)
+    else:
+      vm_util.RunThreaded(_Load, range(len(vms)))
+    end = time.time()
     events.record_event.send(
         type(self).__name__, event='load', start_timestamp=start,
-        end_timestamp=time.time(), metadata=copy.deepcopy(kwargs))
+        end_timestamp=end, metadata=copy.deepcopy(kwargs))
 
-    if len(results) != len(vms):
+    if FLAGS.ycsb_load_chunk_records:
+      if not results:
+        return samples
+    elif len(results) != len(vms):
       raise IOError('Missing results: only {0}/{1} reported\n{2}'.format(
           len(results), len(vms), results))
 
-    samples = []
     if FLAGS.ycsb_include_individual_results and len(results) > 1:
       for i, result in enumerate(results):
         samples.extend(_CreateSamples(
@@ -642,6 +874,16 @@ class YCSBExecutor(object):
             **workload_meta))
 
     combined = _CombineResults(results)
+    if FLAGS.ycsb_load_chunk_records and 'overall' in combined['groups']:
+      # Chunks run one after another on each loader, so their throughputs
+      # don't add up.
+      operations = sum(
+          group['statistics'].get('Operations', 0)
+          for name, group in combined['groups'].iteritems()
+          if name != 'overall')
+      combined['groups']['overall']['statistics'].update({
+          'RunTime(ms)': (end - start) * 1000,
+          'Throughput(ops/sec)': operations / (end - start)})
     samples.extend(_CreateSamples(
         combined, result_type='combined',
         include_histogram=FLAGS.ycsb_histogram,
@@ -649,6 +891,78 @@ class YCSBExecutor(object):
 
     return samples
 
+  def _LoadChunks(self, vms, record_count, workload_meta, kwargs):
+    """Loads the records in chunks that loader workers take from a queue.
+
+    Each client VM runs ycsb_load_workers_per_client workers, which load one
+    chunk at a time until the queue is empty. Completed chunks are recorded
+    in the benchmark spec (and its journal), so that chunks completed by an
+    earlier, failed attempt are skipped. The record is dropped once all
+    chunks are loaded, so that a later load starts over.
+
+    Args:
+      vms: List of virtual machine instances. client nodes.
+      record_count: int. The number of records to load.
+      workload_meta: dict. The metadata of the workload.
+      kwargs: dict. Additional key-value parameters to pass to YCSB.
+
+    Returns:
+      A (results, samples) tuple with a ParseResults output and a 'Load Chunk
+      Throughput' sample per chunk loaded.
+    """
+    spec = context.GetThreadBenchmarkSpec()
+    owner = self if spec is None else spec
+    checkpoints = getattr(owner, 'ycsb_load_checkpoints', None)
+    if checkpoints is None:
+      checkpoints = owner.ycsb_load_checkpoints = {}
+    plan_key = (self.database, workload_meta['workload_name'], record_count,
+                FLAGS.ycsb_load_chunk_records)
+    completed = checkpoints.setdefault(plan_key, set())
+    plan = PlanLoadChunks(record_count, FLAGS.ycsb_load_chunk_records)
+    chunks = [chunk for chunk in plan if chunk[0] not in completed]
+    if completed:
+      logging.info('Resuming load: %d chunks already loaded, %d remaining.',
+                   len(completed), len(chunks))
+    chunk_queue = Queue.Queue()
+    for chunk in chunks:
+      chunk_queue.put(chunk)
+    lock = threading.Lock()
+    results = []
+    samples = []
+
+    def _LoadWorker(loader_index, worker_index):
+      while True:
+        try:
+          insertstart, insertcount = chunk_queue.get_nowait()
+        except Queue.Empty:
+          return
+        kw = copy.deepcopy(kwargs)
+        kw.update(insertstart=insertstart, insertcount=insertcount)
+        if self.perclientparam is not None:
+          kw.update(self.perclientparam[loader_index])
+        result = self._Load(vms[loader_index], **kw)
+        metadata = workload_meta.copy()
+        metadata.update(insertstart=insertstart, insertcount=insertcount,
+                        loader_index=loader_index, worker_index=worker_index)
+        with lock:
+          results.append(result)
+          samples.append(sample.Sample(
+              'Load Chunk Throughput',
+              result['groups']['overall']['statistics'].get(
+                  'Throughput(ops/sec)', 0), 'ops/sec', metadata))
+          completed.add(insertstart)
+          if spec is not None:
+            spec_journal.RecordSpecAttributes(spec, 'ycsb_load_checkpoints')
+
+    workers = [((loader_index, worker_index), {})
+               for worker_index in xrange(FLAGS.ycsb_load_workers_per_client)
+               for loader_index in xrange(len(vms))]
+    vm_util.RunThreaded(_LoadWorker, workers)
+    del checkpoints[plan_key]
+    if spec is not None:
+      spec_journal.RecordSpecAttributes(spec, 'ycsb_load_checkpoints')
+    return results, samples
+
   def _Run(self, vm, **kwargs):
     """Run a single workload from a client vm."""
     for pv in FLAGS.ycsb_run_parameters:
@@ -659,7 +973,12 @@ class YCSBExecutor(object):
     # info we need to stderr. So we have to combine these 2
     # output to get expected results.
     stdout, stderr = vm.RobustRemoteCommand(command)
-    return ParseResults(str(stderr + stdout))
+    result = ParseResults(str(stderr + stdout))
+    if FLAGS.ycsb_status_interval:
+      # Status lines go to stderr.
+      result['status_intervals'] = list(
+          ParseStatusLines(io.BytesIO(str(stderr))))
+    return result
 
   def _RunThreaded(self, vms, **kwargs):
     """Run a single workload using `vms`."""
@@ -702,6 +1021,80 @@ class YCSBExecutor(object):
 
     return results
 
+  def _PrepareWorkload(self, vms, workload_index, workload_file, kwargs):
+    """Pushes a workload file to 'vms' and returns its run parameters.
+
+    Args:
+      vms: List of VirtualMachine objects to generate load from.
+      workload_index: int. The index of the workload file.
+      workload_file: string. The workload file.
+      kwargs: dict. Additional parameters to pass to each run.
+
+    Returns:
+      A (parameters, workload_meta) tuple with the parameters for
+      _RunThreaded and the metadata of the workload.
+    """
+    parameters = {'operationcount': FLAGS.ycsb_operation_count,
+                  'recordcount': FLAGS.ycsb_record_count}
+    if FLAGS.ycsb_timelimit:
+      parameters['maxexecutiontime'] = FLAGS.ycsb_timelimit
+    parameters.update(kwargs)
+    remote_path = posixpath.join(INSTALL_DIR,
+                                 os.path.basename(workload_file))
+
+    with open(workload_file) as fp:
+      workload_meta = _ParseWorkload(fp.read())
+      workload_meta.update(kwargs)
+      workload_meta.update(workload_name=os.path.basename(workload_file),
+                           workload_index=workload_index,
+                           stage='run')
+
+    file_distribution.DistributeFile(vms, workload_file, remote_path)
+
+    parameters['parameter_files'] = [remote_path]
+    return parameters, workload_meta
+
+  def _RunAndCreateSamples(self, vms, parameters, client_meta):
+    """Runs a workload using 'vms' and creates samples of its results.
+
+    Args:
+      vms: List of VirtualMachine objects to generate load from.
+      parameters: dict. The parameters for _RunThreaded.
+      client_meta: dict. Metadata for the samples.
+
+    Returns:
+      A (combined, samples) tuple with the combined result of all VMs and a
+      list of sample.Sample objects.
+    """
+    samples = []
+    start = time.time()
+    results = self._RunThreaded(vms, **parameters)
+    events.record_event.send(
+        type(self).__name__, event='run', start_timestamp=start,
+        end_timestamp=time.time(), metadata=copy.deepcopy(parameters))
+    client_intervals = [result.pop('status_intervals', [])
+                        for result in results]
+
+    if FLAGS.ycsb_include_individual_results and len(results) > 1:
+      for i, result in enumerate(results):
+        samples.extend(_CreateSamples(
+            result,
+            result_type='individual',
+            result_index=i,
+            include_histogram=FLAGS.ycsb_histogram,
+            **client_meta))
+
+    combined = _CombineResults(results)
+    samples.extend(_CreateSamples(
+        combined, result_type='combined',
+        include_histogram=FLAGS.ycsb_histogram,
+        **client_meta))
+    if FLAGS.ycsb_status_interval:
+      samples.extend(_CreateStatusSamples(
+          client_intervals, FLAGS.ycsb_status_interval,
+          FLAGS.ycsb_stall_threshold, **client_meta))
+    return combined, samples
+
   def RunStaircaseLoads(self, vms, workloads, **kwargs):
     """Run each workload in 'workloads' in succession.
 
@@ -718,51 +1111,100 @@ class YCSBExecutor(object):
     """
     all_results = []
     for workload_index, workload_file in enumerate(workloads):
-      parameters = {'operationcount': FLAGS.ycsb_operation_count,
-                    'recordcount': FLAGS.ycsb_record_count}
-      if FLAGS.ycsb_timelimit:
-        parameters['maxexecutiontime'] = FLAGS.ycsb_timelimit
-      parameters.update(kwargs)
-      remote_path = posixpath.join(INSTALL_DIR,
-                                   os.path.basename(workload_file))
-
-      with open(workload_file) as fp:
-        workload_meta = _ParseWorkload(fp.read())
-        workload_meta.update(kwargs)
-        workload_meta.update(workload_name=os.path.basename(workload_file),
-                             workload_index=workload_index,
-                             stage='run')
-
-      def PushWorkload(vm):
-        vm.PushFile(workload_file, remote_path)
-      vm_util.RunThreaded(PushWorkload, vms)
-
-      parameters['parameter_files'] = [remote_path]
+      parameters, workload_meta = self._PrepareWorkload(
+          vms, workload_index, workload_file, kwargs)
       for client_count in _GetThreadsPerLoaderList():
         parameters['threads'] = client_count
-        start = time.time()
-        results = self._RunThreaded(vms, **parameters)
-        events.record_event.send(
-            type(self).__name__, event='run', start_timestamp=start,
-            end_timestamp=time.time(), metadata=copy.deepcopy(parameters))
         client_meta = workload_meta.copy()
         client_meta.update(clients=len(vms) * client_count,
                            threads_per_client_vm=client_count)
+        _, samples = self._RunAndCreateSamples(vms, parameters, client_meta)
+        all_results.extend(samples)
 
-        if FLAGS.ycsb_include_individual_results and len(results) > 1:
-          for i, result in enumerate(results):
-            all_results.extend(_CreateSamples(
-                result,
-                result_type='individual',
-                result_index=i,
-                include_histogram=FLAGS.ycsb_histogram,
-                **client_meta))
-
-        combined = _CombineResults(results)
-        all_results.extend(_CreateSamples(
-            combined, result_type='combined',
-            include_histogram=FLAGS.ycsb_histogram,
-            **client_meta))
+    return all_results
+
+  def RunTargetSearch(self, vms, workloads, **kwargs):
+    """Searches the highest throughput meeting the latency SLO per workload.
+
+    Each workload first runs unthrottled, with the highest thread count of
+    ycsb_threads_per_client, to find the saturation throughput. Unless that
+    already meets the SLO, the total -target across loaders is then
+    binary-searched between 0 and the saturation throughput. A step meets the
+    SLO if the ycsb_slo_percentile latency of every operation is at most
+    ycsb_slo_latency_ms and the loaders achieved the target. Every step is a
+    short run, and its samples form the throughput-latency curve.
+
+    Args:
+      vms: List of VirtualMachine objects to generate load from.
+      **kwargs: Additional parameters to pass to each run.  See constructor for
+      options.
+
+    Returns:
+      List of sample.Sample objects.
+    """
+    all_results = []
+    client_count = max(_GetThreadsPerLoaderList())
+    slo_meta = {'slo_latency_ms': FLAGS.ycsb_slo_latency_ms,
+                'slo_percentile': FLAGS.ycsb_slo_percentile}
+    for workload_index, workload_file in enumerate(workloads):
+      parameters, workload_meta = self._PrepareWorkload(
+          vms, workload_index, workload_file, kwargs)
+      parameters.update(threads=client_count,
+                        maxexecutiontime=FLAGS.ycsb_target_search_step_seconds)
+      workload_meta.update(clients=len(vms) * client_count,
+                           threads_per_client_vm=client_count)
+
+      def RunStep(step, target):
+        """Runs a step and returns its throughput and whether it met the SLO."""
+        parameters['target'] = target
+        client_meta = workload_meta.copy()
+        client_meta.update(target=target, target_search_step=step)
+        combined, samples = self._RunAndCreateSamples(vms, parameters,
+                                                      client_meta)
+        all_results.extend(samples)
+        throughput = combined['groups']['overall']['statistics'][
+            'Throughput(ops/sec)']
+        latency = _GetSloLatency(combined, FLAGS.ycsb_slo_percentile)
+        meets_slo = (latency is not None and
+                     latency <= FLAGS.ycsb_slo_latency_ms and
+                     (target is None or
+                      throughput >= target * TARGET_ACHIEVED_FRACTION))
+        logging.info('Target search step %d: target %s, throughput %s, '
+                     'latency %s ms, meets SLO: %s.', step, target,
+                     throughput, latency, meets_slo)
+        step_meta = client_meta.copy()
+        step_meta.update(slo_meta, throughput=throughput,
+                         meets_slo=meets_slo)
+        if latency is not None:
+          all_results.append(sample.Sample('SLO Latency', latency, 'ms',
+                                           step_meta))
+        return throughput, meets_slo
+
+      max_throughput, meets_slo = RunStep(0, None)
+      steps = 1
+      if not meets_slo:
+        lower, upper = 0, int(max_throughput)
+        max_throughput = 0
+        while (steps <= FLAGS.ycsb_target_search_steps and
+               upper - lower > upper * TARGET_SEARCH_RESOLUTION):
+          target = (lower + upper) // 2
+          if target <= lower:
+            break
+          throughput, meets_slo = RunStep(steps, target)
+          steps += 1
+          if meets_slo:
+            lower = target
+            max_throughput = max(max_throughput, throughput)
+          else:
+            upper = target
+        if not max_throughput:
+          logging.warning('No step of the target search for %s met the SLO.',
+                          workload_meta['workload_name'])
+      result_meta = workload_meta.copy()
+      result_meta.update(slo_meta, target_search_runs=steps)
+      all_results.append(sample.Sample('Max Throughput Under SLO',
+                                       max_throughput, 'ops/sec',
+                                       result_meta))
 
     return all_results
 
@@ -771,7 +1213,8 @@ class YCSBExecutor(object):
 
     Loads data using the workload defined by 'workloads', then
     executes YCSB for each workload file in 'workloads', for each
-    client count defined in FLAGS.ycsb_threads_per_client.
+    client count defined in FLAGS.ycsb_threads_per_client. With
+    FLAGS.ycsb_target_search, the workloads run a target search instead.
 
     Generally database benchmarks using YCSB should only need to call this
     method.
@@ -792,8 +1235,12 @@ class YCSBExecutor(object):
         load_samples += list(self._LoadThreaded(
             vms, workloads[0], **(load_kwargs or {})))
         self.loaded = True
-    run_samples = list(self.RunStaircaseLoads(vms, workloads,
+    if FLAGS.ycsb_target_search:
+      run_samples = list(self.RunTargetSearch(vms, workloads,
                                               **(run_kwargs or {})))
+    else:
+      run_samples = list(self.RunStaircaseLoads(vms, workloads,
+                                                **(run_kwargs or {})))
     if FLAGS.ycsb_load_samples:
       return load_samples + run_samples
     else:
@@ -31,6 +31,7 @@ import os
 import pipes
 import posixpath
 import re
+import subprocess
 import threading
 import time
 import uuid
@@ -284,19 +285,35 @@ class BaseLinuxMixin(virtual_machine.BaseOsMixin):
     pass
 
   @vm_util.Retry()
-  def FormatDisk(self, device_path):
-    """Formats a disk attached to the VM."""
+  def FormatDisk(self, device_path, lazy_init=False):
+    """Formats a disk attached to the VM.
+
+    Args:
+      device_path: string. The path of the disk's device.
+      lazy_init: boolean. Whether to skip zeroing the inode tables. Only safe
+          if the device reads as zeros, e.g. a newly created cloud volume.
+    """
     # Some images may automount one local disk, but we don't
     # want to fail if this wasn't the case.
     fmt_cmd = ('[[ -d /mnt ]] && sudo umount /mnt; '
-               'sudo mke2fs -F -E lazy_itable_init=0,discard -O '
-               '^has_journal -t ext4 -b 4096 %s' % device_path)
+               'sudo mke2fs -F -E lazy_itable_init=%d,discard -O '
+               '^has_journal -t ext4 -b 4096 %s' % (lazy_init, device_path))
     self.RemoteHostCommand(fmt_cmd)
 
-  def MountDisk(self, device_path, mount_path):
-    """Mounts a formatted disk in the VM."""
-    mnt_cmd = ('sudo mkdir -p {1};sudo mount -o discard {0} {1};'
-               'sudo chown -R $USER:$USER {1};').format(device_path, mount_path)
+  def MountDisk(self, device_path, mount_path, lazy_init=False):
+    """Mounts a formatted disk in the VM.
+
+    Args:
+      device_path: string. The path of the disk's device.
+      mount_path: string. Where to mount the disk.
+      lazy_init: boolean. Whether the disk was formatted with lazy_init, in
+          which case the kernel must not zero its inode tables in the
+          background either.
+    """
+    options = 'discard,noinit_itable' if lazy_init else 'discard'
+    mnt_cmd = ('sudo mkdir -p {1};sudo mount -o {2} {0} {1};'
+               'sudo chown -R $USER:$USER {1};').format(
+                   device_path, mount_path, options)
     self.RemoteHostCommand(mnt_cmd)
 
   def RemoteCopy(self, file_path, remote_path='', copy_to=True):
@@ -338,6 +355,31 @@ class BaseLinuxMixin(virtual_machine.BaseOsMixin):
                     (retcode, full_cmd, stdout, stderr))
       raise errors.VirtualMachine.RemoteCommandError(error_text)
 
+  def _GetSshCommand(self):
+    """Returns the ssh command line, without the remote command."""
+    user_host = '%s@%s' % (self.user_name, self.ip_address)
+    ssh_cmd = ['ssh', '-A', '-p', str(self.ssh_port), user_host]
+    ssh_cmd.extend(vm_util.GetSshOptions(self.ssh_private_key))
+    return ssh_cmd
+
+  def OpenRemoteCommand(self, command):
+    """Starts a command on the host VM without waiting for it to finish.
+
+    Unlike RemoteCommand, the output is not collected, so it can be read while
+    the command runs.
+
+    Args:
+      command: A valid bash command.
+
+    Returns:
+      The subprocess.Popen of the ssh client. Its stdout and stderr are pipes
+      that the caller must read before waiting for the process.
+    """
+    ssh_cmd = self._GetSshCommand() + [command]
+    logging.debug('Streaming the output of: %s', ' '.join(ssh_cmd))
+    return subprocess.Popen(ssh_cmd, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE)
+
   def RemoteCommand(self, command,
                     should_log=False, retries=SSH_RETRIES,
                     ignore_failure=False, login_shell=False,
@@ -378,9 +420,7 @@ class BaseLinuxMixin(virtual_machine.BaseOsMixin):
       # newlines are escaped.
       command = command.replace('\n', '\\n')
 
-    user_host = '%s@%s' % (self.user_name, self.ip_address)
-    ssh_cmd = ['ssh', '-A', '-p', str(self.ssh_port), user_host]
-    ssh_cmd.extend(vm_util.GetSshOptions(self.ssh_private_key))
+    ssh_cmd = self._GetSshCommand()
     try:
       if login_shell:
         ssh_cmd.extend(['-t', '-t', 'bash -l -c "%s"' % command])
@@ -549,17 +589,31 @@ class BaseLinuxMixin(virtual_machine.BaseOsMixin):
 
     self.scratch_disks.append(data_disk)
 
+    # Disks are created and attached (concurrently if striped) while mdadm is
+    # installed.
+    setup_steps = []
     if data_disk.disk_type != disk.LOCAL:
-      data_disk.Create()
-      data_disk.Attach(self)
+      def CreateAndAttach():
+        data_disk.Create()
+        data_disk.TimedAttach(self)
+      setup_steps.append(CreateAndAttach)
+    if data_disk.is_striped:
+      setup_steps.append(lambda: self.Install('mdadm'))
+    vm_util.RunThreaded(lambda step: step(), setup_steps)
 
     if data_disk.is_striped:
       device_paths = [d.GetDevicePath() for d in data_disk.disks]
-      self.StripeDisks(device_paths, data_disk.GetDevicePath())
+      with data_disk.MeasureSetupStep('stripe'):
+        self.StripeDisks(device_paths, data_disk.GetDevicePath())
 
     if disk_spec.mount_point:
-      self.FormatDisk(data_disk.GetDevicePath())
-      self.MountDisk(data_disk.GetDevicePath(), disk_spec.mount_point)
+      lazy_init = (FLAGS.scratch_disk_lazy_init and
+                   data_disk.disk_type != disk.LOCAL)
+      with data_disk.MeasureSetupStep('format'):
+        self.FormatDisk(data_disk.GetDevicePath(), lazy_init=lazy_init)
+      with data_disk.MeasureSetupStep('mount'):
+        self.MountDisk(data_disk.GetDevicePath(), disk_spec.mount_point,
+                       lazy_init=lazy_init)
 
   def StripeDisks(self, devices, striped_device):
     """Raids disks together using mdadm.
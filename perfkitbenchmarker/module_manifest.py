@@ -0,0 +1,269 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Index of the benchmark and package modules, used to import them lazily.
+
+The linux/windows benchmark and package directories hold well over a hundred
+modules. Rather than importing all of them on every run, PKB keeps a manifest
+that records, for each benchmark, its BENCHMARK_NAME and the summary shown by
+--help, and for every flag, the module that defines it. With the manifest,
+benchmark and package modules are only imported when they are looked up (see
+import_util.LazyModuleDict), and before flags are parsed only the modules
+defining flags that appear on the command line are imported.
+
+The manifest is generated, not maintained by hand: it is written after PKB has
+imported every module the old way, and is keyed by a fingerprint of the
+modules' source code. If any module is added, removed or edited, the manifest
+no longer matches and PKB falls back to importing everything (and writes a
+new manifest for the next run).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pkgutil
+import re
+import tempfile
+import threading
+
+from perfkitbenchmarker import configs
+from perfkitbenchmarker import flags
+from perfkitbenchmarker import import_util
+from perfkitbenchmarker import sample
+
+FLAGS = flags.FLAGS
+
+BENCHMARK_PACKAGES = ('perfkitbenchmarker.linux_benchmarks',
+                      'perfkitbenchmarker.windows_benchmarks')
+PACKAGES = BENCHMARK_PACKAGES + ('perfkitbenchmarker.linux_packages',
+                                 'perfkitbenchmarker.windows_packages')
+MANIFEST_PATH = os.path.join(tempfile.gettempdir(), 'perfkitbenchmarker',
+                             'module_manifest.json')
+
+# Command-line flags that print the help of every flag while being parsed.
+_HELP_FLAGS = frozenset(['-?', '-h', '-help', '--help', '--helpfull',
+                         '--helpshort', '--helpxml'])
+_FLAG_NAME_RE = re.compile(r'^--?([A-Za-z0-9_]+)(?:=|$)')
+
+_lock = threading.RLock()
+_state = {}
+
+
+def _PackagePath(package_name):
+  """Returns the directory of one of PACKAGES without importing it."""
+  return os.path.join(os.path.dirname(__file__),
+                      package_name.rsplit('.', 1)[-1])
+
+
+def _Fingerprint():
+  """Returns a digest of the source of every module in PACKAGES.
+
+  Returns None if the source of some module cannot be read (e.g. only
+  compiled files were shipped), in which case no manifest is used.
+  """
+  md5 = hashlib.md5()
+  for package_name in PACKAGES:
+    path = _PackagePath(package_name)
+    importer = pkgutil.get_importer(path)
+    for name in import_util.ListModuleNames([path]):
+      loader = importer.find_module(name)
+      source = loader.get_source(name) if loader else None
+      if source is None:
+        return None
+      md5.update('%s.%s\0%s\0' % (package_name, name, source))
+  return md5.hexdigest()
+
+
+def GetManifest():
+  """Returns the manifest if it matches the current modules, else None."""
+  with _lock:
+    if 'manifest' not in _state:
+      _state['fingerprint'] = _Fingerprint()
+      _state['manifest'] = None
+      try:
+        with open(MANIFEST_PATH) as fp:
+          manifest = json.load(fp)
+        fingerprint = _state['fingerprint']
+        if fingerprint and manifest.get('fingerprint') == fingerprint:
+          _state['manifest'] = manifest
+        else:
+          logging.debug('Module manifest %s is stale.', MANIFEST_PATH)
+      except (IOError, ValueError) as e:
+        logging.debug('Could not read module manifest %s: %s',
+                      MANIFEST_PATH, e)
+    return _state['manifest']
+
+
+def _DescribeBenchmark(module):
+  """Returns the manifest entry for a benchmark module."""
+  benchmark_config = configs.LoadMinimalConfig(module.BENCHMARK_CONFIG,
+                                               module.BENCHMARK_NAME)
+  total_vm_count = 0
+  variable_vm_count = False
+  scratch_disk = False
+  for group in benchmark_config.get('vm_groups', {}).itervalues():
+    group_vm_count = group.get('vm_count', 1)
+    if group_vm_count is None:
+      variable_vm_count = True
+    else:
+      total_vm_count += group_vm_count
+    if group.get('disk_spec'):
+      scratch_disk = True
+  return {
+      'module': module.__name__,
+      'name': module.BENCHMARK_NAME,
+      'description': benchmark_config['description'],
+      'vm_count': 'variable' if variable_vm_count else total_vm_count,
+      'scratch_disk': scratch_disk,
+  }
+
+
+def LoadBenchmarkModules(package_name, path):
+  """Returns a LazyModuleDict mapping benchmark names to benchmark modules.
+
+  Args:
+    package_name: string. One of BENCHMARK_PACKAGES.
+    path: list of strings. The package's __path__.
+  """
+  manifest = GetManifest()
+  if manifest is not None:
+    return import_util.LazyModuleDict(
+        {info['name']: info['module']
+         for info in manifest['benchmarks'][package_name]})
+  modules = {module.BENCHMARK_NAME: module for module in
+             import_util.LoadModulesForPath(path, package_name)}
+  return import_util.LazyModuleDict(
+      {name: module.__name__ for name, module in modules.iteritems()},
+      modules)
+
+
+def GetBenchmarkInfo(package_name):
+  """Returns the --help summary of each benchmark in a benchmark package.
+
+  Args:
+    package_name: string. One of BENCHMARK_PACKAGES.
+
+  Returns:
+    list of dicts with 'name', 'description', 'vm_count' and 'scratch_disk'
+    keys, ordered by module name.
+  """
+  manifest = GetManifest()
+  if manifest is not None:
+    return manifest['benchmarks'][package_name]
+  package = import_util.ImportModule(package_name)
+  return [_DescribeBenchmark(module)
+          for module in import_util.LazyModuleList(package.VALID_BENCHMARKS)]
+
+
+def ImportAll():
+  """Imports every module in PACKAGES."""
+  for package_name in PACKAGES:
+    list(import_util.LoadModulesForPath([_PackagePath(package_name)],
+                                        package_name))
+
+
+def WriteManifest():
+  """Writes the manifest for the current modules.
+
+  Every module in PACKAGES must have been imported, e.g. with ImportAll.
+  """
+  with _lock:
+    if GetManifest() is not None or _state['fingerprint'] is None:
+      return
+    benchmarks = {package_name: GetBenchmarkInfo(package_name)
+                  for package_name in BENCHMARK_PACKAGES}
+    flags_by_module = FLAGS.FlagsByModuleDict()
+    manifest = {
+        'fingerprint': _state['fingerprint'],
+        'benchmarks': benchmarks,
+        'flags': {flag.name: module_name
+                  for module_name, module_flags in flags_by_module.iteritems()
+                  if module_name.startswith('perfkitbenchmarker.')
+                  for flag in module_flags},
+    }
+    tmp_path = '%s.%d' % (MANIFEST_PATH, os.getpid())
+    try:
+      if not os.path.isdir(os.path.dirname(MANIFEST_PATH)):
+        os.makedirs(os.path.dirname(MANIFEST_PATH))
+      with open(tmp_path, 'w') as fp:
+        json.dump(manifest, fp, indent=2, sort_keys=True)
+      os.rename(tmp_path, MANIFEST_PATH)
+    except (IOError, OSError) as e:
+      logging.debug('Could not write module manifest %s: %s',
+                    MANIFEST_PATH, e)
+
+
+def ImportModulesForFlags(flag_names):
+  """Imports the modules that define the given flags, if not yet defined."""
+  manifest = GetManifest()
+  if manifest is None:
+    return
+  for flag_name in flag_names:
+    module_name = manifest['flags'].get(flag_name)
+    if module_name and flag_name not in FLAGS:
+      import_util.ImportModule(module_name)
+
+
+def ImportModulesForArgs(argv):
+  """Imports the modules needed to parse a command line.
+
+  Without a current manifest, or if help for every flag was requested, every
+  module is imported (and a manifest is written). Otherwise only the modules
+  defining the flags in 'argv', including those in --flagfile files, are.
+
+  Args:
+    argv: list of strings. The command line, including the program name.
+  """
+  if GetManifest() is None or _HELP_FLAGS.intersection(argv):
+    ImportAll()
+    WriteManifest()
+    return
+  try:
+    argv = FLAGS.ReadFlagsFromFiles(argv)
+  except flags.FlagsError:
+    # Leave reporting an unreadable flagfile to the parse, which needs every
+    # flag defined to do so.
+    ImportAll()
+    return
+  flag_names = []
+  for arg in argv[1:]:
+    if arg == '--':
+      break
+    match = _FLAG_NAME_RE.match(arg)
+    if match:
+      flag_names.append(match.group(1))
+      # Boolean flags may be negated, as in --nofoo.
+      if match.group(1).startswith('no'):
+        flag_names.append(match.group(1)[2:])
+  ImportModulesForFlags(flag_names)
+
+
+def ImportModulesMatching(regex):
+  """Imports the flag-defining modules whose name matches 'regex'."""
+  manifest = GetManifest()
+  if manifest is None:
+    return
+  pattern = re.compile(regex)
+  for module_name in sorted(set(manifest['flags'].itervalues())):
+    if pattern.search(module_name):
+      import_util.ImportModule(module_name)
+
+
+def GetStartupSample():
+  """Returns a sample with the time spent importing modules dynamically."""
+  seconds, num_modules = import_util.GetImportSeconds()
+  return sample.Sample('Module Import Time', seconds, 'seconds', {
+      'modules_imported': num_modules,
+      'module_manifest': GetManifest() is not None})
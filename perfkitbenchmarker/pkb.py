@@ -70,7 +70,6 @@ from perfkitbenchmarker import background_tasks
 from perfkitbenchmarker import benchmark_sets
 from perfkitbenchmarker import benchmark_spec
 from perfkitbenchmarker import benchmark_status
-from perfkitbenchmarker import configs
 from perfkitbenchmarker import context
 from perfkitbenchmarker import disk
 from perfkitbenchmarker import errors
@@ -79,7 +78,9 @@ from perfkitbenchmarker import flags
 from perfkitbenchmarker import flag_util
 from perfkitbenchmarker import linux_benchmarks
 from perfkitbenchmarker import log_util
+from perfkitbenchmarker import module_manifest
 from perfkitbenchmarker import os_types
+from perfkitbenchmarker import provider_api
 from perfkitbenchmarker import requirements
 from perfkitbenchmarker import spark_service
 from perfkitbenchmarker import stages
@@ -90,6 +91,7 @@ from perfkitbenchmarker import version
 from perfkitbenchmarker import vm_util
 from perfkitbenchmarker import windows_benchmarks
 from perfkitbenchmarker.configs import benchmark_config_spec
+from perfkitbenchmarker.configs import spec_cache
 from perfkitbenchmarker.linux_benchmarks import cluster_boot_benchmark
 from perfkitbenchmarker.publisher import SampleCollector
 
@@ -326,21 +328,28 @@ def _CreateBenchmarkSpecs():
   specs = []
   benchmark_tuple_list = benchmark_sets.GetBenchmarksFromFlags()
   benchmark_counts = collections.defaultdict(itertools.count)
+  # Keys of cached configs whose prerequisites have already been checked.
+  checked_keys = set()
   for benchmark_module, user_config in benchmark_tuple_list:
-    # Construct benchmark config object.
+    # Construct benchmark config object, or reuse an identical one.
     name = benchmark_module.BENCHMARK_NAME
-    expected_os_types = (
-        os_types.WINDOWS_OS_TYPES if FLAGS.os_type in os_types.WINDOWS_OS_TYPES
-        else os_types.LINUX_OS_TYPES)
-    merged_flags = benchmark_config_spec.FlagsDecoder().Decode(
-        user_config.get('flags'), 'flags', FLAGS)
-    with flag_util.FlagDictSubstitution(FLAGS, lambda: merged_flags):
-      config_dict = benchmark_module.GetConfig(user_config)
-    config_spec_class = getattr(
-        benchmark_module, 'BENCHMARK_CONFIG_SPEC_CLASS',
-        benchmark_config_spec.BenchmarkConfigSpec)
-    config = config_spec_class(name, expected_os_types=expected_os_types,
-                               flag_values=FLAGS, **config_dict)
+    cache_key = spec_cache.GetKey(benchmark_module, user_config, FLAGS)
+    config = spec_cache.Get(cache_key)
+    if config is None:
+      expected_os_types = (
+          os_types.WINDOWS_OS_TYPES
+          if FLAGS.os_type in os_types.WINDOWS_OS_TYPES
+          else os_types.LINUX_OS_TYPES)
+      merged_flags = benchmark_config_spec.FlagsDecoder().Decode(
+          user_config.get('flags'), 'flags', FLAGS)
+      with flag_util.FlagDictSubstitution(FLAGS, lambda: merged_flags):
+        config_dict = benchmark_module.GetConfig(user_config)
+      config_spec_class = getattr(
+          benchmark_module, 'BENCHMARK_CONFIG_SPEC_CLASS',
+          benchmark_config_spec.BenchmarkConfigSpec)
+      config = config_spec_class(name, expected_os_types=expected_os_types,
+                                 flag_values=FLAGS, **config_dict)
+      spec_cache.Put(cache_key, config)
 
     # Assign a unique ID to each benchmark run. This differs even between two
     # runs of the same benchmark within a single PKB run.
@@ -348,13 +357,14 @@ def _CreateBenchmarkSpecs():
 
     # Optional step to check flag values and verify files exist.
     check_prereqs = getattr(benchmark_module, 'CheckPrerequisites', None)
-    if check_prereqs:
+    if check_prereqs and (cache_key is None or cache_key not in checked_keys):
       try:
         with config.RedirectFlags(FLAGS):
           check_prereqs(config)
       except:
         logging.exception('Prerequisite check failed for %s', name)
         raise
+      checked_keys.add(cache_key)
 
     specs.append(benchmark_spec.BenchmarkSpec.GetBenchmarkSpec(
         benchmark_module, config, uid))
@@ -379,14 +389,12 @@ def DoProvisionPhase(spec, timer):
   # everything up on a second run if something goes wrong.
   spec.Pickle()
   events.benchmark_start.send(benchmark_spec=spec)
-  try:
-    with timer.Measure('Resource Provisioning'):
-      spec.Provision()
-  finally:
-    # Also pickle the spec after the resources are created so that
-    # we have a record of things like AWS ids. Otherwise we won't
-    # be able to clean them up on a subsequent run.
-    spec.Pickle()
+  # Resources created below (and their ids, like AWS ids, which are needed
+  # to clean them up on a subsequent run) are recorded in the spec's journal
+  # as soon as their creation is requested, so the spec doesn't need to be
+  # pickled again here.
+  with timer.Measure('Resource Provisioning'):
+    spec.Provision()
 
 
 def DoPreparePhase(spec, timer):
@@ -523,6 +531,9 @@ def RunBenchmark(spec, collector):
         if timing_util.RuntimeMeasurementsEnabled():
           collector.AddSamples(
               detailed_timer.GenerateSamples(), spec.name, spec)
+          collector.AddSamples(
+              [module_manifest.GetStartupSample()], spec.name, spec)
+          collector.AddSamples(provider_api.GetSamples(), spec.name, spec)
 
       except:
         # Resource cleanup (below) can take a long time. Log the error to give
@@ -537,8 +548,10 @@ def RunBenchmark(spec, collector):
         if stages.TEARDOWN in FLAGS.run_stage:
           spec.Delete()
         events.benchmark_end.send(benchmark_spec=spec)
-        # Pickle spec to save final resource state.
-        spec.Pickle()
+        # Pickle spec to save final benchmark state (which is not journaled)
+        # unless its resources have been torn down for good.
+        if stages.TEARDOWN not in FLAGS.run_stage or not spec.deleted:
+          spec.Pickle()
   spec.status = benchmark_status.SUCCEEDED
 
 
@@ -686,39 +699,27 @@ def RunBenchmarks():
 def _GenerateBenchmarkDocumentation():
   """Generates benchmark documentation to show in --help."""
   benchmark_docs = []
-  for benchmark_module in (linux_benchmarks.BENCHMARKS +
-                           windows_benchmarks.BENCHMARKS):
-    benchmark_config = configs.LoadMinimalConfig(
-        benchmark_module.BENCHMARK_CONFIG, benchmark_module.BENCHMARK_NAME)
-    vm_groups = benchmark_config.get('vm_groups', {})
-    total_vm_count = 0
-    vm_str = ''
-    scratch_disk_str = ''
-    for group in vm_groups.itervalues():
-      group_vm_count = group.get('vm_count', 1)
-      if group_vm_count is None:
-        vm_str = 'variable'
-      else:
-        total_vm_count += group_vm_count
-      if group.get('disk_spec'):
-        scratch_disk_str = ' with scratch volume(s)'
-
-    name = benchmark_module.BENCHMARK_NAME
-    if benchmark_module in windows_benchmarks.BENCHMARKS:
-      name += ' (Windows)'
-    benchmark_docs.append('%s: %s (%s VMs%s)' %
-                          (name,
-                           benchmark_config['description'],
-                           vm_str or total_vm_count,
-                           scratch_disk_str))
+  for package in (linux_benchmarks, windows_benchmarks):
+    for info in module_manifest.GetBenchmarkInfo(package.__name__):
+      name = info['name']
+      if package is windows_benchmarks:
+        name += ' (Windows)'
+      benchmark_docs.append('%s: %s (%s VMs%s)' %
+                            (name,
+                             info['description'],
+                             info['vm_count'],
+                             ' with scratch volume(s)'
+                             if info['scratch_disk'] else ''))
   return '\n\t'.join(benchmark_docs)
 
 
 def Main():
   log_util.ConfigureBasicLogging()
   _InjectBenchmarkInfoIntoDocumentation()
+  module_manifest.ImportModulesForArgs(sys.argv)
   _ParseFlags()
   if FLAGS.helpmatch:
+    module_manifest.ImportModulesMatching(FLAGS.helpmatch)
     _PrintHelp(FLAGS.helpmatch)
     return 0
   CheckVersionFlag()
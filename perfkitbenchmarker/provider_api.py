@@ -0,0 +1,180 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Common support for calling cloud provider APIs in process.
+
+Provider utilities normally run the vendor CLI for every API call, which pays
+for interpreter startup, credential loading and a TLS handshake each time. For
+hot operations (describe, tag, attach, ...), providers can instead call their
+Python SDK with clients that are pooled per region or project and reused for
+the whole run. The CLI remains the default and the fallback when the SDK is
+not installed. See --provider_api.
+
+Every call made through a provider's API helper is recorded, whichever way it
+was made, and reported as samples by GetSamples.
+"""
+
+import collections
+import contextlib
+import logging
+import threading
+import time
+import weakref
+
+from perfkitbenchmarker import context
+from perfkitbenchmarker import flags
+from perfkitbenchmarker import sample
+
+CLI = 'cli'
+SDK = 'sdk'
+
+flags.DEFINE_enum('provider_api', CLI, [CLI, SDK],
+                  'How PKB makes hot cloud provider API calls such as '
+                  'describe, tag and attach. "cli" runs the vendor CLI for '
+                  'each call. "sdk" calls the provider\'s Python SDK with '
+                  'pooled clients, and falls back to the CLI when the SDK is '
+                  'not installed.')
+flags.DEFINE_string('provider_api_endpoint', None,
+                    'If set, SDK clients send their requests to this endpoint '
+                    'URL instead of the provider\'s, e.g. a local fake of '
+                    'the provider API for testing.')
+
+FLAGS = flags.FLAGS
+
+_clients = {}
+_clients_lock = threading.Lock()
+_thread_local = threading.local()
+_missing_sdks_logged = set()
+
+# Maps each BenchmarkSpec to a dict of its call records.
+_calls_by_spec = weakref.WeakKeyDictionary()
+# Call records made outside of any benchmark.
+_global_calls = collections.defaultdict(list)
+_calls_lock = threading.Lock()
+
+_CallRecord = collections.namedtuple('_CallRecord', ['seconds', 'succeeded'])
+
+
+def UseSdk(provider, sdk_module):
+  """Returns whether calls to 'provider' should be made with its SDK.
+
+  Args:
+    provider: string. The provider name, e.g. 'aws'.
+    sdk_module: The provider's SDK module, or None if it is not installed.
+  """
+  if FLAGS.provider_api != SDK:
+    return False
+  if sdk_module is None:
+    if provider not in _missing_sdks_logged:
+      _missing_sdks_logged.add(provider)
+      logging.warning('The %s SDK is not installed. Falling back to the CLI.',
+                      provider)
+    return False
+  return True
+
+
+def GetClient(key, factory, per_thread=False):
+  """Returns the pooled SDK client for 'key', creating it if needed.
+
+  Args:
+    key: hashable. Identifies the client, e.g. ('aws', 'ec2', region).
+    factory: function. Creates the client when there is none for 'key'.
+    per_thread: boolean. Whether each thread needs its own client, for SDKs
+        whose clients are not thread safe.
+  """
+  if per_thread:
+    clients = getattr(_thread_local, 'clients', None)
+    if clients is None:
+      clients = _thread_local.clients = {}
+    if key not in clients:
+      clients[key] = factory()
+    return clients[key]
+  with _clients_lock:
+    if key not in _clients:
+      _clients[key] = factory()
+    return _clients[key]
+
+
+def ClearClients():
+  """Drops all pooled clients."""
+  with _clients_lock:
+    _clients.clear()
+  _thread_local.clients = {}
+
+
+def _GetCalls():
+  """Returns the call records of the current benchmark. Needs _calls_lock."""
+  spec = context.GetThreadBenchmarkSpec()
+  if spec is None:
+    return _global_calls
+  if spec not in _calls_by_spec:
+    _calls_by_spec[spec] = collections.defaultdict(list)
+  return _calls_by_spec[spec]
+
+
+def RecordCall(provider, operation, method, seconds, succeeded=True):
+  """Records one provider API call.
+
+  Args:
+    provider: string. The provider name, e.g. 'aws'.
+    operation: string. The API operation, e.g. 'DescribeInstances'.
+    method: string. CLI or SDK.
+    seconds: float. How long the call took.
+    succeeded: boolean. Whether the call succeeded.
+  """
+  with _calls_lock:
+    _GetCalls()[(provider, operation, method)].append(
+        _CallRecord(seconds, succeeded))
+
+
+@contextlib.contextmanager
+def MeasureCall(provider, operation, method):
+  """Records the provider API call made within the context.
+
+  See RecordCall for the arguments.
+  """
+  start_time = time.time()
+  succeeded = False
+  try:
+    yield
+    succeeded = True
+  finally:
+    RecordCall(provider, operation, method, time.time() - start_time,
+               succeeded)
+
+
+def GetSamples():
+  """Returns samples of the provider API calls of the current benchmark.
+
+  For each provider, operation and method, there is one 'Provider API Calls'
+  sample with the number of calls and one 'Provider API Call Latency' sample
+  with their average latency. Both have the latency percentiles as metadata.
+  """
+  with _calls_lock:
+    calls = dict(_GetCalls())
+  samples = []
+  for (provider, operation, method), records in sorted(calls.iteritems()):
+    latencies = sample.PercentileCalculator(
+        [record.seconds for record in records], percentiles=[50, 90, 99])
+    metadata = {'provider': provider, 'operation': operation,
+                'method': method,
+                'errors': sum(1 for record in records
+                              if not record.succeeded)}
+    metadata.update(('latency_%s' % key, value)
+                    for key, value in latencies.iteritems())
+    samples.append(sample.Sample('Provider API Calls', len(records), 'count',
+                                 metadata))
+    samples.append(sample.Sample('Provider API Call Latency',
+                                 latencies['average'], 'seconds', metadata))
+  return samples
@@ -196,13 +196,8 @@ class AwsDisk(disk.BaseDisk):
 
   def _Exists(self):
     """Returns true if the disk exists."""
-    describe_cmd = util.AWS_PREFIX + [
-        'ec2',
-        'describe-volumes',
-        '--region=%s' % self.region,
-        '--filter=Name=volume-id,Values=%s' % self.id]
-    stdout, _ = util.IssueRetryableCommand(describe_cmd)
-    response = json.loads(stdout)
+    response = util.Ec2Call(self.region, 'DescribeVolumes', Filters=[
+        {'Name': 'volume-id', 'Values': [self.id]}])
     volumes = response['Volumes']
     assert len(volumes) < 2, 'Too many volumes.'
     if not volumes:
@@ -225,26 +220,16 @@ class AwsDisk(disk.BaseDisk):
       self.device_letter = min(AwsDisk.vm_devices[self.attached_vm_id])
       AwsDisk.vm_devices[self.attached_vm_id].remove(self.device_letter)
 
-    attach_cmd = util.AWS_PREFIX + [
-        'ec2',
-        'attach-volume',
-        '--region=%s' % self.region,
-        '--instance-id=%s' % self.attached_vm_id,
-        '--volume-id=%s' % self.id,
-        '--device=%s' % self.GetDevicePath()]
     logging.info('Attaching AWS volume %s. This may fail if the disk is not '
                  'ready, but will be retried.', self.id)
-    util.IssueRetryableCommand(attach_cmd)
+    util.Ec2Call(self.region, 'AttachVolume',
+                 InstanceId=self.attached_vm_id, VolumeId=self.id,
+                 Device=self.GetDevicePath())
 
   def Detach(self):
     """Detaches the disk from a VM."""
-    detach_cmd = util.AWS_PREFIX + [
-        'ec2',
-        'detach-volume',
-        '--region=%s' % self.region,
-        '--instance-id=%s' % self.attached_vm_id,
-        '--volume-id=%s' % self.id]
-    util.IssueRetryableCommand(detach_cmd)
+    util.Ec2Call(self.region, 'DetachVolume',
+                 InstanceId=self.attached_vm_id, VolumeId=self.id)
 
     with self._lock:
       assert self.attached_vm_id in AwsDisk.vm_devices
@@ -137,16 +137,7 @@ class AwsVpc(resource.BaseResource):
 
   def _Exists(self):
     """Returns true if the VPC exists."""
-    describe_cmd = util.AWS_PREFIX + [
-        'ec2',
-        'describe-vpcs',
-        '--region=%s' % self.region,
-        '--filter=Name=vpc-id,Values=%s' % self.id]
-    stdout, _ = util.IssueRetryableCommand(describe_cmd)
-    response = json.loads(stdout)
-    vpcs = response['Vpcs']
-    assert len(vpcs) < 2, 'Too many VPCs.'
-    return len(vpcs) > 0
+    return util.GetBatchedDescription('vpcs', self.region, self.id) is not None
 
   def _EnableDnsHostnames(self):
     """Sets the enableDnsHostnames attribute of this VPC to True.
@@ -238,16 +229,8 @@ class AwsSubnet(resource.BaseResource):
 
   def _Exists(self):
     """Returns true if the subnet exists."""
-    describe_cmd = util.AWS_PREFIX + [
-        'ec2',
-        'describe-subnets',
-        '--region=%s' % self.region,
-        '--filter=Name=subnet-id,Values=%s' % self.id]
-    stdout, _ = util.IssueRetryableCommand(describe_cmd)
-    response = json.loads(stdout)
-    subnets = response['Subnets']
-    assert len(subnets) < 2, 'Too many subnets.'
-    return len(subnets) > 0
+    return util.GetBatchedDescription('subnets', self.region,
+                                      self.id) is not None
 
 
 class AwsInternetGateway(resource.BaseResource):
@@ -409,15 +409,10 @@ class AwsVirtualMachine(virtual_machine.BaseVirtualMachine):
   @vm_util.Retry()
   def _PostCreate(self):
     """Get the instance's data and tag it."""
-    describe_cmd = util.AWS_PREFIX + [
-        'ec2',
-        'describe-instances',
-        '--region=%s' % self.region,
-        '--instance-ids=%s' % self.id]
     logging.info('Getting instance %s public IP. This will fail until '
                  'a public IP is available, but will be retried.', self.id)
-    stdout, _ = util.IssueRetryableCommand(describe_cmd)
-    response = json.loads(stdout)
+    response = util.Ec2Call(self.region, 'DescribeInstances',
+                            InstanceIds=[self.id])
     instance = response['Reservations'][0]['Instances'][0]
     self.ip_address = instance['PublicIpAddress']
     self.internal_ip = instance['PrivateIpAddress']
@@ -462,14 +457,19 @@ class AwsVirtualMachine(virtual_machine.BaseVirtualMachine):
     else:
       self._CreateOnDemand()
 
-  def _CreateOnDemand(self):
-    """Create an OnDemand VM instance."""
+  def _GetRunInstancesCommand(self, client_token, count=1):
+    """Returns the command that launches instances like this VM.
+
+    Args:
+      client_token: string. Makes the request idempotent.
+      count: int. The number of instances to launch. Either all of them are
+          launched or none.
+    """
     placement = []
     if not util.IsRegion(self.zone):
       placement.append('AvailabilityZone=%s' % self.zone)
     if self.use_dedicated_host:
       placement.append('Tenancy=host,HostId=%s' % self.host.id)
-      num_hosts = len(self.host_list)
     elif IsPlacementGroupCompatible(self.machine_type):
       placement.append('GroupName=%s' % self.network.placement_group.name)
     placement = ','.join(placement)
@@ -483,16 +483,25 @@ class AwsVirtualMachine(virtual_machine.BaseVirtualMachine):
         '--region=%s' % self.region,
         '--subnet-id=%s' % self.network.subnet.id,
         '--associate-public-ip-address',
-        '--client-token=%s' % self.client_token,
+        '--client-token=%s' % client_token,
         '--image-id=%s' % self.image,
         '--instance-type=%s' % self.machine_type,
         '--key-name=%s' % 'perfkit-key-%s' % FLAGS.run_uri]
+    if count > 1:
+      create_cmd.append('--count=%d' % count)
     if block_device_map:
       create_cmd.append('--block-device-mappings=%s' % block_device_map)
     if placement:
       create_cmd.append('--placement=%s' % placement)
     if self.user_data:
       create_cmd.append('--user-data=%s' % self.user_data)
+    return create_cmd
+
+  def _CreateOnDemand(self):
+    """Create an OnDemand VM instance."""
+    if self.use_dedicated_host:
+      num_hosts = len(self.host_list)
+    create_cmd = self._GetRunInstancesCommand(self.client_token)
     _, stderr, _ = vm_util.IssueCommand(create_cmd)
     if self.use_dedicated_host and 'InsufficientCapacityOnHost' in stderr:
       logging.warning(
@@ -507,6 +516,29 @@ class AwsVirtualMachine(virtual_machine.BaseVirtualMachine):
       self.client_token = str(uuid.uuid4())
       raise errors.Resource.RetryableCreationError()
 
+  def GetBulkCreateKey(self):
+    """See base class. Spot and dedicated host VMs are created on their own."""
+    if self.use_spot_instance or self.use_dedicated_host:
+      return None
+    return (self.zone, self.machine_type, self.image, self.boot_disk_size,
+            self.user_data)
+
+  @classmethod
+  def _BulkCreate(cls, vms):
+    """Launches the instances of 'vms' with one run-instances request.
+
+    With --count, run-instances launches either all instances or none.
+    """
+    create_cmd = vms[0]._GetRunInstancesCommand(str(uuid.uuid4()),
+                                                count=len(vms))
+    stdout, stderr, retcode = vm_util.IssueCommand(create_cmd)
+    if retcode:
+      raise errors.Resource.CreationError(stderr)
+    instances = json.loads(stdout)['Instances']
+    for vm, instance in zip(vms, instances):
+      vm.id = instance['InstanceId']
+      vm.internal_ip = instance.get('PrivateIpAddress')
+
   def _CreateSpot(self):
     """Create a Spot VM instance."""
     placement = OrderedDict()
@@ -590,30 +622,18 @@ class AwsVirtualMachine(virtual_machine.BaseVirtualMachine):
 
   def _Exists(self):
     """Returns true if the VM exists."""
-    describe_cmd = util.AWS_PREFIX + [
-        'ec2',
-        'describe-instances',
-        '--region=%s' % self.region]
-
-    if self.use_spot_instance:
-      if self.id:
-        describe_cmd.append('--instance-id=%s' % self.id)
-      else:
-        return False
+    if self.id:
+      instance = util.GetBatchedDescription('instance_ids', self.region,
+                                            self.id)
+    elif self.use_spot_instance:
+      return False
     else:
-      describe_cmd.append(
-          '--filter=Name=client-token,Values=%s' % self.client_token)
-
-    stdout, _ = util.IssueRetryableCommand(describe_cmd)
-    response = json.loads(stdout)
-    reservations = response['Reservations']
-    assert len(reservations) < 2, 'Too many reservations.'
-    if not reservations:
+      instance = util.GetBatchedDescription('instances', self.region,
+                                            self.client_token)
+    if instance is None:
       return False
-    instances = reservations[0]['Instances']
-    assert len(instances) == 1, 'Wrong number of instances.'
-    status = instances[0]['State']['Name']
-    self.id = instances[0]['InstanceId']
+    status = instance['State']['Name']
+    self.id = instance['InstanceId']
     assert status in INSTANCE_KNOWN_STATUSES, status
     return status in INSTANCE_EXISTS_STATUSES
 
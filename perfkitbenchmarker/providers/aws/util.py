@@ -14,17 +14,45 @@
 
 """Utilities for working with Amazon Web Services resources."""
 
+import functools
+import json
 import re
 import string
+try:
+  import boto3
+except ImportError:
+  boto3 = None
 
 from perfkitbenchmarker import errors
 from perfkitbenchmarker import flags
+from perfkitbenchmarker import provider_api
+from perfkitbenchmarker import status_poller
 from perfkitbenchmarker import vm_util
 
 AWS_PATH = 'aws'
 AWS_PREFIX = [AWS_PATH, '--output', 'json']
 FLAGS = flags.FLAGS
 
+# The most values EC2 accepts in a single describe-* filter.
+_MAX_FILTER_VALUES = 200
+
+# Maps the kinds of resources whose status can be fetched in batches to the
+# Describe* operation, the filter selecting them, and the key of their list in
+# the response.
+_BATCH_DESCRIBE_COMMANDS = {
+    'instances': ('DescribeInstances', 'client-token', 'Reservations'),
+    'instance_ids': ('DescribeInstances', 'instance-id', 'Reservations'),
+    'subnets': ('DescribeSubnets', 'subnet-id', 'Subnets'),
+    'vpcs': ('DescribeVpcs', 'vpc-id', 'Vpcs'),
+}
+# The key identifying each kind of resource in the response.
+_BATCH_DESCRIBE_KEYS = {
+    'instances': 'ClientToken',
+    'instance_ids': 'InstanceId',
+    'subnets': 'SubnetId',
+    'vpcs': 'VpcId',
+}
+
 
 def IsRegion(zone_or_region):
   """Returns whether "zone_or_region" is a region."""
@@ -52,15 +80,9 @@ def AddTags(resource_id, region, **kwargs):
   if not kwargs:
     return
 
-  tag_cmd = AWS_PREFIX + [
-      'ec2',
-      'create-tags',
-      '--region=%s' % region,
-      '--resources', resource_id,
-      '--tags']
-  for key, value in kwargs.iteritems():
-    tag_cmd.append('Key={0},Value={1}'.format(key, value))
-  IssueRetryableCommand(tag_cmd)
+  Ec2Call(region, 'CreateTags', Resources=[resource_id],
+          Tags=[{'Key': key, 'Value': str(value)}
+                for key, value in sorted(kwargs.iteritems())])
 
 
 def AddDefaultTags(resource_id, region):
@@ -102,3 +124,93 @@ def IssueRetryableCommand(cmd, env=None):
     raise errors.VmUtil.CalledProcessException(
         'The command had output on stderr:\n%s' % stderr)
   return stdout, stderr
+
+
+def _GetEc2Client(region):
+  """Returns the pooled boto3 EC2 client for 'region'."""
+  endpoint = FLAGS.provider_api_endpoint
+  return provider_api.GetClient(
+      ('aws', 'ec2', region, endpoint),
+      lambda: boto3.session.Session().client('ec2', region_name=region,
+                                             endpoint_url=endpoint))
+
+
+@vm_util.Retry()
+def _CallEc2Sdk(region, operation, params):
+  method = re.sub('([a-z0-9])([A-Z])', r'\1_\2', operation).lower()
+  response = getattr(_GetEc2Client(region), method)(**params)
+  response.pop('ResponseMetadata', None)
+  return response
+
+
+def Ec2Call(region, operation, **params):
+  """Calls an EC2 API operation and returns its response.
+
+  The call is made with boto3 if --provider_api=sdk and it is installed, and
+  with the AWS CLI otherwise. Both take the same parameters and return the
+  same response structure. Failed calls are retried.
+
+  Args:
+    region: string. The AWS region to call.
+    operation: string. The EC2 API action, e.g. 'DescribeInstances'.
+    **params: The action's request parameters, e.g. Filters=[...].
+
+  Returns:
+    dict. The response.
+  """
+  if provider_api.UseSdk('aws', boto3):
+    with provider_api.MeasureCall('aws', operation, provider_api.SDK):
+      return _CallEc2Sdk(region, operation, params)
+  cmd = AWS_PREFIX + [
+      'ec2',
+      re.sub('([a-z0-9])([A-Z])', r'\1-\2', operation).lower(),
+      '--region=%s' % region]
+  if params:
+    cmd.append('--cli-input-json=%s' % json.dumps(params, sort_keys=True))
+  with provider_api.MeasureCall('aws', operation, provider_api.CLI):
+    stdout, _ = IssueRetryableCommand(cmd)
+  return json.loads(stdout) if stdout.strip() else {}
+
+
+def _DescribeResources(kind, region, keys):
+  """Describes many resources of one kind with as few requests as possible.
+
+  Args:
+    kind: string. A key of _BATCH_DESCRIBE_COMMANDS.
+    region: string. The AWS region of the resources.
+    keys: list of strings. The client tokens or ids of the resources, see
+        GetBatchedDescription.
+
+  Returns:
+    dict mapping each key that was found to the resource's description.
+  """
+  operation, filter_name, response_key = _BATCH_DESCRIBE_COMMANDS[kind]
+  descriptions = {}
+  for start in xrange(0, len(keys), _MAX_FILTER_VALUES):
+    response = Ec2Call(region, operation, Filters=[{
+        'Name': filter_name,
+        'Values': keys[start:start + _MAX_FILTER_VALUES]}])
+    items = response[response_key]
+    if response_key == 'Reservations':
+      items = [instance for reservation in items
+               for instance in reservation['Instances']]
+    for item in items:
+      descriptions[item[_BATCH_DESCRIBE_KEYS[kind]]] = item
+  return descriptions
+
+
+def GetBatchedDescription(kind, region, key):
+  """Returns the description of one resource, or None if it doesn't exist.
+
+  Concurrent calls for resources of the same kind in the same region are
+  answered by a single Describe* request (see status_poller).
+
+  Args:
+    kind: string. 'instances' (looked up by client token), 'instance_ids',
+        'subnets' or 'vpcs' (looked up by id).
+    region: string. The AWS region of the resource.
+    key: string. The client token or id of the resource.
+  """
+  return status_poller.GetStatus(
+      ('aws', kind, region),
+      functools.partial(_DescribeResources, kind, region), key)
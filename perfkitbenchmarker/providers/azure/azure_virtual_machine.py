@@ -43,6 +43,10 @@ from perfkitbenchmarker import providers
 
 FLAGS = flags.FLAGS
 
+_DEPLOYMENT_TEMPLATE_SCHEMA = ('https://schema.management.azure.com/schemas/'
+                               '2015-01-01/deploymentTemplate.json#')
+_COMPUTE_API_VERSION = '2015-06-15'
+
 
 # Per-VM resources are defined here.
 class AzurePublicIPAddress(resource.BaseResource):
@@ -200,6 +204,91 @@ class AzureVirtualMachine(virtual_machine.BaseVirtualMachine):
       create_cmd.extend(['--ssh-publickey-file', self.ssh_public_key])
     vm_util.IssueCommand(create_cmd)
 
+  def GetBulkCreateKey(self):
+    """See base class.
+
+    Only Linux VMs booted from a marketplace image URN are created in bulk.
+    """
+    if self.password or len(self.image.split(':')) != 4:
+      return None
+    return (self.zone, self.machine_type, self.image, self.user_name,
+            self.storage_account.name, self.network.avail_set.name)
+
+  def _GetTemplateResource(self, public_key):
+    """Returns the deployment template resource that creates this VM."""
+    publisher, offer, sku, version = self.image.split(':')
+    storage_account_id = "resourceId('Microsoft.Storage/storageAccounts', " \
+                         "'%s')" % self.storage_account.name
+    return {
+        'apiVersion': _COMPUTE_API_VERSION,
+        'type': 'Microsoft.Compute/virtualMachines',
+        'name': self.name,
+        'location': self.zone,
+        'properties': {
+            'availabilitySet': {
+                'id': "[resourceId('Microsoft.Compute/availabilitySets', "
+                      "'%s')]" % self.network.avail_set.name},
+            'hardwareProfile': {'vmSize': self.machine_type},
+            'osProfile': {
+                'computerName': self.name,
+                'adminUsername': self.user_name,
+                'linuxConfiguration': {
+                    'disablePasswordAuthentication': True,
+                    'ssh': {'publicKeys': [{
+                        'path': '/home/%s/.ssh/authorized_keys' %
+                                self.user_name,
+                        'keyData': public_key}]}}},
+            'storageProfile': {
+                'imageReference': {'publisher': publisher, 'offer': offer,
+                                   'sku': sku, 'version': version},
+                'osDisk': {
+                    'name': self.name,
+                    'caching': 'ReadWrite',
+                    'createOption': 'FromImage',
+                    'vhd': {'uri': "[concat(reference(%s, '%s')."
+                                   "primaryEndpoints.blob, 'vhds/%s.vhd')]" %
+                                   (storage_account_id, _COMPUTE_API_VERSION,
+                                    self.name)}}},
+            'networkProfile': {'networkInterfaces': [{
+                'id': "[resourceId('Microsoft.Network/networkInterfaces', "
+                      "'%s')]" % self.nic.name}]}}}
+
+  @classmethod
+  def _BulkCreate(cls, vms):
+    """Creates the instances of 'vms' with one template deployment.
+
+    'azure vm create' creates a single VM, so the VMs are declared in a
+    resource group deployment instead. Deployments are atomic and idempotent.
+    """
+    first_vm = vms[0]
+
+    def AttachPublicIp(vm):
+      vm_util.IssueRetryableCommand(
+          [azure.AZURE_PATH, 'network', 'nic', 'set',
+           '--public-ip-name', vm.public_ip.name,
+           vm.nic.name] + vm.resource_group.args)
+
+    vm_util.RunThreaded(AttachPublicIp, vms)
+    with open(first_vm.ssh_public_key) as f:
+      public_key = f.read().rstrip('\n')
+    template = {
+        '$schema': _DEPLOYMENT_TEMPLATE_SCHEMA,
+        'contentVersion': '1.0.0.0',
+        'resources': [vm._GetTemplateResource(public_key) for vm in vms]}
+    with vm_util.NamedTemporaryFile(dir=vm_util.GetTempDir(),
+                                    prefix='vm-template',
+                                    suffix='.json') as tf:
+      json.dump(template, tf)
+      tf.close()
+      _, stderr, retcode = vm_util.IssueCommand(
+          [azure.AZURE_PATH, 'group', 'deployment', 'create',
+           '--template-file', tf.name,
+           first_vm.resource_group.name,
+           '%s-vms' % first_vm.name],
+          timeout=FLAGS.bulk_create_timeout)
+    if retcode:
+      raise errors.Resource.CreationError(stderr)
+
   def _Delete(self):
     # The VM will be deleted when the resource group is.
     self._deleted = True
@@ -17,8 +17,6 @@ Disks can be created, deleted, attached to VMs, and detached from VMs.
 Use 'gcloud compute disk-types list' to determine valid disk types.
 """
 
-import json
-
 from perfkitbenchmarker import disk
 from perfkitbenchmarker import flags
 from perfkitbenchmarker.providers.gcp import util
@@ -84,13 +82,7 @@ class GceDisk(disk.BaseDisk):
 
   def _Exists(self):
     """Returns true if the disk exists."""
-    cmd = util.GcloudCommand(self, 'compute', 'disks', 'describe', self.name)
-    stdout, _, _ = cmd.Issue(suppress_warning=True)
-    try:
-      json.loads(stdout)
-    except ValueError:
-      return False
-    return True
+    return util.GetBatchedDescription('disks', self) is not None
 
   def Attach(self, vm):
     """Attaches the disk to a VM.
@@ -351,6 +351,43 @@ class GceVirtualMachine(virtual_machine.BaseVirtualMachine):
       create_cmd = self._GenerateCreateCommand(tf.name)
       create_cmd.Issue()
 
+  def GetBulkCreateKey(self):
+    """See base class. VMs whose create commands match share a request."""
+    cmd = self._GenerateCreateCommand(None)
+    return repr((self.user_name, self.ssh_public_key, cmd.args[:-1],
+                 cmd.flags.items(), cmd.additional_flags))
+
+  @classmethod
+  def _BulkCreate(cls, vms):
+    """Creates the instances of 'vms' with one 'instances create' command.
+
+    gcloud accepts several instance names, which are created with the same
+    flags by a single bulk request.
+    """
+    first_vm = vms[0]
+    with open(first_vm.ssh_public_key) as f:
+      public_key = f.read().rstrip('\n')
+    with vm_util.NamedTemporaryFile(dir=vm_util.GetTempDir(),
+                                    prefix='key-metadata') as tf:
+      tf.write('%s:%s\n' % (first_vm.user_name, public_key))
+      tf.close()
+      create_cmd = first_vm._GenerateCreateCommand(tf.name)
+      create_cmd.args[-1:] = [vm.name for vm in vms]
+      stdout, stderr, retcode = create_cmd.Issue()
+    if retcode:
+      # Instances that were created are found by the individual creation.
+      raise errors.Resource.CreationError(stderr)
+    vms_by_name = {vm.name: vm for vm in vms}
+    for instance in json.loads(stdout or '[]'):
+      vm = vms_by_name.get(instance.get('name'))
+      if vm is None:
+        continue
+      vm.id = instance['id']
+      network_interface = instance['networkInterfaces'][0]
+      vm.internal_ip = network_interface.get('networkIP')
+      access_configs = network_interface.get('accessConfigs') or [{}]
+      vm.ip_address = access_configs[0].get('natIP')
+
   def _CreateDependencies(self):
     super(GceVirtualMachine, self)._CreateDependencies()
     # GCE firewall rules are created for all instances in a network.
@@ -361,10 +398,7 @@ class GceVirtualMachine(virtual_machine.BaseVirtualMachine):
   @vm_util.Retry()
   def _PostCreate(self):
     """Get the instance's data."""
-    getinstance_cmd = util.GcloudCommand(self, 'compute', 'instances',
-                                         'describe', self.name)
-    stdout, _, _ = getinstance_cmd.Issue()
-    response = json.loads(stdout)
+    response = util.GetComputeResource('instances', self)
     self.id = response['id']
     network_interface = response['networkInterfaces'][0]
     self.internal_ip = network_interface['networkIP']
@@ -378,14 +412,7 @@ class GceVirtualMachine(virtual_machine.BaseVirtualMachine):
 
   def _Exists(self):
     """Returns true if the VM exists."""
-    getinstance_cmd = util.GcloudCommand(self, 'compute', 'instances',
-                                         'describe', self.name)
-    stdout, _, _ = getinstance_cmd.Issue(suppress_warning=True)
-    try:
-      json.loads(stdout)
-    except ValueError:
-      return False
-    return True
+    return util.GetBatchedDescription('instances', self) is not None
 
   def CreateScratchDisk(self, disk_spec):
     """Create a VM's scratch disk.
@@ -13,15 +13,25 @@
 # limitations under the License.
 """Utilities for working with Google Cloud Platform resources."""
 
+import functools
 import json
 import functools32
+try:
+  from googleapiclient import discovery
+except ImportError:
+  discovery = None
 
 from collections import OrderedDict
 from perfkitbenchmarker import flags
+from perfkitbenchmarker import provider_api
+from perfkitbenchmarker import status_poller
 from perfkitbenchmarker import vm_util
 
 FLAGS = flags.FLAGS
 
+# The most resource names passed to a single batched list command.
+_MAX_BATCH_NAMES = 100
+
 
 @functools32.lru_cache()
 def GetDefaultProject():
@@ -124,3 +134,117 @@ class GcloudCommand(object):
     if hasattr(resource, 'zone') and resource.zone:
       self.flags['zone'] = resource.zone
     self.additional_flags.extend(FLAGS.additional_gcloud_flags or ())
+
+
+def _GetComputeClient():
+  """Returns this thread's pooled Compute Engine API client."""
+  endpoint = FLAGS.provider_api_endpoint
+
+  def Build():
+    kwargs = {'cache_discovery': False}
+    if endpoint:
+      kwargs['discoveryServiceUrl'] = (
+          endpoint.rstrip('/') + '/discovery/v1/apis/{api}/{apiVersion}/rest')
+    return discovery.build('compute', 'v1', **kwargs)
+
+  # httplib2, which the client uses, is not thread safe.
+  return provider_api.GetClient(('gcp', 'compute', endpoint), Build,
+                                per_thread=True)
+
+
+@vm_util.Retry()
+def _ExecuteRequest(request):
+  return request.execute()
+
+
+def ListComputeResources(kind, resource, names):
+  """Lists the zonal resources of one kind that have any of 'names'.
+
+  The resources are listed with the Compute Engine API if --provider_api=sdk
+  and it is installed, and with gcloud otherwise.
+
+  Args:
+    kind: string. The Compute Engine resource collection, e.g. 'instances'.
+    resource: A GCE resource whose project and zone are listed.
+    names: list of strings. The names of the resources.
+
+  Returns:
+    list of dicts. The descriptions of the resources that were found.
+  """
+  operation = '%s.list' % kind
+  if provider_api.UseSdk('gcp', discovery):
+    collection = getattr(_GetComputeClient(), kind)()
+    request = collection.list(project=resource.project, zone=resource.zone,
+                              filter='name eq (%s)' % '|'.join(names))
+    items = []
+    with provider_api.MeasureCall('gcp', operation, provider_api.SDK):
+      while request is not None:
+        response = _ExecuteRequest(request)
+        items.extend(response.get('items', []))
+        request = collection.list_next(request, response)
+    return items
+  cmd = GcloudCommand(resource, 'compute', kind, 'list')
+  cmd.flags.pop('zone', None)
+  cmd.flags['zones'] = resource.zone
+  cmd.flags['filter'] = 'name=(%s)' % ' '.join(names)
+  with provider_api.MeasureCall('gcp', operation, provider_api.CLI):
+    stdout, _ = cmd.IssueRetryable()
+  return json.loads(stdout)
+
+
+def GetComputeResource(kind, resource):
+  """Returns the description of a zonal resource.
+
+  See ListComputeResources for how the call is made.
+
+  Args:
+    kind: string. The Compute Engine resource collection, e.g. 'instances'.
+    resource: A GCE resource with name, project and zone attributes.
+  """
+  operation = '%s.get' % kind
+  if provider_api.UseSdk('gcp', discovery):
+    # The name parameter of each collection is its singular, e.g. 'instance'.
+    request = getattr(_GetComputeClient(), kind)().get(
+        **{'project': resource.project, 'zone': resource.zone,
+           kind[:-1]: resource.name})
+    with provider_api.MeasureCall('gcp', operation, provider_api.SDK):
+      return _ExecuteRequest(request)
+  cmd = GcloudCommand(resource, 'compute', kind, 'describe', resource.name)
+  with provider_api.MeasureCall('gcp', operation, provider_api.CLI):
+    stdout, _ = cmd.IssueRetryable()
+  return json.loads(stdout)
+
+
+def _ListResources(kind, resource, names):
+  """Lists the zonal resources of one kind that have any of 'names'.
+
+  Args:
+    kind: string. The Compute Engine resource collection, e.g. 'instances'.
+    resource: A GCE resource whose project and zone are listed.
+    names: list of strings. The names of the resources.
+
+  Returns:
+    dict mapping each name that was found to the resource's description.
+  """
+  descriptions = {}
+  for start in xrange(0, len(names), _MAX_BATCH_NAMES):
+    items = ListComputeResources(kind, resource,
+                                 names[start:start + _MAX_BATCH_NAMES])
+    for item in items:
+      descriptions[item['name']] = item
+  return descriptions
+
+
+def GetBatchedDescription(kind, resource):
+  """Returns the description of a zonal resource, or None if it doesn't exist.
+
+  Concurrent calls for resources of the same kind in the same project and
+  zone are answered by a single list command (see status_poller).
+
+  Args:
+    kind: string. The gcloud compute resource group, e.g. 'instances'.
+    resource: A GCE resource with name, project and zone attributes.
+  """
+  return status_poller.GetStatus(
+      ('gcp', kind, resource.project, resource.zone),
+      functools.partial(_ListResources, kind, resource), resource.name)
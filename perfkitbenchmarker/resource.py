@@ -23,8 +23,15 @@ import abc
 import time
 
 from perfkitbenchmarker import errors
+from perfkitbenchmarker import events
 from perfkitbenchmarker import vm_util
 
+# Lifecycle states sent with events.resource_state_changed.
+REQUESTED = 'requested'
+CREATED = 'created'
+READY = 'ready'
+DELETED = 'deleted'
+
 
 class BaseResource(object):
   """An object representing a cloud resource.
@@ -118,15 +125,23 @@ class BaseResource(object):
     if not self.create_start_time:
       self.create_start_time = time.time()
     self._Create()
+    # Ids assigned by _Create are needed to delete the resource even if it
+    # never comes to exist.
+    events.resource_state_changed.send(self, state=REQUESTED)
     try:
       if not self._Exists():
         raise errors.Resource.RetryableCreationError(
             'Creation of %s failed.' % type(self).__name__)
     except NotImplementedError:
       pass
+    self._SetCreated()
+
+  def _SetCreated(self):
+    """Records that the underlying resource has been created."""
     self.created = True
     if not self.create_end_time:
       self.create_end_time = time.time()
+    events.resource_state_changed.send(self, state=CREATED)
 
   @vm_util.Retry(retryable_exceptions=(errors.Resource.RetryableDeletionError,))
   def _DeleteResource(self):
@@ -142,6 +157,7 @@ class BaseResource(object):
       pass
     if not self.delete_end_time:
       self.delete_end_time = time.time()
+    events.resource_state_changed.send(self, state=DELETED)
 
   def Create(self):
     """Creates a resource and its dependencies."""
@@ -157,12 +173,16 @@ class BaseResource(object):
 
     if self.user_managed:
       return
-    self._CreateDependencies()
+    # Resources created in bulk (see BaseVirtualMachine.BulkCreate) already
+    # have their dependencies.
+    if not self.created:
+      self._CreateDependencies()
     self._CreateResource()
     WaitUntilReady()
     if not self.resource_ready_time:
       self.resource_ready_time = time.time()
     self._PostCreate()
+    events.resource_state_changed.send(self, state=READY)
 
   def Delete(self):
     """Deletes a resource and its dependencies."""
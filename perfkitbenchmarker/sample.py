@@ -13,7 +13,9 @@
 # limitations under the License.
 """A performance sample class."""
 
+import bisect
 import collections
+import math
 import time
 PERCENTILES_LIST = [0.1, 1, 5, 10, 50, 90, 95, 99, 99.9]
 
@@ -64,6 +66,78 @@ def PercentileCalculator(numbers, percentiles=PERCENTILES_LIST):
   return result
 
 
+def HistogramPercentiles(histogram, percentiles):
+  """Returns the values at the given percentiles of a histogram.
+
+  Args:
+    histogram: dict mapping values to their counts. Must not be empty.
+    percentiles: sorted list of percentiles between 0 and 100.
+
+  Returns:
+    A dict mapping each percentile to the smallest value such that at least
+    that percentage of the counts are at or below it.
+  """
+  total = sum(histogram.itervalues())
+  values = {}
+  remaining = list(percentiles)
+  seen = 0
+  for value, count in sorted(histogram.iteritems()):
+    seen += count
+    while remaining:
+      # Rounds off float error, e.g. 99.9 * 1000 / 100 = 999.0000000000001.
+      threshold = math.ceil(round(remaining[0] * total / 100.0, 6))
+      if seen < threshold:
+        break
+      values[remaining.pop(0)] = value
+  return values
+
+
+def GridIntervals(series, width):
+  """Lines up several series of intervals on a common time grid.
+
+  The grid only covers the window in which every series has intervals, so
+  that series starting or ending early do not skew it. For each grid
+  interval, every series contributes its interval that contains the grid
+  interval's midpoint.
+
+  Args:
+    series: list of lists of intervals. Each list holds contiguous intervals
+        in time order, and the first two items of an interval are its start
+        and end times.
+    width: number. The width of the grid intervals.
+
+  Returns:
+    A list with a (start, intervals) tuple for each grid interval, where
+    'intervals' holds the interval of each series. Empty if the series never
+    overlap.
+  """
+  if not series or not all(series):
+    return []
+  window_start = max(intervals[0][0] for intervals in series)
+  window_end = min(intervals[-1][1] for intervals in series)
+  ends = [[interval[1] for interval in intervals] for intervals in series]
+  grid = []
+  start = window_start
+  while start + width <= window_end:
+    midpoint = start + width / 2.0
+    grid.append((start, [intervals[bisect.bisect_right(series_ends, midpoint)]
+                         for intervals, series_ends in zip(series, ends)]))
+    start += width
+  return grid
+
+
+def WeightedMean(values, weights):
+  """Returns the mean of a list of values weighted by a list of weights.
+
+  If the weights sum to zero, the unweighted mean is returned instead.
+  """
+  total_weight = math.fsum(weights)
+  if total_weight:
+    return math.fsum(value * weight
+                     for value, weight in zip(values, weights)) / total_weight
+  return math.fsum(values) / len(values)
+
+
 class Sample(collections.namedtuple('Sample', _SAMPLE_FIELDS)):
   """A performance sample.
 
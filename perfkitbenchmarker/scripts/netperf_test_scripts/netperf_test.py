@@ -30,6 +30,9 @@ flags.DEFINE_string('netperf_cmd', None,
 flags.DEFINE_integer('port_start', None,
                      'Starting port for netperf command and data ports')
 
+flags.DEFINE_integer('num_cpus', 0,
+                     'If set, pins stream i to CPU i % num_cpus with taskset.')
+
 
 def Main(argv=sys.argv):
   # Parse command-line flags
@@ -57,6 +60,8 @@ def Main(argv=sys.argv):
     command_port = port_start + i * 2
     data_port = port_start + i * 2 + 1
     cmd = netperf_cmd.format(command_port=command_port, data_port=data_port)
+    if FLAGS.num_cpus:
+      cmd = 'taskset -c %d %s' % (i % FLAGS.num_cpus, cmd)
     processes[i] = subprocess.Popen(cmd, stdout=subprocess.PIPE,
                                     stderr=subprocess.PIPE, shell=True)
   # Wait for all of the netperf processes to finish and save their return codes
@@ -0,0 +1,270 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Persists BenchmarkSpec state as a snapshot plus a journal of deltas.
+
+A full pickle of the BenchmarkSpec (the snapshot) is written at checkpoints.
+Between checkpoints, every resource lifecycle change (see
+events.resource_state_changed) appends one record to a journal file next to
+the snapshot. A record holds the state of the top-level object that owns the
+changed resource: a VM (including its scratch disks), a network, a firewall
+or a spark/dpb service. References from that state to other top-level objects
+are stored by key rather than by value, so replaying a record updates the
+object in place without duplicating the objects it points to. State kept on
+the spec itself can be journaled the same way with RecordSpecAttributes.
+
+Snapshots are written to a temporary file and renamed into place, and each
+journal record is flushed to disk before the resource is used, so a crash
+leaves either the previous or the new state, never a truncated file. A
+partially written final journal record is ignored on load.
+"""
+
+import logging
+import os
+import pickle
+import StringIO
+import struct
+import threading
+import weakref
+
+from perfkitbenchmarker import context
+from perfkitbenchmarker import events
+from perfkitbenchmarker import vm_util
+
+JOURNAL_SUFFIX = '.journal'
+_HEADER = struct.Struct('>I')
+_SPEC_KEY = 'spec'
+
+# Maps BenchmarkSpec objects to the SpecJournal that records their deltas.
+_journals = weakref.WeakKeyDictionary()
+_journals_lock = threading.Lock()
+
+
+def _TopLevelObjects(spec):
+  """Returns a dict mapping journal keys to the spec's top-level objects."""
+  objects = {_SPEC_KEY: spec}
+  for vm in spec.vms:
+    objects['vm/%s' % vm.name] = vm
+  for key, net in spec.networks.iteritems():
+    objects['network/%s' % (key,)] = net
+  for key, firewall in spec.firewalls.iteritems():
+    objects['firewall/%s' % (key,)] = firewall
+  for attr in ('spark_service', 'dpb_service'):
+    service = getattr(spec, attr, None)
+    if service is not None:
+      objects[attr] = service
+  return objects
+
+
+def _Contains(container, target, top_level_ids, depth):
+  """Returns whether 'target' is reachable from 'container' within 'depth'."""
+  if depth < 0:
+    return False
+  if isinstance(container, dict):
+    children = container.values()
+  elif isinstance(container, (list, tuple, set)):
+    children = container
+  elif hasattr(container, '__dict__'):
+    children = vars(container).values()
+  else:
+    return False
+  for child in children:
+    if child is target:
+      return True
+    if id(child) in top_level_ids:
+      continue
+    if _Contains(child, target, top_level_ids, depth - 1):
+      return True
+  return False
+
+
+def _FindOwnerKey(objects, resource):
+  """Returns the key of the top-level object that owns 'resource'.
+
+  A resource owns itself if it is a top-level object. Otherwise its owner is
+  the top-level object it can be reached from through a few levels of
+  attributes and containers (e.g. a VM's scratch_disks, or the members of a
+  striped disk).
+  """
+  top_level_ids = {id(obj): key for key, obj in objects.iteritems()}
+  if id(resource) in top_level_ids:
+    return top_level_ids[id(resource)]
+  for key, obj in sorted(objects.iteritems()):
+    if key != _SPEC_KEY and _Contains(obj, resource, top_level_ids, 3):
+      return key
+  return None
+
+
+class SpecJournal(object):
+  """A BenchmarkSpec snapshot and its journal of resource deltas.
+
+  Attributes:
+    snapshot_path: string. Path of the pickled BenchmarkSpec.
+    journal_path: string. Path of the append-only journal.
+    num_records: int. Number of records appended since the last checkpoint.
+  """
+
+  def __init__(self, snapshot_path):
+    self.snapshot_path = snapshot_path
+    self.journal_path = snapshot_path + JOURNAL_SUFFIX
+    self.num_records = 0
+    self._lock = threading.Lock()
+
+  def Checkpoint(self, spec):
+    """Atomically writes a full snapshot of 'spec' and empties the journal."""
+    with self._lock:
+      tmp_path = self.snapshot_path + '.tmp'
+      with open(tmp_path, 'wb') as snapshot_file:
+        pickle.dump(spec, snapshot_file, 2)
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+      if vm_util.RunningOnWindows() and os.path.exists(self.snapshot_path):
+        os.remove(self.snapshot_path)
+      os.rename(tmp_path, self.snapshot_path)
+      open(self.journal_path, 'wb').close()
+      self.num_records = 0
+
+  def Record(self, spec, resource, state):
+    """Appends the current state of the object owning 'resource'.
+
+    Args:
+      spec: BenchmarkSpec that 'resource' belongs to.
+      resource: BaseResource whose lifecycle state changed.
+      state: string. The new lifecycle state, e.g. 'created'.
+    """
+    objects = _TopLevelObjects(spec)
+    key = _FindOwnerKey(objects, resource)
+    if key is None or key == _SPEC_KEY:
+      logging.debug('Not journaling %s: not owned by a top-level resource.',
+                    type(resource).__name__)
+      return
+    self._Append(objects, key, state, vars(objects[key]))
+
+  def RecordSpecAttributes(self, spec, names):
+    """Appends the current values of some of the spec's own attributes.
+
+    Resource deltas don't cover state kept on the spec itself, such as the
+    progress of a long data load. This records it so that it survives a
+    crash before the next checkpoint.
+
+    Args:
+      spec: BenchmarkSpec whose attributes to record.
+      names: list of strings. The names of the attributes.
+    """
+    self._Append(_TopLevelObjects(spec), _SPEC_KEY, 'updated',
+                 {name: getattr(spec, name) for name in names})
+
+  def _Append(self, objects, key, state, attributes):
+    """Appends a record updating the attributes of a top-level object."""
+    keys_by_id = {id(obj): obj_key for obj_key, obj in objects.iteritems()}
+
+    with self._lock:
+      buf = StringIO.StringIO()
+      pickler = pickle.Pickler(buf, 2)
+      pickler.persistent_id = lambda obj: keys_by_id.get(id(obj))
+      pickler.dump((key, state, attributes))
+      payload = buf.getvalue()
+      with open(self.journal_path, 'ab') as journal_file:
+        journal_file.write(_HEADER.pack(len(payload)) + payload)
+        journal_file.flush()
+        os.fsync(journal_file.fileno())
+      self.num_records += 1
+
+  def _ReadRecords(self):
+    """Yields the raw payload of each complete journal record."""
+    if not os.path.exists(self.journal_path):
+      return
+    with open(self.journal_path, 'rb') as journal_file:
+      while True:
+        header = journal_file.read(_HEADER.size)
+        if not header:
+          return
+        payload = ''
+        if len(header) == _HEADER.size:
+          length, = _HEADER.unpack(header)
+          payload = journal_file.read(length)
+        if len(header) < _HEADER.size or len(payload) < length:
+          logging.warning('Ignoring truncated record at the end of %s.',
+                          self.journal_path)
+          return
+        yield payload
+
+  def Replay(self, spec):
+    """Applies the journal's records to 'spec' in order.
+
+    Returns:
+      The number of records applied.
+    """
+    applied = 0
+    for payload in self._ReadRecords():
+      objects = _TopLevelObjects(spec)
+      unpickler = pickle.Unpickler(StringIO.StringIO(payload))
+      unpickler.persistent_load = objects.__getitem__
+      key, state, attributes = unpickler.load()
+      if key not in objects:
+        logging.warning('Journal record for unknown object %s (%s) skipped.',
+                        key, state)
+        continue
+      vars(objects[key]).update(attributes)
+      applied += 1
+    self.num_records = applied
+    return applied
+
+  def Load(self):
+    """Loads the snapshot and replays the journal on top of it.
+
+    Returns:
+      The restored BenchmarkSpec.
+    """
+    with open(self.snapshot_path, 'rb') as snapshot_file:
+      spec = pickle.load(snapshot_file)
+    applied = self.Replay(spec)
+    logging.info('Restored %s from snapshot and %d journal record(s).',
+                 self.snapshot_path, applied)
+    return spec
+
+
+def GetJournal(spec):
+  """Returns the SpecJournal attached to 'spec', or None."""
+  with _journals_lock:
+    return _journals.get(spec)
+
+
+def AttachJournal(spec, journal):
+  """Attaches 'journal' so that resource deltas of 'spec' are recorded."""
+  with _journals_lock:
+    _journals[spec] = journal
+
+
+def RecordSpecAttributes(spec, *names):
+  """Records attributes of 'spec' in its journal, if it has one.
+
+  See SpecJournal.RecordSpecAttributes.
+  """
+  journal = GetJournal(spec)
+  if journal is not None:
+    journal.RecordSpecAttributes(spec, names)
+
+
+def _OnResourceStateChanged(sender, state):
+  """Records a lifecycle change of a resource in the current spec's journal."""
+  spec = context.GetThreadBenchmarkSpec()
+  if spec is None:
+    return
+  journal = GetJournal(spec)
+  if journal is not None:
+    journal.Record(spec, sender, state)
+
+
+events.resource_state_changed.connect(_OnResourceStateChanged, weak=False)
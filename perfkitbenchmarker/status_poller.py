@@ -0,0 +1,215 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Coalesces cloud status lookups of many resources into batched requests.
+
+Resources check whether they exist by describing themselves with the cloud
+provider's CLI. When hundreds of resources are created or deleted at once,
+that is one CLI process per resource per check, and the provider's API
+throttles the requests.
+
+A BatchStatusPoller instead collects the keys (e.g. instance ids) of every
+resource that is waiting for its status and answers all of them with one
+batched describe call per poll tick. Each caller is answered from a describe
+call that started after the caller asked, so results are never stale.
+
+The tick interval adapts to how quickly resources change: it is halved after
+a tick that observed a change and grows by half after a tick that did not,
+within --status_poll_min_interval and --status_poll_max_interval.
+
+Pollers are shared by all resources of the current benchmark (see
+context.GetThreadBenchmarkSpec) under a key such as ('aws', 'vpcs', region).
+"""
+
+import logging
+import threading
+import time
+import weakref
+
+from perfkitbenchmarker import context
+from perfkitbenchmarker import flags
+
+flags.DEFINE_float('status_poll_min_interval', 1,
+                   'The minimum number of seconds between two batched '
+                   'status requests for the same kind of cloud resource.',
+                   lower_bound=0)
+flags.DEFINE_float('status_poll_max_interval', 15,
+                   'The maximum number of seconds between two batched '
+                   'status requests for the same kind of cloud resource.',
+                   lower_bound=0)
+
+FLAGS = flags.FLAGS
+
+# Maps each BenchmarkSpec to a dict of its pollers by poller key.
+_pollers_by_spec = weakref.WeakKeyDictionary()
+# Pollers used outside of any benchmark.
+_global_pollers = {}
+_pollers_lock = threading.Lock()
+
+
+class BatchStatusPoller(object):
+  """Answers status lookups of many keys with one batched request per tick.
+
+  Attributes:
+    interval: float. The current number of seconds between two fetches.
+    num_fetches: int. The number of batched requests issued so far.
+  """
+
+  def __init__(self, fetch_func, min_interval, max_interval,
+               clock=time.time, sleep=time.sleep):
+    """Initializes the poller.
+
+    Args:
+      fetch_func: function. Called with a list of keys, it returns a dict
+          mapping each key that was found to its status. Keys that are
+          missing from the result do not exist.
+      min_interval: float. Lower bound on the interval between fetches.
+      max_interval: float. Upper bound on the interval between fetches.
+      clock: function returning the current time in seconds.
+      sleep: function that sleeps for a number of seconds.
+    """
+    self._fetch_func = fetch_func
+    self._min_interval = min_interval
+    self._max_interval = max(min_interval, max_interval)
+    self._clock = clock
+    self._sleep = sleep
+    self._cond = threading.Condition()
+    self.interval = min_interval
+    self.num_fetches = 0
+    # Number of callers waiting for each key.
+    self._waiting = {}
+    self._results = {}
+    self._errors = {}
+    # Incremented each time a fetch completes.
+    self._generation = 0
+    # Whether a caller is waiting for the next tick in order to fetch.
+    self._scheduled = False
+    # Whether the keys of the fetch in progress have already been chosen.
+    self._in_flight = False
+    self._last_fetch_time = None
+
+  def GetStatus(self, key):
+    """Returns the status of 'key', or None if it does not exist.
+
+    Blocks until a batched request that started after this call completes.
+
+    Raises:
+      Exception: Whatever the fetch function raised for the batch that
+          included 'key'.
+    """
+    with self._cond:
+      self._waiting[key] = self._waiting.get(key, 0) + 1
+      # A fetch whose keys were already chosen may not include this key.
+      needed = self._generation + (2 if self._in_flight else 1)
+      try:
+        while self._generation < needed:
+          if self._scheduled:
+            self._cond.wait(1)
+          else:
+            self._FetchNextTick()
+        if key in self._errors:
+          raise self._errors[key]
+        return self._results.get(key)
+      finally:
+        self._waiting[key] -= 1
+        if not self._waiting[key]:
+          del self._waiting[key]
+
+  def _FetchNextTick(self):
+    """Waits for the next tick and fetches the status of all waiting keys.
+
+    The first fetch after an idle period is issued immediately. Later ones
+    start no sooner than the current interval after the previous one, which
+    lets callers that arrive in the meantime join the batch.
+
+    Must be called with self._cond held. The lock is released while waiting
+    and fetching.
+    """
+    self._scheduled = True
+    results, error = {}, None
+    try:
+      delay = 0
+      if self._last_fetch_time is not None:
+        delay = self._last_fetch_time + self.interval - self._clock()
+      if delay > 0:
+        self._cond.release()
+        try:
+          self._sleep(delay)
+        finally:
+          self._cond.acquire()
+      keys = sorted(self._waiting)
+      self._in_flight = True
+      self._last_fetch_time = self._clock()
+      self._cond.release()
+      try:
+        results = self._fetch_func(keys)
+      except Exception as e:  # pylint: disable=broad-except
+        logging.warning('Batched status request for %d resource(s) failed: '
+                        '%s', len(keys), e)
+        error = e
+      finally:
+        self._cond.acquire()
+      self.num_fetches += 1
+      if error is None:
+        changed = any(self._results.get(key) != results.get(key)
+                      for key in keys)
+        for key in keys:
+          if key in results:
+            self._results[key] = results[key]
+          else:
+            self._results.pop(key, None)
+        self._errors = {}
+        self._Adapt(changed)
+      else:
+        self._errors = {key: error for key in keys}
+      self._generation += 1
+    finally:
+      self._scheduled = False
+      self._in_flight = False
+      self._cond.notify_all()
+
+  def _Adapt(self, changed):
+    """Shortens the interval after changes and lengthens it otherwise."""
+    if changed:
+      self.interval = max(self._min_interval, self.interval / 2)
+    else:
+      self.interval = min(self._max_interval,
+                          max(self.interval * 1.5, self._min_interval, 0.1))
+
+
+def GetPoller(poller_key, fetch_func):
+  """Returns the current benchmark's BatchStatusPoller for 'poller_key'.
+
+  Args:
+    poller_key: hashable. Identifies the kind and location of the resources
+        polled, e.g. ('aws', 'instances', 'us-east-1').
+    fetch_func: function. See BatchStatusPoller. Only used when the poller
+        is created.
+  """
+  spec = context.GetThreadBenchmarkSpec()
+  with _pollers_lock:
+    if spec is None:
+      pollers = _global_pollers
+    else:
+      pollers = _pollers_by_spec.setdefault(spec, {})
+    if poller_key not in pollers:
+      pollers[poller_key] = BatchStatusPoller(
+          fetch_func, FLAGS.status_poll_min_interval or 0,
+          FLAGS.status_poll_max_interval or 0)
+    return pollers[poller_key]
+
+
+def GetStatus(poller_key, fetch_func, key):
+  """Returns the status of 'key' from the poller for 'poller_key'."""
+  return GetPoller(poller_key, fetch_func).GetStatus(key)
@@ -18,8 +18,8 @@ http://collectd.org
 
 import logging
 import os
-import posixpath
 
+from perfkitbenchmarker import artifact_collection
 from perfkitbenchmarker import events
 from perfkitbenchmarker import flags
 from perfkitbenchmarker import vm_util
@@ -43,7 +43,9 @@ class _CollectdCollector(object):
     # On the remote host, CSV files are in:
     # self.csv_dir/<fqdn>/<category>.
     # Since AWS VMs have a FQDN different from the VM name, we rename locally.
-    vm.PullFile(local_dir, posixpath.join(collectd.CSV_DIR, '*', ''))
+    artifact_collection.CollectArtifacts(
+        vm, collectd.CSV_DIR, ['*'], local_dir, label='collectd',
+        strip_components=1, manifest_dir=self.target_dir)
 
   def Before(self, unused_sender, benchmark_spec):
     """Install collectd.
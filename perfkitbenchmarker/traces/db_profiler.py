@@ -0,0 +1,500 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Records a database server's own statistics during benchmark runs.
+
+Database benchmarks only report what their clients measure. With --db_profiler,
+the server VMs of the database benchmarks registered below periodically dump
+the database's statistics (e.g. nodetool tpstats, redis INFO or SHOW GLOBAL
+STATUS) for the whole run phase. Each dump is then turned into samples
+timestamped on the server's clock, so that they can be lined up with the
+client's time series. Counters are reported as rates over the interval since
+the previous dump.
+
+Other benchmarks can add their database with RegisterProfiler.
+"""
+
+import logging
+import pipes
+import posixpath
+import re
+import threading
+import time
+import uuid
+
+from perfkitbenchmarker import artifact_collection
+from perfkitbenchmarker import events
+from perfkitbenchmarker import flags
+from perfkitbenchmarker import sample
+from perfkitbenchmarker import vm_util
+from perfkitbenchmarker.linux_packages import aerospike_server
+from perfkitbenchmarker.linux_packages import cassandra
+from perfkitbenchmarker.linux_packages import redis_server
+
+flags.DEFINE_boolean('db_profiler', False,
+                     'Periodically collect the database\'s own statistics on '
+                     'the server VMs of database benchmarks during each '
+                     'benchmark run, and report them as time series.')
+flags.DEFINE_integer('db_profiler_interval', 10,
+                     'Seconds between two collections of the database\'s '
+                     'statistics. Only applicable when --db_profiler is '
+                     'specified.', lower_bound=1)
+
+FLAGS = flags.FLAGS
+
+GAUGE = 'gauge'
+COUNTER = 'counter'
+
+# Starts each dump in the output file, followed by the time of the dump.
+_DUMP_MARKER = '#db_profiler'
+
+_NUMBER_RE = re.compile(r'-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?')
+_SIZE_SUFFIXES = {'b': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3,
+                  't': 1024 ** 4}
+
+# Maps benchmark names to the server VM group and profiler of their database.
+_PROFILERS = {}
+
+
+def RegisterProfiler(benchmark_name, vm_group, profiler_class):
+  """Profiles the database servers of a benchmark when --db_profiler is set.
+
+  Args:
+    benchmark_name: string. The name of the benchmark.
+    vm_group: string. The VM group of the database servers.
+    profiler_class: The BaseDbProfiler subclass for the database.
+  """
+  _PROFILERS[benchmark_name] = vm_group, profiler_class
+
+
+def _ParseNumber(value):
+  """Returns the first number in 'value', or None if it has none."""
+  match = _NUMBER_RE.search(value)
+  return float(match.group(0)) if match else None
+
+
+class BaseDbProfiler(object):
+  """Collects the statistics of a database on one of its server VMs.
+
+  Attributes:
+    NAME: string. The database name, which prefixes the metric names.
+    STATS: list of (stat, kind, unit) tuples. The statistics to report, as
+        named by Parse. Counters are reported as rates, with 'unit' being the
+        unit of the rate.
+  """
+
+  NAME = None
+  STATS = []
+
+  def Prepare(self, vm):
+    """Installs what the command returned by GetCommand needs on 'vm'."""
+    pass
+
+  def GetCommand(self, vm):
+    """Returns the shell command that dumps the statistics on 'vm'."""
+    raise NotImplementedError()
+
+  def Parse(self, output):
+    """Parses a dump of the statistics.
+
+    Args:
+      output: string. The output of the command returned by GetCommand.
+
+    Returns:
+      A dict mapping statistic names to their values.
+    """
+    raise NotImplementedError()
+
+
+class CassandraProfiler(BaseDbProfiler):
+  """Collects nodetool tpstats, cfstats and gcstats."""
+
+  NAME = 'cassandra'
+  STATS = [
+      ('MutationStage pending', GAUGE, 'tasks'),
+      ('MutationStage completed', COUNTER, 'tasks per second'),
+      ('ReadStage pending', GAUGE, 'tasks'),
+      ('ReadStage completed', COUNTER, 'tasks per second'),
+      ('CompactionExecutor pending', GAUGE, 'tasks'),
+      ('MemtableFlushWriter pending', GAUGE, 'tasks'),
+      ('MUTATION dropped', COUNTER, 'messages per second'),
+      ('READ dropped', COUNTER, 'messages per second'),
+      ('Read Latency', GAUGE, 'ms'),
+      ('Write Latency', GAUGE, 'ms'),
+      ('Pending Flushes', GAUGE, 'flushes'),
+      ('SSTable count', GAUGE, 'sstables'),
+      ('GC elapsed percent', GAUGE, '%'),
+      ('GC max elapsed', GAUGE, 'ms')]
+
+  # The keyspace created by cassandra_ycsb.
+  KEYSPACE = 'usertable'
+
+  def GetCommand(self, vm):
+    return '{0} tpstats; {0} cfstats {1}; {0} gcstats'.format(
+        cassandra.NODETOOL, self.KEYSPACE)
+
+  def Parse(self, output):
+    stats = {}
+    lines = output.splitlines()
+    for index, line in enumerate(lines):
+      fields = line.split()
+      if 'GC Elapsed' in line and index + 1 < len(lines):
+        # gcstats covers the time since it last ran.
+        values = [_ParseNumber(value) for value in lines[index + 1].split()]
+        if len(values) >= 3 and None not in values[:3] and values[0]:
+          stats['GC max elapsed'] = values[1]
+          stats['GC elapsed percent'] = 100.0 * values[2] / values[0]
+      elif ':' in line:
+        key, value = line.split(':', 1)
+        value = _ParseNumber(value)
+        if value is not None:
+          stats.setdefault(key.strip(), value)
+      elif len(fields) == 6 and all(field.isdigit() for field in fields[1:]):
+        pool = fields[0]
+        stats[pool + ' active'] = float(fields[1])
+        stats[pool + ' pending'] = float(fields[2])
+        stats[pool + ' completed'] = float(fields[3])
+        stats[pool + ' blocked'] = float(fields[4])
+      elif len(fields) == 2 and fields[1].isdigit():
+        stats[fields[0] + ' dropped'] = float(fields[1])
+    return stats
+
+
+class MongoDbProfiler(BaseDbProfiler):
+  """Collects a row of mongostat."""
+
+  NAME = 'mongodb'
+  STATS = [
+      ('insert', GAUGE, 'operations per second'),
+      ('query', GAUGE, 'operations per second'),
+      ('update', GAUGE, 'operations per second'),
+      ('delete', GAUGE, 'operations per second'),
+      ('getmore', GAUGE, 'operations per second'),
+      ('faults', GAUGE, 'faults per second'),
+      ('% dirty', GAUGE, '%'),
+      ('% used', GAUGE, '%'),
+      ('res', GAUGE, 'bytes'),
+      ('qr', GAUGE, 'clients'),
+      ('qw', GAUGE, 'clients'),
+      ('ar', GAUGE, 'clients'),
+      ('aw', GAUGE, 'clients'),
+      ('netIn', GAUGE, 'bytes per second'),
+      ('netOut', GAUGE, 'bytes per second'),
+      ('conn', GAUGE, 'connections')]
+
+  def Prepare(self, vm):
+    # The server packages of some distributions do not include mongostat.
+    vm.Install('mongodb_tools')
+
+  def GetCommand(self, vm):
+    return 'mongostat --rowcount 1 1'
+
+  def Parse(self, output):
+    """Parses the header and the row of mongostat.
+
+    mongostat right-aligns its values under its column names, some of which
+    contain spaces, so each value is named by the header text above it.
+    """
+    lines = [line for line in output.splitlines() if line.strip()]
+    stats = {}
+    if len(lines) < 2:
+      return stats
+    header, row = lines[-2:]
+    column_start = 0
+    for match in re.finditer(r'\S+', row):
+      name = header[column_start:match.end()].strip()
+      column_start = match.end()
+      names = name.split('|')
+      values = match.group(0).lstrip('*').split('|')
+      if len(names) != len(values):
+        continue
+      for name, value in zip(names, values):
+        number = _ParseNumber(value)
+        if number is None:
+          continue
+        suffix = value[-1].lower()
+        stats[name] = number * _SIZE_SUFFIXES.get(suffix, 1)
+    return stats
+
+
+class RedisProfiler(BaseDbProfiler):
+  """Collects INFO from all Redis processes on the VM, summing them."""
+
+  NAME = 'redis'
+  STATS = [
+      ('total_commands_processed', COUNTER, 'commands per second'),
+      ('connected_clients', GAUGE, 'clients'),
+      ('blocked_clients', GAUGE, 'clients'),
+      ('used_memory', GAUGE, 'bytes'),
+      ('used_cpu_sys', COUNTER, 'cpu seconds per second'),
+      ('used_cpu_user', COUNTER, 'cpu seconds per second'),
+      ('keyspace_misses', COUNTER, 'misses per second'),
+      ('evicted_keys', COUNTER, 'keys per second'),
+      ('total_net_input_bytes', COUNTER, 'bytes per second'),
+      ('total_net_output_bytes', COUNTER, 'bytes per second')]
+
+  def GetCommand(self, vm):
+    ports = [str(redis_server.REDIS_FIRST_PORT + i)
+             for i in xrange(FLAGS.redis_total_num_processes)]
+    return 'for port in {0}; do {1}/src/redis-cli -p $port INFO; done'.format(
+        ' '.join(ports), redis_server.REDIS_DIR)
+
+  def Parse(self, output):
+    stats = {}
+    for line in output.splitlines():
+      key, _, value = line.partition(':')
+      try:
+        value = float(value)
+      except ValueError:
+        continue
+      stats[key] = stats.get(key, 0) + value
+    return stats
+
+
+class AerospikeProfiler(BaseDbProfiler):
+  """Collects the statistics info command over the telnet port.
+
+  asinfo is part of the Aerospike tools, which are not installed with the
+  server, so the command is sent to the same port that is used to check that
+  the server is up.
+  """
+
+  NAME = 'aerospike'
+  STATS = [
+      ('stat_read_reqs', COUNTER, 'requests per second'),
+      ('stat_write_reqs', COUNTER, 'requests per second'),
+      ('stat_read_errs_other', COUNTER, 'errors per second'),
+      ('stat_write_errs', COUNTER, 'errors per second'),
+      ('client_connections', GAUGE, 'connections'),
+      ('used-bytes-memory', GAUGE, 'bytes'),
+      ('used-bytes-disk', GAUGE, 'bytes'),
+      ('waiting_transactions', GAUGE, 'transactions'),
+      ('queue', GAUGE, 'transactions')]
+
+  def GetCommand(self, vm):
+    return '(echo -e "statistics\\n"; sleep 1) | netcat -q 1 {0} {1}'.format(
+        vm.internal_ip, aerospike_server.AEROSPIKE_DEFAULT_TELNET_PORT)
+
+  def Parse(self, output):
+    stats = {}
+    for pair in output.strip().split(';'):
+      key, _, value = pair.partition('=')
+      try:
+        stats[key] = float(value)
+      except ValueError:
+        pass
+    return stats
+
+
+class MySqlProfiler(BaseDbProfiler):
+  """Collects SHOW GLOBAL STATUS from the managed database instance.
+
+  The instance is not a VM, so the client VM queries it.
+  """
+
+  NAME = 'mysql'
+  STATS = [
+      ('Questions', COUNTER, 'queries per second'),
+      ('Com_commit', COUNTER, 'commits per second'),
+      ('Threads_running', GAUGE, 'threads'),
+      ('Threads_connected', GAUGE, 'threads'),
+      ('Innodb_rows_read', COUNTER, 'rows per second'),
+      ('Innodb_rows_inserted', COUNTER, 'rows per second'),
+      ('Innodb_rows_updated', COUNTER, 'rows per second'),
+      ('Innodb_data_reads', COUNTER, 'reads per second'),
+      ('Innodb_data_writes', COUNTER, 'writes per second'),
+      ('Innodb_buffer_pool_pages_dirty', GAUGE, 'pages'),
+      ('Innodb_buffer_pool_wait_free', COUNTER, 'waits per second'),
+      ('Innodb_row_lock_waits', COUNTER, 'waits per second'),
+      ('Innodb_row_lock_current_waits', GAUGE, 'waits')]
+
+  def GetCommand(self, vm):
+    return ('mysql -h {0} -u {1} -p{2} --batch --skip-column-names '
+            '-e "SHOW GLOBAL STATUS"'.format(
+                vm.db_instance_address, vm.db_instance_master_user,
+                vm.db_instance_master_password))
+
+  def Parse(self, output):
+    stats = {}
+    for line in output.splitlines():
+      fields = line.split('\t')
+      if len(fields) != 2:
+        continue
+      try:
+        stats[fields[0]] = float(fields[1])
+      except ValueError:
+        pass
+    return stats
+
+
+RegisterProfiler('cassandra_ycsb', 'workers', CassandraProfiler)
+RegisterProfiler('mongodb_ycsb', 'workers', MongoDbProfiler)
+RegisterProfiler('redis_ycsb', 'workers', RedisProfiler)
+RegisterProfiler('aerospike_ycsb', 'workers', AerospikeProfiler)
+RegisterProfiler('mysql_service', 'default', MySqlProfiler)
+
+
+def ParseDumps(output):
+  """Splits the output of a profiled run into its dumps.
+
+  Args:
+    output: string. The content of the profiler's output file.
+
+  Returns:
+    A list of (timestamp, output) tuples, one per dump.
+  """
+  dumps = []
+  for line in output.splitlines(True):
+    if line.startswith(_DUMP_MARKER):
+      dumps.append((float(line.split()[1]), []))
+    elif dumps:
+      dumps[-1][1].append(line)
+  return [(timestamp, ''.join(lines)) for timestamp, lines in dumps]
+
+
+def GetSamples(profiler, dumps, start_time, metadata):
+  """Returns time-series samples of the statistics in 'dumps'.
+
+  Args:
+    profiler: BaseDbProfiler. The profiler that made the dumps.
+    dumps: list of (timestamp, output) tuples, as returned by ParseDumps.
+    start_time: float. The start of the run phase. Each sample's metadata has
+        its time since then as 'interval_start'.
+    metadata: dict. Metadata to add to each sample.
+
+  Returns:
+    A list of sample.Sample objects.
+  """
+  samples = []
+  previous_time, previous_stats = None, {}
+  for timestamp, output in dumps:
+    stats = profiler.Parse(output)
+    for stat, kind, unit in profiler.STATS:
+      value = stats.get(stat)
+      if value is None:
+        continue
+      if kind == COUNTER:
+        previous = previous_stats.get(stat)
+        # Skip the first dump and counters that were reset.
+        if previous is None or value < previous or timestamp <= previous_time:
+          continue
+        value = (value - previous) / (timestamp - previous_time)
+      sample_metadata = metadata.copy()
+      sample_metadata['interval_start'] = timestamp - start_time
+      samples.append(sample.Sample('%s %s' % (profiler.NAME, stat), value,
+                                   unit, sample_metadata, timestamp=timestamp))
+    previous_time, previous_stats = timestamp, stats
+  return samples
+
+
+class _DbProfilerCollector(object):
+  """Runs the database's profiler on the server VMs during the run phase."""
+
+  def __init__(self, interval):
+    self.interval = interval
+    self._lock = threading.Lock()
+    self._pids = {}
+    self._file_names = {}
+    self._samples = []
+    self._start_time = 0
+
+  def _GetServerVms(self, benchmark_spec):
+    """Returns the profiler and (role, vm) tuples of the spec's servers."""
+    if benchmark_spec.name not in _PROFILERS:
+      return None, []
+    vm_group, profiler_class = _PROFILERS[benchmark_spec.name]
+    vms = benchmark_spec.vm_groups.get(vm_group, [])
+    return profiler_class(), [('%s_%s' % (vm_group, index), vm)
+                              for index, vm in enumerate(vms)]
+
+  def _StartOnVm(self, vm, profiler, suffix):
+    profiler.Prepare(vm)
+    output_file = posixpath.join(
+        vm_util.VM_TMP_DIR, '{0}{1}.txt'.format(vm.name, suffix))
+    loop = ('while true; do echo "{marker} $(date +%s.%N)"; {command}; '
+            'sleep {interval}; done').format(
+                marker=_DUMP_MARKER, command=profiler.GetCommand(vm),
+                interval=self.interval)
+    stdout, _ = vm.RemoteCommand(
+        'nohup bash -c {0} > {1} 2>&1 & echo $!'.format(
+            pipes.quote(loop), output_file))
+    with self._lock:
+      self._pids[vm.name] = stdout.strip()
+      self._file_names[vm.name] = output_file
+
+  def _StopOnVm(self, vm, vm_role, profiler):
+    """Stops the profiler on 'vm' and returns the samples of its dumps."""
+    with self._lock:
+      if vm.name not in self._pids:
+        logging.warn('No db_profiler PID for %s', vm.name)
+        return []
+      pid = self._pids.pop(vm.name)
+      file_name = self._file_names.pop(vm.name)
+    vm.RemoteCommand('kill {0} || true'.format(pid))
+    try:
+      local_path, = artifact_collection.CollectArtifacts(
+          vm, posixpath.dirname(file_name), [posixpath.basename(file_name)],
+          vm_util.GetTempDir(), label='db_profiler')
+    except Exception:
+      logging.exception('Failed fetching db_profiler result from %s.',
+                        vm.name)
+      return []
+    with open(local_path) as output_file:
+      dumps = ParseDumps(output_file.read())
+    samples = GetSamples(profiler, dumps, self._start_time,
+                         {'vm_role': vm_role,
+                          'db_profiler_interval': self.interval})
+    if dumps and not samples:
+      logging.warning('None of the %d db_profiler dumps of %s had %s '
+                      'statistics. See %s.', len(dumps), vm.name,
+                      profiler.NAME, local_path)
+    return samples
+
+  def Start(self, sender, benchmark_spec):
+    """Starts the profiler on the server VMs of 'benchmark_spec'."""
+    profiler, server_vms = self._GetServerVms(benchmark_spec)
+    if not server_vms:
+      return
+    suffix = '-{0}-{1}-db_profiler'.format(benchmark_spec.uid,
+                                           str(uuid.uuid4())[:8])
+    self._start_time = time.time()
+    vm_util.RunThreaded(self._StartOnVm,
+                        [((vm, profiler, suffix), {}) for _, vm in server_vms])
+
+  def Stop(self, sender, benchmark_spec):
+    """Stops the profiler on the server VMs and parses their dumps."""
+    profiler, server_vms = self._GetServerVms(benchmark_spec)
+    if not server_vms:
+      return
+    results = vm_util.RunThreaded(
+        self._StopOnVm,
+        [((vm, role, profiler), {}) for role, vm in server_vms])
+    self._samples = [s for vm_samples in results for s in vm_samples]
+
+  def AddSamples(self, sender, benchmark_spec, samples):
+    """Adds the samples of the last run to 'samples'."""
+    samples.extend(self._samples)
+    self._samples = []
+
+
+def Register(parsed_flags):
+  """Registers the db_profiler collector if FLAGS.db_profiler is set."""
+  if not parsed_flags.db_profiler:
+    return
+  logging.debug('Registering db_profiler collector with interval %s.',
+                parsed_flags.db_profiler_interval)
+  collector = _DbProfilerCollector(parsed_flags.db_profiler_interval)
+  events.before_phase.connect(collector.Start, events.RUN_PHASE, weak=False)
+  events.after_phase.connect(collector.Stop, events.RUN_PHASE, weak=False)
+  events.samples_created.connect(
+      collector.AddSamples, events.RUN_PHASE, weak=False)
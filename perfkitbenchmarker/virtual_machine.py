@@ -19,8 +19,11 @@ operate on the VM: boot, shutdown, etc.
 """
 
 import abc
+import collections
+import logging
 import os.path
 import threading
+import time
 
 import jinja2
 
@@ -28,6 +31,7 @@ from perfkitbenchmarker import background_workload
 from perfkitbenchmarker import data
 from perfkitbenchmarker import disk
 from perfkitbenchmarker import errors
+from perfkitbenchmarker import events
 from perfkitbenchmarker import flags
 from perfkitbenchmarker import resource
 from perfkitbenchmarker import vm_util
@@ -44,6 +48,13 @@ _VM_REGISTRY = {}
 flags.DEFINE_list('vm_metadata', [], 'Metadata to add to the vm '
                   'via the provider\'s AddMetadata function. It expects'
                   'key:value pairs')
+flags.DEFINE_boolean('bulk_create_vms', True,
+                     'If true, VMs with identical specs are created with '
+                     'batched provider requests where the provider supports '
+                     'it, instead of one request per VM.')
+flags.DEFINE_integer('bulk_create_timeout', 600,
+                     'The number of seconds to wait for the instances of a '
+                     'batched create request to appear.')
 
 
 def GetVmSpecClass(cloud):
@@ -56,6 +67,31 @@ def GetVmClass(cloud, os_type):
   return _VM_REGISTRY.get((cloud, os_type))
 
 
+def BulkCreateVms(vms):
+  """Creates the VMs that can share batched create requests.
+
+  VMs of the same class with equal bulk create keys are created together by
+  their class's BulkCreate. The remaining VMs, and those whose batched request
+  was rejected, are left to be created individually by their Create method.
+
+  Args:
+    vms: list of BaseVirtualMachine objects.
+  """
+  if not FLAGS.bulk_create_vms:
+    return
+  groups = collections.OrderedDict()
+  for vm in vms:
+    if vm.created:
+      continue
+    key = vm.GetBulkCreateKey()
+    if key is not None:
+      groups.setdefault((type(vm), key), []).append(vm)
+  groups = [group for group in groups.itervalues() if len(group) > 1]
+  if groups:
+    vm_util.RunThreaded(lambda group: type(group[0]).BulkCreate(group),
+                        groups)
+
+
 class AutoRegisterVmSpecMeta(spec.BaseSpecMetaClass):
   """Metaclass which allows VmSpecs to automatically be registered."""
 
@@ -239,6 +275,13 @@ class BaseVirtualMachine(resource.BaseResource):
 
     self.network = None
     self.firewall = None
+    # The number of VMs created by the same batched request as this one.
+    self.bulk_create_size = 1
+    # The times at which the steps of BenchmarkSpec.PrepareVm that follow
+    # boot completed.
+    self.startup_complete_time = None
+    self.scratch_disks_ready_time = None
+    self.prepare_complete_time = None
 
   def __repr__(self):
     return '<BaseVirtualMachine [ip={0}, internal_ip={1}]>'.format(
@@ -249,6 +292,82 @@ class BaseVirtualMachine(resource.BaseResource):
       return self.ip_address
     return super(BaseVirtualMachine, self).__str__()
 
+  def GetBulkCreateKey(self):
+    """Returns a key shared by the VMs that one request can create.
+
+    VMs of the same class whose keys are equal are created together by
+    BulkCreate. The key must not depend on anything _CreateDependencies sets.
+
+    Returns:
+      A hashable key, or None (the default) if the VM must be created on its
+      own.
+    """
+    return None
+
+  @classmethod
+  def _BulkCreate(cls, vms):
+    """Issues the batched requests that create the instances of 'vms'.
+
+    Called after the dependencies of every VM have been created. The batched
+    requests must either create every instance or none of them, and must
+    record on each VM whatever _Exists, _PostCreate and _Delete need to find
+    its instance (e.g. its id).
+
+    Args:
+      vms: list of VMs of this class with equal bulk create keys.
+
+    Raises:
+      errors.Resource.CreationError: If the instances were not created.
+    """
+    raise NotImplementedError()
+
+  @classmethod
+  def BulkCreate(cls, vms):
+    """Creates VMs with identical specs using batched requests.
+
+    Every VM keeps its own create_start_time and create_end_time, so per-VM
+    create and boot latencies are reported as if the VMs had been created
+    individually. VMs created here have 'created' set, so their Create method
+    only waits until they are ready and runs _PostCreate. If the batched
+    request is rejected, the VMs are left to be created by Create.
+
+    Args:
+      vms: list of VMs of this class with equal bulk create keys.
+    """
+    vm_util.RunThreaded(lambda vm: vm._CreateDependencies(), vms)
+    create_start_time = time.time()
+    for vm in vms:
+      vm.create_start_time = vm.create_start_time or create_start_time
+    logging.info('Creating %d %s VMs with batched requests.', len(vms),
+                 cls.__name__)
+    try:
+      cls._BulkCreate(vms)
+    except errors.Resource.CreationError as e:
+      logging.warning('Batched creation of %d VMs failed, creating them '
+                      'individually: %s', len(vms), e)
+      return
+    for vm in vms:
+      vm.bulk_create_size = len(vms)
+      events.resource_state_changed.send(vm, state=resource.REQUESTED)
+    vm_util.RunThreaded(lambda vm: vm._WaitUntilBulkCreated(), vms)
+
+  def _WaitUntilBulkCreated(self):
+    """Waits until the instance requested by _BulkCreate exists."""
+    @vm_util.Retry(poll_interval=1, max_retries=-1,
+                   timeout=FLAGS.bulk_create_timeout,
+                   retryable_exceptions=(
+                       errors.Resource.RetryableCreationError,))
+    def WaitUntilExists():
+      try:
+        if not self._Exists():
+          raise errors.Resource.RetryableCreationError(
+              '%s does not exist yet.' % self.name)
+      except NotImplementedError:
+        pass
+
+    WaitUntilExists()
+    self._SetCreated()
+
   def CreateScratchDisk(self, disk_spec):
     """Create a VM's scratch disk.
 
@@ -25,13 +25,15 @@ from perfkitbenchmarker import import_util
 
 
 def _LoadPackages():
-  """Imports all package modules and returns a dictionary of packages.
+  """Returns a dictionary of packages.
 
-  This imports all package modules in this directory and then creates a
-  mapping from module names to the modules themselves and returns it.
+  This lists all package modules in this directory and then creates a
+  mapping from module names to the modules, which are imported the first time
+  they are looked up.
   """
-  return {module.__name__.split('.')[-1]: module for module in
-          import_util.LoadModulesForPath(__path__, __name__)}
+  return import_util.LazyModuleDict(
+      {name.split('.')[-1]: name for name in
+       import_util.ListModuleNames(__path__, __name__)})
 
 
 PACKAGES = _LoadPackages()
@@ -280,7 +280,7 @@ class WindowsMixin(virtual_machine.BaseOsMixin):
 
     if data_disk.disk_type != disk.LOCAL:
       data_disk.Create()
-      data_disk.Attach(self)
+      data_disk.TimedAttach(self)
 
     # Create and then run a Diskpart script that will initialize the disks,
     # create a volume, and then format and mount the volume.
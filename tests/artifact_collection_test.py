@@ -0,0 +1,167 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for perfkitbenchmarker.artifact_collection."""
+
+import json
+import os
+import shutil
+import StringIO
+import tarfile
+import tempfile
+import unittest
+
+import mock
+
+from perfkitbenchmarker import artifact_collection
+
+
+def _MakeArchive(files):
+  """Returns the bytes of a gzipped tar holding 'files' (name -> contents)."""
+  buf = StringIO.StringIO()
+  with tarfile.open(fileobj=buf, mode='w:gz') as tar:
+    for name, contents in sorted(files.items()):
+      info = tarfile.TarInfo(name)
+      info.size = len(contents)
+      tar.addfile(info, StringIO.StringIO(contents))
+  return buf.getvalue()
+
+
+class BandwidthBudgetTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.now = 100.0
+    self.sleeps = []
+
+  def _Sleep(self, seconds):
+    self.sleeps.append(seconds)
+    self.now += seconds
+
+  def _Budget(self, bytes_per_second):
+    return artifact_collection._BandwidthBudget(
+        bytes_per_second, clock=lambda: self.now, sleep=self._Sleep)
+
+  def testUnlimited(self):
+    budget = self._Budget(None)
+    self.assertEqual(0, budget.Acquire(10 ** 9))
+    self.assertEqual([], self.sleeps)
+
+  def testPacesTransfers(self):
+    budget = self._Budget(1000)
+    self.assertEqual(0, budget.Acquire(3000))
+    self.assertEqual(3.0, budget.Acquire(1000))
+    self.assertEqual(1.0, budget.Acquire(1000))
+    self.assertEqual([3.0, 1.0], self.sleeps)
+
+  def testRefillsWhileIdle(self):
+    budget = self._Budget(1000)
+    budget.Acquire(2000)
+    self.now += 10
+    self.assertEqual(0, budget.Acquire(500))
+
+
+class CollectArtifactsTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.temp_dir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.temp_dir)
+    p = mock.patch(artifact_collection.vm_util.__name__ + '.GetTempDir',
+                   return_value=self.temp_dir)
+    p.start()
+    self.addCleanup(p.stop)
+    p = mock.patch.object(artifact_collection, '_GetBudget', return_value=(
+        mock.MagicMock(), artifact_collection._BandwidthBudget(None)))
+    p.start()
+    self.addCleanup(p.stop)
+    self.archive = _MakeArchive({'./a/x.log': 'abc', './b.log': 'defg'})
+    self.vm = mock.MagicMock()
+    self.vm.name = 'pkb-vm-0'
+
+  def testCollectArtifacts(self):
+    self.vm.RemoteCommand.return_value = (
+        '%d\n' % len(self.archive), '')
+
+    def PullFile(local_path, remote_path):
+      with open(local_path, 'wb') as fp:
+        fp.write(self.archive)
+    self.vm.PullFile.side_effect = PullFile
+
+    local_dir = os.path.join(self.temp_dir, 'out')
+    paths = artifact_collection.CollectArtifacts(
+        self.vm, '/opt/logs', ['*.log', 'a'], local_dir, label='test')
+
+    self.assertEqual(
+        sorted([os.path.join(local_dir, 'a', 'x.log'),
+                os.path.join(local_dir, 'b.log')]), sorted(paths))
+    with open(os.path.join(local_dir, 'b.log')) as fp:
+      self.assertEqual('defg', fp.read())
+    tar_command = self.vm.RemoteCommand.call_args_list[1][0][0]
+    self.assertIn('cd /opt/logs && tar -czf', tar_command)
+    self.assertIn('*.log a', tar_command)
+    with open(os.path.join(local_dir,
+                           'pkb-vm-0-test-manifest.json')) as fp:
+      manifest = json.load(fp)
+    self.assertEqual(len(self.archive), manifest['compressed_bytes'])
+    self.assertEqual(7, manifest['uncompressed_bytes'])
+    self.assertEqual(2, len(manifest['files']))
+    # The local copy of the archive is removed after unpacking.
+    self.assertEqual(['out'], os.listdir(self.temp_dir))
+
+  def testStripComponents(self):
+    self.archive = _MakeArchive({'host-a/cpu-0/user': 'abc',
+                                 'host-b/memory/used': 'defg'})
+    self.vm.RemoteCommand.return_value = ('%d\n' % len(self.archive), '')
+
+    def PullFile(local_path, remote_path):
+      with open(local_path, 'wb') as fp:
+        fp.write(self.archive)
+    self.vm.PullFile.side_effect = PullFile
+
+    local_dir = os.path.join(self.temp_dir, 'out')
+    paths = artifact_collection.CollectArtifacts(
+        self.vm, '/opt/csv', ['*'], local_dir, label='csv',
+        strip_components=1, manifest_dir=self.temp_dir)
+
+    self.assertEqual(
+        sorted([os.path.join(local_dir, 'cpu-0', 'user'),
+                os.path.join(local_dir, 'memory', 'used')]), sorted(paths))
+    self.assertEqual(['cpu-0', 'memory'], sorted(os.listdir(local_dir)))
+    self.assertIn('pkb-vm-0-csv-manifest.json', os.listdir(self.temp_dir))
+
+  def _OpenRemoteCommand(self, stdout, returncode=0):
+    process = mock.Mock(stdout=StringIO.StringIO(stdout),
+                        returncode=returncode)
+    process.communicate.return_value = ('', 'tar: error\n')
+    self.vm.OpenRemoteCommand.return_value = process
+    return process
+
+  def testStreamArtifacts(self):
+    process = self._OpenRemoteCommand(self.archive)
+    contents = {name: fp.read() for name, fp in
+                artifact_collection.StreamArtifacts(self.vm, '~', ['*'])}
+    self.assertEqual({'./a/x.log': 'abc', './b.log': 'defg'}, contents)
+    self.assertEqual([], os.listdir(self.temp_dir))
+    self.assertIn('tar -czf - *',
+                  self.vm.OpenRemoteCommand.call_args[0][0])
+    process.communicate.assert_called_once_with()
+
+  def testStreamArtifactsFailure(self):
+    self._OpenRemoteCommand(self.archive[:20], returncode=2)
+    error = artifact_collection.errors.VirtualMachine.RemoteCommandError
+    with self.assertRaises(error):
+      list(artifact_collection.StreamArtifacts(self.vm, '~', ['*']))
+
+
+if __name__ == '__main__':
+  unittest.main()
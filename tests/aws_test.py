@@ -14,6 +14,7 @@
 
 """Tests for perfkitbenchmarker.providers.aws."""
 
+import copy
 import json
 import os.path
 import unittest
@@ -75,7 +76,7 @@ class AwsVpcExistsTestCase(unittest.TestCase):
     p.start()
     self.addCleanup(p.stop)
     self.vpc = aws_network.AwsVpc('region')
-    self.vpc.id = 'vpc-foo'
+    self.vpc.id = 'vpc-2289a647'
 
   def testVpcDeleted(self):
     response = '{"Vpcs": [] }'
@@ -107,7 +108,8 @@ class AwsVirtualMachineTestCase(unittest.TestCase):
     mocked_flags.temp_dir = 'tmp'
     p = mock.patch('perfkitbenchmarker.providers.aws.'
                    'util.IssueRetryableCommand')
-    p.start()
+    # Commands without output, e.g. create-tags.
+    p.start().return_value = ('', '')
     self.addCleanup(p.stop)
     p2 = mock.patch('perfkitbenchmarker.'
                     'vm_util.IssueCommand')
@@ -125,7 +127,7 @@ class AwsVirtualMachineTestCase(unittest.TestCase):
         aws_virtual_machine.AwsVmSpec('test_vm_spec.AWS', zone='us-east-1a',
                                       machine_type='c3.large',
                                       spot_price=123.45))
-    self.vm.id = 'i-foo'
+    self.vm.id = 'i-8ed83d71'
     self.vm.image = 'ami-12345'
     self.vm.client_token = '00000000-1111-2222-3333-444444444444'
     network_mock = mock.MagicMock()
@@ -198,6 +200,26 @@ class AwsVirtualMachineTestCase(unittest.TestCase):
 
     self.assertRaises(errors.Resource.CreationError, self.vm._CreateSpot)
 
+  def testBulkCreate(self):
+    vm_util.IssueCommand.side_effect = [(json.dumps({'Instances': [
+        {'InstanceId': 'i-1', 'PrivateIpAddress': '10.0.0.1'},
+        {'InstanceId': 'i-2', 'PrivateIpAddress': '10.0.0.2'}]}), '', 0)]
+    vms = [self.vm, copy.copy(self.vm)]
+
+    aws_virtual_machine.AwsVirtualMachine._BulkCreate(vms)
+
+    create_cmd = vm_util.IssueCommand.call_args[0][0]
+    self.assertIn('run-instances', create_cmd)
+    self.assertIn('--count=2', create_cmd)
+    self.assertEqual(['i-1', 'i-2'], [vm.id for vm in vms])
+    self.assertEqual(['10.0.0.1', '10.0.0.2'], [vm.internal_ip for vm in vms])
+
+  def testBulkCreateRejected(self):
+    vm_util.IssueCommand.side_effect = [('', 'InstanceLimitExceeded', 255)]
+    with self.assertRaises(errors.Resource.CreationError):
+      aws_virtual_machine.AwsVirtualMachine._BulkCreate(
+          [self.vm, copy.copy(self.vm)])
+
     def testDeleteCancelsSpotInstanceRequest(self):
       self.vm.spot_instance_request_id = 'sir-abc'
 
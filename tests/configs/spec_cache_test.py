@@ -0,0 +1,92 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for perfkitbenchmarker.configs.spec_cache."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from perfkitbenchmarker import flags
+from perfkitbenchmarker.configs import spec_cache
+from perfkitbenchmarker.linux_benchmarks import ping_benchmark
+
+
+class _FakeConfigSpec(object):
+
+  def __init__(self, value):
+    self.value = value
+
+
+class SpecCacheTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.flag_values = flags.FlagValues()
+    flags.DEFINE_integer('test_flag', 0, 'Test flag.',
+                         flag_values=self.flag_values)
+    flags.DEFINE_string('run_uri', None, 'Run URI.',
+                        flag_values=self.flag_values)
+    self.flag_values([''])
+    self.temp_dir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.temp_dir)
+    p = mock.patch(spec_cache.__name__ + '.FLAGS')
+    self.flags = p.start()
+    self.addCleanup(p.stop)
+    self.flags.config_cache_dir = None
+    self.addCleanup(spec_cache.Clear)
+
+  def _GetKey(self, user_config=None):
+    return spec_cache.GetKey(ping_benchmark, user_config or {},
+                             self.flag_values)
+
+  def testKeyDependsOnUserConfigAndFlags(self):
+    key = self._GetKey({'flags': {'test_flag': 1}})
+    self.assertEqual(key, self._GetKey({'flags': {'test_flag': 1}}))
+    self.assertNotEqual(key, self._GetKey({'flags': {'test_flag': 2}}))
+    self.flag_values.run_uri = 'abc'
+    self.assertEqual(key, self._GetKey({'flags': {'test_flag': 1}}))
+    self.flag_values.test_flag = 5
+    self.assertNotEqual(key, self._GetKey({'flags': {'test_flag': 1}}))
+
+  def testGetReturnsCopies(self):
+    key = self._GetKey()
+    self.assertIsNone(spec_cache.Get(key))
+    config_spec = _FakeConfigSpec([1])
+    spec_cache.Put(key, config_spec)
+    config_spec.value.append(2)
+    first = spec_cache.Get(key)
+    self.assertEqual([1], first.value)
+    first.value.append(3)
+    self.assertEqual([1], spec_cache.Get(key).value)
+
+  def testPersisted(self):
+    self.flags.config_cache_dir = os.path.join(self.temp_dir, 'cache')
+    key = self._GetKey()
+    spec_cache.Put(key, _FakeConfigSpec('persisted'))
+    spec_cache.Clear()
+    self.assertEqual('persisted', spec_cache.Get(key).value)
+    self.assertEqual([key + '.pickle'],
+                     os.listdir(self.flags.config_cache_dir))
+
+  def testNotPersistedByDefault(self):
+    key = self._GetKey()
+    spec_cache.Put(key, _FakeConfigSpec('memory'))
+    spec_cache.Clear()
+    self.assertIsNone(spec_cache.Get(key))
+
+
+if __name__ == '__main__':
+  unittest.main()
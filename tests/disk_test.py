@@ -13,8 +13,11 @@
 # limitations under the License.
 """Tests for perfkitbenchmarker.disk."""
 
+import threading
 import unittest
 
+import mock
+
 from perfkitbenchmarker import disk
 from perfkitbenchmarker import errors
 from tests import mock_flags
@@ -117,5 +120,73 @@ class BaseDiskSpecTestCase(unittest.TestCase):
     self.assertEqual(spec.num_striped_disks, 3)
 
 
+class _FakeDisk(disk.BaseDisk):
+  """Records how many of its instances are being attached at once."""
+
+  def __init__(self, disk_spec, tracker):
+    super(_FakeDisk, self).__init__(disk_spec)
+    self.tracker = tracker
+
+  def _Create(self):
+    pass
+
+  def _Delete(self):
+    pass
+
+  def Attach(self, vm):
+    self.tracker.Enter()
+    self.tracker.Exit()
+
+  def Detach(self):
+    pass
+
+
+class _ConcurrencyTracker(object):
+
+  def __init__(self, barrier_size):
+    self.lock = threading.Lock()
+    self.active = 0
+    self.max_active = 0
+    self.all_active = threading.Event()
+    self.barrier_size = barrier_size
+
+  def Enter(self):
+    with self.lock:
+      self.active += 1
+      self.max_active = max(self.max_active, self.active)
+      if self.active >= self.barrier_size:
+        self.all_active.set()
+    self.all_active.wait(5)
+
+  def Exit(self):
+    with self.lock:
+      self.active -= 1
+
+
+class StripedDiskTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.flags = mock_flags.PatchTestCaseFlags(self)
+    self.flags.scratch_disk_parallelism = 2
+    self.spec = disk.BaseDiskSpec(_COMPONENT, disk_size=10,
+                                  disk_type='remote', num_striped_disks=4)
+
+  def testAttachesDisksConcurrently(self):
+    tracker = _ConcurrencyTracker(barrier_size=2)
+    disks = [_FakeDisk(self.spec, tracker) for _ in xrange(4)]
+    striped_disk = disk.StripedDisk(self.spec, disks)
+    striped_disk.TimedAttach(mock.Mock())
+    self.assertEqual(2, tracker.max_active)
+    for d in disks + [striped_disk]:
+      self.assertLessEqual(d.attach_start_time, d.attach_end_time)
+
+  def testMeasureSetupStep(self):
+    d = _FakeDisk(self.spec, None)
+    with mock.patch(disk.__name__ + '.time.time', side_effect=[10, 12.5]):
+      with d.MeasureSetupStep('format'):
+        pass
+    self.assertEqual({'format': 2.5}, d.setup_seconds)
+
+
 if __name__ == '__main__':
   unittest.main()
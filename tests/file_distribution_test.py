@@ -0,0 +1,167 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for perfkitbenchmarker.file_distribution."""
+
+import re
+import unittest
+
+import mock
+
+from perfkitbenchmarker import file_distribution
+
+_CHECKSUM = 'd41d8cd98f00b204e9800998ecf8427e'
+
+
+class _FakeVm(object):
+  """Stands in for a VM whose filesystem is a dict of path to checksum."""
+
+  def __init__(self, index, files=None):
+    self.name = 'vm%d' % index
+    self.internal_ip = '10.0.0.%d' % index
+    self.ip_address = '1.1.1.%d' % index
+    self.user_name = 'perfkit'
+    self.ssh_port = 22
+    self.files = files or {}
+    self.received_from = []
+    self.pushes = 0
+    self.AuthenticateVm = mock.MagicMock()
+
+  def __str__(self):
+    return self.name
+
+  def RemoteCommand(self, command, **kwargs):
+    match = re.match(r'md5sum (\S+)', command)
+    if match:
+      checksum = self.files.get(match.group(1))
+      return ('%s  %s\n' % (checksum, match.group(1)) if checksum else '', '')
+    match = re.match(r'mv -f (\S+) (\S+)', command)
+    if match:
+      self.files[match.group(2)] = self.files.pop(match.group(1))
+    return '', ''
+
+  def RemoteHostCommand(self, command, **kwargs):
+    match = re.match(r'scp .* (\S+) \S+@(\S+):(\S+)$', command)
+    source_path, address, target_path = match.groups()
+    target = _FakeVm.by_address[address]
+    target.files[target_path] = self.files[source_path]
+    target.received_from.append(self)
+    return '', ''
+
+  def PushFile(self, local_path, remote_path):
+    self.pushes += 1
+    self.files[remote_path] = _CHECKSUM
+
+
+class DistributeFileTestCase(unittest.TestCase):
+
+  def setUp(self):
+    p = mock.patch(file_distribution.__name__ + '.FLAGS')
+    self.flags = p.start()
+    self.addCleanup(p.stop)
+    self.flags.file_distribution_fanout = 1
+    self.flags.file_distribution_min_vms = 4
+    self.flags.ip_addresses = 'INTERNAL'
+    self.flags.default_timeout = 0
+    p = mock.patch(file_distribution.vm_util.__name__ + '.FLAGS',
+                   self.flags)
+    p.start()
+    self.addCleanup(p.stop)
+    p = mock.patch(file_distribution.__name__ + '._LocalMd5',
+                   return_value=_CHECKSUM)
+    p.start()
+    self.addCleanup(p.stop)
+
+  def _CreateVms(self, count):
+    vms = [_FakeVm(i) for i in xrange(count)]
+    _FakeVm.by_address = {vm.internal_ip: vm for vm in vms}
+    return vms
+
+  def testPushesDirectlyToFewVms(self):
+    vms = self._CreateVms(3)
+    file_distribution.DistributeFile(vms, '/local/data', 'data')
+    self.assertEqual([1, 1, 1], [vm.pushes for vm in vms])
+
+  def testTreeDistribution(self):
+    vms = self._CreateVms(8)
+    file_distribution.DistributeFile(vms, '/local/data', 'data')
+    self.assertEqual(1, sum(vm.pushes for vm in vms))
+    self.assertTrue(all(vm.files == {'data': _CHECKSUM} for vm in vms))
+    # vm0 sends in every one of the three rounds.
+    self.assertEqual(3, sum(1 for vm in vms
+                            if vm.received_from == [vms[0]]))
+
+  def testSkipsVmsWithMatchingCopy(self):
+    vms = self._CreateVms(5)
+    vms[3].files['data'] = _CHECKSUM
+    file_distribution.DistributeFile(vms, '/local/data', 'data')
+    self.assertEqual([], vms[3].received_from)
+
+  def testDistributeRemoteFileToDifferentPath(self):
+    vms = self._CreateVms(3)
+    vms[0].files['/usr/bin/orted'] = _CHECKSUM
+    file_distribution.DistributeRemoteFile(vms[0], vms[1:], '/usr/bin/orted',
+                                           'orted')
+    self.assertEqual({'orted': _CHECKSUM}, vms[1].files)
+    self.assertEqual({'orted': _CHECKSUM}, vms[2].files)
+
+  def testDistributeMissingRemoteFile(self):
+    vms = self._CreateVms(2)
+    with self.assertRaises(file_distribution.errors.VirtualMachine.
+                           RemoteCommandError):
+      file_distribution.DistributeRemoteFile(vms[0], vms[1:], 'missing')
+
+
+_ContainerizedMixin = (
+    file_distribution.linux_virtual_machine.ContainerizedDebianMixin)
+
+
+class _FakeContainerizedVm(_FakeVm, _ContainerizedMixin):
+  """A _FakeVm whose RemoteCommand would run inside a container."""
+
+  def __init__(self, index, files=None):
+    super(_FakeContainerizedVm, self).__init__(index, files)
+    self.moved_to = []
+
+  def RemoteHostCommand(self, command, **kwargs):
+    raise AssertionError('Unexpected host command: %s' % command)
+
+  def MoveFile(self, target, source_path, remote_path=''):
+    self.moved_to.append(target)
+    target.files[remote_path] = self.files[source_path]
+
+
+class ContainerizedDistributionTestCase(unittest.TestCase):
+
+  def setUp(self):
+    p = mock.patch(file_distribution.__name__ + '.FLAGS')
+    self.flags = p.start()
+    self.addCleanup(p.stop)
+    self.flags.file_distribution_min_vms = 4
+    self.vms = [_FakeContainerizedVm(i) for i in xrange(5)]
+
+  def testPushesToEachVm(self):
+    file_distribution.DistributeFile(self.vms, '/local/data', 'data')
+    self.assertEqual([1] * 5, [vm.pushes for vm in self.vms])
+
+  def testMovesRemoteFileFromSource(self):
+    self.vms[0].files['hpcc'] = _CHECKSUM
+    file_distribution.DistributeRemoteFile(self.vms[0], self.vms, 'hpcc')
+    self.assertEqual(['vm1', 'vm2', 'vm3', 'vm4'],
+                     sorted(vm.name for vm in self.vms[0].moved_to))
+    self.assertTrue(all(vm.files == {'hpcc': _CHECKSUM} for vm in self.vms))
+
+
+if __name__ == '__main__':
+  unittest.main()
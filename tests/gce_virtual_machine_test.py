@@ -15,6 +15,7 @@
 """Tests for perfkitbenchmarker.providers.gcp.gce_virtual_machine"""
 
 import contextlib
+import json
 import mock
 import re
 import unittest
@@ -313,5 +314,64 @@ class GCEVMFlagsTestCase(unittest.TestCase):
       self.assertIn('k3=p3', actual_metadata_from_file)
 
 
+
+class GceBulkCreateTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self._mocked_flags = mock_flags.PatchTestCaseFlags(self)
+    self._mocked_flags.cloud = providers.GCP
+    self._mocked_flags.gcloud_path = 'test_gcloud'
+    self._mocked_flags.os_type = os_types.DEBIAN
+    self._mocked_flags.run_uri = 'aaaaaa'
+    self._mocked_flags.gcp_instance_metadata = []
+    self._mocked_flags.gcp_instance_metadata_from_file = []
+    self.addCleanup(context.SetThreadBenchmarkSpec, None)
+    config_spec = benchmark_config_spec.BenchmarkConfigSpec(
+        _BENCHMARK_NAME, flag_values=self._mocked_flags, vm_groups={})
+    self._benchmark_spec = benchmark_spec.BenchmarkSpec(
+        mock.MagicMock(), config_spec, _BENCHMARK_UID)
+    for target in ('__builtin__.open',
+                   vm_util.__name__ + '.NamedTemporaryFile',
+                   util.__name__ + '.GetDefaultProject'):
+      p = mock.patch(target)
+      p.start()
+      self.addCleanup(p.stop)
+    p = mock.patch(vm_util.__name__ + '.IssueCommand')
+    self.issue_command = p.start()
+    self.addCleanup(p.stop)
+    vm_spec = gce_virtual_machine.GceVmSpec(
+        'test_vm_spec.GCP', self._mocked_flags, image='image',
+        machine_type='test_machine_type')
+    self.vms = [gce_virtual_machine.GceVirtualMachine(vm_spec)
+                for _ in range(2)]
+
+  def testBulkCreate(self):
+    # Instances are not necessarily listed in the order they were named.
+    instances = [
+        {'name': vm.name, 'id': str(i), 'networkInterfaces': [
+            {'networkIP': '10.0.0.%d' % i,
+             'accessConfigs': [{'natIP': '1.1.1.%d' % i}]}]}
+        for i, vm in enumerate(self.vms, 1)]
+    self.issue_command.return_value = (json.dumps(instances[::-1]), '', 0)
+
+    gce_virtual_machine.GceVirtualMachine._BulkCreate(self.vms)
+
+    self.assertEqual(self.issue_command.call_count, 1)
+    create_cmd = ' '.join(self.issue_command.call_args[0][0])
+    self.assertIn('instances create %s %s ' % (self.vms[0].name,
+                                               self.vms[1].name), create_cmd)
+    self.assertIn('--format json', create_cmd)
+    self.assertEqual(['1', '2'], [vm.id for vm in self.vms])
+    self.assertEqual(['10.0.0.1', '10.0.0.2'],
+                     [vm.internal_ip for vm in self.vms])
+    self.assertEqual(['1.1.1.1', '1.1.1.2'],
+                     [vm.ip_address for vm in self.vms])
+
+  def testBulkCreateRejected(self):
+    self.issue_command.return_value = ('', 'QUOTA_EXCEEDED', 1)
+    with self.assertRaises(errors.Resource.CreationError):
+      gce_virtual_machine.GceVirtualMachine._BulkCreate(self.vms)
+
+
 if __name__ == '__main__':
   unittest.main()
@@ -0,0 +1,136 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for cassandra_stress_benchmark."""
+
+import unittest
+
+import mock
+
+from perfkitbenchmarker.linux_benchmarks import cassandra_stress_benchmark
+from tests import mock_flags
+
+_HEADER = ('type,      total ops,    op/s,    pk/s,   row/s,    mean,     '
+           'med,     .95,     .99,    .999,     max,   time,   stderr, '
+           'errors,  gc: #,  max ms,  sum ms,  sdv ms,      mb')
+_INTERVAL = ('total, {ops:13d}, {rate:7d}, {rate:7d}, {rate:7d}, {mean:7.1f}, '
+             '    1.1,     4.4,     9.0,    36.5, {max:7.1f}, {time:6.1f},  '
+             '0.00000,      0,      0,       0,       0,       0,       0')
+
+
+def _Log(rates, means=None, maxes=None):
+  means = means or [1.0] * len(rates)
+  maxes = maxes or [10.0] * len(rates)
+  lines = ['Warming up WRITE with 50000 iterations...', _HEADER]
+  for i, rate in enumerate(rates):
+    lines.append(_INTERVAL.format(ops=rate * (i + 1), rate=rate,
+                                  mean=means[i], max=maxes[i], time=i + 1.0))
+  lines.extend(['', 'Results:', 'op rate                   : 1000'])
+  return [line + '\n' for line in lines]
+
+
+def _Aligned(rates, end_time, **kwargs):
+  return cassandra_stress_benchmark.AlignIntervals(
+      cassandra_stress_benchmark.ParseIntervals(_Log(rates, **kwargs)),
+      end_time)
+
+
+class ParseIntervalsTestCase(unittest.TestCase):
+
+  def testParse(self):
+    intervals = cassandra_stress_benchmark.ParseIntervals(
+        _Log([100, 200], means=[1.5, 2.5]))
+    self.assertEqual(2, len(intervals))
+    self.assertEqual(200.0, intervals[1]['op/s'])
+    self.assertEqual(2.5, intervals[1]['mean'])
+    self.assertEqual(2.0, intervals[1]['time'])
+    self.assertEqual(400.0, intervals[1]['total ops'])
+
+  def testAlign(self):
+    aligned = _Aligned([100, 200, 300], 1003.5)
+    self.assertEqual([(1000.5, 1001.5), (1001.5, 1002.5), (1002.5, 1003.5)],
+                     [(start, end) for start, end, _ in aligned])
+
+
+class MergeIntervalsTestCase(unittest.TestCase):
+
+  def testMergeOverCommonWindow(self):
+    # The first loader runs from 1000 to 1004, the second from 1001.5 to 1004.5.
+    merged = cassandra_stress_benchmark.MergeIntervals([
+        _Aligned([100, 100, 100, 100], 1004.0, means=[1.0, 1.0, 1.0, 3.0]),
+        _Aligned([300, 300, 300], 1004.5, maxes=[10.0, 50.0, 10.0])])
+    self.assertEqual([1001.5, 1002.5], [interval.start for interval in merged])
+    self.assertEqual([400.0, 400.0],
+                     [interval.op_rate for interval in merged])
+    self.assertEqual([1.0, 1.5],
+                     [interval.latency_mean for interval in merged])
+    self.assertEqual([10.0, 50.0],
+                     [interval.latency_max for interval in merged])
+
+  def testNoOverlap(self):
+    self.assertEqual([], cassandra_stress_benchmark.MergeIntervals([
+        _Aligned([100, 100], 1002.0), _Aligned([100, 100], 1010.0)]))
+
+
+class CassandraStressRunTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.flags = mock_flags.PatchTestCaseFlags(self)
+    self.flags.cassandra_stress_consistency_level = 'QUORUM'
+    self.flags.cassandra_stress_replication_factor = 3
+    self.flags.cassandra_stress_retries = 1000
+    self.flags.num_cassandra_stress_threads = 150
+    p = mock.patch.object(cassandra_stress_benchmark.cassandra,
+                          'GetCassandraStressPath',
+                          return_value='cassandra-stress')
+    p.start()
+    self.addCleanup(p.stop)
+
+  def testLoadersStartTogether(self):
+    loaders = [mock.Mock(hostname='loader%d' % i) for i in xrange(2)]
+    loaders[0].RemoteCommand.return_value = ('1000\n', '')
+    cassandra_stress_benchmark.RunCassandraStressTest(
+        [mock.Mock(internal_ip='10.0.0.1')], loaders, 100, 'write')
+    for i, vm in enumerate(loaders):
+      command = vm.RobustRemoteCommand.call_args[0][0]
+      self.assertTrue(command.startswith(
+          'now=$(date +%s); if [ 1015 -gt $now ]; then '
+          'sleep $((1015 - now)); fi; date +%s.%N > '))
+      self.assertIn('-pop seq=%d..%d ' % (i * 50 + 1, (i + 1) * 50), command)
+      self.assertTrue(command.endswith(
+          '&& date +%s.%N >> /tmp/pkb/loader{0}.stress_timing.txt'.format(i)))
+
+  def testAlignedSamples(self):
+    loaders = [
+        cassandra_stress_benchmark.LoaderIntervals(
+            995.0, 1004.0, _Aligned([100, 100, 100, 100], 1004.0)),
+        cassandra_stress_benchmark.LoaderIntervals(
+            995.5, 1004.5, _Aligned([300, 300, 300], 1004.5))]
+    samples = cassandra_stress_benchmark.GetAlignedSamples(loaders, {'a': 1})
+    values = {s.metric: s.value for s in samples}
+    self.assertEqual(0.5, values['loader launch skew'])
+    self.assertEqual(1.5, values['loader start skew'])
+    self.assertEqual(0.5, values['loader end skew'])
+    self.assertEqual(400.0, values['aligned op rate'])
+    self.assertEqual(1.0, values['aligned latency mean'])
+    series = [s for s in samples if s.metric == 'aligned interval op rate']
+    self.assertEqual([0.0, 1.0],
+                     [s.metadata['interval_start'] for s in series])
+    self.assertEqual(1002.5, series[1].timestamp)
+    aligned, = [s for s in samples if s.metric == 'aligned op rate']
+    self.assertEqual({'a': 1, 'window_seconds': 2}, aligned.metadata)
+
+
+if __name__ == '__main__':
+  unittest.main()
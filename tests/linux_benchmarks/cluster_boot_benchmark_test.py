@@ -0,0 +1,109 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for cluster_boot_benchmark."""
+
+import unittest
+
+import mock
+
+from perfkitbenchmarker import os_types
+from perfkitbenchmarker.linux_benchmarks import cluster_boot_benchmark
+
+
+def _MockVm(offset, systemd_output=''):
+  vm = mock.Mock(OS_TYPE=os_types.DEBIAN, num_cpus=1, bulk_create_size=1,
+                 create_start_time=100.0 + offset,
+                 create_end_time=101.0 + offset,
+                 resource_ready_time=103.0 + offset,
+                 bootable_time=110.0 + offset,
+                 startup_complete_time=111.0 + offset,
+                 scratch_disks_ready_time=None,
+                 prepare_complete_time=115.0 + offset,
+                 scratch_disks=[])
+  vm.RemoteCommand.return_value = (systemd_output, '')
+  return vm
+
+
+class ClusterBootBenchmarkTestCase(unittest.TestCase):
+
+  def testBootPhaseSamples(self):
+    vms = [_MockVm(0), _MockVm(5)]
+    samples = cluster_boot_benchmark.GetBootPhaseSamples(vms)
+    per_vm = [(s.metadata['boot_phase'], s.value) for s in samples
+              if s.metric == 'Boot Phase Time'
+              and s.metadata['machine_instance'] == 0]
+    # The missing scratch disk time makes prepare_environment span both.
+    self.assertEqual([('api_accept', 1.0), ('instance_running', 2.0),
+                      ('first_ssh', 7.0), ('startup', 1.0),
+                      ('prepare_environment', 4.0)], per_vm)
+    p50 = {s.metadata['boot_phase']: s.value for s in samples
+           if s.metric == 'Boot Phase Time p50'}
+    self.assertEqual(7.0, p50['first_ssh'])
+    self.assertEqual(5, len(p50))
+
+  def testTimeToBootIncludesPhases(self):
+    samples = cluster_boot_benchmark.GetTimeToBoot([_MockVm(0)])
+    self.assertEqual(('Boot Time', 10.0),
+                     (samples[0].metric, samples[0].value))
+    self.assertIn('Boot Phase Time', [s.metric for s in samples])
+
+  def testScratchDiskSamples(self):
+    striped_disks = [mock.Mock(disk_type='remote', create_start_time=1.0,
+                               create_end_time=3.0 + i, attach_start_time=5.0,
+                               attach_end_time=6.0) for i in xrange(2)]
+    scratch_disk = mock.Mock(is_striped=True, disks=striped_disks,
+                             mount_point='/scratch', num_striped_disks=2,
+                             setup_seconds={'stripe': 1.5, 'format': 4.0})
+    vm = _MockVm(0)
+    vm.scratch_disks = [scratch_disk]
+    samples = cluster_boot_benchmark.GetScratchDiskSamples([vm])
+    self.assertEqual(
+        [('create', 2.0), ('attach', 1.0), ('create', 3.0), ('attach', 1.0),
+         ('format', 4.0), ('stripe', 1.5)],
+        [(s.metadata['disk_step'], s.value) for s in samples
+         if s.metric == 'Scratch Disk Time'])
+    p90 = {s.metadata['disk_step']: s.value for s in samples
+           if s.metric == 'Scratch Disk Time p90'}
+    self.assertEqual({'attach': 1.0, 'create': 3.0, 'format': 4.0,
+                      'stripe': 1.5}, p90)
+
+  def testParseSystemdAnalyze(self):
+    phases = cluster_boot_benchmark.ParseSystemdAnalyze(
+        'Startup finished in 2.163s (kernel) + 1min 3.5s (userspace) = '
+        '1min 5.663s\n')
+    self.assertEqual(['kernel', 'userspace', 'total'], list(phases))
+    self.assertAlmostEqual(2.163, phases['kernel'])
+    self.assertAlmostEqual(63.5, phases['userspace'])
+    self.assertAlmostEqual(65.663, phases['total'])
+
+  def testParseSystemdAnalyzeNotFinished(self):
+    self.assertIsNone(cluster_boot_benchmark.ParseSystemdAnalyze(
+        'Bootup is not yet finished. Please try again later.'))
+
+  def testGuestBootSamples(self):
+    windows_vm = _MockVm(0)
+    windows_vm.OS_TYPE = os_types.WINDOWS
+    vms = [_MockVm(0, 'Startup finished in 1s (kernel) + 3s (userspace) = 4s'),
+           _MockVm(0, 'Bootup is not yet finished.'), windows_vm]
+    samples = cluster_boot_benchmark.GetGuestBootSamples(vms)
+    self.assertEqual(
+        [('kernel', 1.0), ('userspace', 3.0), ('total', 4.0)],
+        [(s.metadata['guest_boot_phase'], s.value) for s in samples
+         if s.metric == 'Guest Boot Time'])
+    self.assertFalse(windows_vm.RemoteCommand.called)
+
+
+if __name__ == '__main__':
+  unittest.main()
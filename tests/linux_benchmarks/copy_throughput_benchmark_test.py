@@ -0,0 +1,163 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the parallel modes of copy_throughput_benchmark."""
+
+import subprocess
+import unittest
+
+import mock
+
+from perfkitbenchmarker.linux_benchmarks import copy_throughput_benchmark
+from tests import mock_flags
+
+_RUN_ERROR = copy_throughput_benchmark.errors.Benchmarks.RunError
+_FILES = [(4000000, '/scratch0/data/file-0.dat'),
+          (1000000, '/scratch0/data/file-1.dat'),
+          (2000000, '/scratch0/data/file-2.dat'),
+          (2000000, '/scratch0/data/file-3.dat')]
+
+
+def _MockVm(name):
+  vm = mock.Mock(zone='zone-' + name, user_name='perfkit',
+                 ip_address='1.1.1.' + name, internal_ip='10.0.0.' + name)
+  vm.GetMachineTypeDict.return_value = {'machine_type': 'n1-standard-1'}
+  vm.GetScratchDir.return_value = '/scratch0'
+  return vm
+
+
+class ParallelCopyTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.flags = mock_flags.PatchTestCaseFlags(self)
+    self.flags.copy_benchmark_mode = copy_throughput_benchmark.PARALLEL_TAR
+    self.flags.copy_parallel_streams = 2
+    self.flags.copy_compress = False
+
+  def testSplitFiles(self):
+    streams = copy_throughput_benchmark.SplitFiles(_FILES, 2)
+    self.assertEqual([[4000000, 1000000], [2000000, 2000000]],
+                     [[size for size, _ in stream] for stream in streams])
+    self.assertEqual(2, len(copy_throughput_benchmark.SplitFiles(_FILES[:2],
+                                                                 3)))
+
+  def testTarCommands(self):
+    streams = copy_throughput_benchmark.SplitFiles(_FILES, 2)
+    receive_cmd, send_cmds = (
+        copy_throughput_benchmark.GetParallelCopyCommands(
+            copy_throughput_benchmark.PARALLEL_TAR, streams, _MockVm('1'),
+            _MockVm('2'), '10.0.0.2', '/scratch0/internal', None, True))
+    self.assertIn('nc -l 20001 < /dev/null | tar -xz -C /scratch0/internal',
+                  receive_cmd)
+    self.assertEqual(
+        'tar -cz -C /scratch0/data file-3.dat file-2.dat '
+        '> /dev/tcp/10.0.0.2/20001', send_cmds[1])
+
+  def testRsyncCommands(self):
+    streams = copy_throughput_benchmark.SplitFiles(_FILES[:1], 2)
+    receive_cmd, send_cmds = (
+        copy_throughput_benchmark.GetParallelCopyCommands(
+            copy_throughput_benchmark.PARALLEL_RSYNC, streams, _MockVm('1'),
+            _MockVm('2'), '10.0.0.2', '/scratch0/internal', 'aes128-ctr',
+            False))
+    self.assertIsNone(receive_cmd)
+    self.assertRegexpMatches(
+        send_cmds[0], r'^rsync -a -e "ssh -o StrictHostKeyChecking=no -i \S+ '
+        r'-c aes128-ctr" /scratch0/data/file-0.dat '
+        r'perfkit@10.0.0.2:/scratch0/internal/$')
+
+  def testScript(self):
+    script = copy_throughput_benchmark.GetParallelCopyScript(
+        ['sleep 0.1', 'true'])
+    stdout = subprocess.check_output(['bash', '-c', script])
+    total_seconds, stream_seconds = (
+        copy_throughput_benchmark.ParseParallelCopyOutput(stdout, 2))
+    self.assertEqual([0, 1], sorted(stream_seconds))
+    self.assertGreaterEqual(total_seconds, stream_seconds[0])
+    self.assertGreaterEqual(stream_seconds[0], 0.1)
+
+  def testFailedStream(self):
+    script = copy_throughput_benchmark.GetParallelCopyScript(['false'])
+    stdout = subprocess.check_output(['bash', '-c', script])
+    with self.assertRaises(_RUN_ERROR):
+      copy_throughput_benchmark.ParseParallelCopyOutput(stdout, 1)
+
+  def testMissingStream(self):
+    with self.assertRaises(_RUN_ERROR):
+      copy_throughput_benchmark.ParseParallelCopyOutput(
+          'stream 1 10.0 14.0 0\ntotal 9.5 14.5\n', 2)
+
+  def testFailedStreamKillsListeners(self):
+    sending_vm, receiving_vm = _MockVm('1'), _MockVm('2')
+    sending_vm.RemoteCommand.side_effect = [
+        ('\n'.join('%s %s' % f for f in _FILES) + '\n', ''),
+        ('stream 1 10.0 14.0 0\nstream 0 10.0 12.0 1\ntotal 9.5 14.5\n', '')]
+    with mock.patch.object(copy_throughput_benchmark.vm_util,
+                           'ShouldRunOnExternalIpAddress',
+                           return_value=True):
+      with self.assertRaises(_RUN_ERROR):
+        copy_throughput_benchmark.RunParallelCopySingleDirection(
+            sending_vm, receiving_vm, None)
+    self.assertEqual(
+        ['pkill -f "nc -l (20000|20001)( |$)" || true',
+         'rm -rf /scratch0/external'],
+        [c[0][0] for c in receiving_vm.RemoteCommand.call_args_list[-2:]])
+
+  def testRunSingleDirection(self):
+    sending_vm, receiving_vm = _MockVm('1'), _MockVm('2')
+    sending_vm.RemoteCommand.side_effect = [
+        ('\n'.join('%s %s' % f for f in _FILES) + '\n', ''),
+        ('stream 1 10.0 14.0 0\nstream 0 10.0 12.0 0\ntotal 9.5 14.5\n', '')]
+    with mock.patch.object(copy_throughput_benchmark.vm_util,
+                           'ShouldRunOnExternalIpAddress',
+                           return_value=False), mock.patch.object(
+                               copy_throughput_benchmark.vm_util,
+                               'ShouldRunOnInternalIpAddress',
+                               return_value=True):
+      samples = copy_throughput_benchmark.RunParallelCopySingleDirection(
+          sending_vm, receiving_vm, None)
+    self.assertEqual(
+        [('parallel_tar throughput', 1.8),
+         ('parallel_tar stream throughput', 2.5),
+         ('parallel_tar stream throughput', 1.0)],
+        [(s.metric, s.value) for s in samples])
+    self.assertEqual(1.0, samples[0].metadata['stream_throughput_min'])
+    self.assertEqual('internal', samples[0].metadata['ip_type'])
+    self.assertEqual('zone-1', samples[0].metadata['sending_zone'])
+    receive_cmd = receiving_vm.RemoteCommand.call_args_list[1][0][0]
+    self.assertIn('nc -l 20000', receive_cmd)
+
+
+class PrepareTestCase(unittest.TestCase):
+
+  def testDataFileIsDistributed(self):
+    self.flags = mock_flags.PatchTestCaseFlags(self)
+    self.flags.copy_benchmark_mode = 'cp'
+    vms = [_MockVm(str(i)) for i in xrange(3)]
+    with mock.patch.object(copy_throughput_benchmark.data, 'ResourcePath',
+                           return_value='/local/cloud-storage-workload.sh'), \
+        mock.patch.object(copy_throughput_benchmark.file_distribution,
+                          'DistributeFile') as distribute:
+      copy_throughput_benchmark.Prepare(mock.Mock(vms=vms))
+    distribute.assert_called_once_with(
+        vms, '/local/cloud-storage-workload.sh',
+        '/scratch0/cloud-storage-workload.sh')
+    for vm in vms:
+      vm.RemoteCommand.assert_called_once_with(
+          'cd /scratch0/; bash cloud-storage-workload.sh')
+      self.assertFalse(vm.PushFile.called)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -14,13 +14,17 @@
 
 """Tests for fio_benchmark."""
 
+import re
 import unittest
 
 import mock
 
+from perfkitbenchmarker import sample
 from perfkitbenchmarker import units
 from perfkitbenchmarker import vm_util
 from perfkitbenchmarker.linux_benchmarks import fio_benchmark
+from perfkitbenchmarker.linux_packages import fio
+from tests import mock_flags
 
 
 class TestGenerateJobFileString(unittest.TestCase):
@@ -153,8 +157,13 @@ blocksize = 8k
             mock.patch('__builtin__.open'), \
             mock.patch(vm_util.__name__ + '.GetTempDir'), \
             mock.patch(fio_benchmark.__name__ + '.fio.ParseResults'), \
+            mock.patch(fio_benchmark.__name__ +
+                       '.artifact_collection.CollectArtifacts'), \
             mock.patch(fio_benchmark.__name__ + '.FLAGS') as fio_FLAGS:
       fio_FLAGS.fio_target_mode = mode
+      fio_FLAGS.fio_prewarm = fio.PREWARM_NONE
+      fio_FLAGS.fio_sweep = False
+      fio_FLAGS.fio_per_device = False
       benchmark_spec = mock.MagicMock()
       benchmark_spec.vms = [mock.MagicMock()]
       benchmark_spec.vms[0].RobustRemoteCommand = (
@@ -204,5 +213,145 @@ blocksize = 8k
                           expect_format_disk=False)
 
 
+def _SweepSamples(iops, p99_usec):
+  return [sample.Sample('job:read:iops', iops, ''),
+          sample.Sample('job:read:latency:p99', p99_usec, 'usec'),
+          sample.Sample('job:read:latency:p50', p99_usec / 2, 'usec')]
+
+
+class TestSweep(unittest.TestCase):
+
+  # Maps (num_jobs, io_depth) to the (IOPS, p99 usec) of a probe.
+  CURVE = {(1, 1): (1000, 100), (1, 2): (1900, 110), (1, 4): (3000, 150),
+           (1, 8): (3050, 300), (1, 16): (3060, 600),
+           (2, 1): (1900, 110), (2, 2): (3040, 160), (2, 4): (3060, 320)}
+
+  def setUp(self):
+    self.flags = mock_flags.PatchTestCaseFlags(self)
+    self.flags.fio_target_mode = fio_benchmark.AGAINST_DEVICE_WITHOUT_FILL_MODE
+    self.flags.fio_sweep_scenario = 'random_read'
+    self.flags.fio_sweep_blocksizes = ['4KiB']
+    self.flags.fio_sweep_io_depths = [1, 2, 4, 8, 16]
+    self.flags.fio_sweep_num_jobs = [1, 2, 4]
+    self.flags.fio_sweep_probe_runtime = 10
+    self.flags.fio_sweep_min_gain = 0.05
+    self.flags.fio_sweep_max_p99_usec = None
+    self.flags.fio_working_set_size = None
+    self.flags.fio_parameters = []
+    self.flags.fio_per_device = False
+    self.probes = []
+    for p in (mock.patch(fio_benchmark.__name__ + '.RunJobFile',
+                         side_effect=self._RunJobFile),
+              mock.patch(fio_benchmark.__name__ + '.fio.ParseResults',
+                         side_effect=lambda _, result: _SweepSamples(*result))):
+      p.start()
+      self.addCleanup(p.stop)
+
+  def _RunJobFile(self, vm, disk, job_file_string):
+    num_jobs = int(re.search(r'numjobs=(\d+)', job_file_string).group(1))
+    io_depth = int(re.search(r'iodepth=(\d+)', job_file_string).group(1))
+    self.assertIn('runtime=10', job_file_string)
+    self.probes.append((num_jobs, io_depth))
+    return self.CURVE[num_jobs, io_depth]
+
+  def testStopsEarlyAndFindsKnee(self):
+    samples = fio_benchmark.RunSweep(mock.Mock(), mock.Mock())
+    # IOPS stop growing at io_depth 8, and 2 jobs add nothing over 1 job.
+    self.assertEqual([(1, 1), (1, 2), (1, 4), (1, 8), (2, 1), (2, 2),
+                      (2, 4)], self.probes)
+    self.assertEqual(7, len([s for s in samples if s.metric == 'Sweep IOPS']))
+    knee, = [s for s in samples if s.metric == 'Knee IOPS']
+    # Of the configurations with the fewest outstanding IOs, the best one.
+    self.assertEqual(3040, knee.value)
+    self.assertEqual((2, 2), (knee.metadata['fio_sweep_num_jobs'],
+                              knee.metadata['fio_sweep_io_depth']))
+    knee_samples = [s for s in samples if s.metadata.get('fio_sweep_knee')]
+    self.assertEqual(3, len(knee_samples))
+
+  def testLatencyLimit(self):
+    self.flags.fio_sweep_max_p99_usec = 120
+    samples = fio_benchmark.RunSweep(mock.Mock(), mock.Mock())
+    self.assertEqual([(1, 1), (1, 2), (1, 4), (2, 1), (2, 2)], self.probes)
+    knee, = [s for s in samples if s.metric == 'Knee IOPS']
+    self.assertEqual(1900, knee.value)
+
+
+_NUMACTL_HARDWARE = """available: 2 nodes (0-1)
+node 0 cpus: 0 1 2 3
+node 0 size: 7680 MB
+node 1 cpus: 4 5 6 7
+node 1 size: 7680 MB
+node distances:
+"""
+
+
+class TestPerDevice(unittest.TestCase):
+
+  def setUp(self):
+    members = [mock.Mock(**{'GetDevicePath.return_value': path})
+               for path in ('/dev/nvme0n1', '/dev/nvme1n1')]
+    self.disk = mock.Mock(is_striped=True, disks=members)
+    self.vm = mock.Mock()
+    self.vm.RemoteCommand.side_effect = self._RemoteCommand
+
+  def _RemoteCommand(self, command, **kwargs):
+    if command == 'numactl --hardware':
+      return _NUMACTL_HARDWARE, ''
+    return '1\n' if 'nvme1n1' in command else '', ''
+
+  def testParseNumaNodeCpus(self):
+    self.assertEqual({0: '0,1,2,3', 1: '4,5,6,7'},
+                     fio_benchmark.ParseNumaNodeCpus(_NUMACTL_HARDWARE))
+
+  def testDevicePlacement(self):
+    devices = fio_benchmark.GetDevicePlacement(self.vm, self.disk, True)
+    self.assertEqual(
+        [{'path': '/dev/nvme0n1', 'numa_node': -1, 'cpus': ''},
+         {'path': '/dev/nvme1n1', 'numa_node': 1, 'cpus': '4,5,6,7'}],
+        devices)
+    self.vm.Install.assert_called_once_with('numactl')
+
+  def testJobFile(self):
+    job_file = fio_benchmark.GeneratePerDeviceJobFileString(
+        [{'path': '/dev/nvme0n1', 'cpus': '0,1'},
+         {'path': '/dev/nvme1n1', 'cpus': ''}],
+        ['random_read'], [1], [2], None, None, 60, [])
+    self.assertIn("""
+[random_read-io-depth-1-num-jobs-2-device-0]
+stonewall
+new_group
+filename=/dev/nvme0n1
+cpus_allowed=0,1
+rw=randread
+blocksize=4k
+iodepth=1
+size=100%
+numjobs=2
+
+[random_read-io-depth-1-num-jobs-2-device-1]
+new_group
+filename=/dev/nvme1n1
+rw=randread""", job_file)
+    self.assertNotIn('filename', job_file.split('[random_read')[0])
+
+  def testAggregateDeviceSamples(self):
+    job = 'random_read-io-depth-1-num-jobs-2'
+    samples = []
+    for device, (iops, p99) in enumerate([(100, 50), (300, 80)]):
+      metadata = {'fio_job': '%s-device-%d' % (job, device),
+                  'filename': '/dev/nvme%dn1' % device, 'rw': 'randread'}
+      for suffix, value, unit in ((':read:iops', iops, ''),
+                                  (':read:latency:p99', p99, 'usec'),
+                                  (':read:latency:p50', p99 / 2, 'usec')):
+        samples.append(sample.Sample(metadata['fio_job'] + suffix, value, unit,
+                                     metadata))
+    aggregates = fio_benchmark.AggregateDeviceSamples(samples, 2)
+    self.assertEqual(
+        [(job + ':read:iops', 400), (job + ':read:latency:p99', 80)],
+        [(s.metric, s.value) for s in aggregates])
+    self.assertEqual({'fio_job': job, 'rw': 'randread', 'num_devices': 2,
+                      'per_device_aggregate': True}, aggregates[0].metadata)
+
+
 if __name__ == '__main__':
   unittest.main()
@@ -0,0 +1,105 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for iperf_benchmark."""
+
+import json
+import os
+import unittest
+
+import mock
+
+from perfkitbenchmarker.linux_benchmarks import iperf_benchmark
+from tests import mock_flags
+
+_UDP_RESULTS = {
+    'start': {'test_start': {'protocol': 'UDP'}},
+    'intervals': [{'streams': [
+        {'socket': 5, 'start': 0, 'end': 1.0, 'bits_per_second': 1e9,
+         'packets': 1000, 'omitted': False, 'sender': True}]}],
+    'end': {'streams': [{'udp': {
+        'socket': 5, 'bits_per_second': 9e8, 'jitter_ms': 0.05,
+        'lost_packets': 10, 'packets': 1000, 'sender': True}}]}
+}
+
+
+class Iperf3TestCase(unittest.TestCase):
+
+  def setUp(self):
+    path = os.path.join(os.path.dirname(__file__), '..', 'data',
+                        'iperf3-tcp-bidir.json')
+    with open(path) as fp:
+      self.tcp_output = fp.read()
+    self.flags = mock_flags.PatchTestCaseFlags(self)
+    self.flags.iperf_tool = iperf_benchmark.IPERF3
+    self.flags.iperf_runtime_in_seconds = 2
+    self.flags.iperf_sending_thread_count = 1
+    self.flags.iperf3_interval = 1
+    self.flags.iperf3_udp = False
+    self.flags.iperf3_bidirectional = True
+
+  def testParseTcpBidirectional(self):
+    samples = iperf_benchmark.ParseIperf3Results(json.loads(self.tcp_output),
+                                                 {'ip_type': 'internal'})
+    intervals = [(s.metadata['direction'], s.metadata['interval_start'],
+                  s.value) for s in samples
+                 if s.metric == 'Interval Throughput']
+    self.assertEqual([('forward', 0, 949.893), ('reverse', 0, 499.9385),
+                      ('forward', 1.000123, 1979.852),
+                      ('reverse', 1.000123, 500.036)], intervals)
+    retransmits = [s.value for s in samples
+                   if s.metric == 'Interval Retransmits']
+    self.assertEqual([12, 0, 0, 0], retransmits)
+    stream, = [s for s in samples if s.metric == 'Stream Interval Throughput'
+               and s.metadata['stream'] == 5 and s.metadata['rtt'] == 1104]
+    self.assertEqual(2906112, stream.metadata['snd_cwnd'])
+    throughput = {s.metadata['direction']: (s.value,
+                                            s.metadata['retransmits'])
+                  for s in samples if s.metric == 'Throughput'}
+    self.assertEqual({'forward': (1440.0, 12), 'reverse': (496.0, 0)},
+                     throughput)
+    self.assertTrue(all(s.metadata['ip_type'] == 'internal'
+                        for s in samples))
+
+  def testParseUdp(self):
+    samples = iperf_benchmark.ParseIperf3Results(_UDP_RESULTS, {})
+    self.assertEqual(
+        [('Stream Interval Throughput', 1000.0),
+         ('Interval Throughput', 1000.0), ('Stream Throughput', 900.0),
+         ('Throughput', 900.0), ('Jitter', 0.05), ('Packet Loss', 1.0)],
+        [(s.metric, s.value) for s in samples])
+
+  def testParseError(self):
+    with self.assertRaises(ValueError):
+      iperf_benchmark.ParseIperf3Results({'error': 'unable to connect'}, {})
+
+  def testRunBidirectional(self):
+    vms = [mock.Mock(internal_ip='10.0.0.%d' % i) for i in xrange(2)]
+    vms[0].RemoteCommand.return_value = (self.tcp_output, '')
+    benchmark_spec = mock.Mock(vms=vms)
+    with mock.patch.object(iperf_benchmark.vm_util,
+                           'ShouldRunOnExternalIpAddress', return_value=False):
+      with mock.patch.object(iperf_benchmark.vm_util,
+                             'ShouldRunOnInternalIpAddress',
+                             return_value=True):
+        samples = iperf_benchmark.Run(benchmark_spec)
+    self.assertFalse(vms[1].RemoteCommand.called)
+    command = vms[0].RemoteCommand.call_args[0][0]
+    self.assertEqual('iperf3 --client 10.0.0.1 --port 20000 --time 2 '
+                     '--parallel 1 --interval 1 --json --bidir', command)
+    self.assertEqual(2, len([s for s in samples if s.metric == 'Throughput']))
+
+
+if __name__ == '__main__':
+  unittest.main()
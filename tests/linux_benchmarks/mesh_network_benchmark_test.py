@@ -0,0 +1,130 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for mesh_network_benchmark."""
+
+import json
+import re
+import unittest
+
+import mock
+
+from perfkitbenchmarker.linux_benchmarks import mesh_network_benchmark
+from tests import mock_flags
+
+_STREAM_OUTPUT = ' 87380  16384  16384    10.00    %s   \n'
+_RR_OUTPUT = '16384  87380  1        1       10.00    %s   \n16384  87380 \n'
+
+
+class RoundRobinScheduleTestCase(unittest.TestCase):
+
+  def _CheckSchedule(self, num_vms, num_rounds):
+    schedule = mesh_network_benchmark.RoundRobinSchedule(num_vms)
+    self.assertEqual(num_rounds, len(schedule))
+    pairs = []
+    for round_pairs in schedule:
+      vms = [vm for pair in round_pairs for vm in pair]
+      self.assertEqual(len(vms), len(set(vms)))
+      pairs.extend(round_pairs)
+    self.assertEqual(
+        sorted((a, b) for a in xrange(num_vms) for b in xrange(num_vms)
+               if a != b), sorted(pairs))
+
+  def testEven(self):
+    self._CheckSchedule(4, 6)
+
+  def testOdd(self):
+    self._CheckSchedule(5, 10)
+
+  def testTwo(self):
+    self.assertEqual([[(0, 1)], [(1, 0)]],
+                     mesh_network_benchmark.RoundRobinSchedule(2))
+
+
+class RunRoundRobinTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.flags = mock_flags.PatchTestCaseFlags(self)
+    self.flags.num_connections = 1
+    self.flags.duration_in_seconds = 10
+    self.flags.mesh_network_round_margin = 5
+    self.vms = []
+    for i in xrange(3):
+      vm = mock.Mock(internal_ip='10.0.0.%d' % i)
+      vm.RemoteCommand.side_effect = self._MakeRemoteCommand(i)
+      self.vms.append(vm)
+    self.scripts = {}
+    original = mesh_network_benchmark.GetScheduleScript
+
+    def GetScheduleScript(vm_index, *args):
+      self.scripts[vm_index] = original(vm_index, *args)
+      return self.scripts[vm_index]
+
+    for p in (mock.patch(mesh_network_benchmark.__name__ + '.open',
+                         create=True),
+              mock.patch(mesh_network_benchmark.vm_util.__name__ +
+                         '.GetTempDir', return_value='/tmp'),
+              mock.patch.object(mesh_network_benchmark, 'GetScheduleScript',
+                                side_effect=GetScheduleScript)):
+      p.start()
+      self.addCleanup(p.stop)
+
+  def _MakeRemoteCommand(self, index):
+    def RemoteCommand(command, **kwargs):
+      if command == 'date +%s':
+        return '1000\n', ''
+      # Answer with the flows of the script pushed to this VM.
+      output = ''
+      for flow in re.findall(r'"#flow (\d+) (\w+) (\d+)"',
+                             self.scripts[index]):
+        server = int(flow[2])
+        output += '#flow %s %s %s\n' % flow
+        if flow[1] == 'TCP_RR':
+          output += _RR_OUTPUT % (1000.0 / (index + server + 1))
+        else:
+          output += _STREAM_OUTPUT % (100.0 * (index + 1) + server)
+      return output, ''
+    return RemoteCommand
+
+  def testRun(self):
+    samples = mesh_network_benchmark.RunRoundRobin(self.vms)
+
+    throughput = {(s.metadata['sending_machine'],
+                   s.metadata['receiving_machine']): s.value
+                  for s in samples if s.metric == 'TCP_STREAM_Throughput'}
+    self.assertEqual(6, len(throughput))
+    self.assertEqual(301.0, throughput[2, 1])
+    latency, = [s for s in samples if s.metric == 'TCP_RR_Latency'
+                and s.metadata['sending_machine'] == 0
+                and s.metadata['receiving_machine'] == 2]
+    self.assertAlmostEqual(3.0, latency.value)
+    matrix, = [s for s in samples
+               if s.metric == 'TCP_STREAM_Throughput_Matrix']
+    self.assertEqual([None, 101.0, 102.0],
+                     json.loads(matrix.metadata['matrix'])[0])
+    # Client 0 first runs in the second round, at 1000 + 30 + 3 * 5 + 30.
+    self.assertIn('wait_until 1075\n', self.scripts[0])
+    for vm in self.vms:
+      vm.PushFile.assert_called_once_with(
+          mock.ANY, mesh_network_benchmark.SCHEDULE_SCRIPT)
+
+  def testUnreachable(self):
+    self.vms[1].RemoteCommand.side_effect = (
+        lambda command, **kwargs: ('1000\n', ''))
+    with self.assertRaises(mesh_network_benchmark.errors.Benchmarks.RunError):
+      mesh_network_benchmark.RunRoundRobin(self.vms)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -55,7 +55,17 @@ class MySQLServiceBenchmarkTestCase(unittest.TestCase,
         sample.Sample(
             'sysbench latency percentile 99', 57.15,
             'milliseconds', {})]
-    self.assertSampleListsEqualUpToTimestamp(results, expected_results)
+    self.assertSampleListsEqualUpToTimestamp(results[:16], expected_results)
+    # Then come the samples of each interval, with the first three of the
+    # run reported as warm-up.
+    self.assertEqual(
+        ['sysbench interval tps'] * 8 + ['sysbench steady state tps',
+                                         'sysbench steady state qps'],
+        [s.metric for s in results[16:]])
+    self.assertEqual([False] * 3 + [True] * 5,
+                     [s.metadata['steady_state'] for s in results[16:24]])
+    self.assertAlmostEqual(577.2, results[24].value)
+    self.assertEqual(6, results[24].metadata['warmup_seconds'])
 
 
 if __name__ == '__main__':
@@ -132,3 +132,107 @@ class NetperfBenchmarkTestCase(unittest.TestCase):
     for i, meta in enumerate(expected_meta):
       self.assertIsInstance(result[i][3], dict)
       self.assertDictContainsSubset(meta, result[i][3])
+
+
+_PROC_STAT = """cpu  %s
+cpu0 %s 0 0
+cpu1 %s 0 0
+intr 12345
+"""
+
+
+class NetperfManyFlowsTestCase(unittest.TestCase):
+
+  def setUp(self):
+    path = os.path.join(os.path.dirname(__file__),
+                        '..', 'data',
+                        'netperf_results.json')
+    with open(path) as fp:
+      self.stream_stdout = '\n'.join(json.load(fp)[4])
+    p = mock.patch.object(netperf_benchmark, 'FLAGS')
+    self.flags = p.start()
+    self.addCleanup(p.stop)
+    self.flags.netperf_many_flows = True
+    self.flags.netperf_max_iter = None
+    self.flags.netperf_test_length = 60
+    self.flags.netperf_thinktime = 0
+    self.flags.netperf_enable_histograms = False
+
+  def testCpuMask(self):
+    self.assertEqual('00000005', netperf_benchmark.CpuMask([0, 2]))
+    self.assertEqual('00000001,00000000', netperf_benchmark.CpuMask([32]))
+    self.assertEqual('00000000', netperf_benchmark.CpuMask([]))
+
+  def testCpuUtilizationSamples(self):
+    before = netperf_benchmark.ParseProcStat(
+        _PROC_STAT % ('0 0 0 0 0 0 0 0', '10 0 10 80 0 0 0 0',
+                      '0 0 0 100 0 0 0 0'))
+    after = netperf_benchmark.ParseProcStat(
+        _PROC_STAT % ('0 0 0 0 0 0 0 0', '20 0 40 130 0 0 10 0',
+                      '0 0 10 180 10 0 0 0'))
+    self.assertEqual([0, 1], sorted(before))
+    samples = netperf_benchmark.GetCpuUtilizationSamples(
+        before, after, 'sending', {'ip_type': 'internal'})
+    self.assertEqual(
+        [('CPU_Utilization', 50.0, 0), ('CPU_Utilization', 10.0, 1),
+         ('CPU_Utilization_max', 50.0, 0)],
+        [(s.metric, s.value, s.metadata['cpu']) for s in samples])
+    self.assertEqual(10.0, samples[0].metadata['softirq_percent'])
+    self.assertEqual(30.0, samples[2].metadata['average_percent'])
+    self.assertEqual('internal', samples[2].metadata['ip_type'])
+
+  def testConfigureSteering(self):
+    vm = mock.Mock(num_cpus=4)
+    vm.RemoteCommand.side_effect = [
+        ('10.0.0.3 dev ens4 src 10.0.0.2 uid 0\n    cache\n', ''),
+        ('rx-0\nrx-1\ntx-0\ntx-1\n', ''),
+        ('', '')]
+    steering = netperf_benchmark.ConfigureSteering(vm, '10.0.0.3')
+    self.assertEqual({'interface': 'ens4', 'rx_queues': 2, 'tx_queues': 2,
+                      'rps': True}, steering)
+    command = vm.RemoteCommand.call_args[0][0]
+    self.assertIn('echo 00000005 | sudo tee '
+                  '/sys/class/net/ens4/queues/tx-0/xps_cpus', command)
+    self.assertIn('echo 0000000a | sudo tee '
+                  '/sys/class/net/ens4/queues/rx-1/rps_cpus', command)
+
+  def testConfigureSteeringUnsupported(self):
+    vm = mock.Mock(num_cpus=4)
+    vm.RemoteCommand.side_effect = [
+        ('10.0.0.3 dev ens4 src 10.0.0.2 uid 0\n    cache\n', ''),
+        ('rx-0\ntx-0\n', ''),
+        netperf_benchmark.errors.VirtualMachine.RemoteCommandError(
+            'tee: xps_cpus: No such file or directory')]
+    steering = netperf_benchmark.ConfigureSteering(vm, '10.0.0.3')
+    self.assertEqual({'interface': 'ens4', 'rx_queues': 1, 'tx_queues': 1,
+                      'rps': True}, steering)
+
+  def testRunNetperf(self):
+    client = mock.Mock(num_cpus=2)
+    server = mock.Mock(num_cpus=1)
+    server.RemoteCommand.return_value = (
+        _PROC_STAT % ('0', '0 0 0 0 0 0 0 0', '0 0 0 0 0 0 0 0'), '')
+    client.RemoteCommand.side_effect = [
+        (_PROC_STAT % ('0', '0 0 0 0 0 0 0 0', '0 0 0 0 0 0 0 0'), ''),
+        (json.dumps(([self.stream_stdout] * 3, [''] * 3, [0] * 3)), ''),
+        (_PROC_STAT % ('0', '50 0 0 50 0 0 0 0', '0 0 0 100 0 0 0 0'), '')]
+    server.RemoteCommand.side_effect = [
+        (_PROC_STAT % ('0', '0 0 0 0 0 0 0 0', '0 0 0 0 0 0 0 0'), ''),
+        (_PROC_STAT % ('0', '100 0 0 0 0 0 0 0', '0 0 0 0 0 0 0 0'), '')]
+
+    samples = netperf_benchmark.RunNetperf(client, 'TCP_STREAM', '10.0.0.3',
+                                           3, server_vm=server)
+
+    remote_cmd = client.RemoteCommand.call_args_list[1][0][0]
+    self.assertIn('--num_streams=3', remote_cmd)
+    self.assertIn('--num_cpus=2', remote_cmd)
+    flows = [(s.value, s.metadata['stream'], s.metadata['sending_cpu'],
+              s.metadata['receiving_cpu']) for s in samples
+             if s.metric == 'TCP_STREAM_Flow_Throughput']
+    self.assertEqual([(1187.94, 0, 0, 0), (1187.94, 1, 1, 0),
+                      (1187.94, 2, 0, 0)], flows)
+    total, = [s for s in samples if s.metric == 'TCP_STREAM_Throughput_total']
+    self.assertAlmostEqual(3563.82, total.value)
+    busiest = {s.metadata['vm_role']: s.value for s in samples
+               if s.metric == 'CPU_Utilization_max'}
+    self.assertEqual({'sending': 50.0, 'receiving': 100.0}, busiest)
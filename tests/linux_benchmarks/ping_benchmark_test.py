@@ -19,6 +19,13 @@ import os
 import mock
 from perfkitbenchmarker.linux_benchmarks import ping_benchmark
 from perfkitbenchmarker import benchmark_spec
+from tests import mock_flags
+
+_HISTOGRAM_OUTPUT = """4 packets transmitted, 3 received, 25% packet loss, time 3ms
+rtt 0.300 1
+rtt 0.280 2
+jitter 0.02
+"""
 
 
 class TestGenerateJobFileString(unittest.TestCase):
@@ -41,5 +48,37 @@ class TestGenerateJobFileString(unittest.TestCase):
     self.assertEquals(vm_spec.vms[1].RemoteCommand.call_count, 1)
     self.assertEquals(len(samples), 8)
 
+
+class HistogramModeTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.flags = mock_flags.PatchTestCaseFlags(self)
+    self.flags.ping_mode = ping_benchmark.HISTOGRAM
+    self.flags.ping_histogram_count = 4
+    self.flags.ping_histogram_interval = 0.0002
+
+  def testParseHistogramOutput(self):
+    self.assertEqual(({0.28: 2, 0.3: 1}, 0.02, 4, 3),
+                     ping_benchmark.ParseHistogramOutput(_HISTOGRAM_OUTPUT))
+
+  def testRun(self):
+    vm_spec = mock.MagicMock(spec=benchmark_spec.BenchmarkSpec)
+    vm_spec.vms = [mock.MagicMock(), mock.MagicMock()]
+    for vm in vm_spec.vms:
+      vm.RemoteCommand.return_value = (_HISTOGRAM_OUTPUT, '')
+    samples = ping_benchmark.Run(vm_spec)
+
+    for vm in vm_spec.vms:
+      self.assertIn('sudo ping -i 0.0002 -c 4 -W 1',
+                    vm.RemoteCommand.call_args[0][0])
+    values = {s.metric: s.value for s in samples}
+    self.assertEqual(0.3, values['Latency p99.9'])
+    self.assertEqual(0.28, values['Latency p50'])
+    self.assertAlmostEqual(0.2866667, values['Average Latency'])
+    self.assertEqual(0.02, values['Latency Jitter'])
+    self.assertEqual(25.0, values['Packet Loss'])
+    self.assertEqual(20, len(samples))
+
+
 if __name__ == '__main__':
   unittest.main()
@@ -0,0 +1,79 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for redis_benchmark."""
+
+import json
+import unittest
+
+import mock
+
+from perfkitbenchmarker.linux_benchmarks import redis_benchmark
+from tests import mock_flags
+
+_HGRM = """       Value     Percentile TotalCount 1/(1-Percentile)
+       0.100 0.000000000000          1           1.00
+       0.200 0.990000000000         99         100.00
+       1.000 1.000000000000        100
+"""
+
+
+class RedisBenchmarkTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.flags = mock_flags.PatchTestCaseFlags(self)
+    self.flags.redis_numprocesses = 1
+    self.flags.redis_setgetratio = '1:0'
+    self.flags.redis_warmup_seconds = 0
+    self.flags.redis_test_seconds = 20
+    self.flags.redis_cooldown_seconds = 0
+    self.flags.redis_saturation_steps = 2
+    self.redis_vm = mock.Mock(num_cpus=2, internal_ip='10.0.0.1')
+    self.load_vm = mock.Mock()
+    self.load_vm.RemoteCommand.side_effect = self._RemoteCommand
+
+  def _RemoteCommand(self, cmd):
+    threads = int(cmd.split(' -t ')[1].split()[0])
+    # Each client's throughput stops growing after 2 threads.
+    throughput = 1000.0 * min(threads, 2)
+    results = {'ALL STATS': {
+        'Sets': {'Ops/sec': throughput, 'Average Latency': 0.2 * threads},
+        'Totals': {'Ops/sec': throughput, 'Average Latency': 0.2 * threads}}}
+    return (json.dumps(results) + '\n' + redis_benchmark._HDR_SEPARATOR +
+            '\n' + _HGRM, '')
+
+  def testRun(self):
+    samples = redis_benchmark.Run(
+        mock.Mock(vms=[self.redis_vm, self.load_vm]))
+
+    cmd = self.load_vm.RemoteCommand.call_args_list[0][0][0]
+    self.assertIn('--test-time=20', cmd)
+    self.assertIn('--json-out-file=memtier-0.json --hdr-file-prefix=memtier-0',
+                  cmd)
+    throughputs = [(s.metadata['threads'], s.value) for s in samples
+                   if s.metric == 'throughput']
+    # The sweep stops after two steps without a gain.
+    self.assertEqual([(1, 1000.0), (2, 2000.0), (3, 3000.0), (4, 4000.0),
+                      (5, 4000.0), (6, 4000.0)], throughputs)
+    saturation, = [s for s in samples if s.metric == 'saturation_throughput']
+    self.assertEqual((4000.0, 4), (saturation.value,
+                                   saturation.metadata['threads']))
+    self.assertEqual(4000.0, saturation.metadata['sets_throughput'])
+    p99, = [s for s in samples
+            if s.metric == 'latency_p99' and s.metadata['threads'] == 1]
+    self.assertEqual(0.2, p99.value)
+
+
+if __name__ == '__main__':
+  unittest.main()
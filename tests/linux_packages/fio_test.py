@@ -13,15 +13,18 @@
 # limitations under the License.
 """Tests for perfkitbenchmarker.packages.fio."""
 
+import io
 import json
 import os
 import unittest
 
 import mock
 
+from perfkitbenchmarker import errors
 from perfkitbenchmarker import sample
 from perfkitbenchmarker import test_util
 from perfkitbenchmarker.linux_packages import fio
+from tests import mock_flags
 
 
 class FioTestCase(unittest.TestCase, test_util.SamplesTestMixin):
@@ -428,5 +431,83 @@ class FioTestCase(unittest.TestCase, test_util.SamplesTestMixin):
             'filename'))
 
 
+class PrewarmTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.flags = mock_flags.PatchTestCaseFlags(self)
+    self.flags.fio_prewarm_jobs_per_device = 2
+    self.flags.fio_prewarm_iodepth = 16
+    self.flags.fio_prewarm_log_msec = 1000
+    self.vm = mock.Mock()
+    p = mock.patch.object(fio.artifact_collection, 'StreamArtifacts',
+                          side_effect=self._StreamArtifacts)
+    p.start()
+    self.addCleanup(p.stop)
+    self.members = [mock.Mock(**{'GetDevicePath.return_value': path})
+                    for path in ('/dev/sdb', '/dev/sdc')]
+    self.disk = mock.Mock(is_striped=True, disks=self.members,
+                          mount_point=None,
+                          **{'GetDevicePath.return_value': '/dev/md0'})
+
+  def _RemoteCommand(self, command, **kwargs):
+    if command.startswith('cat %s' % fio.PREWARM_STATE_FILE):
+      return 'serial-b:3145728\n', ''
+    if 'blockdev' in command:
+      return '3145728\nserial-%s\n' % command.split()[-3][-1], ''
+    return '', ''
+
+  def _StreamArtifacts(self, vm, remote_dir, patterns):
+    self.assertEqual(self.vm, vm)
+    self.assertRegexpMatches(patterns[0], r'^pkb_fio_prewarm_\d+_bw\.\*\.log$')
+    yield 'a_bw.1.log', io.BytesIO('1001, 100, 0, 1048576\n2000, 25, 0\n')
+    yield 'a_bw.2.log', io.BytesIO('998, 50, 0, 1048576\n')
+
+  def testPrewarmCommand(self):
+    command = fio.GetPrewarmCommand([('/dev/sdb', 5 * 1024 * 1024)], 'read', 2,
+                                    16, 'log', 1000)
+    self.assertIn('--rw=read --write_bw_log=log --log_avg_msec=1000', command)
+    self.assertIn('--name=prewarm-0-0 --filename=/dev/sdb --offset=0 '
+                  '--size=3145728 --name=prewarm-0-1 --filename=/dev/sdb '
+                  '--offset=3145728 --size=2097152', command)
+    self.assertNotIn('prewarm-0-2', command)
+
+  def testParseBandwidthLogs(self):
+    self.assertEqual([(1.0, 150.0), (2.0, 25.0)],
+                     fio.ParsePrewarmBandwidthLogs(
+                         ['1001, 100, 0, 4096\n', '998, 50, 0, 4096\n', '\n',
+                          '2000, 25, 0, 4096\n'], 1000))
+
+  def testPrewarmSkipsInitializedMembers(self):
+    self.vm.RemoteCommand.side_effect = self._RemoteCommand
+    with mock.patch(fio.__name__ + '.time') as time:
+      time.time.side_effect = [0, 10, 13]
+      samples = fio.PrewarmScratchDisk(self.vm, self.disk, fio.PREWARM_READ)
+    command = self.vm.RobustRemoteCommand.call_args[0][0]
+    self.assertIn('--filename=/dev/sdc', command)
+    self.assertNotIn('/dev/sdb', command)
+    self.assertEqual(
+        [('Prewarm Throughput', 150.0), ('Prewarm Throughput', 25.0),
+         ('Prewarm Time', 3), ('Prewarm Bandwidth', 1024.0)],
+        [(s.metric, s.value) for s in samples])
+    self.vm.RemoteCommand.assert_called_with(
+        'printf "%%s\\n" serial-c:3145728 >> %s' % fio.PREWARM_STATE_FILE)
+
+  def testPrewarmWritesStripedDevice(self):
+    self.vm.RemoteCommand.side_effect = self._RemoteCommand
+    fio.PrewarmScratchDisk(self.vm, self.disk, fio.PREWARM_WRITE)
+    command = self.vm.RobustRemoteCommand.call_args[0][0]
+    self.assertIn('--rw=write', command)
+    self.assertIn('--filename=/dev/md0', command)
+    self.assertIn('prewarm-0-2', command)
+    self.assertNotIn('/dev/sdc', command)
+
+  def testPrewarmWriteRejectsMountedDisk(self):
+    self.disk.mount_point = '/scratch'
+    with self.assertRaises(errors.Benchmarks.PrepareException):
+      fio.PrewarmScratchDisk(self.vm, self.disk, fio.PREWARM_WRITE)
+    self.assertEqual([], fio.PrewarmScratchDisk(self.vm, self.disk,
+                                                fio.PREWARM_NONE))
+
+
 if __name__ == '__main__':
   unittest.main()
@@ -0,0 +1,63 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for perfkitbenchmarker.linux_packages.memtier."""
+
+import unittest
+
+from perfkitbenchmarker.linux_packages import memtier
+
+_HGRM = """       Value     Percentile TotalCount 1/(1-Percentile)
+
+       0.095 0.000000000000          1           1.00
+       0.151 0.500000000000         50           2.00
+       0.151 0.550000000000         50           2.22
+       0.287 0.900000000000         90          10.00
+      12.031 1.000000000000        100
+#[Mean    =        0.287, StdDeviation   =        0.164]
+#[Max     =       12.031, Total count    =        100]
+#[Buckets =           22, SubBuckets     =       2048]
+"""
+
+
+def _Second(count, average_latency):
+  return {'Count': count, 'Accumulated Latency': count * average_latency * 1000,
+          'Min Latency': 0.1, 'Max Latency': 1.0}
+
+
+class MemtierTestCase(unittest.TestCase):
+
+  def testParseHdrHistogram(self):
+    self.assertEqual({0.095: 1, 0.151: 49, 0.287: 40, 12.031: 10},
+                     memtier.ParseHdrHistogram(_HGRM))
+
+  def testParseJsonResultsWindow(self):
+    series = {str(second): _Second(100 * (second + 1), 0.5)
+              for second in xrange(5)}
+    series['4'] = _Second(10, 4.0)
+    results = {'ALL STATS': {
+        'Totals': {'Ops/sec': 280.0, 'Average Latency': 0.6,
+                   'Time-Serie': series},
+        'Sets': {'Ops/sec': 280.0, 'Average Latency': 0.6}}}
+    stats = memtier.ParseJsonResults(results, warmup_seconds=1,
+                                     cooldown_seconds=1)
+    # Seconds 1 to 3 are measured.
+    self.assertEqual(300.0, stats['Totals'][0])
+    self.assertAlmostEqual(0.5, stats['Totals'][1])
+    self.assertEqual((280.0, 0.6), stats['Sets'])
+    self.assertNotIn('Gets', stats)
+
+
+if __name__ == '__main__':
+  unittest.main()
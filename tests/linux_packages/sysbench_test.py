@@ -0,0 +1,139 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the sysbench output parser."""
+
+import json
+import os
+import unittest
+
+from perfkitbenchmarker.linux_packages import sysbench
+from tests import mock_flags
+
+_INTERVAL_10 = ('[ %ds ] thds: 8 tps: %.2f qps: %.2f (r/w/o: 0.00/0.00/0.00) '
+                'lat (ms,95%%): %.2f err/s: %.2f reconn/s: 0.00\n')
+_SYSBENCH_10_OUTPUT = """sysbench 1.0.11 (using system LuaJIT 2.1.0-beta3)
+
+Threads started!
+
+""" + _INTERVAL_10 % (2, 100, 2000, 90, 0) + _INTERVAL_10 % (
+    4, 200, 4000, 50, 1) + """Latency histogram (values are in milliseconds)
+       value  ------------- distribution ------------- count
+      10.000 |****************************************  90
+      20.000 |****                                      9
+     100.000 |*                                         1
+
+SQL statistics:
+    queries performed:
+        total:                           6000
+    transactions:                        300    (150.00 per sec.)
+    queries:                             6000   (3000.00 per sec.)
+    ignored errors:                      2      (1.00 per sec.)
+
+Latency (ms):
+         min:                                    5.00
+         avg:                                   12.50
+         max:                                  100.00
+         95th percentile:                       60.00
+         sum:                                 3750.00
+
+Threads fairness:
+    events (avg/stddev):           37.5000/1.00
+"""
+
+_SYSBENCH_04_OUTPUT = """OLTP test statistics:
+    transactions:                        1000   (16.66 per sec.)
+    read/write requests:                 19000  (316.54 per sec.)
+
+Test execution summary:
+    per-request statistics:
+         min:                                  1.23ms
+         avg:                                 60.02ms
+         max:                                912.21ms
+         approx.  95 percentile:             117.10ms
+"""
+
+
+class SysbenchParserTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.flags = mock_flags.PatchTestCaseFlags(self)
+    self.flags.sysbench_steady_state_tolerance = 0.1
+    self.flags.sysbench_steady_state_window = 3
+
+  def testParse05(self):
+    path = os.path.join(os.path.dirname(__file__), '..', 'data',
+                        'sysbench-output-sample.txt')
+    with open(path) as fp:
+      results = sysbench.ParseSysbenchOutput(fp)
+    self.assertEqual(8, len(results.intervals))
+    self.assertEqual(sysbench.SysbenchInterval(
+        2, 16, 526.38, 9552.31, 210.67, 0.0, 0.0), results.intervals[0])
+    self.assertEqual((586.29, 10553.27), (results.tps, results.qps))
+    self.assertEqual({'min': 18.31, 'avg': 27.26, 'max': 313.5,
+                      'percentile': 57.15}, results.latency)
+    self.assertEqual(99, results.latency_percentile)
+    self.assertEqual({}, results.histogram)
+
+  def testParse10(self):
+    results = sysbench.ParseSysbenchOutput(_SYSBENCH_10_OUTPUT)
+    self.assertEqual([sysbench.SysbenchInterval(2, 8, 100.0, 2000.0, 90.0,
+                                                0.0, 0.0),
+                      sysbench.SysbenchInterval(4, 8, 200.0, 4000.0, 50.0,
+                                                1.0, 0.0)],
+                     results.intervals)
+    self.assertEqual({10.0: 90, 20.0: 9, 100.0: 1}, results.histogram)
+    self.assertEqual((150.0, 3000.0), (results.tps, results.qps))
+    self.assertEqual({'min': 5.0, 'avg': 12.5, 'max': 100.0,
+                      'percentile': 60.0}, results.latency)
+    self.assertEqual(95, results.latency_percentile)
+
+  def testParse04(self):
+    results = sysbench.ParseSysbenchOutput(_SYSBENCH_04_OUTPUT)
+    self.assertEqual((16.66, 316.54), (results.tps, results.qps))
+    self.assertEqual({'min': 1.23, 'avg': 60.02, 'max': 912.21,
+                      'percentile': 117.1}, results.latency)
+    self.assertEqual(95, results.latency_percentile)
+
+  def testFindSteadyState(self):
+    self.assertEqual(2, sysbench.FindSteadyState(
+        [10, 50, 98, 101, 100, 99, 102, 100], 0.1, 3))
+    self.assertEqual(0, sysbench.FindSteadyState([10, 100], 0.1, 3))
+    self.assertIsNone(sysbench.FindSteadyState(
+        [10, 100, 10, 100, 10, 100], 0.1, 3))
+
+  def testGetSamples(self):
+    self.flags.sysbench_steady_state_window = 1
+    samples = sysbench.GetSamples(
+        sysbench.ParseSysbenchOutput(_SYSBENCH_10_OUTPUT), {'a': 1})
+    metrics = [s.metric for s in samples]
+    self.assertEqual(
+        ['sysbench interval tps', 'sysbench interval tps',
+         'sysbench steady state tps', 'sysbench steady state qps',
+         'sysbench latency p50', 'sysbench latency p90',
+         'sysbench latency p99', 'sysbench latency p99.9',
+         'sysbench latency histogram'], metrics)
+    # The second half of the run is the 200 tps interval.
+    self.assertEqual([False, True],
+                     [s.metadata['steady_state'] for s in samples[:2]])
+    self.assertEqual((200.0, 2), (samples[2].value,
+                                  samples[2].metadata['warmup_seconds']))
+    self.assertEqual(20.0, samples[6].value)
+    self.assertEqual([[10.0, 90], [20.0, 9], [100.0, 1]],
+                     json.loads(samples[-1].metadata['histogram']))
+    self.assertTrue(all(s.metadata['a'] == 1 for s in samples))
+
+
+if __name__ == '__main__':
+  unittest.main()
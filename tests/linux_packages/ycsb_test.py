@@ -17,8 +17,10 @@ import copy
 import os
 import unittest
 
+import mock
 
 from perfkitbenchmarker.linux_packages import ycsb
+from tests import mock_flags
 
 
 class SimpleResultParserTestCase(unittest.TestCase):
@@ -233,3 +235,250 @@ class CombineResultsTestCase(unittest.TestCase):
     self.assertEqual(r, r_copy)
     r['groups']['read']['statistics'] = {}
     self.assertEqual(r, combined)
+
+
+def _FakeResult(throughput, latency_ms):
+  return {
+      'client': '',
+      'command_line': '',
+      'groups': {
+          'overall': {
+              'group': 'overall',
+              'statistics': {'Throughput(ops/sec)': throughput},
+              'histogram': []
+          },
+          'read': {
+              'group': 'read',
+              'statistics': {'Operations': 100},
+              'histogram': [(latency_ms, 100)]
+          }
+      }
+  }
+
+
+class TargetSearchTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.flags = mock_flags.PatchTestCaseFlags(self)
+    self.flags.ycsb_operation_count = 1000000
+    self.flags.ycsb_record_count = 1000
+    self.flags.ycsb_timelimit = 1800
+    self.flags.ycsb_threads_per_client = ['8', '32']
+    self.flags.ycsb_slo_latency_ms = 10.0
+    self.flags.ycsb_slo_percentile = 99.0
+    self.flags.ycsb_target_search_steps = 8
+    self.flags.ycsb_target_search_step_seconds = 60
+    self.workload = os.path.join(os.path.dirname(__file__), '..', 'data',
+                                 'ycsb_workloada')
+    self.vms = [mock.Mock(), mock.Mock()]
+    self.executor = ycsb.YCSBExecutor('basic')
+    p = mock.patch.object(ycsb.file_distribution, 'DistributeFile')
+    self.distribute = p.start()
+    self.addCleanup(p.stop)
+    self.targets = []
+
+  def _RunThreaded(self, vms, **parameters):
+    """Answers like a database that meets the SLO up to 6000 ops/sec."""
+    target = parameters['target']
+    self.targets.append(target)
+    self.assertEqual(32, parameters['threads'])
+    self.assertEqual(60, parameters['maxexecutiontime'])
+    if target is None:
+      throughput, latency_ms = 10000, 50
+    else:
+      throughput, latency_ms = target, 2 if target <= 6000 else 20
+    return [_FakeResult(throughput / 2.0, latency_ms) for _ in vms]
+
+  def testSearch(self):
+    with mock.patch.object(self.executor, '_RunThreaded',
+                           side_effect=self._RunThreaded):
+      samples = self.executor.RunTargetSearch(self.vms, [self.workload])
+    self.assertEqual([None, 5000, 7500, 6250, 5625, 5937, 6093, 6015],
+                     self.targets)
+    curve = [(s.metadata['target'], s.value, s.metadata['meets_slo'])
+             for s in samples if s.metric == 'SLO Latency']
+    self.assertEqual((None, 50, False), curve[0])
+    self.assertEqual((5000, 2, True), curve[1])
+    self.assertEqual((7500, 20, False), curve[2])
+    result, = [s for s in samples if s.metric == 'Max Throughput Under SLO']
+    self.assertEqual(5937, result.value)
+    self.assertEqual(8, result.metadata['target_search_runs'])
+    self.assertEqual(10.0, result.metadata['slo_latency_ms'])
+    throughput = [s for s in samples if s.metric == 'overall Throughput']
+    self.assertEqual(8, len(throughput))
+    self.assertEqual(1, throughput[1].metadata['target_search_step'])
+
+  def testSaturationMeetsSlo(self):
+    self.flags.ycsb_slo_latency_ms = 100.0
+    with mock.patch.object(self.executor, '_RunThreaded',
+                           side_effect=self._RunThreaded):
+      samples = self.executor.RunTargetSearch(self.vms, [self.workload])
+    self.assertEqual([None], self.targets)
+    self.assertEqual(10000, samples[-1].value)
+
+  def testUnachievedTargetFailsSlo(self):
+    def RunThreaded(vms, **parameters):
+      target = parameters['target']
+      self.targets.append(target)
+      if target is None:
+        return [_FakeResult(5000, 50) for _ in vms]
+      return [_FakeResult(min(target, 4000) / 2.0, 1) for _ in vms]
+    with mock.patch.object(self.executor, '_RunThreaded',
+                           side_effect=RunThreaded):
+      samples = self.executor.RunTargetSearch(self.vms, [self.workload])
+    self.assertEqual(5000, self.targets[1])
+    step = [s for s in samples if s.metric == 'SLO Latency'][1]
+    self.assertEqual((1, False), (step.value, step.metadata['meets_slo']))
+    self.assertEqual(4000, samples[-1].value)
+
+
+class _FakeSpec(object):
+  pass
+
+
+class ChunkedLoadTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.flags = mock_flags.PatchTestCaseFlags(self)
+    self.flags.ycsb_record_count = 1000
+    self.flags.ycsb_load_chunk_records = 300
+    self.flags.ycsb_load_workers_per_client = 2
+    self.workload = os.path.join(os.path.dirname(__file__), '..', 'data',
+                                 'ycsb_workloada')
+    self.vms = [mock.Mock(), mock.Mock()]
+    self.executor = ycsb.YCSBExecutor('basic')
+    p = mock.patch.object(ycsb.file_distribution, 'DistributeFile')
+    self.distribute = p.start()
+    self.addCleanup(p.stop)
+    self.spec = _FakeSpec()
+    ycsb.context.SetThreadBenchmarkSpec(self.spec)
+    self.addCleanup(ycsb.context.SetThreadBenchmarkSpec, None)
+    p = mock.patch.object(ycsb.spec_journal, 'RecordSpecAttributes')
+    self.record = p.start()
+    self.addCleanup(p.stop)
+    self.loaded = []
+    self.failing_chunk = None
+
+  def _Load(self, vm, **kwargs):
+    start, count = kwargs['insertstart'], kwargs['insertcount']
+    if start == self.failing_chunk:
+      raise IOError('loader failed')
+    self.loaded.append((start, count))
+    return {
+        'client': '',
+        'command_line': '-load',
+        'groups': {
+            'overall': {
+                'group': 'overall',
+                'statistics': {'Throughput(ops/sec)': count / 2.0,
+                               'RunTime(ms)': 2000},
+                'histogram': []
+            },
+            'insert': {
+                'group': 'insert',
+                'statistics': {'Operations': count},
+                'histogram': [(1, count)]
+            }
+        }
+    }
+
+  def _LoadThreaded(self):
+    with mock.patch.object(self.executor, '_Load', side_effect=self._Load):
+      return self.executor._LoadThreaded(self.vms, self.workload)
+
+  def testPlan(self):
+    self.assertEqual([(0, 300), (300, 300), (600, 300), (900, 100)],
+                     ycsb.PlanLoadChunks(1000, 300))
+
+  def testLoad(self):
+    samples = self._LoadThreaded()
+    self.assertEqual(ycsb.PlanLoadChunks(1000, 300), sorted(self.loaded))
+    chunks = sorted((s.metadata['insertstart'], s.value) for s in samples
+                    if s.metric == 'Load Chunk Throughput')
+    self.assertEqual([(0, 150.0), (300, 150.0), (600, 150.0), (900, 50.0)],
+                     chunks)
+    operations, = [s for s in samples if s.metric == 'insert Operations']
+    self.assertEqual(1000, operations.value)
+    self.assertEqual({}, self.spec.ycsb_load_checkpoints)
+    self.assertEqual(5, self.record.call_count)
+    self.distribute.assert_called_once_with(
+        self.vms, self.workload, ycsb.posixpath.join(
+            ycsb.INSTALL_DIR, 'ycsb_workloada'))
+
+  def testResume(self):
+    self.failing_chunk = 600
+    with self.assertRaises(ycsb.vm_util.errors.VmUtil.ThreadException):
+      self._LoadThreaded()
+    self.assertEqual({0, 300, 900},
+                     self.spec.ycsb_load_checkpoints.values()[0])
+    self.failing_chunk = None
+    self.loaded = []
+    self._LoadThreaded()
+    self.assertEqual([(600, 300)], self.loaded)
+    self.assertEqual({}, self.spec.ycsb_load_checkpoints)
+
+
+def _StatusLine(seconds, throughput, latencies):
+  return ('2017-05-01 10:00:%02d:000 %d sec: 100 operations; '
+          '%s current ops/sec; est completion in 1 minute %s\n' %
+          (seconds, seconds, throughput, latencies))
+
+
+class StatusTestCase(unittest.TestCase):
+
+  def testParseHistogram(self):
+    intervals = list(ycsb.ParseStatusLines([
+        '2017-05-01 10:00:00:000 0 sec: 0 operations; est completion in 0\n',
+        'Loading workload...\n',
+        _StatusLine(10, '100.5', '[READ AverageLatency(us)=1500] '
+                    '[CLEANUP AverageLatency(us)=9]'),
+        '2017-05-01 10:00:20:500 20 sec: 100 operations; '
+        'est completion in 0\n']))
+    self.assertEqual(2, len(intervals))
+    self.assertEqual(1493632800.0, intervals[0].start)
+    self.assertEqual(1493632810.0, intervals[0].end)
+    self.assertEqual(100.5, intervals[0].throughput)
+    self.assertEqual({'read': 1.5}, intervals[0].latencies)
+    self.assertEqual((1493632820.5, 0.0, {}), intervals[1][1:])
+
+  def testParseHdrHistogram(self):
+    interval, = ycsb.ParseStatusLines([
+        _StatusLine(0, '0', ''),
+        _StatusLine(10, '100', '[READ: Count=1000, Max=9000, Min=100, '
+                    'Avg=2000.5, 90=3000, 99=5000] [UPDATE: Count=10, '
+                    'Max=4000, Min=300, Avg=1000, 90=2000, 99=3000]')])
+    self.assertEqual({'read': 2.0005, 'update': 1.0}, interval.latencies)
+
+  def testMergeOverCommonWindow(self):
+    merged = ycsb.MergeStatusIntervals([
+        [ycsb.StatusInterval(0, 10, 100, {'read': 1.0}),
+         ycsb.StatusInterval(10, 20, 100, {'read': 1.0}),
+         ycsb.StatusInterval(20, 30, 100, {'read': 1.0})],
+        [ycsb.StatusInterval(5, 15, 300, {'read': 3.0, 'update': 2.0}),
+         ycsb.StatusInterval(15, 25, 0, {'read': 5.0})]], 10)
+    # Throughput is summed, and latencies are weighted by throughput.
+    self.assertEqual([(5, 15, 400, {'read': 2.5, 'update': 2.0}),
+                      (15, 25, 100, {'read': 1.0})],
+                     merged)
+
+  def testNoOverlap(self):
+    self.assertEqual([], ycsb.MergeStatusIntervals(
+        [[ycsb.StatusInterval(0, 10, 100, {})],
+         [ycsb.StatusInterval(20, 30, 100, {})]], 10))
+
+  def testStalls(self):
+    throughputs = [100, 100, 10, 20, 100, 100, 40, 100]
+    intervals = [ycsb.StatusInterval(10 * i, 10 * (i + 1), throughput, {})
+                 for i, throughput in enumerate(throughputs)]
+    samples = ycsb._CreateStatusSamples([intervals], 10, 0.5, a=1)
+    series = [s for s in samples if s.metric == 'overall Interval Throughput']
+    self.assertEqual(throughputs, [s.value for s in series])
+    self.assertEqual(30, series[3].metadata['interval_start'])
+    values = {s.metric: s.value for s in samples}
+    self.assertEqual(2, values['Stall Count'])
+    self.assertEqual(30, values['Stall Time'])
+    stalls = samples[-1].metadata
+    self.assertEqual('20,60', stalls['stall_starts'])
+    self.assertEqual(20, stalls['longest_stall'])
+    self.assertEqual(100, stalls['median_interval_throughput'])
+    self.assertEqual(1, stalls['a'])
@@ -0,0 +1,157 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for perfkitbenchmarker.module_manifest and lazy module loading."""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import mock
+
+from perfkitbenchmarker import import_util
+from perfkitbenchmarker import linux_benchmarks
+from perfkitbenchmarker import module_manifest
+
+
+class LazyModuleDictTestCase(unittest.TestCase):
+
+  def setUp(self):
+    p = mock.patch(import_util.__name__ + '.importlib')
+    self.importlib = p.start()
+    self.addCleanup(p.stop)
+    self.importlib.import_module.side_effect = lambda name: 'module:' + name
+    self.modules = import_util.LazyModuleDict(
+        {'b': 'pkg.b_module', 'a': 'pkg.a_module'})
+
+  def testKeysDoNotImport(self):
+    self.assertEqual(['a', 'b'], list(self.modules))
+    self.assertIn('a', self.modules)
+    self.assertNotIn('c', self.modules)
+    self.assertEqual(2, len(self.modules))
+    self.assertFalse(self.importlib.import_module.called)
+
+  def testImportsOnceOnLookup(self):
+    self.assertEqual('module:pkg.a_module', self.modules['a'])
+    self.assertEqual('module:pkg.a_module', self.modules.get('a'))
+    self.importlib.import_module.assert_called_once_with('pkg.a_module')
+    self.assertTrue(self.modules.IsLoaded('a'))
+    self.assertFalse(self.modules.IsLoaded('b'))
+
+  def testAssignedValues(self):
+    self.modules.update({'c': 'image'})
+    self.assertEqual(['a', 'b', 'c'], list(self.modules))
+    self.assertEqual('image', self.modules['c'])
+
+  def testLazyModuleList(self):
+    modules = import_util.LazyModuleList(self.modules)
+    self.assertEqual(2, len(modules))
+    self.assertFalse(self.importlib.import_module.called)
+    self.assertEqual('module:pkg.b_module', modules[1])
+    self.assertEqual(['module:pkg.a_module', 'module:pkg.b_module', 'x'],
+                     modules + ['x'])
+
+
+class ModuleManifestTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.temp_dir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.temp_dir)
+    self.manifest_path = os.path.join(self.temp_dir, 'manifest.json')
+    for p in (mock.patch.object(module_manifest, 'MANIFEST_PATH',
+                                self.manifest_path),
+              mock.patch.object(module_manifest, '_state', {}),
+              mock.patch.object(module_manifest, '_Fingerprint',
+                                return_value='abc')):
+      p.start()
+      self.addCleanup(p.stop)
+
+  def _WriteManifest(self, manifest):
+    with open(self.manifest_path, 'w') as fp:
+      json.dump(manifest, fp)
+
+  def testMissingManifest(self):
+    self.assertIsNone(module_manifest.GetManifest())
+
+  def testStaleManifest(self):
+    self._WriteManifest({'fingerprint': 'old'})
+    self.assertIsNone(module_manifest.GetManifest())
+
+  def testWriteManifest(self):
+    module_manifest.WriteManifest()
+    module_manifest._state.clear()
+    manifest = module_manifest.GetManifest()
+    self.assertEqual('abc', manifest['fingerprint'])
+    self.assertEqual('perfkitbenchmarker.linux_benchmarks.fio_benchmark',
+                     manifest['flags']['fio_jobfile'])
+    ping = next(info for info in manifest['benchmarks'][
+        linux_benchmarks.__name__] if info['name'] == 'ping')
+    self.assertEqual(2, ping['vm_count'])
+    self.assertFalse(ping['scratch_disk'])
+
+  def testImportModulesForArgs(self):
+    self._WriteManifest({'fingerprint': 'abc', 'flags': {
+        'lazy_flag': 'pkg.lazy', 'lazy_bool': 'pkg.lazy_bool',
+        'other_flag': 'pkg.other'}})
+    with mock.patch(import_util.__name__ + '.importlib') as importlib:
+      module_manifest.ImportModulesForArgs(
+          ['pkb.py', '--lazy_flag=1', '--nolazy_bool', 'value',
+           '--', '--other_flag'])
+    self.assertEqual([mock.call('pkg.lazy'), mock.call('pkg.lazy_bool')],
+                     importlib.import_module.call_args_list)
+
+  def testImportModulesForFlagfileArgs(self):
+    self._WriteManifest({'fingerprint': 'abc', 'flags': {
+        'lazy_flag': 'pkg.lazy', 'lazy_bool': 'pkg.lazy_bool',
+        'other_flag': 'pkg.other'}})
+    nested_path = os.path.join(self.temp_dir, 'nested.cfg')
+    with open(nested_path, 'w') as fp:
+      fp.write('--lazy_bool\n')
+    flagfile_path = os.path.join(self.temp_dir, 'flags.cfg')
+    with open(flagfile_path, 'w') as fp:
+      fp.write('# A comment.\n--lazy_flag=1\n--flagfile=%s\n' % nested_path)
+    with mock.patch(import_util.__name__ + '.importlib') as importlib:
+      module_manifest.ImportModulesForArgs(
+          ['pkb.py', '--flagfile=%s' % flagfile_path])
+    self.assertEqual([mock.call('pkg.lazy'), mock.call('pkg.lazy_bool')],
+                     importlib.import_module.call_args_list)
+
+  def testImportAllForMissingFlagfile(self):
+    self._WriteManifest({'fingerprint': 'abc', 'flags': {}})
+    with mock.patch.object(module_manifest, 'ImportAll') as import_all:
+      module_manifest.ImportModulesForArgs(
+          ['pkb.py', '--flagfile=%s' % os.path.join(self.temp_dir, 'none')])
+    import_all.assert_called_once_with()
+
+  def testImportAllWithoutManifest(self):
+    with mock.patch.object(module_manifest, 'ImportAll') as import_all:
+      with mock.patch.object(module_manifest, 'WriteManifest') as write:
+        module_manifest.ImportModulesForArgs(['pkb.py', '--lazy_flag=1'])
+    import_all.assert_called_once_with()
+    write.assert_called_once_with()
+
+  def testLazyBenchmarkModules(self):
+    self._WriteManifest({'fingerprint': 'abc', 'benchmarks': {
+        'pkg': [{'name': 'lazy', 'module': 'pkg.lazy_benchmark'}]}})
+    benchmarks = module_manifest.LoadBenchmarkModules('pkg', [])
+    self.assertEqual(['lazy'], list(benchmarks))
+    self.assertEqual('pkg.lazy_benchmark', benchmarks.GetModuleName('lazy'))
+    self.assertNotIn('pkg.lazy_benchmark', sys.modules)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,144 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for perfkitbenchmarker.provider_api and the provider API helpers."""
+
+import unittest
+
+import mock
+
+from perfkitbenchmarker import provider_api
+from perfkitbenchmarker.providers.aws import util as aws_util
+from perfkitbenchmarker.providers.gcp import util as gcp_util
+from tests import mock_flags
+
+_FAKE_ENDPOINT = 'http://localhost:5000'
+
+
+class _FakeEc2Client(object):
+  """Answers EC2 calls like a local fake of the EC2 endpoint."""
+
+  def __init__(self, region_name, endpoint_url):
+    self.region_name = region_name
+    self.endpoint_url = endpoint_url
+    self.calls = []
+
+  def describe_vpcs(self, **params):
+    self.calls.append(('describe_vpcs', params))
+    return {'Vpcs': [{'VpcId': 'vpc-1'}], 'ResponseMetadata': {}}
+
+
+class _FakeBoto3(object):
+
+  def __init__(self):
+    self.clients = []
+    self.session = mock.Mock()
+    self.session.Session.return_value.client.side_effect = self._Client
+
+  def _Client(self, service, region_name, endpoint_url):
+    assert service == 'ec2'
+    client = _FakeEc2Client(region_name, endpoint_url)
+    self.clients.append(client)
+    return client
+
+
+class ProviderApiTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.flags = mock_flags.PatchTestCaseFlags(self)
+    self.flags.provider_api = provider_api.SDK
+    self.flags.provider_api_endpoint = _FAKE_ENDPOINT
+    for p in (mock.patch.object(provider_api, '_global_calls',
+                                provider_api.collections.defaultdict(list)),
+              mock.patch.object(provider_api, '_clients', {})):
+      p.start()
+      self.addCleanup(p.stop)
+    self.addCleanup(provider_api.ClearClients)
+
+  def testUseSdk(self):
+    self.assertTrue(provider_api.UseSdk('aws', object()))
+    self.assertFalse(provider_api.UseSdk('aws', None))
+    self.flags.provider_api = provider_api.CLI
+    self.assertFalse(provider_api.UseSdk('aws', object()))
+
+  def testClientsArePooled(self):
+    factory = mock.Mock(side_effect=lambda: object())
+    client = provider_api.GetClient('key', factory)
+    self.assertIs(client, provider_api.GetClient('key', factory))
+    self.assertIsNot(client, provider_api.GetClient('other', factory))
+    self.assertEqual(2, factory.call_count)
+
+  def testSamples(self):
+    provider_api.RecordCall('aws', 'DescribeVpcs', provider_api.SDK, 1.0)
+    provider_api.RecordCall('aws', 'DescribeVpcs', provider_api.SDK, 3.0,
+                            succeeded=False)
+    with self.assertRaises(ValueError):
+      with provider_api.MeasureCall('gcp', 'instances.get', provider_api.CLI):
+        raise ValueError()
+    samples = provider_api.GetSamples()
+    self.assertEqual(4, len(samples))
+    calls, latency = samples[:2]
+    self.assertEqual(('Provider API Calls', 2, 'count'),
+                     (calls.metric, calls.value, calls.unit))
+    self.assertEqual(('Provider API Call Latency', 2.0, 'seconds'),
+                     (latency.metric, latency.value, latency.unit))
+    self.assertEqual(1, calls.metadata['errors'])
+    self.assertEqual(3.0, calls.metadata['latency_p90'])
+    self.assertEqual('gcp', samples[2].metadata['provider'])
+
+  def testAwsSdk(self):
+    boto3 = _FakeBoto3()
+    with mock.patch.object(aws_util, 'boto3', boto3):
+      for _ in xrange(2):
+        response = aws_util.Ec2Call('us-east-1', 'DescribeVpcs',
+                                    VpcIds=['vpc-1'])
+    self.assertEqual({'Vpcs': [{'VpcId': 'vpc-1'}]}, response)
+    client, = boto3.clients
+    self.assertEqual(_FAKE_ENDPOINT, client.endpoint_url)
+    self.assertEqual(2, len(client.calls))
+    self.assertEqual(('describe_vpcs', {'VpcIds': ['vpc-1']}),
+                     client.calls[0])
+    self.assertEqual(2, provider_api.GetSamples()[0].value)
+
+  def testAwsCliFallback(self):
+    with mock.patch.object(aws_util, 'boto3', None):
+      with mock.patch.object(aws_util, 'IssueRetryableCommand',
+                             return_value=('{"Vpcs": []}', '')) as issue:
+        self.assertEqual({'Vpcs': []}, aws_util.Ec2Call(
+            'us-east-1', 'DescribeVpcs', VpcIds=['vpc-1']))
+    cmd = issue.call_args[0][0]
+    self.assertIn('describe-vpcs', cmd)
+    self.assertIn('--cli-input-json={"VpcIds": ["vpc-1"]}', cmd)
+    self.assertEqual(provider_api.CLI,
+                     provider_api.GetSamples()[0].metadata['method'])
+
+  def testGcpSdk(self):
+    discovery = mock.Mock()
+    instances = discovery.build.return_value.instances.return_value
+    instances.list.return_value.execute.return_value = {
+        'items': [{'name': 'vm-1'}]}
+    instances.list_next.return_value = None
+    resource = mock.Mock(project='project', zone='us-central1-a')
+    with mock.patch.object(gcp_util, 'discovery', discovery):
+      items = gcp_util.ListComputeResources('instances', resource,
+                                            ['vm-1', 'vm-2'])
+    self.assertEqual([{'name': 'vm-1'}], items)
+    instances.list.assert_called_once_with(
+        project='project', zone='us-central1-a', filter='name eq (vm-1|vm-2)')
+    self.assertTrue(discovery.build.call_args[1][
+        'discoveryServiceUrl'].startswith(_FAKE_ENDPOINT))
+
+
+if __name__ == '__main__':
+  unittest.main()
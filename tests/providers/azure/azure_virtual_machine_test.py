@@ -0,0 +1,171 @@
+# Copyright 2016 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for perfkitbenchmarker.providers.azure.azure_virtual_machine."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from perfkitbenchmarker import benchmark_spec
+from perfkitbenchmarker import context
+from perfkitbenchmarker import errors
+from perfkitbenchmarker import os_types
+from perfkitbenchmarker import providers
+from perfkitbenchmarker import virtual_machine
+from perfkitbenchmarker import vm_util
+from perfkitbenchmarker.configs import benchmark_config_spec
+from perfkitbenchmarker.providers.azure import azure_network
+from perfkitbenchmarker.providers.azure import azure_virtual_machine
+from tests import mock_flags
+
+
+_BENCHMARK_NAME = 'name'
+_BENCHMARK_UID = 'benchmark_uid'
+_PUBLIC_KEY = 'ssh-rsa AAAA test'
+
+
+class AzureBulkCreateTestCase(unittest.TestCase):
+
+  def setUp(self):
+    mocked_flags = mock_flags.PatchTestCaseFlags(self)
+    mocked_flags.cloud = providers.AZURE
+    mocked_flags.os_type = os_types.DEBIAN
+    mocked_flags.run_uri = 'aaaaaa'
+    mocked_flags.bulk_create_timeout = 600
+    self.addCleanup(context.SetThreadBenchmarkSpec, None)
+    config_spec = benchmark_config_spec.BenchmarkConfigSpec(
+        _BENCHMARK_NAME, flag_values=mocked_flags, vm_groups={})
+    self.spec = benchmark_spec.BenchmarkSpec(mock.MagicMock(), config_spec,
+                                             _BENCHMARK_UID)
+    self.temp_dir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.temp_dir)
+    p = mock.patch(vm_util.__name__ + '.GetTempDir',
+                   return_value=self.temp_dir)
+    p.start()
+    self.addCleanup(p.stop)
+    p = mock.patch(azure_network.__name__ + '.AzureNetwork.GetNetwork')
+    network = p.start().return_value
+    self.addCleanup(p.stop)
+    network.avail_set.name = 'test-avail-set'
+    network.storage_account.name = 'teststorage'
+    p = mock.patch(azure_network.__name__ + '.AzureFirewall.GetFirewall')
+    p.start()
+    self.addCleanup(p.stop)
+    p = mock.patch(vm_util.__name__ + '.IssueCommand')
+    self.issue_command = p.start()
+    self.addCleanup(p.stop)
+    p = mock.patch(vm_util.__name__ + '.IssueRetryableCommand')
+    self.issue_retryable_command = p.start()
+    self.addCleanup(p.stop)
+
+    public_key_path = os.path.join(self.temp_dir, 'key.pub')
+    with open(public_key_path, 'w') as f:
+      f.write(_PUBLIC_KEY + '\n')
+    vm_spec = virtual_machine.BaseVmSpec(
+        'test_vm_spec.Azure', zone='eastus', machine_type='Standard_A1')
+    self.vms = [azure_virtual_machine.DebianBasedAzureVirtualMachine(vm_spec)
+                for _ in range(2)]
+    for vm in self.vms:
+      vm.ssh_public_key = public_key_path
+
+  def _IssueDeployment(self, cmd, **kwargs):
+    """Records the template of a 'group deployment create' command."""
+    with open(cmd[cmd.index('--template-file') + 1]) as f:
+      self.template = json.load(f)
+    return '', '', 0
+
+  def testBulkCreate(self):
+    self.issue_command.side_effect = self._IssueDeployment
+
+    azure_virtual_machine.AzureVirtualMachine._BulkCreate(self.vms)
+
+    # Each VM's public IP is attached to its NIC before the deployment.
+    attach_cmds = sorted(call[0][0] for call in
+                         self.issue_retryable_command.call_args_list)
+    self.assertEqual(
+        [['azure', 'network', 'nic', 'set',
+          '--public-ip-name', vm.public_ip.name,
+          vm.nic.name] + vm.resource_group.args for vm in self.vms],
+        attach_cmds)
+    self.assertEqual(self.issue_command.call_count, 1)
+    deploy_cmd = self.issue_command.call_args[0][0]
+    self.assertEqual(['azure', 'group', 'deployment', 'create'],
+                     deploy_cmd[:4])
+    self.assertEqual([self.vms[0].resource_group.name,
+                      '%s-vms' % self.vms[0].name], deploy_cmd[-2:])
+    self.assertEqual(self.issue_command.call_args[1],
+                     {'timeout': 600})
+
+    resources = self.template['resources']
+    self.assertEqual([vm.name for vm in self.vms],
+                     [r['name'] for r in resources])
+    for vm, r in zip(self.vms, resources):
+      properties = r['properties']
+      self.assertEqual('Microsoft.Compute/virtualMachines', r['type'])
+      self.assertEqual('eastus', r['location'])
+      self.assertEqual({'vmSize': 'Standard_A1'},
+                       properties['hardwareProfile'])
+      self.assertEqual(
+          {'publisher': 'Canonical', 'offer': 'UbuntuServer',
+           'sku': '14.04.4-LTS', 'version': 'latest'},
+          properties['storageProfile']['imageReference'])
+      os_disk = properties['storageProfile']['osDisk']
+      self.assertIn("'teststorage'", os_disk['vhd']['uri'])
+      self.assertIn("'test-avail-set'",
+                    properties['availabilitySet']['id'])
+      self.assertEqual(
+          [{'path': '/home/%s/.ssh/authorized_keys' % vm.user_name,
+            'keyData': _PUBLIC_KEY}],
+          properties['osProfile']['linuxConfiguration']['ssh']['publicKeys'])
+      self.assertIn("'%s'" % vm.nic.name,
+                    properties['networkProfile']['networkInterfaces'][0]['id'])
+
+  def testBulkCreateRejected(self):
+    self.issue_command.return_value = ('', 'QuotaExceeded', 1)
+    with self.assertRaises(errors.Resource.CreationError):
+      azure_virtual_machine.AzureVirtualMachine._BulkCreate(self.vms)
+
+  def testPostCreateAfterBulkCreate(self):
+    responses = {}
+    for i, vm in enumerate(self.vms):
+      responses[('vm', vm.name)] = {
+          'storageProfile': {'osDisk': {'name': vm.name}}}
+      responses[('nic', vm.nic.name)] = {
+          'ipConfigurations': [{'privateIPAddress': '10.0.0.%d' % i}]}
+      responses[('public-ip', vm.public_ip.name)] = {
+          'ipAddress': '1.1.1.%d' % i}
+
+    def IssueShow(cmd, **kwargs):
+      name = cmd[cmd.index('--json') + 1]
+      return json.dumps(responses[(cmd[cmd.index('show') - 1], name)]), ''
+
+    self.issue_retryable_command.side_effect = IssueShow
+
+    for vm in self.vms:
+      vm._PostCreate()
+
+    self.assertEqual(['10.0.0.0', '10.0.0.1'],
+                     [vm.internal_ip for vm in self.vms])
+    self.assertEqual(['1.1.1.0', '1.1.1.1'],
+                     [vm.ip_address for vm in self.vms])
+    self.assertEqual([vm.name for vm in self.vms],
+                     [vm.os_disk.name for vm in self.vms])
+
+
+if __name__ == '__main__':
+  unittest.main()
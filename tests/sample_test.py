@@ -56,3 +56,40 @@ class TestPercentileCalculator(unittest.TestCase):
   def testWrongTypePercentile(self):
     with self.assertRaises(ValueError):
       sample.PercentileCalculator([3], percentiles=["a"])
+
+
+class TestHistogramPercentiles(unittest.TestCase):
+
+  def testHistogramPercentiles(self):
+    histogram = {1: 989, 2: 10, 3: 1}
+    self.assertEqual({50: 1, 99: 2, 99.9: 2, 100: 3},
+                     sample.HistogramPercentiles(
+                         histogram, [50, 99, 99.9, 100]))
+
+
+class TestGridIntervals(unittest.TestCase):
+
+  def testWindowAndMidpoints(self):
+    first = [(0, 10, 'a'), (10, 20, 'b'), (20, 30, 'c')]
+    second = [(4, 16, 'x'), (16, 28, 'y')]
+    self.assertEqual(
+        [(4, [(0, 10, 'a'), (4, 16, 'x')]),
+         (14, [(10, 20, 'b'), (16, 28, 'y')])],
+        sample.GridIntervals([first, second], 10))
+
+  def testNoOverlap(self):
+    self.assertEqual([], sample.GridIntervals(
+        [[(0, 10, 'a')], [(10, 20, 'b')]], 5))
+
+  def testEmptySeries(self):
+    self.assertEqual([], sample.GridIntervals([], 5))
+    self.assertEqual([], sample.GridIntervals([[(0, 10, 'a')], []], 5))
+
+
+class TestWeightedMean(unittest.TestCase):
+
+  def testWeightedMean(self):
+    self.assertEqual(3.0, sample.WeightedMean([1, 4], [1, 2]))
+
+  def testZeroWeights(self):
+    self.assertEqual(2.5, sample.WeightedMean([1, 4], [0, 0]))
@@ -65,6 +65,7 @@ class ScratchDiskTestMixin(object):
     mocked_flags = mock_flags.PatchTestCaseFlags(self)
     mocked_flags.cloud = providers.GCP
     mocked_flags.os_type = os_types.DEBIAN
+    mocked_flags.scratch_disk_lazy_init = True
     self.patches = []
 
     vm_prefix = linux_virtual_machine.__name__ + '.BaseLinuxMixin'
@@ -114,9 +115,10 @@ class ScratchDiskTestMixin(object):
     scratch_disk = vm.scratch_disks[0]
 
     scratch_disk.Create.assert_called_once_with()
-    vm.FormatDisk.assert_called_once_with(scratch_disk.GetDevicePath())
+    vm.FormatDisk.assert_called_once_with(scratch_disk.GetDevicePath(),
+                                          lazy_init=True)
     vm.MountDisk.assert_called_once_with(
-        scratch_disk.GetDevicePath(), '/mountpoint0')
+        scratch_disk.GetDevicePath(), '/mountpoint0', lazy_init=True)
 
     disk_spec = disk.BaseDiskSpec(_COMPONENT, mount_point='/mountpoint1')
     vm.CreateScratchDisk(disk_spec)
@@ -134,9 +136,10 @@ class ScratchDiskTestMixin(object):
     scratch_disk = vm.scratch_disks[1]
 
     scratch_disk.Create.assert_called_once_with()
-    vm.FormatDisk.assert_called_with(scratch_disk.GetDevicePath())
+    vm.FormatDisk.assert_called_with(scratch_disk.GetDevicePath(),
+                                     lazy_init=True)
     vm.MountDisk.assert_called_with(
-        scratch_disk.GetDevicePath(), '/mountpoint1')
+        scratch_disk.GetDevicePath(), '/mountpoint1', lazy_init=True)
 
     vm.DeleteScratchDisks()
 
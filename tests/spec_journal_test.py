@@ -0,0 +1,171 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for perfkitbenchmarker.spec_journal."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from perfkitbenchmarker import context
+from perfkitbenchmarker import errors
+from perfkitbenchmarker import events
+from perfkitbenchmarker import resource
+from perfkitbenchmarker import spec_journal
+
+
+class _FakeResource(object):
+
+  def __init__(self, name):
+    self.name = name
+    self.id = None
+    self.created = False
+
+
+class _FakeVm(_FakeResource):
+
+  def __init__(self, name, network):
+    super(_FakeVm, self).__init__(name)
+    self.network = network
+    self.scratch_disks = []
+
+
+class _FakeSpec(object):
+
+  def __init__(self):
+    self.network = _FakeResource('net')
+    self.networks = {'zone-a': self.network}
+    self.firewalls = {}
+    self.vms = [_FakeVm('vm0', self.network), _FakeVm('vm1', self.network)]
+
+
+class _NeverExistingResource(resource.BaseResource):
+  """A resource that gets an id when requested but never comes to exist."""
+
+  def __init__(self):
+    super(_NeverExistingResource, self).__init__()
+    self.name = 'net'
+    self.id = None
+
+  def _Create(self):
+    self.id = 'sir-1234'
+
+  def _Exists(self):
+    raise errors.Resource.CreationError('describe failed')
+
+  def _Delete(self):
+    pass
+
+
+class SpecJournalTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.temp_dir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.temp_dir)
+    self.path = os.path.join(self.temp_dir, 'benchmark0')
+    self.spec = _FakeSpec()
+    self.journal = spec_journal.SpecJournal(self.path)
+    self.journal.Checkpoint(self.spec)
+
+  def testCheckpointOnly(self):
+    spec = self.journal.Load()
+    self.assertEqual(['vm0', 'vm1'], [vm.name for vm in spec.vms])
+    self.assertEqual(0, os.path.getsize(self.journal.journal_path))
+
+  def testReplayPreservesSharedReferences(self):
+    vm = self.spec.vms[1]
+    vm.id = 'i-1234'
+    vm.created = True
+    self.journal.Record(self.spec, vm, resource.CREATED)
+
+    spec = spec_journal.SpecJournal(self.path).Load()
+    self.assertEqual('i-1234', spec.vms[1].id)
+    self.assertTrue(spec.vms[1].created)
+    self.assertIsNone(spec.vms[0].id)
+    self.assertIs(spec.networks['zone-a'], spec.vms[1].network)
+
+  def testRecordsOwnerOfNestedResource(self):
+    vm = self.spec.vms[0]
+    scratch_disk = _FakeResource('disk0')
+    vm.scratch_disks.append(scratch_disk)
+    scratch_disk.id = 'vol-1'
+    self.journal.Record(self.spec, scratch_disk, resource.CREATED)
+
+    spec = spec_journal.SpecJournal(self.path).Load()
+    self.assertEqual(['vol-1'], [d.id for d in spec.vms[0].scratch_disks])
+
+  def testLaterRecordsWin(self):
+    net = self.spec.network
+    net.id = 'vpc-1'
+    self.journal.Record(self.spec, net, resource.CREATED)
+    net.id = None
+    self.journal.Record(self.spec, net, resource.DELETED)
+
+    spec = spec_journal.SpecJournal(self.path).Load()
+    self.assertIsNone(spec.network.id)
+
+  def testTruncatedRecordIsIgnored(self):
+    self.spec.vms[0].id = 'i-1'
+    self.journal.Record(self.spec, self.spec.vms[0], resource.CREATED)
+    self.spec.vms[1].id = 'i-2'
+    self.journal.Record(self.spec, self.spec.vms[1], resource.CREATED)
+    with open(self.journal.journal_path, 'rb+') as journal_file:
+      journal_file.truncate(os.path.getsize(self.journal.journal_path) - 3)
+
+    spec = spec_journal.SpecJournal(self.path).Load()
+    self.assertEqual('i-1', spec.vms[0].id)
+    self.assertIsNone(spec.vms[1].id)
+
+  def testCheckpointEmptiesJournal(self):
+    self.spec.vms[0].id = 'i-1'
+    self.journal.Record(self.spec, self.spec.vms[0], resource.CREATED)
+    self.journal.Checkpoint(self.spec)
+    self.assertEqual(0, os.path.getsize(self.journal.journal_path))
+    self.assertEqual('i-1', self.journal.Load().vms[0].id)
+
+  def testResourceEventIsJournaled(self):
+    spec_journal.AttachJournal(self.spec, self.journal)
+    context.SetThreadBenchmarkSpec(self.spec)
+    self.addCleanup(context.SetThreadBenchmarkSpec, None)
+    self.spec.vms[0].id = 'i-1'
+    events.resource_state_changed.send(self.spec.vms[0],
+                                       state=resource.READY)
+    self.assertEqual(1, self.journal.num_records)
+    self.assertEqual('i-1', spec_journal.SpecJournal(self.path).Load()
+                     .vms[0].id)
+
+  def testRequestedResourceIsJournaled(self):
+    spec_journal.AttachJournal(self.spec, self.journal)
+    context.SetThreadBenchmarkSpec(self.spec)
+    self.addCleanup(context.SetThreadBenchmarkSpec, None)
+    self.spec.network = self.spec.networks['zone-a'] = _NeverExistingResource()
+    self.journal.Checkpoint(self.spec)
+    with self.assertRaises(errors.Resource.CreationError):
+      self.spec.network.Create()
+    spec = spec_journal.SpecJournal(self.path).Load()
+    self.assertEqual('sir-1234', spec.network.id)
+    self.assertFalse(spec.network.created)
+
+  def testSpecAttributesAreJournaled(self):
+    spec_journal.AttachJournal(self.spec, self.journal)
+    self.spec.load_progress = {'chunks': {0, 10}}
+    spec_journal.RecordSpecAttributes(self.spec, 'load_progress')
+    spec = spec_journal.SpecJournal(self.path).Load()
+    self.assertEqual({'chunks': {0, 10}}, spec.load_progress)
+    self.assertIs(spec.network, spec.vms[0].network)
+
+
+if __name__ == '__main__':
+  unittest.main()
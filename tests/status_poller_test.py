@@ -0,0 +1,125 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for perfkitbenchmarker.status_poller."""
+
+import json
+import threading
+import unittest
+
+import mock
+
+from perfkitbenchmarker import status_poller
+from perfkitbenchmarker.providers.aws import util
+
+
+class BatchStatusPollerTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.batches = []
+    self.statuses = {}
+    self.fetch_started = threading.Event()
+    self.release_fetch = threading.Event()
+    self.release_fetch.set()
+
+  def _Fetch(self, keys):
+    self.batches.append(keys)
+    self.fetch_started.set()
+    self.release_fetch.wait(5)
+    return {key: self.statuses[key] for key in keys if key in self.statuses}
+
+  def testGetStatus(self):
+    poller = status_poller.BatchStatusPoller(self._Fetch, 0, 0)
+    self.statuses['a'] = 'running'
+    self.assertEqual('running', poller.GetStatus('a'))
+    self.assertIsNone(poller.GetStatus('b'))
+    self.assertEqual([['a'], ['b']], self.batches)
+
+  def testCallersJoinTheNextBatch(self):
+    poller = status_poller.BatchStatusPoller(self._Fetch, 0, 0)
+    self.statuses.update({'a': 1, 'b': 2, 'c': 3})
+    self.release_fetch.clear()
+    results = {}
+
+    def GetStatus(key):
+      results[key] = poller.GetStatus(key)
+
+    first = threading.Thread(target=GetStatus, args=('a',))
+    first.start()
+    self.fetch_started.wait(5)
+    # These arrive while the first batch is in flight, so they share the
+    # next one.
+    others = [threading.Thread(target=GetStatus, args=(key,))
+              for key in ('b', 'c')]
+    for thread in others:
+      thread.start()
+    while len(poller._waiting) < 3:
+      pass
+    self.release_fetch.set()
+    for thread in [first] + others:
+      thread.join(5)
+    self.assertEqual({'a': 1, 'b': 2, 'c': 3}, results)
+    self.assertEqual([['a'], ['b', 'c']], self.batches)
+
+  def testErrorsAreRaisedToCallers(self):
+    poller = status_poller.BatchStatusPoller(
+        mock.Mock(side_effect=ValueError('throttled')), 0, 0)
+    with self.assertRaises(ValueError):
+      poller.GetStatus('a')
+
+  def testIntervalAdapts(self):
+    sleeps = []
+    poller = status_poller.BatchStatusPoller(
+        self._Fetch, 1, 4, clock=lambda: 0, sleep=sleeps.append)
+    self.statuses['a'] = 'pending'
+    poller.GetStatus('a')
+    self.assertEqual(1, poller.interval)
+    poller.GetStatus('a')
+    poller.GetStatus('a')
+    self.assertEqual(2.25, poller.interval)
+    self.assertEqual([1, 1.5], sleeps)
+    self.statuses['a'] = 'running'
+    poller.GetStatus('a')
+    self.assertEqual(1.125, poller.interval)
+
+
+class AwsBatchedDescriptionTestCase(unittest.TestCase):
+
+  def setUp(self):
+    p = mock.patch(util.__name__ + '.IssueRetryableCommand')
+    self.issue_command = p.start()
+    self.addCleanup(p.stop)
+
+  def testDescribeInstances(self):
+    self.issue_command.return_value = (json.dumps({'Reservations': [
+        {'Instances': [{'ClientToken': 'a', 'InstanceId': 'i-1'}]},
+        {'Instances': [{'ClientToken': 'b', 'InstanceId': 'i-2'}]}]}), '')
+    descriptions = util._DescribeResources('instances', 'us-east-1',
+                                           ['a', 'b', 'c'])
+    self.assertEqual(['a', 'b'], sorted(descriptions))
+    self.assertEqual('i-2', descriptions['b']['InstanceId'])
+    command = self.issue_command.call_args[0][0]
+    self.assertIn('describe-instances', command)
+    self.assertIn('--cli-input-json={"Filters": [{"Name": "client-token", '
+                  '"Values": ["a", "b", "c"]}]}', command)
+
+  def testSplitsLargeBatches(self):
+    self.issue_command.return_value = ('{"Vpcs": []}', '')
+    util._DescribeResources('vpcs', 'us-east-1',
+                            ['vpc-%d' % i for i in xrange(250)])
+    self.assertEqual(2, self.issue_command.call_count)
+
+
+if __name__ == '__main__':
+  unittest.main()
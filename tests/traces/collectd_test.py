@@ -0,0 +1,39 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for perfkitbenchmarker.traces.collectd."""
+
+import unittest
+
+import mock
+
+from perfkitbenchmarker.traces import collectd
+
+
+class CollectdCollectorTestCase(unittest.TestCase):
+
+  def testFetchResults(self):
+    vm = mock.Mock()
+    vm.name = 'vm0'
+    with mock.patch.object(collectd.artifact_collection,
+                           'CollectArtifacts') as collect:
+      collectd._CollectdCollector('/out')._FetchResults(vm)
+    # The CSV files are below a directory named after the VM's FQDN.
+    collect.assert_called_once_with(
+        vm, collectd.collectd.CSV_DIR, ['*'], '/out/vm0-collectd',
+        label='collectd', strip_components=1, manifest_dir='/out')
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,173 @@
+# Copyright 2017 PerfKitBenchmarker Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for perfkitbenchmarker.traces.db_profiler"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from perfkitbenchmarker.traces import db_profiler
+
+_MONGOSTAT_COLUMNS = [
+    ('insert', '1200'), ('query', '*0'), ('update', '300'), ('delete', '*0'),
+    ('getmore', '0'), ('command', '5|0'), ('% dirty', '2.5'),
+    ('% used', '40.1'), ('flushes', '0'), ('vsize', '1.2G'),
+    ('res', '51.0M'), ('qr|qw', '0|3'), ('ar|aw', '1|2'), ('netIn', '300k'),
+    ('netOut', '18m'), ('conn', '64'), ('time', '2017-05-01T10:00:00Z')]
+# mongostat right-aligns each value under its column name.
+_MONGOSTAT = '\n'.join(
+    ' '.join(column[i].rjust(max(len(column[0]), len(column[1])))
+             for column in _MONGOSTAT_COLUMNS) for i in xrange(2)) + '\n'
+
+
+class ParseTestCase(unittest.TestCase):
+
+  def testCassandra(self):
+    path = os.path.join(os.path.dirname(__file__), '..', 'data',
+                        'nodetool-stats.txt')
+    with open(path) as output:
+      stats = db_profiler.CassandraProfiler().Parse(output.read())
+    self.assertEqual(17.0, stats['MutationStage pending'])
+    self.assertEqual(123456.0, stats['MutationStage completed'])
+    self.assertEqual(12.0, stats['MUTATION dropped'])
+    self.assertEqual(0.0512, stats['Read Latency'])
+    self.assertEqual(4.0, stats['SSTable count'])
+    self.assertEqual(5.0, stats['GC elapsed percent'])
+    self.assertEqual(45.0, stats['GC max elapsed'])
+
+  def testMongoDb(self):
+    stats = db_profiler.MongoDbProfiler().Parse(
+        '2017-05-01T10:00:00.000+0000\tconnected to: 127.0.0.1\n' + _MONGOSTAT)
+    self.assertEqual(1200.0, stats['insert'])
+    self.assertEqual(0.0, stats['query'])
+    self.assertEqual(2.5, stats['% dirty'])
+    self.assertEqual(51.0 * 1024 ** 2, stats['res'])
+    self.assertEqual(3.0, stats['qw'])
+    self.assertEqual(300 * 1024, stats['netIn'])
+    self.assertEqual(64.0, stats['conn'])
+    self.assertNotIn('command', stats)
+
+  def testRedisSumsProcesses(self):
+    info = ('# Stats\r\ntotal_commands_processed:100\r\n'
+            'redis_version:3.0.7\r\nconnected_clients:2\r\n')
+    stats = db_profiler.RedisProfiler().Parse(info + info)
+    self.assertEqual({'total_commands_processed': 200.0,
+                      'connected_clients': 4.0}, stats)
+
+  def testAerospike(self):
+    stats = db_profiler.AerospikeProfiler().Parse(
+        'cluster_size=1;stat_read_reqs=10;paxos_principal=BB9\n')
+    self.assertEqual({'cluster_size': 1.0, 'stat_read_reqs': 10.0}, stats)
+
+  def testMySql(self):
+    stats = db_profiler.MySqlProfiler().Parse(
+        'Questions\t1000\nThreads_running\t4\nSsl_version\t\n')
+    self.assertEqual({'Questions': 1000.0, 'Threads_running': 4.0}, stats)
+
+
+class GetSamplesTestCase(unittest.TestCase):
+
+  def testCountersAreRates(self):
+    dumps = db_profiler.ParseDumps(
+        '#db_profiler 1000.0\nQuestions\t100\nThreads_running\t4\n'
+        '#db_profiler 1010.0\nQuestions\t600\nThreads_running\t8\n'
+        '#db_profiler 1020.0\nQuestions\t50\nThreads_running\t2\n')
+    samples = db_profiler.GetSamples(db_profiler.MySqlProfiler(), dumps,
+                                     995.0, {'vm_role': 'default_0'})
+    self.assertEqual(
+        [('mysql Threads_running', 4.0, 5.0),
+         ('mysql Questions', 50.0, 15.0),
+         ('mysql Threads_running', 8.0, 15.0),
+         ('mysql Threads_running', 2.0, 25.0)],
+        [(s.metric, s.value, s.metadata['interval_start']) for s in samples])
+    self.assertEqual(1010.0, samples[1].timestamp)
+    self.assertEqual('queries per second', samples[1].unit)
+    self.assertEqual('default_0', samples[1].metadata['vm_role'])
+
+
+class CollectorTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.temp_dir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.temp_dir)
+    p = mock.patch.object(db_profiler.vm_util, 'GetTempDir',
+                          return_value=self.temp_dir)
+    p.start()
+    self.addCleanup(p.stop)
+    p = mock.patch.object(db_profiler.artifact_collection, 'CollectArtifacts',
+                          side_effect=self._CollectArtifacts)
+    self.collect = p.start()
+    self.addCleanup(p.stop)
+    self.dumps = ('#db_profiler 1000.0\nQuestions\t100\n'
+                  '#db_profiler 1010.0\nQuestions\t200\n')
+
+  def _CollectArtifacts(self, vm, remote_dir, patterns, local_dir, label):
+    local_path = os.path.join(local_dir, patterns[0])
+    with open(local_path, 'w') as output_file:
+      output_file.write(self.dumps)
+    return [local_path]
+
+  def testRun(self):
+    vm = mock.Mock(db_instance_address='10.0.0.2',
+                   db_instance_master_user='root',
+                   db_instance_master_password='secret')
+    vm.name = 'vm0'
+    vm.RemoteCommand.return_value = ('1234\n', '')
+    spec = mock.Mock(uid='uid', vm_groups={'default': [vm]})
+    spec.name = 'mysql_service'
+    collector = db_profiler._DbProfilerCollector(10)
+    collector.Start(None, spec)
+    command = vm.RemoteCommand.call_args[0][0]
+    self.assertIn('SHOW GLOBAL STATUS', command)
+    self.assertIn('sleep 10; done', command)
+    collector.Stop(None, spec)
+    vm.RemoteCommand.assert_called_with('kill 1234 || true')
+    samples = []
+    collector.AddSamples(None, spec, samples)
+    self.assertEqual([('mysql Questions', 10.0)],
+                     [(s.metric, s.value) for s in samples])
+    remote_dir, patterns = self.collect.call_args[0][1:3]
+    self.assertEqual(db_profiler.vm_util.VM_TMP_DIR, remote_dir)
+    self.assertRegexpMatches(patterns[0], r'^vm0-uid-\w+-db_profiler\.txt$')
+    self.assertFalse(vm.Install.called)
+
+  def testMongoDbInstallsTools(self):
+    vm = mock.Mock()
+    vm.name = 'vm0'
+    vm.RemoteCommand.return_value = ('1234\n', '')
+    spec = mock.Mock(uid='uid', vm_groups={'workers': [vm]})
+    spec.name = 'mongodb_ycsb'
+    collector = db_profiler._DbProfilerCollector(10)
+    collector.Start(None, spec)
+    vm.Install.assert_called_once_with('mongodb_tools')
+    self.dumps = '#db_profiler 1000.0\nbash: mongostat: command not found\n'
+    with mock.patch.object(db_profiler.logging, 'warning') as warning:
+      collector.Stop(None, spec)
+    self.assertTrue(warning.called)
+
+  def testOtherBenchmarks(self):
+    vm = mock.Mock()
+    spec = mock.Mock(vm_groups={'default': [vm]})
+    spec.name = 'iperf'
+    collector = db_profiler._DbProfilerCollector(10)
+    collector.Start(None, spec)
+    collector.Stop(None, spec)
+    self.assertFalse(vm.RemoteCommand.called)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -16,8 +16,10 @@
 import unittest
 
 from perfkitbenchmarker import errors
+from perfkitbenchmarker import resource
 from perfkitbenchmarker import virtual_machine
 from perfkitbenchmarker.configs import option_decoders
+from tests import mock_flags
 
 
 _COMPONENT = 'test_component'
@@ -85,5 +87,82 @@ class BaseVmSpecTestCase(unittest.TestCase):
       virtual_machine.BaseVmSpec(_COMPONENT, zone=0)
 
 
+class _BulkVm(virtual_machine.BaseVirtualMachine):
+
+  requests = []
+  reject = False
+
+  def __init__(self, name, key):  # pylint: disable=super-init-not-called
+    resource.BaseResource.__init__(self)
+    self.name = name
+    self.key = key
+    self.id = None
+    self.bulk_create_size = 1
+    self.dependencies_created = False
+
+  def GetBulkCreateKey(self):
+    return self.key
+
+  def _CreateDependencies(self):
+    self.dependencies_created = True
+
+  @classmethod
+  def _BulkCreate(cls, vms):
+    if cls.reject:
+      raise errors.Resource.CreationError('quota exceeded')
+    cls.requests.append([vm.name for vm in vms])
+    for i, vm in enumerate(vms):
+      vm.id = 'i-%d' % i
+
+  def _Create(self):
+    raise AssertionError('Created individually.')
+
+  def _Delete(self):
+    pass
+
+  def _Exists(self):
+    return self.id is not None
+
+
+class BulkCreateVmsTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.flags = mock_flags.PatchTestCaseFlags(self)
+    self.flags.bulk_create_vms = True
+    self.flags.bulk_create_timeout = 10
+    _BulkVm.requests = []
+    _BulkVm.reject = False
+
+  def testGroupsVmsByKey(self):
+    vms = [_BulkVm('a', 'x'), _BulkVm('b', 'y'), _BulkVm('c', 'x'),
+           _BulkVm('d', None), _BulkVm('e', None)]
+    virtual_machine.BulkCreateVms(vms)
+    self.assertEqual([['a', 'c']], _BulkVm.requests)
+    self.assertEqual([True, False, True, False, False],
+                     [vm.created for vm in vms])
+    self.assertEqual(['i-0', None, 'i-1', None, None], [vm.id for vm in vms])
+    self.assertEqual(2, vms[0].bulk_create_size)
+    self.assertEqual(1, vms[1].bulk_create_size)
+
+  def testPerVmTimes(self):
+    vms = [_BulkVm('a', 'x'), _BulkVm('b', 'x')]
+    virtual_machine.BulkCreateVms(vms)
+    for vm in vms:
+      self.assertTrue(vm.dependencies_created)
+      self.assertLessEqual(vm.create_start_time, vm.create_end_time)
+
+  def testRejectedRequestLeavesVmsToCreate(self):
+    _BulkVm.reject = True
+    vms = [_BulkVm('a', 'x'), _BulkVm('b', 'x')]
+    virtual_machine.BulkCreateVms(vms)
+    self.assertFalse(any(vm.created for vm in vms))
+    self.assertEqual([1, 1], [vm.bulk_create_size for vm in vms])
+
+  def testDisabled(self):
+    self.flags.bulk_create_vms = False
+    virtual_machine.BulkCreateVms([_BulkVm('a', 'x'), _BulkVm('b', 'x')])
+    self.assertEqual([], _BulkVm.requests)
+
+
 if __name__ == '__main__':
   unittest.main()